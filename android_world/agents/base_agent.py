@@ -126,6 +126,14 @@ class EnvironmentInteractingAgent(abc.ABC):
       Done and agent & observation data.
     """
 
+  def finish_episode(self) -> None:
+    """Completes the work left pending by the last step of an episode.
+
+    Agents that return from `step` before all of its data is available, e.g.
+    while an LLM call is still in flight, fill in that data here.
+    `episode_runner.run_episode` calls this before collecting the step data.
+    """
+
   @property
   def name(self) -> str:
     return self._name
@@ -0,0 +1,152 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Holds the screenshots that agents keep in their step data.
+
+Agents keep several full resolution frames per step for the whole episode.
+A `FrameStore` keeps a single read-only instance of identical frames, and can
+keep them downsampled or JPEG-compressed instead of as full arrays.
+"""
+
+import enum
+import hashlib
+import threading
+
+from android_world.agents import infer
+from android_world.utils import jpeg_frame
+import cv2
+import numpy as np
+
+
+class Encoding(enum.Enum):
+  """How a `FrameStore` keeps frames."""
+
+  # Read-only arrays at full resolution.
+  ARRAY = 'array'
+  # Read-only arrays, downscaled to `max_long_edge`.
+  DOWNSAMPLED = 'downsampled'
+  # `JpegFrame`s, optionally downscaled to `max_long_edge`.
+  JPEG = 'jpeg'
+
+
+# Kept here too, as `FrameStore.put` returns them.
+JpegFrame = jpeg_frame.JpegFrame
+to_array = jpeg_frame.to_array
+
+
+def _downsample(frame: np.ndarray, max_long_edge: int) -> np.ndarray:
+  height, width = frame.shape[:2]
+  if max(height, width) <= max_long_edge:
+    return frame.copy()
+  scale = max_long_edge / max(height, width)
+  return cv2.resize(
+      frame,
+      (max(1, round(width * scale)), max(1, round(height * scale))),
+      interpolation=cv2.INTER_AREA,
+  )
+
+
+def _decoded_shape(
+    frame: np.ndarray, max_long_edge: int | None
+) -> tuple[int, ...]:
+  height, width = frame.shape[:2]
+  if max_long_edge and max(height, width) > max_long_edge:
+    scale = max_long_edge / max(height, width)
+    height = max(1, round(height * scale))
+    width = max(1, round(width * scale))
+  return (height, width, 3)
+
+
+class FrameStore:
+  """Keeps frames for step data, deduplicated by content.
+
+  The frames of an episode are held until `clear` is called, which agents do
+  on reset.
+  """
+
+  def __init__(
+      self,
+      encoding: Encoding = Encoding.ARRAY,
+      max_long_edge: int | None = None,
+      jpeg_quality: int = 75,
+  ):
+    """Initializes the store.
+
+    Args:
+      encoding: How frames are kept.
+      max_long_edge: For `DOWNSAMPLED` and `JPEG`, the number of pixels the
+        longer edge of frames is downscaled to.
+      jpeg_quality: For `JPEG`, the JPEG quality, from 0 to 100.
+
+    Raises:
+      ValueError: If `DOWNSAMPLED` is used without `max_long_edge`.
+    """
+    if encoding == Encoding.DOWNSAMPLED and not max_long_edge:
+      raise ValueError('Downsampled frames require max_long_edge.')
+    self.encoding = encoding
+    self.max_long_edge = max_long_edge
+    self.jpeg_quality = jpeg_quality
+    self._frames = {}
+    self._lock = threading.Lock()
+
+  def __len__(self) -> int:
+    return len(self._frames)
+
+  def put(
+      self, frame: np.ndarray, copy: bool = True
+  ) -> np.ndarray | JpegFrame:
+    """Returns the instance of a frame to keep in step data.
+
+    Args:
+      frame: The RGB frame.
+      copy: Whether to copy the frame if it is kept as is. If False, the store
+        takes ownership of `frame`, which becomes read-only.
+
+    Returns:
+      A read-only array or a `JpegFrame`, shared by all identical frames.
+    """
+    frame = np.ascontiguousarray(frame)
+    hasher = hashlib.sha1(
+        f'{frame.dtype.str}{frame.shape}'.encode(), usedforsecurity=False
+    )
+    hasher.update(frame.data)
+    digest = hasher.digest()
+    with self._lock:
+      stored = self._frames.get(digest)
+    if stored is not None:
+      return stored
+
+    if self.encoding == Encoding.JPEG:
+      data = infer.encode_jpeg(
+          frame,
+          infer.ImageEncoding(
+              max_long_edge=self.max_long_edge, jpeg_quality=self.jpeg_quality
+          ),
+      )
+      stored = JpegFrame(data, _decoded_shape(frame, self.max_long_edge))
+    else:
+      if self.encoding == Encoding.DOWNSAMPLED:
+        stored = _downsample(frame, self.max_long_edge)
+      else:
+        stored = frame.copy() if copy else frame
+      stored.flags.writeable = False
+
+    with self._lock:
+      return self._frames.setdefault(digest, stored)
+
+  def clear(self) -> None:
+    """Forgets all frames, e.g. at the end of an episode."""
+    with self._lock:
+      self._frames.clear()
+
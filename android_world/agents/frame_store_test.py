@@ -0,0 +1,98 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from absl.testing import absltest
+from android_world.agents import frame_store
+import numpy as np
+
+
+def _frame(value: int = 0) -> np.ndarray:
+  frame = np.zeros((200, 100, 3), dtype=np.uint8)
+  frame[:100] = value
+  return frame
+
+
+class FrameStoreTest(absltest.TestCase):
+
+  def test_identical_frames_are_kept_once(self):
+    store = frame_store.FrameStore()
+
+    first = store.put(_frame())
+    second = store.put(_frame())
+    other = store.put(_frame(1))
+
+    self.assertIs(first, second)
+    self.assertIsNot(first, other)
+    self.assertLen(store, 2)
+
+  def test_frames_are_read_only(self):
+    store = frame_store.FrameStore()
+    frame = _frame()
+
+    stored = store.put(frame)
+
+    self.assertFalse(stored.flags.writeable)
+    self.assertFalse(np.shares_memory(stored, frame))
+    frame[0, 0] = 1  # The caller's frame is still writable.
+
+  def test_put_without_copy_takes_ownership(self):
+    store = frame_store.FrameStore()
+    frame = _frame()
+
+    stored = store.put(frame, copy=False)
+
+    self.assertIs(stored, frame)
+    self.assertFalse(frame.flags.writeable)
+
+  def test_downsampled(self):
+    store = frame_store.FrameStore(
+        frame_store.Encoding.DOWNSAMPLED, max_long_edge=50
+    )
+
+    stored = store.put(_frame(255))
+
+    self.assertEqual(stored.shape, (50, 25, 3))
+    self.assertEqual(stored[0, 0, 0], 255)
+    self.assertEqual(stored[-1, 0, 0], 0)
+
+  def test_downsampled_requires_max_long_edge(self):
+    with self.assertRaises(ValueError):
+      frame_store.FrameStore(frame_store.Encoding.DOWNSAMPLED)
+
+  def test_jpeg(self):
+    store = frame_store.FrameStore(frame_store.Encoding.JPEG, max_long_edge=50)
+    frame = _frame(255)
+    frame[:100, :, 1:] = 0  # Red.
+
+    stored = store.put(frame)
+    decoded = frame_store.to_array(stored)
+
+    self.assertIsInstance(stored, frame_store.JpegFrame)
+    self.assertEqual(decoded.shape, stored.shape)
+    self.assertEqual(decoded.shape, (50, 25, 3))
+    self.assertGreater(decoded[10, 10, 0], 200)
+    self.assertLess(decoded[10, 10, 1], 50)
+
+  def test_clear(self):
+    store = frame_store.FrameStore()
+    first = store.put(_frame())
+
+    store.clear()
+
+    self.assertEmpty(store)
+    self.assertIsNot(store.put(_frame()), first)
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -15,11 +15,22 @@
 """Some LLM inference interface."""
 
 import abc
+import asyncio
 import base64
+import collections
+from concurrent import futures
+import contextlib
+import dataclasses
+import datetime
+import email.utils
+import functools
 import io
 import os
+import threading
 import time
-from typing import Any, Optional
+from typing import Any, Coroutine, Optional, TypeVar
+import zlib
+import cv2
 import google.generativeai as genai
 from google.generativeai import types
 from google.generativeai.types import answer_types
@@ -30,14 +41,263 @@ import numpy as np
 from PIL import Image
 import requests
 
+_T = TypeVar('_T')
 
 ERROR_CALLING_LLM = 'Error calling LLM'
 
+# Runs the blocking LLM calls of the `*_async` methods that are not natively
+# asynchronous, shared by all wrappers so the number of concurrent requests is
+# bounded across agents.
+_EXECUTOR = futures.ThreadPoolExecutor(
+    max_workers=32, thread_name_prefix='llm_infer'
+)
+_background_loop: asyncio.AbstractEventLoop | None = None
+_background_loop_lock = threading.Lock()
+
+
+def _get_background_loop() -> asyncio.AbstractEventLoop:
+  """Returns the shared event loop, starting its thread on first use."""
+  global _background_loop
+  with _background_loop_lock:
+    if _background_loop is None:
+      loop = asyncio.new_event_loop()
+      threading.Thread(
+          target=loop.run_forever, name='llm_infer_loop', daemon=True
+      ).start()
+      _background_loop = loop
+    return _background_loop
+
+
+_OPENAI_CHAT_COMPLETIONS_URL = 'https://api.openai.com/v1/chat/completions'
+# Matches the number of threads of `_EXECUTOR`, so that every thread can keep
+# a connection alive.
+_HTTP_POOL_SIZE = 32
+
+_http_session: requests.Session | None = None
+_http_session_lock = threading.Lock()
+
+
+class TokenBucket:
+  """A token-bucket rate limiter that can be shared by threads."""
+
+  def __init__(self, rate: float, capacity: float | None = None):
+    """Initializes the bucket, which starts full.
+
+    Args:
+      rate: Tokens added per second.
+      capacity: Maximum number of tokens, i.e. the largest burst. Defaults to
+        one second worth of tokens, and at least one.
+    """
+    if rate <= 0:
+      raise ValueError(f'Rate must be positive, got {rate}.')
+    self.rate = rate
+    self.capacity = capacity if capacity is not None else max(1.0, rate)
+    self._tokens = self.capacity
+    self._last_refill = time.monotonic()
+    self._lock = threading.Lock()
+
+  def acquire(self) -> None:
+    """Takes a token, waiting until one is available."""
+    while True:
+      with self._lock:
+        now = time.monotonic()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._last_refill) * self.rate
+        )
+        self._last_refill = now
+        if self._tokens >= 1:
+          self._tokens -= 1
+          return
+        wait_seconds = (1 - self._tokens) / self.rate
+      time.sleep(wait_seconds)
+
+
+_request_semaphore: threading.BoundedSemaphore | None = None
+_rate_limiter: TokenBucket | None = None
+
+
+def set_request_limits(
+    max_concurrent_requests: int | None = None,
+    requests_per_minute: float | None = None,
+) -> None:
+  """Limits the HTTP requests made by all LLM wrappers in this process.
+
+  Args:
+    max_concurrent_requests: Maximum number of requests in flight at once, or
+      None for no limit.
+    requests_per_minute: Maximum sustained request rate, or None for no limit.
+      Up to one second worth of requests may be sent in a burst.
+  """
+  global _request_semaphore, _rate_limiter
+  _request_semaphore = (
+      threading.BoundedSemaphore(max_concurrent_requests)
+      if max_concurrent_requests
+      else None
+  )
+  _rate_limiter = (
+      TokenBucket(requests_per_minute / 60) if requests_per_minute else None
+  )
+
+
+def _get_http_session() -> requests.Session:
+  """Returns the session shared by all wrappers to reuse connections."""
+  global _http_session
+  with _http_session_lock:
+    if _http_session is None:
+      session = requests.Session()
+      adapter = requests.adapters.HTTPAdapter(
+          pool_connections=_HTTP_POOL_SIZE, pool_maxsize=_HTTP_POOL_SIZE
+      )
+      session.mount('https://', adapter)
+      session.mount('http://', adapter)
+      _http_session = session
+    return _http_session
+
+
+@contextlib.contextmanager
+def _request_slot():
+  """Waits until the request limits allow sending another request."""
+  semaphore = _request_semaphore
+  rate_limiter = _rate_limiter
+  if semaphore is not None:
+    semaphore.acquire()
+  try:
+    if rate_limiter is not None:
+      rate_limiter.acquire()
+    yield
+  finally:
+    if semaphore is not None:
+      semaphore.release()
+
+
+def _retry_after_seconds(response: requests.Response) -> float | None:
+  """Returns how long the `Retry-After` header asks to wait, if it is set."""
+  value = response.headers.get('Retry-After')
+  if not value:
+    return None
+  try:
+    return max(0.0, float(value))
+  except ValueError:
+    pass
+  try:
+    retry_at = email.utils.parsedate_to_datetime(value)
+  except (TypeError, ValueError):
+    return None
+  if retry_at.tzinfo is None:
+    retry_at = retry_at.replace(tzinfo=datetime.timezone.utc)
+  now = datetime.datetime.now(datetime.timezone.utc)
+  return max(0.0, (retry_at - now).total_seconds())
+
+
+def submit(coroutine: Coroutine[Any, Any, _T]) -> futures.Future[_T]:
+  """Runs a coroutine on a shared background event loop.
+
+  This lets synchronous code, such as an agent's `step`, start LLM calls and
+  keep interacting with the device while they are in flight.
+
+  Args:
+    coroutine: The coroutine to run, e.g. from `predict_mm_async`.
+
+  Returns:
+    A future holding the result of the coroutine.
+  """
+  return asyncio.run_coroutine_threadsafe(coroutine, _get_background_loop())
+
+
+@dataclasses.dataclass(frozen=True)
+class ImageEncoding:
+  """How images are encoded for multimodal prompts.
+
+  Attributes:
+    max_long_edge: If set, images whose longer edge has more pixels are
+      downscaled to it, keeping their aspect ratio.
+    jpeg_quality: JPEG quality, from 0 to 100.
+  """
+
+  max_long_edge: int | None = None
+  jpeg_quality: int = 75
+
+
+# Recent encodings, so that an image sent in both the action selection and the
+# summary prompts of a step is only encoded once.
+_ENCODED_IMAGE_CACHE_SIZE = 16
+_encoded_images: collections.OrderedDict[Any, bytes] = (
+    collections.OrderedDict()
+)
+_encoded_images_lock = threading.Lock()
+# Per-thread buffers for the BGR conversion of the images to encode.
+_encoding_buffers = threading.local()
+
+
+def _to_bgr(image: np.ndarray) -> np.ndarray:
+  """Converts an RGB(A) image to the BGR layout of OpenCV."""
+  if image.ndim != 3 or image.shape[2] not in (3, 4):
+    return image
+  shape = image.shape[:2] + (3,)
+  buffer = getattr(_encoding_buffers, 'bgr', None)
+  if buffer is None or buffer.shape != shape or buffer.dtype != image.dtype:
+    buffer = np.empty(shape, dtype=image.dtype)
+    _encoding_buffers.bgr = buffer
+  code = cv2.COLOR_RGB2BGR if image.shape[2] == 3 else cv2.COLOR_RGBA2BGR
+  return cv2.cvtColor(image, code, dst=buffer)
+
+
+def encode_jpeg(
+    image: np.ndarray, encoding: ImageEncoding = ImageEncoding()
+) -> bytes:
+  """Encodes an RGB image as JPEG.
+
+  Encoding uses OpenCV's libjpeg-turbo, which is faster than PIL, and reuses
+  the result if the same, unchanged, array was encoded recently.
+
+  Args:
+    image: The image as a numpy array.
+    encoding: How to downscale and compress the image.
+
+  Returns:
+    The JPEG bytes.
+  """
+  key_id = id(image)
+  image = np.ascontiguousarray(image)
+  key = (
+      key_id,
+      image.shape,
+      image.dtype.str,
+      zlib.crc32(image.data),
+      encoding,
+  )
+  with _encoded_images_lock:
+    if key in _encoded_images:
+      _encoded_images.move_to_end(key)
+      return _encoded_images[key]
+
+  height, width = image.shape[:2]
+  if encoding.max_long_edge and max(height, width) > encoding.max_long_edge:
+    scale = encoding.max_long_edge / max(height, width)
+    image = cv2.resize(
+        image,
+        (max(1, round(width * scale)), max(1, round(height * scale))),
+        interpolation=cv2.INTER_LINEAR,
+    )
+  ok, encoded = cv2.imencode(
+      '.jpg',
+      _to_bgr(image),
+      [cv2.IMWRITE_JPEG_QUALITY, encoding.jpeg_quality],
+  )
+  if not ok:
+    raise ValueError(f'Failed to encode image of shape {image.shape}.')
+  jpeg = encoded.tobytes()
+
+  with _encoded_images_lock:
+    _encoded_images[key] = jpeg
+    while len(_encoded_images) > _ENCODED_IMAGE_CACHE_SIZE:
+      _encoded_images.popitem(last=False)
+  return jpeg
+
 
 def array_to_jpeg_bytes(image: np.ndarray) -> bytes:
   """Converts a numpy array into a byte string for a JPEG image."""
-  image = Image.fromarray(image)
-  return image_to_jpeg_bytes(image)
+  return encode_jpeg(image)
 
 
 def image_to_jpeg_bytes(image: Image.Image) -> bytes:
@@ -66,6 +326,24 @@ class LlmWrapper(abc.ABC):
       Text output, is_safe, and raw output.
     """
 
+  async def predict_async(
+      self,
+      text_prompt: str,
+  ) -> tuple[str, Optional[bool], Any]:
+    """Asynchronous version of `predict`.
+
+    By default, runs `predict` on a shared thread pool.
+
+    Args:
+      text_prompt: Text prompt.
+
+    Returns:
+      Text output, is_safe, and raw output.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _EXECUTOR, self.predict, text_prompt
+    )
+
 
 class MultimodalLlmWrapper(abc.ABC):
   """Abstract interface for Multimodal LLM."""
@@ -84,6 +362,24 @@ class MultimodalLlmWrapper(abc.ABC):
       Text output and raw output.
     """
 
+  async def predict_mm_async(
+      self, text_prompt: str, images: list[np.ndarray]
+  ) -> tuple[str, Optional[bool], Any]:
+    """Asynchronous version of `predict_mm`.
+
+    By default, runs `predict_mm` on a shared thread pool.
+
+    Args:
+      text_prompt: Text prompt.
+      images: List of images as numpy ndarray.
+
+    Returns:
+      Text output, is_safe, and raw output.
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        _EXECUTOR, functools.partial(self.predict_mm, text_prompt, images)
+    )
+
 
 SAFETY_SETTINGS_BLOCK_NONE = {
     types.HarmCategory.HARM_CATEGORY_HARASSMENT: (
@@ -111,23 +407,48 @@ class GeminiGcpWrapper(LlmWrapper, MultimodalLlmWrapper):
       temperature: float = 0.0,
       top_p: float = 0.95,
       enable_safety_checks: bool = True,
+      image_encoding: ImageEncoding | None = None,
   ):
+    """Initializes the wrapper.
+
+    Args:
+      model_name: The Gemini model.
+      max_retry: Max number of retries when some error happens.
+      temperature: The temperature of the model.
+      top_p: The top-p of the model.
+      enable_safety_checks: Whether to use the default safety settings.
+      image_encoding: If set, images are sent as JPEGs encoded this way.
+        Otherwise, the client library encodes them as lossless WebP.
+    """
     if 'GCP_API_KEY' not in os.environ:
       raise RuntimeError('GCP API key not set.')
     genai.configure(api_key=os.environ['GCP_API_KEY'])
+    self.generation_config = generation_types.GenerationConfig(
+        temperature=temperature, top_p=top_p, max_output_tokens=1000
+    )
     self.llm = genai.GenerativeModel(
         model_name,
         safety_settings=None
         if enable_safety_checks
         else SAFETY_SETTINGS_BLOCK_NONE,
-        generation_config=generation_types.GenerationConfig(
-            temperature=temperature, top_p=top_p, max_output_tokens=1000
-        ),
+        generation_config=self.generation_config,
     )
     if max_retry <= 0:
       max_retry = 3
       print('Max_retry must be positive. Reset it to 3')
     self.max_retry = min(max_retry, 5)
+    self.image_encoding = image_encoding
+
+  def _image_parts(self, images: list[np.ndarray]) -> list[Any]:
+    if self.image_encoding is None:
+      return [Image.fromarray(image) for image in images]
+    return [
+        {
+            'mime_type': 'image/jpeg',
+            'data': encode_jpeg(image, self.image_encoding),
+        }
+        for image in images
+    ]
 
   def predict(
       self,
@@ -162,7 +483,7 @@ class GeminiGcpWrapper(LlmWrapper, MultimodalLlmWrapper):
     while counter > 0:
       try:
         output = self.llm.generate_content(
-            [text_prompt] + [Image.fromarray(image) for image in images],
+            [text_prompt] + self._image_parts(images),
             safety_settings=None
             if enable_safety_checks
             else SAFETY_SETTINGS_BLOCK_NONE,
@@ -182,6 +503,49 @@ class GeminiGcpWrapper(LlmWrapper, MultimodalLlmWrapper):
       return ERROR_CALLING_LLM, False, output
     return ERROR_CALLING_LLM, None, None
 
+  async def predict_async(
+      self,
+      text_prompt: str,
+      enable_safety_checks: bool = True,
+      generation_config: generation_types.GenerationConfigType | None = None,
+  ) -> tuple[str, Optional[bool], Any]:
+    return await self.predict_mm_async(
+        text_prompt, [], enable_safety_checks, generation_config
+    )
+
+  async def predict_mm_async(
+      self,
+      text_prompt: str,
+      images: list[np.ndarray],
+      enable_safety_checks: bool = True,
+      generation_config: generation_types.GenerationConfigType | None = None,
+  ) -> tuple[str, Optional[bool], Any]:
+    counter = self.max_retry
+    retry_delay = 1.0
+    output = None
+    while counter > 0:
+      try:
+        output = await self.llm.generate_content_async(
+            [text_prompt] + self._image_parts(images),
+            safety_settings=None
+            if enable_safety_checks
+            else SAFETY_SETTINGS_BLOCK_NONE,
+            generation_config=generation_config,
+        )
+        return output.text, True, output
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        counter -= 1
+        print(f'Error calling LLM, will retry in {retry_delay} seconds')
+        print(e)
+        if counter > 0:
+          # Expo backoff
+          await asyncio.sleep(retry_delay)
+          retry_delay *= 2
+
+    if (output is not None) and (not self.is_safe(output)):
+      return ERROR_CALLING_LLM, False, output
+    return ERROR_CALLING_LLM, None, None
+
   def generate(
       self,
       contents: (
@@ -250,6 +614,7 @@ class Gpt4Wrapper(LlmWrapper, MultimodalLlmWrapper):
     max_retry: Max number of retries when some error happens.
     temperature: The temperature parameter in LLM to control result stability.
     model: GPT model to use based on if it is multimodal.
+    image_encoding: How images are encoded in the requests.
   """
 
   RETRY_WAITING_SECONDS = 20
@@ -259,6 +624,7 @@ class Gpt4Wrapper(LlmWrapper, MultimodalLlmWrapper):
       model_name: str,
       max_retry: int = 3,
       temperature: float = 0.0,
+      image_encoding: ImageEncoding | None = None,
   ):
     if 'OPENAI_API_KEY' not in os.environ:
       raise RuntimeError('OpenAI API key not set.')
@@ -269,10 +635,17 @@ class Gpt4Wrapper(LlmWrapper, MultimodalLlmWrapper):
     self.max_retry = min(max_retry, 5)
     self.temperature = temperature
     self.model = model_name
+    self.image_encoding = image_encoding or ImageEncoding()
+    self._headers = {
+        'Content-Type': 'application/json',
+        'Authorization': f'Bearer {self.openai_api_key}',
+    }
 
   @classmethod
-  def encode_image(cls, image: np.ndarray) -> str:
-    return base64.b64encode(array_to_jpeg_bytes(image)).decode('utf-8')
+  def encode_image(
+      cls, image: np.ndarray, encoding: ImageEncoding = ImageEncoding()
+  ) -> str:
+    return base64.b64encode(encode_jpeg(image, encoding)).decode('utf-8')
 
   def predict(
       self,
@@ -283,11 +656,6 @@ class Gpt4Wrapper(LlmWrapper, MultimodalLlmWrapper):
   def predict_mm(
       self, text_prompt: str, images: list[np.ndarray]
   ) -> tuple[str, Optional[bool], Any]:
-    headers = {
-        'Content-Type': 'application/json',
-        'Authorization': f'Bearer {self.openai_api_key}',
-    }
-
     payload = {
         'model': self.model,
         'temperature': self.temperature,
@@ -306,19 +674,27 @@ class Gpt4Wrapper(LlmWrapper, MultimodalLlmWrapper):
       payload['messages'][0]['content'].append({
           'type': 'image_url',
           'image_url': {
-              'url': f'data:image/jpeg;base64,{self.encode_image(image)}'
+              'url': (
+                  'data:image/jpeg;base64,'
+                  + self.encode_image(image, self.image_encoding)
+              )
           },
       })
 
     counter = self.max_retry
     wait_seconds = self.RETRY_WAITING_SECONDS
     while counter > 0:
+      counter -= 1
+      retry_after_seconds = None
       try:
-        response = requests.post(
-            'https://api.openai.com/v1/chat/completions',
-            headers=headers,
-            json=payload,
-        )
+        with _request_slot():
+          response = _get_http_session().post(
+              _OPENAI_CHAT_COMPLETIONS_URL,
+              headers=self._headers,
+              json=payload,
+          )
+        if response.status_code == 429:
+          retry_after_seconds = _retry_after_seconds(response)
         if response.ok and 'choices' in response.json():
           return (
               response.json()['choices'][0]['message']['content'],
@@ -329,13 +705,14 @@ class Gpt4Wrapper(LlmWrapper, MultimodalLlmWrapper):
             'Error calling OpenAI API with error message: '
             + response.json()['error']['message']
         )
-        time.sleep(wait_seconds)
-        wait_seconds *= 2
       except Exception as e:  # pylint: disable=broad-exception-caught
         # Want to catch all exceptions happened during LLM calls.
-        time.sleep(wait_seconds)
-        wait_seconds *= 2
-        counter -= 1
         print('Error calling LLM, will retry soon...')
         print(e)
+      if counter > 0:
+        if retry_after_seconds is not None:
+          time.sleep(retry_after_seconds)
+        else:
+          time.sleep(wait_seconds)
+          wait_seconds *= 2
     return ERROR_CALLING_LLM, None, None
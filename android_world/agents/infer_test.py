@@ -17,10 +17,12 @@ import time
 from unittest import mock
 from absl.testing import absltest
 from android_world.agents import infer
+import cv2
 import google.ai.generativelanguage as glm
 import google.generativeai as genai
 from google.generativeai.types import answer_types
 from google.generativeai.types import generation_types
+import numpy as np
 import requests
 
 
@@ -28,7 +30,7 @@ class InferTest(absltest.TestCase):
 
   def setUp(self):
     super().setUp()
-    self.mock_post = mock.patch.object(requests, "post").start()
+    self.mock_post = mock.patch.object(requests.Session, "post").start()
     self.mock_sleep = mock.patch.object(time, "sleep").start()
     os.environ["OPENAI_API_KEY"] = "fake_api_key"
     os.environ["GCP_API_KEY"] = "fake_api_key"
@@ -53,6 +55,31 @@ class InferTest(absltest.TestCase):
     self.assertEqual(text_output, "fake response")
     self.assertEqual(is_safe, True)
 
+  @mock.patch.object(genai.GenerativeModel, "generate_content")
+  def test_gemini_gcp_image_encoding(self, mock_generate_content):
+    mock_generate_content.return_value = (
+        generation_types.GenerateContentResponse.from_response(
+            glm.GenerateContentResponse({
+                "candidates": (
+                    [{"content": {"parts": [{"text": "fake response"}]}}]
+                )
+            })
+        )
+    )
+    llm = infer.GeminiGcpWrapper(
+        model_name="some_gemini_model",
+        image_encoding=infer.ImageEncoding(max_long_edge=10),
+    )
+
+    llm.predict_mm("fake prompt", [np.zeros((20, 20, 3), dtype=np.uint8)])
+
+    contents = mock_generate_content.call_args.args[0]
+    self.assertEqual(contents[1]["mime_type"], "image/jpeg")
+    decoded = cv2.imdecode(
+        np.frombuffer(contents[1]["data"], np.uint8), cv2.IMREAD_COLOR
+    )
+    self.assertEqual(decoded.shape, (10, 10, 3))
+
   @mock.patch.object(genai.GenerativeModel, "generate_content")
   def test_gemini_gcp_error(self, mock_generate_content):
     mock_generate_content.return_value = (
@@ -131,6 +158,133 @@ class InferTest(absltest.TestCase):
     gpt4v.predict_mm("fake prompt", [])
     self.mock_sleep.assert_called_once()
 
+  def test_gpt4v_retry_after(self):
+    gpt4v = infer.Gpt4Wrapper(model_name="gpt-4-turbo-2024-04-09")
+
+    mock_429_response = requests.Response()
+    mock_429_response.status_code = 429
+    mock_429_response.headers["Retry-After"] = "3"
+    mock_429_response._content = (
+        b'{"error": {"message": "Error 429: rate limit reached."}}'
+    )
+
+    mock_200_response = requests.Response()
+    mock_200_response.status_code = 200
+    mock_200_response._content = (
+        b'{"choices": [{"message": {"content": "ok."}}]}'
+    )
+    self.mock_post.side_effect = [mock_429_response, mock_200_response]
+
+    text_output, _, _ = gpt4v.predict_mm("fake prompt", [])
+    self.assertEqual(text_output, "ok.")
+    self.mock_sleep.assert_called_once_with(3.0)
+
+  def test_gpt4v_gives_up_after_max_retry(self):
+    gpt4v = infer.Gpt4Wrapper(
+        model_name="gpt-4-turbo-2024-04-09", max_retry=3
+    )
+
+    mock_500_response = requests.Response()
+    mock_500_response.status_code = 500
+    mock_500_response._content = b'{"error": {"message": "Server error."}}'
+    self.mock_post.return_value = mock_500_response
+
+    text_output, _, _ = gpt4v.predict_mm("fake prompt", [])
+    self.assertEqual(text_output, infer.ERROR_CALLING_LLM)
+    self.assertEqual(self.mock_post.call_count, 3)
+    self.assertEqual(
+        [c.args[0] for c in self.mock_sleep.call_args_list], [20, 40]
+    )
+
+  def test_token_bucket(self):
+    now = 0.0
+
+    def fake_sleep(seconds):
+      nonlocal now
+      now += seconds
+
+    self.enter_context(
+        mock.patch.object(time, "monotonic", side_effect=lambda: now)
+    )
+    self.mock_sleep.side_effect = fake_sleep
+    bucket = infer.TokenBucket(rate=2, capacity=2)
+
+    for _ in range(6):
+      bucket.acquire()
+
+    # The first two tokens are available right away.
+    self.assertAlmostEqual(now, 2.0)
+
+  def test_gpt4v_async(self):
+    llm = infer.Gpt4Wrapper(model_name="gpt-4-turbo-2024-04-09")
+    mock_200_response = requests.Response()
+    mock_200_response.status_code = 200
+    mock_200_response._content = (
+        b'{"choices": [{"message": {"content": "fake response"}}]}'
+    )
+    self.mock_post.return_value = mock_200_response
+
+    text_output, _, _ = infer.submit(
+        llm.predict_mm_async("fake prompt", [])
+    ).result()
+    self.assertEqual(text_output, "fake response")
+
+  @mock.patch.object(genai.GenerativeModel, "generate_content_async")
+  def test_gemini_gcp_async(self, mock_generate_content_async):
+    mock_generate_content_async.return_value = (
+        generation_types.AsyncGenerateContentResponse.from_response(
+            glm.GenerateContentResponse({
+                "candidates": (
+                    [{"content": {"parts": [{"text": "fake response"}]}}]
+                )
+            })
+        )
+    )
+    llm = infer.GeminiGcpWrapper(model_name="some_gemini_model")
+    text_output, is_safe, _ = infer.submit(
+        llm.predict_async("fake prompt")
+    ).result()
+    self.assertEqual(text_output, "fake response")
+    self.assertEqual(is_safe, True)
+
+
+class EncodeJpegTest(absltest.TestCase):
+
+  def test_downscales_to_max_long_edge(self):
+    image = np.zeros((200, 100, 3), dtype=np.uint8)
+
+    jpeg = infer.encode_jpeg(image, infer.ImageEncoding(max_long_edge=50))
+
+    decoded = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+    self.assertEqual(decoded.shape, (50, 25, 3))
+
+  def test_keeps_rgb_channel_order(self):
+    image = np.zeros((16, 16, 3), dtype=np.uint8)
+    image[..., 0] = 255
+
+    decoded = cv2.imdecode(
+        np.frombuffer(infer.encode_jpeg(image), np.uint8), cv2.IMREAD_COLOR
+    )
+
+    # Red in RGB is the last channel in OpenCV's BGR.
+    self.assertGreater(decoded[..., 2].mean(), 200)
+    self.assertLess(decoded[..., 0].mean(), 50)
+
+  def test_reuses_encoding_of_unchanged_image(self):
+    image = np.zeros((16, 16, 3), dtype=np.uint8)
+    mock_imencode = self.enter_context(
+        mock.patch.object(cv2, "imencode", wraps=cv2.imencode)
+    )
+
+    first = infer.encode_jpeg(image)
+    second = infer.encode_jpeg(image)
+    image[0, 0] = 255
+    third = infer.encode_jpeg(image)
+
+    self.assertEqual(first, second)
+    self.assertNotEqual(first, third)
+    self.assertEqual(mock_imencode.call_count, 2)
+
 
 if __name__ == "__main__":
   absltest.main()
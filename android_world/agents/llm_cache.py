@@ -0,0 +1,241 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""An on-disk cache of LLM responses, for deterministic and offline reruns.
+
+Responses are keyed by a hash of the model, the prompt and the image bytes, so
+re-running an agent with `temperature=0.0` on the same screens sends no
+requests. In `RECORD` mode, missing responses are requested from the wrapped
+LLM and stored; in `REPLAY` mode, only stored responses are returned, which
+makes whole suites or agent tests run without network access.
+"""
+
+from collections.abc import Callable
+import dataclasses
+import enum
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Optional
+
+from absl import logging
+from android_world.agents import infer
+from android_world.utils import file_utils
+import numpy as np
+
+
+class Mode(enum.Enum):
+  """How `CachingLlmWrapper` uses the cache."""
+
+  # Returns stored responses and stores the responses of cache misses.
+  RECORD = 'record'
+  # Only returns stored responses; a cache miss raises `CacheMissError`.
+  REPLAY = 'replay'
+
+
+class CacheMissError(KeyError):
+  """Raised in `REPLAY` mode when a response is not in the cache."""
+
+
+@dataclasses.dataclass(frozen=True)
+class CachedResponse:
+  """Stand-in for the raw LLM response of a response read from the cache."""
+
+  text: str
+
+
+def default_cache_dir() -> str:
+  return os.path.join(
+      file_utils.get_local_tmp_directory(), 'android_world', 'llm_cache'
+  )
+
+
+def _model_key(llm: infer.LlmWrapper | infer.MultimodalLlmWrapper) -> str:
+  """Identifies the wrapped model and its sampling parameters."""
+  parts = [type(llm).__name__]
+  model = getattr(llm, 'model', None) or getattr(
+      getattr(llm, 'llm', None), 'model_name', None
+  )
+  if model:
+    parts.append(str(model))
+  temperature = getattr(llm, 'temperature', None)
+  if temperature is not None:
+    parts.append(f'temperature={temperature}')
+  generation_config = getattr(llm, 'generation_config', None)
+  if dataclasses.is_dataclass(generation_config):
+    fields = sorted(
+        (name, value)
+        for name, value in dataclasses.asdict(generation_config).items()
+        if value is not None
+    )
+    parts.append(
+        'generation_config='
+        + ','.join(f'{name}={value}' for name, value in fields)
+    )
+  image_encoding = getattr(llm, 'image_encoding', None)
+  if image_encoding is not None:
+    parts.append(f'image_encoding={image_encoding}')
+  return '/'.join(parts)
+
+
+class CachingLlmWrapper(infer.LlmWrapper, infer.MultimodalLlmWrapper):
+  """Caches the responses of an LLM wrapper on disk.
+
+  Only successful responses are cached. The size of the cache is bounded by
+  evicting the least recently used responses.
+  """
+
+  def __init__(
+      self,
+      llm: infer.LlmWrapper | infer.MultimodalLlmWrapper,
+      cache_dir: str | None = None,
+      mode: Mode = Mode.RECORD,
+      max_size_bytes: int = 1 << 30,
+      model_key: str | None = None,
+  ):
+    """Initializes the cache.
+
+    Args:
+      llm: The wrapped LLM.
+      cache_dir: Directory of the cached responses. Defaults to a directory
+        under the local temporary directory.
+      mode: Whether cache misses are requested and recorded, or raise.
+      max_size_bytes: Total size of the cached responses above which the least
+        recently used ones are evicted.
+      model_key: Identifies the model in the cache keys. Defaults to the
+        wrapper's class, model name, sampling parameters (`temperature` or
+        `generation_config`) and image encoding. Set it for wrappers that keep
+        their sampling parameters elsewhere.
+    """
+    self.llm = llm
+    self.cache_dir = cache_dir or default_cache_dir()
+    self.mode = mode
+    self.max_size_bytes = max_size_bytes
+    self.model_key = model_key or _model_key(llm)
+    self._lock = threading.Lock()
+    os.makedirs(self.cache_dir, exist_ok=True)
+    self._size_bytes = sum(
+        os.path.getsize(path) for path in self._entry_paths()
+    )
+
+  def _entry_paths(self) -> list[str]:
+    return [
+        os.path.join(self.cache_dir, name)
+        for name in os.listdir(self.cache_dir)
+        if name.endswith('.json')
+    ]
+
+  def cache_key(self, text_prompt: str, images: list[np.ndarray]) -> str:
+    """Returns the content hash of a request."""
+    key = hashlib.sha256()
+    for part in (self.model_key, text_prompt):
+      encoded = part.encode('utf-8')
+      key.update(len(encoded).to_bytes(8, 'little'))
+      key.update(encoded)
+    for image in images:
+      image = np.ascontiguousarray(image)
+      key.update(f'{image.dtype.str}{image.shape}'.encode('utf-8'))
+      key.update(image.data)
+    return key.hexdigest()
+
+  def _read(self, key: str) -> tuple[str, Optional[bool]] | None:
+    path = os.path.join(self.cache_dir, key + '.json')
+    try:
+      with open(path) as f:
+        entry = json.load(f)
+      text, is_safe = entry['text'], entry['is_safe']
+      # Marks the entry as recently used.
+      os.utime(path)
+    except FileNotFoundError:
+      return None
+    except (OSError, ValueError, KeyError, TypeError) as e:
+      logging.warning('Ignoring unreadable LLM cache entry %s: %s', path, e)
+      return None
+    return text, is_safe
+
+  def _write(self, key: str, text: str, is_safe: Optional[bool]) -> None:
+    path = os.path.join(self.cache_dir, key + '.json')
+    data = json.dumps(
+        {'model': self.model_key, 'text': text, 'is_safe': is_safe}
+    )
+    with self._lock:
+      try:
+        old_size = os.path.getsize(path) if os.path.exists(path) else 0
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+          f.write(data)
+        os.replace(tmp_path, path)
+      except OSError as e:
+        logging.warning('Failed to write LLM cache entry %s: %s', path, e)
+        return
+      self._size_bytes += os.path.getsize(path) - old_size
+      if self._size_bytes > self.max_size_bytes:
+        self._evict()
+
+  def _evict(self) -> None:
+    """Removes the least recently used entries until the cache fits."""
+    entries = []
+    for path in self._entry_paths():
+      try:
+        stat = os.stat(path)
+      except FileNotFoundError:
+        continue
+      entries.append((stat.st_mtime, stat.st_size, path))
+    entries.sort()
+    self._size_bytes = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+      if self._size_bytes <= self.max_size_bytes:
+        break
+      try:
+        os.remove(path)
+      except FileNotFoundError:
+        pass
+      self._size_bytes -= size
+
+  def _predict(
+      self,
+      text_prompt: str,
+      images: list[np.ndarray],
+      request: Callable[[], tuple[str, Optional[bool], Any]],
+  ) -> tuple[str, Optional[bool], Any]:
+    key = self.cache_key(text_prompt, images)
+    cached = self._read(key)
+    if cached is not None:
+      text, is_safe = cached
+      return text, is_safe, CachedResponse(text)
+    if self.mode == Mode.REPLAY:
+      raise CacheMissError(
+          f'No cached response for {self.model_key} in {self.cache_dir}.'
+      )
+
+    text, is_safe, raw_response = request()
+    if raw_response and text != infer.ERROR_CALLING_LLM:
+      self._write(key, text, is_safe)
+    return text, is_safe, raw_response
+
+  def predict(
+      self,
+      text_prompt: str,
+  ) -> tuple[str, Optional[bool], Any]:
+    return self._predict(
+        text_prompt, [], lambda: self.llm.predict(text_prompt)
+    )
+
+  def predict_mm(
+      self, text_prompt: str, images: list[np.ndarray]
+  ) -> tuple[str, Optional[bool], Any]:
+    return self._predict(
+        text_prompt, images, lambda: self.llm.predict_mm(text_prompt, images)
+    )
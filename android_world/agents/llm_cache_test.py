@@ -0,0 +1,158 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+
+from absl.testing import absltest
+from android_world.agents import infer
+from android_world.agents import llm_cache
+from google.generativeai.types import generation_types
+import numpy as np
+
+
+class FakeLlmWrapper(infer.LlmWrapper, infer.MultimodalLlmWrapper):
+  """Fake LLM that answers with the number of calls it has received."""
+
+  def __init__(self, fail: bool = False):
+    self.calls = 0
+    self.fail = fail
+    self.model = 'fake-model'
+
+  def predict(self, text_prompt):
+    return self.predict_mm(text_prompt, [])
+
+  def predict_mm(self, text_prompt, images):
+    self.calls += 1
+    if self.fail:
+      return infer.ERROR_CALLING_LLM, None, None
+    return f'response {self.calls}', None, 'raw response'
+
+
+class CachingLlmWrapperTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.cache_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, self.cache_dir)
+    self.image = np.zeros((4, 4, 3), dtype=np.uint8)
+
+  def test_record_returns_cached_responses(self):
+    llm = FakeLlmWrapper()
+    cache = llm_cache.CachingLlmWrapper(llm, self.cache_dir)
+
+    first = cache.predict_mm('prompt', [self.image])
+    second = cache.predict_mm('prompt', [self.image])
+
+    self.assertEqual(first[0], 'response 1')
+    self.assertEqual(second[0], 'response 1')
+    self.assertEqual(second[2], llm_cache.CachedResponse('response 1'))
+    self.assertEqual(llm.calls, 1)
+
+  def test_key_depends_on_model_prompt_and_images(self):
+    cache = llm_cache.CachingLlmWrapper(FakeLlmWrapper(), self.cache_dir)
+    other_image = self.image.copy()
+    other_image[0, 0, 0] = 1
+
+    keys = {
+        cache.cache_key('prompt', [self.image]),
+        cache.cache_key('prompt', [other_image]),
+        cache.cache_key('prompt', [self.image[:2]]),
+        cache.cache_key('other prompt', [self.image]),
+        cache.cache_key('prompt', []),
+        llm_cache.CachingLlmWrapper(
+            FakeLlmWrapper(), self.cache_dir, model_key='other-model'
+        ).cache_key('prompt', [self.image]),
+    }
+
+    self.assertLen(keys, 6)
+
+  def test_key_depends_on_generation_config(self):
+    keys = set()
+    for temperature in (0.0, 1.0):
+      llm = FakeLlmWrapper()
+      llm.generation_config = generation_types.GenerationConfig(
+          temperature=temperature, top_p=0.95
+      )
+      keys.add(
+          llm_cache.CachingLlmWrapper(llm, self.cache_dir).cache_key(
+              'prompt', []
+          )
+      )
+
+    self.assertLen(keys, 2)
+
+  def test_replay_uses_recorded_responses(self):
+    llm_cache.CachingLlmWrapper(FakeLlmWrapper(), self.cache_dir).predict(
+        'prompt'
+    )
+    llm = FakeLlmWrapper()
+    replay = llm_cache.CachingLlmWrapper(
+        llm, self.cache_dir, mode=llm_cache.Mode.REPLAY
+    )
+
+    self.assertEqual(replay.predict('prompt')[0], 'response 1')
+    with self.assertRaises(llm_cache.CacheMissError):
+      replay.predict('other prompt')
+    self.assertEqual(llm.calls, 0)
+
+  def test_errors_are_not_cached(self):
+    llm = FakeLlmWrapper(fail=True)
+    cache = llm_cache.CachingLlmWrapper(llm, self.cache_dir)
+
+    cache.predict('prompt')
+    cache.predict('prompt')
+
+    self.assertEqual(llm.calls, 2)
+
+  def test_invalid_entries_are_ignored(self):
+    llm = FakeLlmWrapper()
+    cache = llm_cache.CachingLlmWrapper(llm, self.cache_dir)
+    path = os.path.join(self.cache_dir, cache.cache_key('prompt', []) + '.json')
+    with open(path, 'w') as f:
+      f.write('{"model": "fake-model"}')
+
+    self.assertEqual(cache.predict('prompt')[0], 'response 1')
+    self.assertEqual(cache.predict('prompt')[0], 'response 1')
+    self.assertEqual(llm.calls, 1)
+
+  def test_evicts_least_recently_used(self):
+    llm = FakeLlmWrapper()
+    cache = llm_cache.CachingLlmWrapper(llm, self.cache_dir)
+    cache.predict('a')
+    cache.predict('b')
+    entry_size = os.path.getsize(
+        os.path.join(self.cache_dir, cache.cache_key('a', []) + '.json')
+    )
+    for mtime, prompt in enumerate(['a', 'b']):
+      path = os.path.join(self.cache_dir, cache.cache_key(prompt, []) + '.json')
+      os.utime(path, (mtime, mtime))
+    cache = llm_cache.CachingLlmWrapper(
+        llm, self.cache_dir, max_size_bytes=2 * entry_size + 1
+    )
+
+    cache.predict('a')  # Hit, so 'b' becomes the least recently used.
+    cache.predict('c')
+
+    self.assertLen(os.listdir(self.cache_dir), 2)
+    cache.predict('a')
+    cache.predict('c')
+    self.assertEqual(llm.calls, 3)
+    cache.predict('b')
+    self.assertEqual(llm.calls, 4)
+
+
+if __name__ == '__main__':
+  absltest.main()
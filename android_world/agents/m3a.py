@@ -14,14 +14,18 @@
 
 """A Multimodal Autonomous Agent for Android (M3A)."""
 
+from concurrent import futures
 import time
+from typing import Any
 from android_world.agents import agent_utils
 from android_world.agents import base_agent
+from android_world.agents import frame_store as frame_store_lib
 from android_world.agents import infer
 from android_world.agents import m3a_utils
 from android_world.env import interface
 from android_world.env import json_action
 from android_world.env import representation_utils
+import numpy as np
 
 PROMPT_PREFIX = (
     'You are an agent who can operate an Android phone on behalf of a user.'
@@ -329,6 +333,35 @@ def _summarize_prompt(
   )
 
 
+def _record_summary(
+    step_data: dict[str, Any],
+    action: str,
+    summary_prompt: str,
+    llm_output: tuple[str, bool | None, Any],
+) -> None:
+  """Adds the output of the summary LLM call to the step data."""
+  summary, is_safe, raw_response = llm_output
+  if is_safe == False:  # pylint: disable=singleton-comparison
+    #  is_safe could be None
+    summary = """Summary triggered LLM safety classifier."""
+
+  if not raw_response:
+    print(
+        'Error calling LLM in summarization phase. This should not happen: '
+        f'{summary}'
+    )
+    step_data['summary'] = (
+        'Some error occurred calling LLM during summarization phase: %s'
+        % summary
+    )
+    return
+
+  step_data['summary_prompt'] = summary_prompt
+  step_data['summary'] = f'Action selected: {action}. {summary}'
+  print('Summary: ' + summary)
+  step_data['summary_raw_response'] = raw_response
+
+
 class M3A(base_agent.EnvironmentInteractingAgent):
   """M3A which stands for Multimodal Autonomous Agent for Android."""
 
@@ -338,6 +371,8 @@ class M3A(base_agent.EnvironmentInteractingAgent):
       llm: infer.MultimodalLlmWrapper,
       name: str = 'M3A',
       wait_after_action_seconds: float = 2.0,
+      overlap_summary: bool = False,
+      frame_store: frame_store_lib.FrameStore | None = None,
   ):
     """Initializes a M3A Agent.
 
@@ -347,12 +382,27 @@ class M3A(base_agent.EnvironmentInteractingAgent):
       name: The agent name.
       wait_after_action_seconds: Seconds to wait for the screen to stablize
         after executing an action
+      overlap_summary: If True, a step returns as soon as its summary is
+        requested, and the summary is only awaited by the next step after it
+        has captured the new state, or by `finish_episode`. The summary fields
+        of the returned step data are filled in at that point.
+      frame_store: Keeps the screenshots in the step data. Defaults to
+        read-only, deduplicated, full resolution arrays.
     """
     super().__init__(env, name)
     self.llm = llm
     self.history = []
     self.additional_guidelines = None
+    if frame_store is None:
+      frame_store = frame_store_lib.FrameStore()
+    self.frame_store = frame_store
     self.wait_after_action_seconds = wait_after_action_seconds
+    self.overlap_summary = overlap_summary
+    # The step data, action and prompt of the pending summary, with the
+    # future of its LLM call.
+    self._pending_summary: (
+        tuple[dict[str, Any], str, str, futures.Future[Any]] | None
+    ) = None
 
   def set_task_guidelines(self, task_guidelines: list[str]) -> None:
     self.additional_guidelines = task_guidelines
@@ -361,7 +411,23 @@ class M3A(base_agent.EnvironmentInteractingAgent):
     super().reset(go_home_on_reset)
     # Hide the coordinates on screen which might affect the vision model.
     self.env.hide_automation_ui()
+    self._wait_for_pending_summary()
     self.history = []
+    self.frame_store.clear()
+
+  def _wait_for_pending_summary(self) -> None:
+    """Waits for the summary of the previous step, if it is still pending.
+
+    The summary is added to the step data on the calling thread, so the step
+    data is never written to while it is read elsewhere, e.g. checkpointed.
+    """
+    if self._pending_summary is not None:
+      pending_summary, self._pending_summary = self._pending_summary, None
+      step_data, action, summary_prompt, llm_output = pending_summary
+      _record_summary(step_data, action, summary_prompt, llm_output.result())
+
+  def finish_episode(self) -> None:
+    self._wait_for_pending_summary()
 
   def step(self, goal: str) -> base_agent.AgentInteractionResult:
     step_data = {
@@ -390,20 +456,22 @@ class M3A(base_agent.EnvironmentInteractingAgent):
     before_ui_elements_list = _generate_ui_elements_description_list(
         before_ui_elements, logical_screen_size
     )
-    step_data['raw_screenshot'] = state.pixels.copy()
-    before_screenshot = state.pixels.copy()
-    for index, ui_element in enumerate(before_ui_elements):
-      if m3a_utils.validate_ui_element(ui_element, logical_screen_size):
-        m3a_utils.add_ui_element_mark(
-            before_screenshot,
-            ui_element,
-            index,
-            logical_screen_size,
-            physical_frame_boundary,
-            orientation,
-        )
-    step_data['before_screenshot_with_som'] = before_screenshot.copy()
+    raw_screenshot = state.pixels
+    step_data['raw_screenshot'] = self.frame_store.put(raw_screenshot)
+    before_screenshot = raw_screenshot.copy()
+    m3a_utils.add_ui_element_marks(
+        before_screenshot,
+        before_ui_elements,
+        logical_screen_size,
+        physical_frame_boundary,
+        orientation,
+    )
+    step_data['before_screenshot_with_som'] = self.frame_store.put(
+        before_screenshot, copy=False
+    )
 
+    # The previous step's summary is part of the action prompt.
+    self._wait_for_pending_summary()
     action_prompt = _action_selection_prompt(
         goal,
         [
@@ -417,7 +485,7 @@ class M3A(base_agent.EnvironmentInteractingAgent):
     action_output, is_safe, raw_response = self.llm.predict_mm(
         action_prompt,
         [
-            step_data['raw_screenshot'],
+            raw_screenshot,
             before_screenshot,
         ],
     )
@@ -493,14 +561,18 @@ Action: {{"action_type": "status", "goal_status": "infeasible"}}"""
         return base_agent.AgentInteractionResult(False, step_data)
 
       # Add mark to the target element.
+      marked_raw_screenshot = raw_screenshot.copy()
       m3a_utils.add_ui_element_mark(
-          step_data['raw_screenshot'],
+          marked_raw_screenshot,
           before_ui_elements[action_index],
           action_index,
           logical_screen_size,
           physical_frame_boundary,
           orientation,
       )
+      step_data['raw_screenshot'] = self.frame_store.put(
+          marked_raw_screenshot, copy=False
+      )
 
     if converted_action.action_type == 'status':
       if converted_action.goal_status == 'infeasible':
@@ -540,22 +612,23 @@ Action: {{"action_type": "status", "goal_status": "infeasible"}}"""
         after_ui_elements, logical_screen_size
     )
     after_screenshot = state.pixels.copy()
-    for index, ui_element in enumerate(after_ui_elements):
-      if m3a_utils.validate_ui_element(ui_element, logical_screen_size):
-        m3a_utils.add_ui_element_mark(
-            after_screenshot,
-            ui_element,
-            index,
-            logical_screen_size,
-            physical_frame_boundary,
-            orientation,
-        )
+    m3a_utils.add_ui_element_marks(
+        after_screenshot,
+        after_ui_elements,
+        logical_screen_size,
+        physical_frame_boundary,
+        orientation,
+    )
 
-    m3a_utils.add_screenshot_label(
-        step_data['before_screenshot_with_som'], 'before'
+    labeled_before_screenshot = before_screenshot.copy()
+    m3a_utils.add_screenshot_label(labeled_before_screenshot, 'before')
+    step_data['before_screenshot_with_som'] = self.frame_store.put(
+        labeled_before_screenshot, copy=False
     )
     m3a_utils.add_screenshot_label(after_screenshot, 'after')
-    step_data['after_screenshot_with_som'] = after_screenshot.copy()
+    step_data['after_screenshot_with_som'] = self.frame_store.put(
+        after_screenshot, copy=False
+    )
 
     summary_prompt = _summarize_prompt(
         action,
@@ -564,38 +637,24 @@ Action: {{"action_type": "status", "goal_status": "infeasible"}}"""
         before_ui_elements_list,
         after_ui_elements_list,
     )
-    summary, is_safe, raw_response = self.llm.predict_mm(
-        summary_prompt,
-        [
-            before_screenshot,
-            after_screenshot,
-        ],
-    )
-
-    if is_safe == False:  # pylint: disable=singleton-comparison
-      #  is_safe could be None
-      summary = """Summary triggered LLM safety classifier."""
-
-    if not raw_response:
-      print(
-          'Error calling LLM in summarization phase. This should not happen: '
-          f'{summary}'
-      )
-      step_data['summary'] = (
-          'Some error occurred calling LLM during summarization phase: %s'
-          % summary
+    summary_images = [before_screenshot, after_screenshot]
+    if self.overlap_summary:
+      self._pending_summary = (
+          step_data,
+          action,
+          summary_prompt,
+          infer.submit(
+              self.llm.predict_mm_async(summary_prompt, summary_images)
+          ),
       )
-      self.history.append(step_data)
-      return base_agent.AgentInteractionResult(
-          False,
+    else:
+      _record_summary(
           step_data,
+          action,
+          summary_prompt,
+          self.llm.predict_mm(summary_prompt, summary_images),
       )
 
-    step_data['summary_prompt'] = summary_prompt
-    step_data['summary'] = f'Action selected: {action}. {summary}'
-    print('Summary: ' + summary)
-    step_data['summary_raw_response'] = raw_response
-
     self.history.append(step_data)
     return base_agent.AgentInteractionResult(
         False,
@@ -12,9 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
 from typing import Any
 from unittest import mock
 from absl.testing import absltest
+from android_world import constants
+from android_world import episode_runner
+from android_world.agents import frame_store
 from android_world.agents import infer
 from android_world.agents import m3a
 from android_world.env import adb_utils
@@ -130,6 +134,127 @@ class M3AInteractionTest(absltest.TestCase):
     self.assertTrue(step2_data.done)
     self.assertLen(agent.history, 2)
 
+  def test_screenshots_are_kept_in_frame_store(self):
+    env = test_utils.FakeAsyncEnv()
+    llm = MockMultimodalLlmWrapper([
+        (
+            (
+                "Reason: answer question.\nAction: {'action_type': 'answer',"
+                " 'text': 'fake answer.'}"
+            ),
+            'test raw response',
+        ),
+        (
+            'fake summary',
+            'test raw response',
+        ),
+    ])
+    self.mock_get_orientation.return_value = 0
+    self.mock_get_physical_frame_boundary.return_value = [0, 0, 100, 100]
+    agent = m3a.M3A(
+        env,
+        llm,
+        frame_store=frame_store.FrameStore(frame_store.Encoding.JPEG),
+    )
+
+    step_data = agent.step('do something').data
+
+    for key in [
+        'raw_screenshot',
+        'before_screenshot_with_som',
+        'after_screenshot_with_som',
+    ]:
+      self.assertIsInstance(step_data[key], frame_store.JpegFrame)
+
+  def test_overlap_summary(self):
+    env = test_utils.FakeAsyncEnv()
+    llm = MockMultimodalLlmWrapper([
+        (
+            (
+                "Reason: answer question.\nAction: {'action_type': 'answer',"
+                " 'text': 'fake answer.'}"
+            ),
+            'test raw response',
+        ),
+        (
+            'fake summary',
+            'test raw response',
+        ),
+        (
+            (
+                "Reason: completed.\nAction: {'action_type': 'status',"
+                " 'goal_status': 'complete'}"
+            ),
+            'test raw response',
+        ),
+    ])
+    summary_requested = threading.Event()
+    release_summary = threading.Event()
+    predict_mm = llm.predict_mm
+
+    def blocking_predict_mm(text_prompt, images):
+      if llm.index == 1:
+        summary_requested.set()
+        release_summary.wait()
+      return predict_mm(text_prompt, images)
+
+    llm.predict_mm = blocking_predict_mm
+    self.mock_get_orientation.return_value = 0
+    self.mock_get_physical_frame_boundary.return_value = [0, 0, 100, 100]
+    agent = m3a.M3A(env, llm, overlap_summary=True)
+
+    goal = 'do something'
+    step1_data = agent.step(goal)
+    self.assertTrue(summary_requested.wait(timeout=10))
+    self.assertFalse(step1_data.done)
+    self.assertIsNone(step1_data.data['summary'])
+
+    release_summary.set()
+    step2_data = agent.step(goal)
+    self.assertTrue(step2_data.done)
+    self.assertIn('fake summary', step1_data.data['summary'])
+    self.assertIn('fake summary', step2_data.data['action_prompt'])
+    self.assertLen(agent.history, 2)
+
+  def test_overlap_summary_in_episode_step_data(self):
+    env = test_utils.FakeAsyncEnv()
+    answer = (
+        "Reason: answer question.\nAction: {'action_type': 'answer',"
+        " 'text': 'fake answer.'}"
+    )
+    llm = MockMultimodalLlmWrapper([
+        (answer, 'test raw response'),
+        ('fake summary 1', 'test raw response'),
+        (answer, 'test raw response'),
+        ('fake summary 2', 'test raw response'),
+    ])
+    self.mock_get_orientation.return_value = 0
+    self.mock_get_physical_frame_boundary.return_value = [0, 0, 100, 100]
+    agent = m3a.M3A(env, llm, overlap_summary=True)
+    episode_finishing = threading.Event()
+    predict_mm = llm.predict_mm
+    finish_episode = agent.finish_episode
+
+    def blocking_predict_mm(text_prompt, images):
+      # The summary of the last step is still pending when the episode ends.
+      if llm.index == 3:
+        episode_finishing.wait(timeout=10)
+      return predict_mm(text_prompt, images)
+
+    def signalling_finish_episode():
+      episode_finishing.set()
+      finish_episode()
+
+    llm.predict_mm = blocking_predict_mm
+    agent.finish_episode = signalling_finish_episode
+
+    result = episode_runner.run_episode('do something', agent, max_n_steps=2)
+
+    self.assertFalse(result.done)
+    self.assertEqual(result.step_data[constants.STEP_NUMBER], [0, 1])
+    self.assertIn('fake summary 1', result.step_data['summary'][0])
+    self.assertIn('fake summary 2', result.step_data['summary'][1])
+
 
 if __name__ == '__main__':
   absltest.main()
@@ -16,10 +16,13 @@
 
 import ast
 import base64
+from collections.abc import Sequence
+import functools
 import json
 import math
 import re
 from typing import Any, Optional
+from android_world.agents import frame_store
 from android_world.env import representation_utils
 import cv2
 import numpy as np
@@ -216,6 +219,219 @@ def add_ui_element_mark(
     )
 
 
+@functools.lru_cache(maxsize=1024)
+def _label_patch(
+    text: str, x_scale: float, y_scale: float
+) -> tuple[np.ndarray, np.ndarray | None, int, int]:
+  """Renders the label of a mark, as drawn by `add_ui_element_mark`, once.
+
+  Args:
+    text: The text of the label.
+    x_scale: Horizontal scale from physical to screenshot pixels.
+    y_scale: Vertical scale from physical to screenshot pixels.
+
+  Returns:
+    The label's pixels, the mask of the pixels to draw or None if all of them
+    are drawn, and the offset of the label's upper left corner from the upper
+    left corner of the UI element.
+  """
+  iso_scale = math.sqrt(x_scale * x_scale + y_scale * y_scale)
+  font_scale = 0.7 * iso_scale
+  thickness = int(2 * iso_scale)
+  box_x0, box_y0 = int(1 * x_scale), int(1 * y_scale)
+  box_x1, box_y1 = int(35 * x_scale), int(25 * y_scale)
+  text_x, text_y = int(1 * x_scale), int(20 * y_scale)
+  (width, height), baseline = cv2.getTextSize(
+      text, cv2.FONT_HERSHEY_SIMPLEX, font_scale, thickness
+  )
+  pad = thickness + 2
+  x0 = min(box_x0, text_x - pad)
+  y0 = min(box_y0, text_y - height - pad)
+  x1 = max(box_x1, text_x + width + pad)
+  y1 = max(box_y1, text_y + baseline + pad)
+
+  patch = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+  mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+  patch[box_y0 - y0 : box_y1 - y0, box_x0 - x0 : box_x1 - x0] = 255
+  mask[box_y0 - y0 : box_y1 - y0, box_x0 - x0 : box_x1 - x0] = 1
+  origin = (text_x - x0, text_y - y0)
+  for image, color in ((patch, (0, 0, 0)), (mask, 1)):
+    cv2.putText(
+        image,
+        text,
+        origin,
+        cv2.FONT_HERSHEY_SIMPLEX,
+        font_scale,
+        color,
+        thickness=thickness,
+    )
+  patch.flags.writeable = False
+  if mask.all():
+    return patch, None, x0, y0
+  mask.flags.writeable = False
+  return patch, mask, x0, y0
+
+
+def _draw_patch(
+    screenshot: np.ndarray,
+    patch: np.ndarray,
+    mask: np.ndarray | None,
+    x: int,
+    y: int,
+) -> None:
+  """Draws a patch placed at (x, y), clipped to the screenshot."""
+  height, width = screenshot.shape[:2]
+  x0, y0 = max(x, 0), max(y, 0)
+  x1 = min(x + patch.shape[1], width)
+  y1 = min(y + patch.shape[0], height)
+  if x0 >= x1 or y0 >= y1:
+    return
+  patch = patch[y0 - y : y1 - y, x0 - x : x1 - x]
+  if mask is None:
+    screenshot[y0:y1, x0:x1] = patch
+  else:
+    cv2.copyTo(
+        patch, mask[y0 - y : y1 - y, x0 - x : x1 - x], screenshot[y0:y1, x0:x1]
+    )
+
+
+def _corner_arrays(
+    bboxes: np.ndarray,
+    logical_screen_size: tuple[int, int],
+    physical_frame_boundary: tuple[int, int, int, int],
+    orientation: int,
+) -> tuple[np.ndarray, np.ndarray]:
+  """Vectorized `_ui_element_logical_corner` and `_logical_to_physical`.
+
+  Args:
+    bboxes: Logical [x_min, y_min, x_max, y_max] rows of the UI elements.
+    logical_screen_size: The logical screen size.
+    physical_frame_boundary: The physical coordinates in portrait orientation
+      for the upper left and lower right corner for the frame.
+    orientation: The current screen orientation.
+
+  Returns:
+    The physical [x, y] rows of the upper left and lower right corners.
+
+  Raises:
+    ValueError: If the orientation is not valid.
+  """
+  x_min, y_min, x_max, y_max = np.trunc(bboxes).astype(np.int64).T
+  if orientation == 0:
+    corners = [(x_min, y_min), (x_max, y_max)]
+  elif orientation == 1:
+    corners = [(x_min, y_max), (x_max, y_min)]
+  elif orientation == 2:
+    corners = [(x_max, y_max), (x_min, y_min)]
+  elif orientation == 3:
+    corners = [(x_max, y_min), (x_min, y_max)]
+  else:
+    raise ValueError('Unsupported orientation.')
+
+  px0, py0, px1, py1 = physical_frame_boundary
+  px, py = px1 - px0, py1 - py0
+  lx, ly = logical_screen_size
+  physical = []
+  for x, y in corners:
+    if orientation == 0:
+      x, y = (x * px / lx).astype(np.int64), (y * py / ly).astype(np.int64)
+    elif orientation == 1:
+      x, y = px - (y * px / ly).astype(np.int64), (x * py / lx).astype(np.int64)
+    elif orientation == 2:
+      x, y = (
+          px - (x * px / lx).astype(np.int64),
+          py - (y * py / ly).astype(np.int64),
+      )
+    else:
+      x, y = (y * px / ly).astype(np.int64), py - (x * py / lx).astype(np.int64)
+    physical.append(np.stack([x + px0, y + py0], axis=1))
+  return physical[0], physical[1]
+
+
+def add_ui_element_marks(
+    screenshot: np.ndarray,
+    ui_elements: Sequence[representation_utils.UIElement],
+    logical_screen_size: tuple[int, int],
+    physical_frame_boundary: tuple[int, int, int, int],
+    orientation: int,
+) -> None:
+  """Marks all valid UI elements in the screenshot, labeled by their index.
+
+  Draws the same marks as calling `add_ui_element_mark` for every element that
+  passes `validate_ui_element`, but in batches: the boxes are transformed with
+  NumPy and drawn together, and the labels are copied from cached renderings.
+  Labels are drawn on top of all boxes, so overlapping boxes do not hide
+  them, and box corners are square instead of rounded.
+
+  Args:
+    screenshot: The screenshot as a numpy ndarray, which is drawn on.
+    ui_elements: The UI elements, marked with their index in this list.
+    logical_screen_size: The logical screen size.
+    physical_frame_boundary: The physical coordinates in portrait orientation
+      for the upper left and lower right corner for the frame.
+    orientation: The current screen orientation.
+  """
+  if isinstance(ui_elements, representation_utils.UIElementTable):
+    pixels = ui_elements.bbox_pixels_array
+    selected = ~np.isnan(pixels[:, 0]) & ui_elements.flag_array('is_visible')
+    indices = np.flatnonzero(selected)
+    bboxes = pixels[selected][:, [0, 2, 1, 3]]
+  else:
+    indices = []
+    bboxes = []
+    for index, ui_element in enumerate(ui_elements):
+      bbox = ui_element.bbox_pixels
+      if bbox and ui_element.is_visible:
+        indices.append(index)
+        bboxes.append((bbox.x_min, bbox.y_min, bbox.x_max, bbox.y_max))
+  if len(indices) == 0:  # pylint: disable=g-explicit-length-test
+    return
+  bboxes = np.asarray(bboxes, dtype=np.float64)
+  screen_width, screen_height = logical_screen_size
+  valid = (
+      (bboxes[:, 0] < bboxes[:, 2])
+      & (bboxes[:, 0] < screen_width)
+      & (bboxes[:, 2] > 0)
+      & (bboxes[:, 1] < bboxes[:, 3])
+      & (bboxes[:, 1] < screen_height)
+      & (bboxes[:, 3] > 0)
+  )
+  indices = np.asarray(indices)[valid]
+  upper_left, lower_right = _corner_arrays(
+      bboxes[valid], logical_screen_size, physical_frame_boundary, orientation
+  )
+
+  x_scale = screenshot.shape[1] / physical_frame_boundary[2]
+  y_scale = screenshot.shape[0] / physical_frame_boundary[3]
+  iso_scale = math.sqrt(x_scale * x_scale + y_scale * y_scale)
+  scale = np.array([x_scale, y_scale])
+  upper_left = (upper_left * scale).astype(np.int64)
+  lower_right = (lower_right * scale).astype(np.int64)
+
+  # A box is the union of one pixel wide rectangles, nested as deep as the
+  # lines drawn by `cv2.rectangle` are wide, so that all boxes are drawn with
+  # a few `cv2.polylines` calls.
+  thickness = int(2 * iso_scale)
+  half_width = (thickness + 1) // 2 if thickness > 1 else 0
+  box_min = np.minimum(upper_left, lower_right)
+  box_max = np.maximum(upper_left, lower_right)
+  for offset in range(-half_width, half_width + 1):
+    x0, y0 = (box_min - offset).T
+    x1, y1 = (box_max + offset).T
+    corners = np.stack([x0, y0, x1, y0, x1, y1, x0, y1], axis=1)
+    cv2.polylines(
+        screenshot,
+        list(corners.reshape(-1, 4, 2).astype(np.int32)),
+        isClosed=True,
+        color=(0, 255, 0),
+        thickness=1,
+    )
+
+  for index, (x, y) in zip(indices.tolist(), upper_left.tolist()):
+    patch, mask, dx, dy = _label_patch(str(index), x_scale, y_scale)
+    _draw_patch(screenshot, patch, mask, x + dx, y + dy)
+
+
 def add_screenshot_label(screenshot: np.ndarray, label: str):
   """Add a text label to the right bottom of the screenshot.
 
@@ -236,15 +452,16 @@ def add_screenshot_label(screenshot: np.ndarray, label: str):
   )
 
 
-def encode_image_for_html(image: np.ndarray) -> str:
+def encode_image_for_html(image: np.ndarray | frame_store.JpegFrame) -> str:
   """Encode image in numpy ndarray to html string with correct color channels.
 
   Args:
-    image: Image as a numpy ndarray.
+    image: Image as a numpy ndarray, or as kept by a `frame_store.FrameStore`.
 
   Returns:
     Encoded image to be used in html.
   """
+  image = frame_store.to_array(image)
   return base64.b64encode(
       cv2.imencode('.jpeg', cv2.cvtColor(image, cv2.COLOR_BGR2RGB))[1]
   ).decode('utf-8')
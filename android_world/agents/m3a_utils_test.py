@@ -0,0 +1,123 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from absl.testing import absltest
+from absl.testing import parameterized
+from android_world.agents import m3a_utils
+from android_world.env import representation_utils
+import numpy as np
+
+_PHYSICAL_FRAME_BOUNDARY = (0, 0, 1080, 2400)
+
+
+def _ui_element(x_min, x_max, y_min, y_max, is_visible=True):
+  return representation_utils.UIElement(
+      bbox_pixels=representation_utils.BoundingBox(x_min, x_max, y_min, y_max),
+      is_visible=is_visible,
+  )
+
+
+class AddUiElementMarksTest(parameterized.TestCase):
+
+  @parameterized.named_parameters(
+      ('portrait', 0, (1080, 2400), (2400, 1080, 3)),
+      ('landscape', 1, (2400, 1080), (2400, 1080, 3)),
+      ('downscaled', 0, (1080, 2400), (1200, 540, 3)),
+  )
+  def test_matches_marking_each_element(
+      self, orientation, logical_screen_size, screenshot_shape
+  ):
+    ui_elements = [
+        _ui_element(10, 200, 20, 120),
+        _ui_element(300, 500, 50, 90, is_visible=False),
+        representation_utils.UIElement(bbox_pixels=None, is_visible=True),
+        _ui_element(300, 500, 300, 400),
+        _ui_element(600, 500, 300, 400),
+    ]
+    expected = np.zeros(screenshot_shape, dtype=np.uint8)
+    for index, ui_element in enumerate(ui_elements):
+      if m3a_utils.validate_ui_element(ui_element, logical_screen_size):
+        m3a_utils.add_ui_element_mark(
+            expected,
+            ui_element,
+            index,
+            logical_screen_size,
+            _PHYSICAL_FRAME_BOUNDARY,
+            orientation,
+        )
+    screenshot = np.zeros(screenshot_shape, dtype=np.uint8)
+
+    m3a_utils.add_ui_element_marks(
+        screenshot,
+        ui_elements,
+        logical_screen_size,
+        _PHYSICAL_FRAME_BOUNDARY,
+        orientation,
+    )
+
+    # Only the rounded outer corners of the two marked boxes differ.
+    self.assertLessEqual(
+        np.count_nonzero((screenshot != expected).any(axis=-1)), 2 * 4
+    )
+
+  def test_table_matches_list(self):
+    ui_elements = [
+        _ui_element(10, 200, 20, 120),
+        _ui_element(300, 500, 50, 90, is_visible=False),
+        representation_utils.UIElement(bbox_pixels=None, is_visible=True),
+        _ui_element(300, 500, 300, 400),
+    ]
+    expected = np.zeros((2400, 1080, 3), dtype=np.uint8)
+    m3a_utils.add_ui_element_marks(
+        expected, ui_elements, (1080, 2400), _PHYSICAL_FRAME_BOUNDARY, 0
+    )
+    screenshot = np.zeros_like(expected)
+
+    m3a_utils.add_ui_element_marks(
+        screenshot,
+        representation_utils.UIElementTable.from_elements(ui_elements),
+        (1080, 2400),
+        _PHYSICAL_FRAME_BOUNDARY,
+        0,
+    )
+
+    np.testing.assert_array_equal(screenshot, expected)
+
+  def test_labels_are_drawn_on_top_of_boxes(self):
+    ui_elements = [_ui_element(10, 300, 10, 300), _ui_element(0, 200, 20, 200)]
+    screenshot = np.zeros((2400, 1080, 3), dtype=np.uint8)
+
+    m3a_utils.add_ui_element_marks(
+        screenshot,
+        ui_elements,
+        (1080, 2400),
+        _PHYSICAL_FRAME_BOUNDARY,
+        0,
+    )
+
+    # The second box crosses the white background of the first label.
+    self.assertTrue((screenshot[20, 30] == 255).all())
+
+  def test_no_elements(self):
+    screenshot = np.zeros((100, 100, 3), dtype=np.uint8)
+
+    m3a_utils.add_ui_element_marks(
+        screenshot, [], (100, 100), (0, 0, 100, 100), 0
+    )
+
+    self.assertFalse(screenshot.any())
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -14,8 +14,11 @@
 
 """T3A: Text-only Autonomous Agent for Android."""
 
+from concurrent import futures
+from typing import Any
 from android_world.agents import agent_utils
 from android_world.agents import base_agent
+from android_world.agents import frame_store as frame_store_lib
 from android_world.agents import infer
 from android_world.agents import m3a_utils
 from android_world.env import adb_utils
@@ -269,6 +272,28 @@ def _summarize_prompt(
   )
 
 
+def _record_summary(
+    step_data: dict[str, Any],
+    action: str,
+    summary_prompt: str,
+    llm_output: tuple[str, bool | None, Any],
+) -> None:
+  """Adds the output of the summary LLM call to the step data."""
+  summary, is_safe, raw_response = llm_output
+  if is_safe == False:  # pylint: disable=singleton-comparison
+    #  is_safe could be None
+    summary = """Summary triggered LLM safety classifier."""
+
+  step_data['summary_prompt'] = summary_prompt
+  step_data['summary'] = (
+      f'Action selected: {action}. {summary}'
+      if raw_response
+      else 'Error calling LLM in summerization phase.'
+  )
+  print('Summary: ' + summary)
+  step_data['summary_raw_response'] = raw_response
+
+
 class T3A(base_agent.EnvironmentInteractingAgent):
   """Text only autonomous agent for Android."""
 
@@ -277,6 +302,8 @@ class T3A(base_agent.EnvironmentInteractingAgent):
       env: interface.AsyncEnv,
       llm: infer.LlmWrapper,
       name: str = 'T3A',
+      overlap_summary: bool = False,
+      frame_store: frame_store_lib.FrameStore | None = None,
   ):
     """Initializes a RandomAgent.
 
@@ -284,16 +311,47 @@ class T3A(base_agent.EnvironmentInteractingAgent):
       env: The environment.
       llm: The text only LLM.
       name: The agent name.
+      overlap_summary: If True, a step returns as soon as its summary is
+        requested, and the summary is only awaited by the next step after it
+        has captured the new state, or by `finish_episode`. The summary fields
+        of the returned step data are filled in at that point.
+      frame_store: Keeps the screenshots in the step data. Defaults to
+        read-only, deduplicated, full resolution arrays.
     """
     super().__init__(env, name)
     self.llm = llm
     self.history = []
     self.additional_guidelines = None
+    if frame_store is None:
+      frame_store = frame_store_lib.FrameStore()
+    self.frame_store = frame_store
+    self.overlap_summary = overlap_summary
+    # The step data, action and prompt of the pending summary, with the
+    # future of its LLM call.
+    self._pending_summary: (
+        tuple[dict[str, Any], str, str, futures.Future[Any]] | None
+    ) = None
 
   def reset(self, go_home_on_reset: bool = False):
     super().reset(go_home_on_reset)
     self.env.hide_automation_ui()
+    self._wait_for_pending_summary()
     self.history = []
+    self.frame_store.clear()
+
+  def _wait_for_pending_summary(self) -> None:
+    """Waits for the summary of the previous step, if it is still pending.
+
+    The summary is added to the step data on the calling thread, so the step
+    data is never written to while it is read elsewhere, e.g. checkpointed.
+    """
+    if self._pending_summary is not None:
+      pending_summary, self._pending_summary = self._pending_summary, None
+      step_data, action, summary_prompt, llm_output = pending_summary
+      _record_summary(step_data, action, summary_prompt, llm_output.result())
+
+  def finish_episode(self) -> None:
+    self._wait_for_pending_summary()
 
   def set_task_guidelines(self, task_guidelines: list[str]) -> None:
     self.additional_guidelines = task_guidelines
@@ -322,9 +380,12 @@ class T3A(base_agent.EnvironmentInteractingAgent):
         logical_screen_size,
     )
     # Only save the screenshot for result visualization.
-    step_data['before_screenshot'] = state.pixels.copy()
+    before_screenshot = state.pixels
+    step_data['before_screenshot'] = self.frame_store.put(before_screenshot)
     step_data['before_element_list'] = ui_elements
 
+    # The previous step's summary is part of the action prompt.
+    self._wait_for_pending_summary()
     action_prompt = _action_selection_prompt(
         goal,
         [
@@ -401,14 +462,18 @@ Action: {{"action_type": "status", "goal_status": "infeasible"}}"""
         return base_agent.AgentInteractionResult(False, step_data)
       else:
         # Add mark for the target ui element, just used for visualization.
+        marked_before_screenshot = before_screenshot.copy()
         m3a_utils.add_ui_element_mark(
-            step_data['before_screenshot'],
+            marked_before_screenshot,
             ui_elements[converted_action.index],
             converted_action.index,
             logical_screen_size,
             adb_utils.get_physical_frame_boundary(self.env.controller),
             adb_utils.get_orientation(self.env.controller),
         )
+        step_data['before_screenshot'] = self.frame_store.put(
+            marked_before_screenshot, copy=False
+        )
 
     if converted_action.action_type == 'status':
       if converted_action.goal_status == 'infeasible':
@@ -451,7 +516,7 @@ Action: {{"action_type": "status", "goal_status": "infeasible"}}"""
     )
 
     # Save screenshot only for result visualization.
-    step_data['after_screenshot'] = state.pixels.copy()
+    step_data['after_screenshot'] = self.frame_store.put(state.pixels)
     step_data['after_element_list'] = ui_elements
 
     summary_prompt = _summarize_prompt(
@@ -462,21 +527,17 @@ Action: {{"action_type": "status", "goal_status": "infeasible"}}"""
         after_element_list,
     )
 
-    summary, is_safe, raw_response = self.llm.predict(
-        summary_prompt,
-    )
-    if is_safe == False:  # pylint: disable=singleton-comparison
-      #  is_safe could be None
-      summary = """Summary triggered LLM safety classifier."""
-
-    step_data['summary_prompt'] = summary_prompt
-    step_data['summary'] = (
-        f'Action selected: {action}. {summary}'
-        if raw_response
-        else 'Error calling LLM in summerization phase.'
-    )
-    print('Summary: ' + summary)
-    step_data['summary_raw_response'] = raw_response
+    if self.overlap_summary:
+      self._pending_summary = (
+          step_data,
+          action,
+          summary_prompt,
+          infer.submit(self.llm.predict_async(summary_prompt)),
+      )
+    else:
+      _record_summary(
+          step_data, action, summary_prompt, self.llm.predict(summary_prompt)
+      )
 
     self.history.append(step_data)
 
@@ -12,8 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import threading
 from typing import Any
 from absl.testing import absltest
+from android_world import constants
+from android_world import episode_runner
 from android_world.agents import infer
 from android_world.agents import t3a
 from android_world.utils import test_utils
@@ -88,6 +91,86 @@ class T3AInteractionTest(absltest.TestCase):
     self.assertTrue(step2_data.done)
     self.assertLen(agent.history, 2)
 
+  def test_overlap_summary(self):
+    env = test_utils.FakeAsyncEnv()
+    mock_llm = MockLlmWrapper([
+        (
+            (
+                "Reason: completed.\nAction: {'action_type': 'answer',"
+                " 'text': 'mock_response'}"
+            ),
+            "fake_response_1",
+        ),
+        (
+            "fake_summary",
+            "fake_response_1",
+        ),
+        (
+            (
+                "Reason: completed.\nAction: {'action_type': 'status',"
+                " 'goal_status': 'complete'}"
+            ),
+            "fake_response_2",
+        ),
+    ])
+    release_summary = threading.Event()
+    predict = mock_llm.predict
+
+    def blocking_predict(text_prompt):
+      if mock_llm.index == 1:
+        release_summary.wait()
+      return predict(text_prompt)
+
+    mock_llm.predict = blocking_predict
+    agent = t3a.T3A(env, mock_llm, overlap_summary=True)
+
+    goal = "do something"
+    step1_data = agent.step(goal)
+    self.assertIsNone(step1_data.data["summary"])
+
+    release_summary.set()
+    step2_data = agent.step(goal)
+    self.assertTrue(step2_data.done)
+    self.assertIn("fake_summary", step1_data.data["summary"])
+    self.assertIn("fake_summary", step2_data.data["action_prompt"])
+
+  def test_overlap_summary_in_episode_step_data(self):
+    env = test_utils.FakeAsyncEnv()
+    answer = (
+        "Reason: answer question.\nAction: {'action_type': 'answer',"
+        " 'text': 'mock_response'}"
+    )
+    mock_llm = MockLlmWrapper([
+        (answer, "fake_response_1"),
+        ("fake_summary_1", "fake_response_1"),
+        (answer, "fake_response_2"),
+        ("fake_summary_2", "fake_response_2"),
+    ])
+    agent = t3a.T3A(env, mock_llm, overlap_summary=True)
+    episode_finishing = threading.Event()
+    predict = mock_llm.predict
+    finish_episode = agent.finish_episode
+
+    def blocking_predict(text_prompt):
+      # The summary of the last step is still pending when the episode ends.
+      if mock_llm.index == 3:
+        episode_finishing.wait(timeout=10)
+      return predict(text_prompt)
+
+    def signalling_finish_episode():
+      episode_finishing.set()
+      finish_episode()
+
+    mock_llm.predict = blocking_predict
+    agent.finish_episode = signalling_finish_episode
+
+    result = episode_runner.run_episode("do something", agent, max_n_steps=2)
+
+    self.assertFalse(result.done)
+    self.assertEqual(result.step_data[constants.STEP_NUMBER], [0, 1])
+    self.assertIn("fake_summary_1", result.step_data["summary"][0])
+    self.assertIn("fake_summary_2", result.step_data["summary"][1])
+
 
 if __name__ == "__main__":
   absltest.main()
@@ -15,17 +15,31 @@
 """Checkpointer class."""
 
 import abc
+import contextlib
+import dataclasses
 import datetime
 import gzip
+import hashlib
 import io
 import os
 import pickle
-from typing import Any
+import sqlite3
+import tempfile
+from typing import Any, Callable, Iterator
 
 from absl import logging
+import numpy as np
 
 INSTANCE_SEPARATOR = '_'
 
+# Sidecar index holding every episode field except the heavy episode data, so
+# that resuming a run and summarizing results never unpickles screenshots.
+METADATA_INDEX_FILENAME = 'episode_metadata.sqlite'
+_HEAVY_FIELDS = frozenset({'episode_data'})
+
+# Subdirectory of a run directory holding externalized episode arrays.
+ARRAY_STORE_DIRNAME = 'arrays'
+
 Episode = dict[str, Any]
 
 
@@ -88,6 +102,85 @@ def _unzip_and_read_pickle(file_path: str) -> Any:
     return pickle.load(f_in)
 
 
+@dataclasses.dataclass(frozen=True)
+class ArrayRef:
+  """Reference to an array stored in an `ArrayStore`, kept in its place."""
+
+  digest: str
+  shape: tuple[int, ...]
+  dtype: str
+
+
+class ArrayStore:
+  """Content-addressed store of uncompressed numpy arrays.
+
+  Each array is written once to `<digest>.npy`, so identical frames across
+  steps and episodes are stored only once, and arrays are read back with
+  `np.load(..., mmap_mode='r')`: a viewer only pages in the frames it touches.
+
+  Attributes:
+    directory: The directory holding the .npy files.
+    min_nbytes: Arrays smaller than this are left in place when externalizing.
+  """
+
+  def __init__(self, directory: str, min_nbytes: int = 64 * 1024) -> None:
+    self.directory = directory
+    self.min_nbytes = min_nbytes
+    os.makedirs(directory, exist_ok=True)
+
+  def _path(self, digest: str) -> str:
+    return os.path.join(self.directory, f'{digest}.npy')
+
+  def put(self, array: np.ndarray) -> ArrayRef:
+    """Stores an array, if not already stored, and returns its reference."""
+    array = np.ascontiguousarray(array)
+    hasher = hashlib.sha256(f'{array.dtype.str}{array.shape}'.encode())
+    hasher.update(array.data)
+    ref = ArrayRef(hasher.hexdigest(), array.shape, array.dtype.str)
+    path = self._path(ref.digest)
+    if not os.path.exists(path):
+      # Write to a unique file, then rename, so concurrent readers never see a
+      # partial file and concurrent writers never share one.
+      fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+      try:
+        with os.fdopen(fd, 'wb') as f:
+          np.save(f, array, allow_pickle=False)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+      except OSError:
+        os.remove(tmp_path)
+        # Fine if another writer stored the same array meanwhile.
+        if not os.path.exists(path):
+          raise
+    return ref
+
+  def get(self, ref: ArrayRef) -> np.ndarray:
+    """Returns a read-only memory map of a stored array."""
+    return np.load(self._path(ref.digest), mmap_mode='r')
+
+  def externalize(self, data: Any) -> Any:
+    """Returns `data` with large arrays, at any depth, replaced by refs."""
+    if isinstance(data, np.ndarray):
+      if data.dtype.hasobject or data.nbytes < self.min_nbytes:
+        return data
+      return self.put(data)
+    if isinstance(data, dict):
+      return {k: self.externalize(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+      return type(data)(self.externalize(v) for v in data)
+    return data
+
+  def resolve(self, data: Any) -> Any:
+    """Inverse of `externalize`; refs are replaced by memory-mapped arrays."""
+    if isinstance(data, ArrayRef):
+      return self.get(data)
+    if isinstance(data, dict):
+      return {k: self.resolve(v) for k, v in data.items()}
+    if isinstance(data, (list, tuple)):
+      return type(data)(self.resolve(v) for v in data)
+    return data
+
+
 class Checkpointer(abc.ABC):
   """Saves and loads the results of an evaluation run."""
 
@@ -109,11 +202,24 @@ class IncrementalCheckpointer(Checkpointer):
 
   Attributes:
       directory: The directory to store the task data.
+      externalize_arrays: Whether to write large arrays in episode data, e.g.
+        screenshots, to an `ArrayStore` instead of pickling them with the
+        episode. Loading such episodes returns memory-mapped arrays.
   """
 
-  def __init__(self, directory: str) -> None:
+  def __init__(
+      self, directory: str, externalize_arrays: bool = False
+  ) -> None:
     self.directory = directory
+    self.externalize_arrays = externalize_arrays
     os.makedirs(directory, exist_ok=True)
+    self._index = _MetadataIndex(
+        os.path.join(directory, METADATA_INDEX_FILENAME)
+    )
+    self._array_store = None
+    array_dir = os.path.join(directory, ARRAY_STORE_DIRNAME)
+    if externalize_arrays or os.path.isdir(array_dir):
+      self._array_store = ArrayStore(array_dir)
 
   def save_episodes(self, task_episodes: list[Episode], task_name: str):
     """Saves a task group to disk.
@@ -123,23 +229,53 @@ class IncrementalCheckpointer(Checkpointer):
         task_name: The unique identifier for the task group.
     """
     filename = os.path.join(self.directory, f'{task_name}.pkl.gz')
+    to_pickle = task_episodes
+    if self.externalize_arrays:
+      to_pickle = [
+          _map_heavy_fields(episode, self._array_store.externalize)
+          for episode in task_episodes
+      ]
     with open(filename, 'wb') as f:
-      compressed = _gzip_pickle(task_episodes)
+      compressed = _gzip_pickle(to_pickle)
       f.write(compressed)
+    self._index.put(task_name, filename, task_episodes)
     logging.info('Wrote task episodes for %s to %s', task_name, filename)
 
   def load(self, fields: list[str] | None = None) -> list[Episode]:
-    """Loads all task groups from disk."""
+    """Loads all task groups from disk.
+
+    If `fields` does not include the heavy episode data, episodes are read from
+    the metadata index instead of the full task group files. Task groups
+    missing from the index, e.g. from runs written before it existed, are read
+    in full once and added to it.
+
+    Args:
+      fields: Episode fields to keep. If None, full episodes are returned.
+
+    Returns:
+      Episodes from all task groups, in the same order as they were run.
+    """
     # Keep same order as runtime.
     directories = os.listdir(self.directory)
     directories.sort(key=sort_key)
+    use_index = fields is not None and not _HEAVY_FIELDS.intersection(fields)
+    indexed = self._index.get_all() if use_index else {}
 
     data = []
     for filename in directories:
       if filename.endswith('.pkl.gz'):
         try:
           task_group_id = filename[:-7]  # Remove ".pkl.gz" extension
-          task_group = self._load_task_group(task_group_id)
+          path = os.path.join(self.directory, filename)
+          task_group = None
+          if use_index:
+            task_group = indexed.get(task_group_id, {}).get(
+                _file_signature(path)
+            )
+          if task_group is None:
+            task_group = self._load_task_group(task_group_id)
+            if use_index:
+              self._index.put(task_group_id, path, task_group)
           if fields is not None:
             task_group = [
                 {field: episode[field] for field in fields}
@@ -154,13 +290,96 @@ class IncrementalCheckpointer(Checkpointer):
     """Loads a single task group from disk."""
     filename = os.path.join(self.directory, f'{task_group_id}.pkl.gz')
     try:
-      return _unzip_and_read_pickle(filename)
+      task_group = _unzip_and_read_pickle(filename)
     except FileNotFoundError:
       logging.info(
           'File not readable: %s. It may not exist. Starting from empty state.',
           filename,
       )
       return []
+    if self._array_store is not None:
+      task_group = [
+          _map_heavy_fields(episode, self._array_store.resolve)
+          for episode in task_group
+      ]
+    return task_group
+
+
+def _map_heavy_fields(
+    episode: Episode, fn: Callable[[Any], Any]
+) -> Episode:
+  """Returns a copy of `episode` with `fn` applied to its heavy fields."""
+  return {
+      k: fn(v) if k in _HEAVY_FIELDS else v for k, v in episode.items()
+  }
+
+
+def _file_signature(path: str) -> tuple[int, int]:
+  """Returns (size, mtime) of a file, used to detect stale index entries."""
+  stat = os.stat(path)
+  return stat.st_size, stat.st_mtime_ns
+
+
+class _MetadataIndex:
+  """SQLite table mapping task group ids to their episodes' metadata.
+
+  Each row stores the episodes of one task group file with the heavy fields
+  removed, along with the size and mtime of the file it was derived from. A
+  row whose signature no longer matches its file is ignored by readers.
+  """
+
+  def __init__(self, path: str) -> None:
+    self.path = path
+    with self._connect() as conn:
+      conn.execute(
+          'CREATE TABLE IF NOT EXISTS episodes ('
+          'task_group_id TEXT PRIMARY KEY, file_size INTEGER, '
+          'file_mtime_ns INTEGER, metadata BLOB)'
+      )
+
+  @contextlib.contextmanager
+  def _connect(self) -> Iterator[sqlite3.Connection]:
+    conn = sqlite3.connect(self.path, timeout=30)
+    try:
+      with conn:  # Commits on success, rolls back on error.
+        yield conn
+    finally:
+      conn.close()
+
+  def put(
+      self, task_group_id: str, path: str, task_episodes: list[Episode]
+  ) -> None:
+    """Records the metadata of a task group file that was just written."""
+    metadata = [
+        {k: v for k, v in episode.items() if k not in _HEAVY_FIELDS}
+        for episode in task_episodes
+    ]
+    size, mtime_ns = _file_signature(path)
+    try:
+      with self._connect() as conn:
+        conn.execute(
+            'INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?)',
+            (task_group_id, size, mtime_ns, pickle.dumps(metadata)),
+        )
+    except (sqlite3.Error, pickle.PicklingError) as e:
+      # The index is an optimization; readers fall back to the full files.
+      logging.warning('Unable to index %s: %s', task_group_id, e)
+
+  def get_all(self) -> dict[str, dict[tuple[int, int], list[Episode]]]:
+    """Returns indexed metadata, keyed by task group id and file signature."""
+    try:
+      with self._connect() as conn:
+        rows = conn.execute(
+            'SELECT task_group_id, file_size, file_mtime_ns, metadata '
+            'FROM episodes'
+        ).fetchall()
+    except sqlite3.Error as e:
+      logging.warning('Unable to read metadata index %s: %s', self.path, e)
+      return {}
+    return {
+        task_group_id: {(size, mtime_ns): pickle.loads(metadata)}
+        for task_group_id, size, mtime_ns, metadata in rows
+    }
 
 
 class NullCheckpointer(Checkpointer):
@@ -12,10 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent import futures
 import os
 import tempfile
+from unittest import mock
 from absl.testing import absltest
 from android_world import checkpointer
+import numpy as np
 
 
 class CheckpointerTest(absltest.TestCase):
@@ -85,6 +88,132 @@ class CheckpointerTest(absltest.TestCase):
     expected_data = [{'key1': 'value1'}]
     self.assertEqual(expected_data, loaded_data)
 
+  def test_load_fields_reads_metadata_index(self) -> None:
+    """Tests that loading metadata fields does not read full episodes."""
+    task_group = [{'goal': 'g', 'episode_data': {'screenshot': [0] * 100}}]
+    self.checkpointer.save_episodes(task_group, 'task_group')
+    with mock.patch.object(
+        checkpointer, '_unzip_and_read_pickle', autospec=True
+    ) as mock_read:
+      loaded_data = self.checkpointer.load(fields=['goal'])
+    mock_read.assert_not_called()
+    self.assertEqual([{'goal': 'g'}], loaded_data)
+
+  def test_load_episode_data_reads_full_episodes(self) -> None:
+    """Tests that requesting heavy fields bypasses the metadata index."""
+    task_group = [{'goal': 'g', 'episode_data': {'step_number': [0]}}]
+    self.checkpointer.save_episodes(task_group, 'task_group')
+    loaded_data = self.checkpointer.load(fields=['episode_data'])
+    self.assertEqual([{'episode_data': {'step_number': [0]}}], loaded_data)
+
+  def test_load_fields_backfills_unindexed_files(self) -> None:
+    """Tests that task groups written without an index are indexed on load."""
+    os.remove(
+        os.path.join(self.temp_dir.name, checkpointer.METADATA_INDEX_FILENAME)
+    )
+    with open(os.path.join(self.temp_dir.name, 'old_0.pkl.gz'), 'wb') as f:
+      f.write(checkpointer._gzip_pickle([{'goal': 'old'}]))
+    resumed = checkpointer.IncrementalCheckpointer(self.temp_dir.name)
+    self.assertEqual([{'goal': 'old'}], resumed.load(fields=['goal']))
+    with mock.patch.object(
+        checkpointer, '_unzip_and_read_pickle', autospec=True
+    ) as mock_read:
+      self.assertEqual([{'goal': 'old'}], resumed.load(fields=['goal']))
+    mock_read.assert_not_called()
+
+  def test_load_fields_ignores_stale_index(self) -> None:
+    """Tests that a task group rewritten outside the checkpointer is reread."""
+    self.checkpointer.save_episodes([{'goal': 'before'}], 'task_group')
+    with open(
+        os.path.join(self.temp_dir.name, 'task_group.pkl.gz'), 'wb'
+    ) as f:
+      f.write(checkpointer._gzip_pickle([{'goal': 'after!'}]))
+    loaded_data = self.checkpointer.load(fields=['goal'])
+    self.assertEqual([{'goal': 'after!'}], loaded_data)
+
+
+class ExternalizedArraysTest(absltest.TestCase):
+
+  def setUp(self) -> None:
+    super().setUp()
+    self.temp_dir = tempfile.TemporaryDirectory()
+    self.checkpointer = checkpointer.IncrementalCheckpointer(
+        directory=self.temp_dir.name, externalize_arrays=True
+    )
+
+  def tearDown(self) -> None:
+    super().tearDown()
+    self.temp_dir.cleanup()
+
+  def test_save_and_load_round_trip(self) -> None:
+    """Tests that externalized arrays are loaded back as memory maps."""
+    frame = np.arange(300 * 300 * 3, dtype=np.uint8).reshape(300, 300, 3)
+    small = np.zeros(3)
+    episode = {
+        'goal': 'g',
+        'episode_data': {'screenshot': [frame, frame], 'small': [small]},
+    }
+    self.checkpointer.save_episodes([episode], 'task_group')
+
+    # Identical frames are stored once.
+    array_dir = os.path.join(
+        self.temp_dir.name, checkpointer.ARRAY_STORE_DIRNAME
+    )
+    self.assertLen(os.listdir(array_dir), 1)
+
+    loaded = checkpointer.IncrementalCheckpointer(self.temp_dir.name).load()
+    screenshots = loaded[0]['episode_data']['screenshot']
+    self.assertIsInstance(screenshots[0], np.memmap)
+    np.testing.assert_array_equal(screenshots[1], frame)
+    self.assertIs(type(loaded[0]['episode_data']['small'][0]), np.ndarray)
+
+  def test_pickle_holds_references(self) -> None:
+    """Tests that the pickled episode does not contain the array bytes."""
+    frame = np.ones((300, 300, 3), dtype=np.uint8)
+    self.checkpointer.save_episodes(
+        [{'episode_data': {'screenshot': [frame]}}], 'task_group'
+    )
+    raw = checkpointer._unzip_and_read_pickle(
+        os.path.join(self.temp_dir.name, 'task_group.pkl.gz')
+    )
+    self.assertIsInstance(
+        raw[0]['episode_data']['screenshot'][0], checkpointer.ArrayRef
+    )
+
+  def test_concurrent_puts_of_same_array(self) -> None:
+    """Tests that writers storing the same array don't clobber each other."""
+    store = checkpointer.ArrayStore(
+        os.path.join(self.temp_dir.name, checkpointer.ARRAY_STORE_DIRNAME)
+    )
+    frame = np.ones((300, 300, 3), dtype=np.uint8)
+
+    with futures.ThreadPoolExecutor(max_workers=8) as executor:
+      refs = list(executor.map(lambda _: store.put(frame), range(16)))
+
+    self.assertLen(set(refs), 1)
+    self.assertLen(os.listdir(store.directory), 1)
+    np.testing.assert_array_equal(store.get(refs[0]), frame)
+
+  def test_put_tolerates_array_stored_meanwhile(self) -> None:
+    """Tests that a failed rename is fine if the array is already stored."""
+    store = checkpointer.ArrayStore(
+        os.path.join(self.temp_dir.name, checkpointer.ARRAY_STORE_DIRNAME)
+    )
+    frame = np.ones((300, 300, 3), dtype=np.uint8)
+    ref = store.put(frame)
+
+    with mock.patch.object(
+        checkpointer.os, 'replace', side_effect=PermissionError
+    ), mock.patch.object(
+        checkpointer.os.path,
+        'exists',
+        side_effect=[False, True],
+    ):
+      self.assertEqual(store.put(frame), ref)
+
+    # The temporary file is removed.
+    self.assertEqual(os.listdir(store.directory), [f'{ref.digest}.npy'])
+
 
 if __name__ == '__main__':
   absltest.main()
@@ -14,11 +14,16 @@
 
 """Utilties to interact with the environment using adb."""
 
+from concurrent import futures
+import dataclasses
+import functools
 import os
 import re
+import shlex
 import time
-from typing import Any, Callable, Collection, Iterable, Literal, Optional, TypeVar
+from typing import Any, Callable, Collection, Iterable, Literal, Optional, Sequence, TypeVar
 import unicodedata
+import uuid
 from absl import logging
 from android_env import env_interface
 from android_env.components import errors
@@ -29,6 +34,15 @@ T = TypeVar('T')
 
 _DEFAULT_TIMEOUT_SECS = 10
 
+# How `type_text` enters text. 'words' sends one adb input request per word,
+# 'clipboard' pastes the whole text through the Clipper app and 'auto' uses the
+# clipboard only when it saves round-trips or preserves non-ASCII characters.
+TextInputMethod = Literal['words', 'clipboard', 'auto']
+
+# Below this many word-by-word requests, 'auto' typing does not use the
+# clipboard, as pasting has a fixed cost of a few requests plus a short sleep.
+_MIN_REQUESTS_FOR_CLIPBOARD = 8
+
 # pylint: disable=line-too-long
 # Maps app names to the activity that should be launched to open the app.
 _PATTERN_TO_ACTIVITY = immutabledict.immutabledict({
@@ -333,6 +347,7 @@ def press_home_button(
 
   if response.status != adb_pb2.AdbResponse.Status.OK:
     logging.error('Failed to press the HOME button')
+  invalidate_geometry_cache(env, ROTATION_DEPENDENT_GEOMETRY)
   return response
 
 
@@ -361,7 +376,7 @@ def press_back_button(
 
   if response.status != adb_pb2.AdbResponse.Status.OK:
     logging.error('Failed to press the BACK button')
-
+  invalidate_geometry_cache(env, ROTATION_DEPENDENT_GEOMETRY)
   return response
 
 
@@ -462,24 +477,12 @@ def _split_words_and_newlines(text: str) -> Iterable[str]:
       yield '\n'
 
 
-def type_text(
+def _type_text_word_by_word(
     text: str,
     env: env_interface.AndroidEnvInterface,
-    timeout_sec: Optional[float] = _DEFAULT_TIMEOUT_SECS,
+    timeout_sec: Optional[float],
 ) -> None:
-  """Issues an AdbRequest to type the specified text string word-by-word.
-
-  It types word-by-word to fix issue where sometimes long text strings can be
-  typed out of order at the character level. Additionally, long strings can time
-  out and word-by-word fixes this, while allowing us to keep a lot timeout per
-  word.
-
-  Args:
-    text: The text string to be typed.
-    env: The environment.
-    timeout_sec: A timeout to use for this operation. Note: For longer texts,
-      this should be longer as it takes longer to type.
-  """
+  """Types text with one adb request per word, space and newline."""
   words = _split_words_and_newlines(text)
   for word in words:
     if word == '\n':
@@ -499,6 +502,73 @@ def type_text(
       logging.error('Failed to type word: %r', formatted)
 
 
+def paste_text(
+    text: str,
+    env: env_interface.AndroidEnvInterface,
+    timeout_sec: Optional[float] = _DEFAULT_TIMEOUT_SECS,
+) -> None:
+  """Enters text into the focused field by pasting it from the clipboard.
+
+  Unlike `type_text` in 'words' mode, this takes a constant number of adb
+  requests regardless of text length and keeps non-ASCII characters. It
+  overwrites the device clipboard.
+
+  Args:
+    text: The text to enter.
+    env: The environment.
+    timeout_sec: A timeout to use for the paste key event.
+
+  Raises:
+    RuntimeError: If the Clipper app is unavailable or the paste fails.
+  """
+  _set_clipboard(shlex.quote(text), env)
+  response = press_keyboard_generic('KEYCODE_PASTE', env, timeout_sec)
+  check_ok(response, 'Failed to paste text from clipboard.')
+
+
+def type_text(
+    text: str,
+    env: env_interface.AndroidEnvInterface,
+    timeout_sec: Optional[float] = _DEFAULT_TIMEOUT_SECS,
+    method: Optional[TextInputMethod] = None,
+) -> None:
+  """Issues an AdbRequest to type the specified text string word-by-word.
+
+  It types word-by-word to fix issue where sometimes long text strings can be
+  typed out of order at the character level. Additionally, long strings can time
+  out and word-by-word fixes this, while allowing us to keep a lot timeout per
+  word.
+
+  With the 'clipboard' and 'auto' methods the text is instead pasted with
+  `paste_text`, falling back to word-by-word typing if pasting fails.
+
+  Args:
+    text: The text string to be typed.
+    env: The environment.
+    timeout_sec: A timeout to use for this operation. Note: For longer texts,
+      this should be longer as it takes longer to type.
+    method: How to enter the text. If None, uses the `text_input_method`
+      attribute of `env` if it has one, and 'words' otherwise.
+  """
+  if method is None:
+    method = getattr(env, 'text_input_method', 'words')
+
+  use_clipboard = method == 'clipboard'
+  if method == 'auto':
+    num_requests = sum(1 for _ in _split_words_and_newlines(text))
+    use_clipboard = (
+        num_requests >= _MIN_REQUESTS_FOR_CLIPBOARD or not text.isascii()
+    )
+
+  if use_clipboard:
+    try:
+      paste_text(text, env, timeout_sec)
+      return
+    except (RuntimeError, ValueError) as e:
+      logging.warning('Pasting text failed, typing word-by-word: %s', e)
+  _type_text_word_by_word(text, env, timeout_sec)
+
+
 def issue_generic_request(
     args: Collection[str] | str,
     env: env_interface.AndroidEnvInterface,
@@ -540,6 +610,152 @@ def issue_generic_request(
   return response
 
 
+@dataclasses.dataclass(frozen=True)
+class ShellResult:
+  """Outcome of a single command in a batched shell invocation.
+
+  Attributes:
+    command: The shell command that was run.
+    exit_code: The command's exit status, or None if the batch ended before the
+      command reported one (e.g. the adb call failed or timed out).
+    output: Combined stdout and stderr of the command.
+  """
+
+  command: str
+  exit_code: Optional[int]
+  output: str
+
+  @property
+  def ok(self) -> bool:
+    return self.exit_code == 0
+
+
+# Background pool used by `issue_batched_shell_commands_async`. Threads are only
+# started on first use.
+_BATCH_EXECUTOR = futures.ThreadPoolExecutor(
+    max_workers=4, thread_name_prefix='adb_batch'
+)
+
+
+def _build_batch_script(commands: Sequence[str], marker: str) -> str:
+  """Joins commands into one script that reports each command's exit code."""
+  lines = []
+  for command in commands:
+    # Each command runs in its own subshell so that `exit`, `cd` or a failure
+    # in one command cannot affect the ones that follow it.
+    lines.append(
+        f"( {command} ) </dev/null 2>&1; printf '\\n%s %d\\n' {marker} $?"
+    )
+  return '\n'.join(lines)
+
+
+def _parse_batch_output(
+    commands: Sequence[str], output: str, marker: str
+) -> list[ShellResult]:
+  """Splits the output of a batch script into per-command results."""
+  # Older adb versions translate "\n" to "\r\n" on shell output.
+  output = output.replace('\r\n', '\n')
+  results = []
+  start = 0
+  for match in re.finditer(rf'\n{re.escape(marker)} (-?\d+)\n', output):
+    if len(results) == len(commands):
+      break
+    results.append(
+        ShellResult(
+            command=commands[len(results)],
+            exit_code=int(match.group(1)),
+            output=output[start : match.start()],
+        )
+    )
+    start = match.end()
+  # Commands that never reported an exit code (e.g. the batch timed out).
+  for command in commands[len(results) :]:
+    results.append(ShellResult(command=command, exit_code=None, output=''))
+  return results
+
+
+def issue_batched_shell_commands(
+    commands: Iterable[Collection[str] | str],
+    env: env_interface.AndroidEnvInterface,
+    timeout_sec: Optional[float] = None,
+) -> list[ShellResult]:
+  """Runs several shell commands on device in a single adb round-trip.
+
+  The commands are run sequentially, in order, in one `adb shell` invocation.
+  A failing command does not stop the ones after it; callers should inspect the
+  per-command results.
+
+  Example:
+  ~~~~~~~
+
+  results = issue_batched_shell_commands(
+      [['am', 'force-stop', 'com.foo'], 'rm -rf /data/data/com.foo/*'], env
+  )
+  if not all(r.ok for r in results):
+    ...
+
+  Args:
+    commands: Shell commands to run. Each command is either a string or a
+      collection of arguments, which are joined with spaces just like in
+      `issue_generic_request`.
+    env: The environment.
+    timeout_sec: A timeout for the whole batch. Defaults to the default timeout
+      of a single request multiplied by the number of commands.
+
+  Returns:
+    One result per command, in the order they were given.
+  """
+  commands = [
+      command if isinstance(command, str) else ' '.join(command)
+      for command in commands
+  ]
+  if not commands:
+    return []
+  if timeout_sec is None:
+    timeout_sec = _DEFAULT_TIMEOUT_SECS * len(commands)
+
+  marker = f'__aw_batch_{uuid.uuid4().hex}__'
+  response = issue_generic_request(
+      ['shell', _build_batch_script(commands, marker)], env, timeout_sec
+  )
+  if response.status != adb_pb2.AdbResponse.Status.OK:
+    logging.error('Batched shell request failed: %s', response.error_message)
+    return [
+        ShellResult(command=command, exit_code=None, output='')
+        for command in commands
+    ]
+  return _parse_batch_output(
+      commands, response.generic.output.decode('utf-8', errors='replace'), marker
+  )
+
+
+def issue_batched_shell_commands_async(
+    commands: Iterable[Collection[str] | str],
+    env: env_interface.AndroidEnvInterface,
+    timeout_sec: Optional[float] = None,
+) -> futures.Future[list[ShellResult]]:
+  """Non-blocking version of `issue_batched_shell_commands`.
+
+  The batch is issued from a background thread, so the caller can overlap it
+  with host-side work. There is no ordering guarantee relative to other adb
+  calls made on the same environment while the batch is in flight.
+
+  Args:
+    commands: Shell commands to run.
+    env: The environment.
+    timeout_sec: A timeout for the whole batch.
+
+  Returns:
+    A future resolving to one result per command.
+  """
+  # Materialize now so that lazily generated commands are not consumed from
+  # another thread.
+  commands = list(commands)
+  return _BATCH_EXECUTOR.submit(
+      issue_batched_shell_commands, commands, env, timeout_sec
+  )
+
+
 def get_adb_activity(app_name: str) -> Optional[str]:
   """Get a mapping of regex patterns to ADB activities top Android apps."""
   for pattern, activity in _PATTERN_TO_ACTIVITY.items():
@@ -646,6 +862,8 @@ def launch_app(
   Returns:
     The name of the app that is launched.
   """
+  # The launched app may rotate the screen, so its geometry is queried again.
+  invalidate_geometry_cache(env, ROTATION_DEPENDENT_GEOMETRY)
 
   if app_name in _DEFAULT_URIS:
     _launch_default_app(app_name, env)
@@ -1145,6 +1363,7 @@ def change_orientation(
   issue_generic_request(
       command + ['user_rotation', _ORIENTATIONS[orientation]], env
   )
+  invalidate_geometry_cache(env)
 
 
 def set_clipboard_contents(
@@ -1164,6 +1383,13 @@ def set_clipboard_contents(
     RuntimeError: If the adb command does not successfully execute or if the
     app is not in the foreground.
   """
+  _set_clipboard(_adb_text_format(content), env)
+
+
+def _set_clipboard(
+    quoted_content: str, env: env_interface.AndroidEnvInterface
+) -> None:
+  """Sets the clipboard to content that is already escaped for the shell."""
   if launch_app('clipper', env) is None:
     raise RuntimeError(
         'Clipper app must be in the foreground to access clipboard. You may'
@@ -1171,13 +1397,25 @@ def set_clipboard_contents(
     )
 
   time.sleep(0.5)
-  content = _adb_text_format(content)
-  output_str = issue_generic_request(
-      ['shell', 'am', 'broadcast', '-a', 'clipper.set', '-e', 'text', content],
-      env,
-  ).generic.output.decode('utf-8')
-  _extract_clipper_output(output_str)
-  press_back_button(env)
+  try:
+    response = issue_generic_request(
+        [
+            'shell',
+            'am',
+            'broadcast',
+            '-a',
+            'clipper.set',
+            '-e',
+            'text',
+            quoted_content,
+        ],
+        env,
+    )
+    _extract_clipper_output(response.generic.output.decode('utf-8'))
+  finally:
+    # Leaves Clipper even if setting the clipboard failed, so that e.g. text
+    # typed instead goes to the app that was in the foreground.
+    press_back_button(env)
 
 
 def grant_permissions(
@@ -1468,6 +1706,29 @@ def put_settings(
   return env.execute_adb_call(adb_request)
 
 
+def put_settings_command(
+    namespace: adb_pb2.AdbRequest.SettingsRequest.Namespace,
+    key: str,
+    value: str,
+) -> list[str]:
+  """Returns the shell command equivalent to `put_settings`.
+
+  Useful to change settings as part of `issue_batched_shell_commands`.
+
+  Args:
+    namespace: The namespace in which the setting resides (SYSTEM, SECURE,
+      GLOBAL).
+    key: The key of the setting to change.
+    value: The new value for the setting.
+  """
+  if not key:
+    raise ValueError('Key must be provided.')
+  if not value:
+    raise ValueError('Value must be provided.')
+  namespace_name = adb_pb2.AdbRequest.SettingsRequest.Namespace.Name(namespace)
+  return ['settings', 'put', namespace_name.lower(), key, value]
+
+
 def delete_contacts(
     env: env_interface.AndroidEnvInterface,
     timeout_sec: float = _DEFAULT_TIMEOUT_SECS,
@@ -1491,6 +1752,77 @@ def delete_contacts(
   return response
 
 
+class GeometryCache:
+  """Caches device geometry that is costly to query over ADB.
+
+  Screen size, logical size, orientation and the physical frame boundary only
+  change when the device rotates or its resolution is changed, yet each query
+  shells out to `wm` or `dumpsys`. An env exposing a `geometry_cache` attribute
+  of this type has these queries served from the cache; it is cleared by
+  `change_orientation`, `set_screen_size` and when a rotation is detected. Apps
+  may rotate the screen on their own, so the values that depend on the
+  rotation are also cleared by actions that switch apps: `launch_app` and
+  pressing home or back.
+  """
+
+  def __init__(self):
+    self._values: dict[str, Any] = {}
+
+  def get(self, key: str, fetch: Callable[[], T]) -> T:
+    """Returns the cached value for `key`, calling `fetch` on a miss."""
+    if key not in self._values:
+      self._values[key] = fetch()
+    return self._values[key]
+
+  def peek(self, key: str) -> Any | None:
+    """Returns the cached value for `key` without fetching it."""
+    return self._values.get(key)
+
+  def invalidate(self, keys: Iterable[str] | None = None) -> None:
+    """Clears the cached values for `keys`, or all of them if None."""
+    if keys is None:
+      self._values.clear()
+      return
+    for key in keys:
+      self._values.pop(key, None)
+
+
+# Geometry that changes when the screen rotates, unlike the physical size.
+ROTATION_DEPENDENT_GEOMETRY = (
+    'orientation',
+    'logical_screen_size',
+    'physical_frame_boundary',
+)
+
+
+def _geometry_cached(
+    key: str,
+) -> Callable[[Callable[..., T]], Callable[..., T]]:
+  """Decorator serving a geometry query from the env's `GeometryCache`."""
+
+  def decorator(func: Callable[..., T]) -> Callable[..., T]:
+    @functools.wraps(func)
+    def wrapper(env: env_interface.AndroidEnvInterface) -> T:
+      cache = getattr(env, 'geometry_cache', None)
+      if not isinstance(cache, GeometryCache):
+        return func(env)
+      return cache.get(key, lambda: func(env))
+
+    return wrapper
+
+  return decorator
+
+
+def invalidate_geometry_cache(
+    env: env_interface.AndroidEnvInterface,
+    keys: Iterable[str] | None = None,
+) -> None:
+  """Clears the env's cached geometry, if any; see `GeometryCache`."""
+  cache = getattr(env, 'geometry_cache', None)
+  if isinstance(cache, GeometryCache):
+    cache.invalidate(keys)
+
+
 def _parse_screen_size_response(response: str) -> tuple[int, int]:
   """Parse the adb response to extract screen size.
 
@@ -1510,6 +1842,7 @@ def _parse_screen_size_response(response: str) -> tuple[int, int]:
     )
 
 
+@_geometry_cached('screen_size')
 def get_screen_size(env: env_interface.AndroidEnvInterface) -> tuple[int, int]:
   """Get the screen size in pixels of an Android device via ADB.
 
@@ -1526,6 +1859,7 @@ def get_screen_size(env: env_interface.AndroidEnvInterface) -> tuple[int, int]:
   )
 
 
+@_geometry_cached('logical_screen_size')
 def get_logical_screen_size(
     env: env_interface.AndroidEnvInterface,
 ) -> tuple[int, int]:
@@ -1557,6 +1891,7 @@ def get_logical_screen_size(
   raise ValueError('Failed to get logical screen size.')
 
 
+@_geometry_cached('physical_frame_boundary')
 def get_physical_frame_boundary(
     env: env_interface.AndroidEnvInterface,
 ) -> tuple[int, int, int, int]:
@@ -1591,6 +1926,7 @@ def get_physical_frame_boundary(
   raise ValueError('Failed to get physical frame boundary.')
 
 
+@_geometry_cached('orientation')
 def get_orientation(
     env: env_interface.AndroidEnvInterface,
 ) -> int:
@@ -1642,7 +1978,9 @@ def set_screen_size(
   adb_command = ['shell', f'wm size {width}x{height}']
 
   # Issue the command and return the response
-  return issue_generic_request(adb_command, env)
+  response = issue_generic_request(adb_command, env)
+  invalidate_geometry_cache(env)
+  return response
 
 
 def retry(n: int) -> Callable[[Any], Any]:
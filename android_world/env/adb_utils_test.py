@@ -14,6 +14,7 @@
 
 """Tests for adb_utils."""
 
+import subprocess
 from unittest import mock
 
 from absl.testing import absltest
@@ -145,6 +146,16 @@ class AdbSettingsTest(AdbTestSetup):
     self.assertIsInstance(response, adb_pb2.AdbResponse)
     self.mock_env.execute_adb_call.assert_called_once()
 
+  def test_put_settings_command(self):
+    self.assertEqual(
+        adb_utils.put_settings_command(
+            adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL,
+            'auto_time',
+            '0',
+        ),
+        ['settings', 'put', 'global', 'auto_time', '0'],
+    )
+
   def test_invalid_inputs_put_operation(self):
     self.mock_env.execute_adb_call.return_value = adb_pb2.AdbResponse()
 
@@ -242,6 +253,93 @@ class AdbTypingTest(AdbTestSetup):
       self.assertLen(expected_calls, mock_execute_adb_call.call_count)
 
 
+class AdbPasteTextTest(AdbTestSetup):
+
+  def setUp(self):
+    super().setUp()
+    self.enter_context(mock.patch.object(adb_utils.time, 'sleep'))
+    self.mock_launch_app = self.enter_context(
+        mock.patch.object(adb_utils, 'launch_app', return_value='clipper')
+    )
+    self.mock_press_back_button = self.enter_context(
+        mock.patch.object(adb_utils, 'press_back_button')
+    )
+    self.mock_issue_generic_request.return_value = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK,
+        generic=adb_pb2.AdbResponse.GenericResponse(
+            output=b'Broadcast completed: result=-1, data="Text is copied"'
+        ),
+    )
+    self.mock_env.execute_adb_call.return_value = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK
+    )
+
+  def test_clipboard_method_pastes_text_verbatim(self):
+    adb_utils.type_text("Ça va?\nIt's fine", self.mock_env, method='clipboard')
+
+    self.mock_issue_generic_request.assert_has_calls([
+        mock.call(
+            [
+                'shell',
+                'am',
+                'broadcast',
+                '-a',
+                'clipper.set',
+                '-e',
+                'text',
+                "'Ça va?\nIt'\"'\"'s fine'",
+            ],
+            self.mock_env,
+        ),
+        mock.call(
+            ['shell', 'input', 'keyevent', 'KEYCODE_PASTE'],
+            self.mock_env,
+            adb_utils._DEFAULT_TIMEOUT_SECS,
+        ),
+    ])
+    self.mock_env.execute_adb_call.assert_not_called()
+
+  def test_falls_back_to_words_without_clipper(self):
+    self.mock_issue_generic_request.return_value = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK,
+        generic=adb_pb2.AdbResponse.GenericResponse(
+            output=b'Broadcast completed: result=0'
+        ),
+    )
+
+    calls = []
+    self.mock_press_back_button.side_effect = lambda env: calls.append('back')
+    self.mock_env.execute_adb_call.side_effect = lambda request: (
+        calls.append('type') or adb_pb2.AdbResponse(
+            status=adb_pb2.AdbResponse.Status.OK
+        )
+    )
+
+    adb_utils.type_text('one two', self.mock_env, method='clipboard')
+
+    # Clipper is left before typing, so the text goes to the focused app.
+    self.assertEqual(calls, ['back', 'type', 'type', 'type'])
+
+  def test_auto_types_short_ascii_text_word_by_word(self):
+    adb_utils.type_text('one two', self.mock_env, method='auto')
+
+    self.mock_launch_app.assert_not_called()
+    self.assertEqual(self.mock_env.execute_adb_call.call_count, 3)
+
+  def test_auto_pastes_long_text(self):
+    adb_utils.type_text(' '.join(['word'] * 20), self.mock_env, method='auto')
+
+    self.mock_launch_app.assert_called_once()
+    self.mock_env.execute_adb_call.assert_not_called()
+
+  def test_method_defaults_to_env_setting(self):
+    self.mock_env.text_input_method = 'clipboard'
+
+    adb_utils.type_text('one', self.mock_env)
+
+    self.mock_launch_app.assert_called_once()
+
+
 class TestExtractBroadcastData(absltest.TestCase):
 
   def test_successful_data_extraction(self):
@@ -282,5 +380,129 @@ class TestScreenUtils(absltest.TestCase):
     )
 
 
+class GeometryCacheTest(AdbTestSetup):
+
+  def setUp(self):
+    super().setUp()
+    self.mock_issue_generic_request.return_value = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK,
+        generic=adb_pb2.AdbResponse.GenericResponse(
+            output=b'mCurrentRotation=ROTATION_90'
+        ),
+    )
+    self.mock_env.geometry_cache = adb_utils.GeometryCache()
+
+  def test_queries_are_cached(self):
+    self.assertEqual(adb_utils.get_orientation(self.mock_env), 1)
+    self.assertEqual(adb_utils.get_orientation(self.mock_env), 1)
+
+    self.mock_issue_generic_request.assert_called_once()
+
+  def test_change_orientation_invalidates_cache(self):
+    adb_utils.get_orientation(self.mock_env)
+
+    adb_utils.change_orientation('portrait', self.mock_env)
+    adb_utils.get_orientation(self.mock_env)
+
+    # Two settings calls for the rotation change, two orientation queries.
+    self.assertEqual(self.mock_issue_generic_request.call_count, 4)
+
+  def test_set_screen_size_invalidates_cache(self):
+    adb_utils.get_orientation(self.mock_env)
+
+    adb_utils.set_screen_size(100, 200, self.mock_env)
+    adb_utils.get_orientation(self.mock_env)
+
+    self.assertEqual(self.mock_issue_generic_request.call_count, 3)
+
+  def test_switching_apps_invalidates_rotation_dependent_geometry(self):
+    self.mock_env.geometry_cache.get('screen_size', lambda: (100, 200))
+    adb_utils.get_orientation(self.mock_env)
+
+    adb_utils.press_home_button(self.mock_env)
+    adb_utils.get_orientation(self.mock_env)
+
+    self.assertEqual(self.mock_issue_generic_request.call_count, 2)
+    self.assertEqual(
+        self.mock_env.geometry_cache.peek('screen_size'), (100, 200)
+    )
+
+  def test_env_without_cache_always_queries(self):
+    env = mock.MagicMock()
+
+    adb_utils.get_orientation(env)
+    adb_utils.get_orientation(env)
+
+    self.assertEqual(self.mock_issue_generic_request.call_count, 2)
+
+
+
+def _run_locally(args, unused_env, unused_timeout_sec=None):
+  """Runs an `adb shell` request with the host shell instead of a device."""
+  completed = subprocess.run(
+      ['sh', '-c', ' '.join(args[1:])], capture_output=True, check=False
+  )
+  return adb_pb2.AdbResponse(
+      status=adb_pb2.AdbResponse.Status.OK,
+      generic=adb_pb2.AdbResponse.GenericResponse(output=completed.stdout),
+  )
+
+
+class BatchedShellCommandsTest(AdbTestSetup):
+
+  def setUp(self):
+    super().setUp()
+    self.mock_issue_generic_request.side_effect = _run_locally
+
+  def test_single_round_trip(self):
+    results = adb_utils.issue_batched_shell_commands(
+        ['echo one', ['echo', 'two']], self.mock_env
+    )
+
+    self.mock_issue_generic_request.assert_called_once()
+    self.assertEqual(
+        results,
+        [
+            adb_utils.ShellResult('echo one', 0, 'one\n'),
+            adb_utils.ShellResult('echo two', 0, 'two\n'),
+        ],
+    )
+
+  def test_failures_are_reported_per_command(self):
+    results = adb_utils.issue_batched_shell_commands(
+        ['echo oops >&2; exit 3', 'printf partial', 'true'], self.mock_env
+    )
+
+    self.assertEqual([r.exit_code for r in results], [3, 0, 0])
+    self.assertEqual([r.ok for r in results], [False, True, True])
+    self.assertEqual(results[0].output, 'oops\n')
+    self.assertEqual(results[1].output, 'partial')
+
+  def test_failed_request_has_no_exit_codes(self):
+    self.mock_issue_generic_request.side_effect = None
+    self.mock_issue_generic_request.return_value = adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.TIMEOUT
+    )
+
+    results = adb_utils.issue_batched_shell_commands(
+        ['true', 'true'], self.mock_env
+    )
+
+    self.assertEqual([r.exit_code for r in results], [None, None])
+
+  def test_empty_batch_issues_no_request(self):
+    self.assertEqual(
+        adb_utils.issue_batched_shell_commands([], self.mock_env), []
+    )
+    self.mock_issue_generic_request.assert_not_called()
+
+  def test_async(self):
+    future = adb_utils.issue_batched_shell_commands_async(
+        ['echo hi'], self.mock_env
+    )
+
+    self.assertEqual(future.result(timeout=10)[0].output, 'hi\n')
+
+
 if __name__ == '__main__':
   absltest.main()
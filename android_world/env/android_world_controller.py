@@ -14,8 +14,10 @@
 
 """Controller for Android that adds UI tree information to the observation."""
 
+from collections.abc import Sequence
 import contextlib
 import enum
+import hashlib
 import os
 import time
 from typing import Any
@@ -174,11 +176,16 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
     else:
       self._env = env
     self._a11y_method = a11y_method
+    # Geometry queries made through adb_utils with this controller are served
+    # from this cache until the device rotates or its resolution changes.
+    self.geometry_cache = adb_utils.GeometryCache()
+    # Read by `adb_utils.type_text` when no input method is given explicitly.
+    self.text_input_method: adb_utils.TextInputMethod = 'words'
 
   @property
   def device_screen_size(self) -> tuple[int, int]:
     """Returns the physical screen size of the device: (width, height)."""
-    return adb_utils.get_screen_size(self._env)
+    return adb_utils.get_screen_size(self)
 
   @property
   def logical_screen_size(self) -> tuple[int, int]:
@@ -187,7 +194,7 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
     This will be different with the physical size if orientation or resolution
     is changed.
     """
-    return adb_utils.get_logical_screen_size(self._env)
+    return adb_utils.get_logical_screen_size(self)
 
   @property
   def env(self) -> env_interface.AndroidEnvInterface:
@@ -202,6 +209,7 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
         adb_path=self.env._coordinator._simulator._config.adb_controller.adb_path,
         grpc_port=self.env._coordinator._simulator._config.emulator_launcher.grpc_port,
     ).env
+    self.geometry_cache.invalidate()
     # pylint: enable=protected-access
     # pytype: enable=attribute-error
 
@@ -224,7 +232,7 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
       self.refresh_env()
       return self._get_a11y_forest()
 
-  def get_ui_elements(self) -> list[representation_utils.UIElement]:
+  def get_ui_elements(self) -> Sequence[representation_utils.UIElement]:
     """Returns the most recent UI elements from the device."""
     if self._a11y_method == A11yMethod.A11Y_FORWARDER_APP:
       return representation_utils.forest_to_ui_elements(
@@ -238,6 +246,52 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
     else:
       return []
 
+  def get_ui_fingerprint(self) -> bytes:
+    """Returns a digest of the current UI tree, without grabbing pixels.
+
+    Two calls return the same digest iff the UI tree did not change in between,
+    which makes it a cheap signal to detect when the screen has settled.
+    """
+    if self._a11y_method == A11yMethod.A11Y_FORWARDER_APP:
+      payload = self.get_a11y_forest().SerializeToString(deterministic=True)
+    else:
+      payload = repr(self.get_ui_elements()).encode()
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+  def _invalidate_geometry_on_rotation(
+      self,
+      forest: android_accessibility_forest_pb2.AndroidAccessibilityForest,
+  ) -> None:
+    """Clears cached geometry if the forest shows the screen has rotated.
+
+    Apps may rotate the screen on their own, e.g. when opening a video. Window
+    bounds in the forest are in logical coordinates, so a rotation shows up as
+    the screen extent flipping between portrait and landscape. It is compared
+    against the cached logical screen size or, if that is not cached, the
+    cached orientation, whose natural rotation is portrait on phones.
+
+    Args:
+      forest: The latest a11y forest.
+    """
+    logical_size = self.geometry_cache.peek('logical_screen_size')
+    orientation = self.geometry_cache.peek('orientation')
+    if logical_size is not None:
+      cached_landscape = logical_size[0] > logical_size[1]
+    elif orientation is not None:
+      cached_landscape = orientation % 2 == 1
+    else:
+      return
+    try:
+      right = max(w.bounds_in_screen.right for w in forest.windows)
+      bottom = max(w.bounds_in_screen.bottom for w in forest.windows)
+    except (AttributeError, TypeError, ValueError):
+      return  # Malformed or empty forest; nothing to compare against.
+    if right == bottom:
+      return
+    if (right > bottom) != cached_landscape:
+      logging.info('Screen rotation detected; clearing geometry cache.')
+      self.geometry_cache.invalidate(adb_utils.ROTATION_DEPENDENT_GEOMETRY)
+
   def _process_timestep(self, timestep: dm_env.TimeStep) -> dm_env.TimeStep:
     """Adds a11y tree info to the observation."""
     if self._a11y_method == A11yMethod.A11Y_FORWARDER_APP:
@@ -246,6 +300,7 @@ class AndroidWorldController(base_wrapper.BaseWrapper):
           forest,
           exclude_invisible_elements=True,
       )
+      self._invalidate_geometry_on_rotation(forest)
     else:
       forest = None
       ui_elements = self.get_ui_elements()
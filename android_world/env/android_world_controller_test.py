@@ -18,6 +18,7 @@ from unittest import mock
 
 from absl.testing import absltest
 from android_env import env_interface
+from android_env.proto.a11y import android_accessibility_forest_pb2
 from android_env.wrappers import a11y_grpc_wrapper
 from android_world.env import adb_utils
 from android_world.env import android_world_controller
@@ -190,6 +191,50 @@ class AndroidWorldControllerTest(absltest.TestCase):
 
     self.assertEqual(open(remote_file_path, 'r').read(), new_file_contents)
 
+  def test_device_screen_size_is_cached(self):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+
+    self.assertEqual(env.device_screen_size, (100, 200))
+    self.assertEqual(env.device_screen_size, (100, 200))
+
+    adb_utils.issue_generic_request.assert_called_once()
+
+  def test_rotation_in_forest_invalidates_geometry_cache(self):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+    env.geometry_cache.get('logical_screen_size', lambda: (100, 200))
+    portrait = android_accessibility_forest_pb2.AndroidAccessibilityForest()
+    portrait.windows.add().bounds_in_screen.right = 100
+    portrait.windows[0].bounds_in_screen.bottom = 200
+    landscape = android_accessibility_forest_pb2.AndroidAccessibilityForest()
+    landscape.windows.add().bounds_in_screen.right = 200
+    landscape.windows[0].bounds_in_screen.bottom = 100
+
+    env._invalidate_geometry_on_rotation(portrait)
+    self.assertEqual(
+        env.geometry_cache.peek('logical_screen_size'), (100, 200)
+    )
+
+    env._invalidate_geometry_on_rotation(landscape)
+    self.assertIsNone(env.geometry_cache.peek('logical_screen_size'))
+
+  def test_rotation_detected_from_cached_orientation(self):
+    mock_base_env = mock.Mock(spec=env_interface.AndroidEnvInterface)
+    env = android_world_controller.AndroidWorldController(mock_base_env)
+    env.geometry_cache.get('screen_size', lambda: (100, 200))
+    env.geometry_cache.get('orientation', lambda: 0)
+    env.geometry_cache.get('physical_frame_boundary', lambda: (0, 0, 100, 200))
+    landscape = android_accessibility_forest_pb2.AndroidAccessibilityForest()
+    landscape.windows.add().bounds_in_screen.right = 200
+    landscape.windows[0].bounds_in_screen.bottom = 100
+
+    env._invalidate_geometry_on_rotation(landscape)
+
+    self.assertIsNone(env.geometry_cache.peek('orientation'))
+    self.assertIsNone(env.geometry_cache.peek('physical_frame_boundary'))
+    self.assertEqual(env.geometry_cache.peek('screen_size'), (100, 200))
+
 
 if __name__ == '__main__':
   absltest.main()
@@ -0,0 +1,184 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""A pool of devices leased to sessions, so one server can drive many agents.
+
+Each device has its own `DeviceWorker`, so operations on different devices run
+concurrently while the operations on one device stay sequential.
+"""
+
+from collections.abc import Sequence
+import dataclasses
+import threading
+import time
+from typing import Any
+import uuid
+
+from absl import logging
+from android_world.env import device_worker
+from android_world.env import interface
+
+
+class NoDeviceAvailableError(RuntimeError):
+  """Raised when a session is requested while all devices are leased."""
+
+
+class UnknownSessionError(KeyError):
+  """Raised for a session ID that was never opened or is already closed."""
+
+
+@dataclasses.dataclass
+class Device:
+  """A device of the pool.
+
+  Attributes:
+    name: Identifies the device, e.g. in utilization reports.
+    env: The environment of the device.
+    worker: Runs the operations on the device.
+    session_id: The session the device is leased to, if any.
+    leased_at: When the device was leased, from `time.monotonic`.
+  """
+
+  name: str
+  env: interface.AsyncEnv
+  worker: device_worker.DeviceWorker
+  session_id: str | None = None
+  leased_at: float | None = None
+
+
+class DevicePool:
+  """Leases devices to sessions and routes session requests to them.
+
+  Requests that do not belong to a session go to the first device, as on a
+  single-device server, unless it is leased to a session.
+  """
+
+  def __init__(
+      self, envs: Sequence[interface.AsyncEnv], names: Sequence[str] = ()
+  ):
+    """Initializes the pool.
+
+    Args:
+      envs: The environments of the devices.
+      names: Names of the devices, aligned with `envs`. Defaults to their
+        indices.
+
+    Raises:
+      ValueError: If `envs` is empty or `names` does not match it.
+    """
+    if not envs:
+      raise ValueError('A device pool needs at least one device.')
+    names = list(names) or [str(i) for i in range(len(envs))]
+    if len(names) != len(envs):
+      raise ValueError(f'Expected {len(envs)} device names, got {names}.')
+    self.devices = [
+        Device(name, env, device_worker.DeviceWorker(f'device-{name}'))
+        for name, env in zip(names, envs)
+    ]
+    self._sessions: dict[str, Device] = {}
+    self._lock = threading.Lock()
+
+  def __len__(self) -> int:
+    return len(self.devices)
+
+  def open_session(self) -> str:
+    """Leases a free device to a new session and returns the session ID.
+
+    Raises:
+      NoDeviceAvailableError: If all devices are leased.
+    """
+    with self._lock:
+      # The first device is leased last, so it keeps serving requests that do
+      # not use sessions for as long as possible.
+      for device in self.devices[1:] + self.devices[:1]:
+        if device.session_id is None:
+          device.session_id = uuid.uuid4().hex
+          device.leased_at = time.monotonic()
+          self._sessions[device.session_id] = device
+          return device.session_id
+    raise NoDeviceAvailableError(
+        f'All {len(self.devices)} devices are leased to sessions.'
+    )
+
+  def close_session(self, session_id: str) -> Device:
+    """Ends a session and returns its device to the pool.
+
+    Raises:
+      UnknownSessionError: If the session is not open.
+    """
+    with self._lock:
+      device = self._sessions.pop(session_id, None)
+      if device is None:
+        raise UnknownSessionError(session_id)
+      device.session_id = None
+      device.leased_at = None
+      return device
+
+  def get(self, session_id: str | None = None) -> Device:
+    """Returns the device of a session.
+
+    Args:
+      session_id: The session. If None, the first device, for requests that do
+        not use sessions.
+
+    Raises:
+      UnknownSessionError: If the session is not open.
+      NoDeviceAvailableError: If `session_id` is None and the first device is
+        leased to a session.
+    """
+    with self._lock:
+      if session_id is None:
+        device = self.devices[0]
+        if device.session_id is not None:
+          raise NoDeviceAvailableError(
+              f'Device {device.name} is leased to a session; pass a'
+              ' session_id.'
+          )
+        return device
+      try:
+        return self._sessions[session_id]
+      except KeyError:
+        raise UnknownSessionError(session_id) from None
+
+  def utilization(self) -> dict[str, Any]:
+    """Returns how many devices are leased and the load of each device."""
+    now = time.monotonic()
+    with self._lock:
+      devices = [
+          {
+              'name': device.name,
+              'leased': device.session_id is not None,
+              'leased_seconds': (
+                  None if device.leased_at is None else now - device.leased_at
+              ),
+              'pending_operations': device.worker.pending,
+          }
+          for device in self.devices
+      ]
+    leased = sum(device['leased'] for device in devices)
+    return {
+        'size': len(devices),
+        'leased': leased,
+        'available': len(devices) - leased,
+        'devices': devices,
+    }
+
+  def close(self) -> None:
+    """Closes all devices and stops their workers."""
+    for device in self.devices:
+      try:
+        device.worker.submit(device.env.close).result()
+      except Exception:  # pylint: disable=broad-exception-caught
+        logging.exception('Failed to close device %s.', device.name)
+      device.worker.close()
@@ -0,0 +1,96 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import mock
+
+from absl.testing import absltest
+from android_world.env import device_pool
+from android_world.env import interface
+
+
+def _envs(count):
+  return [mock.create_autospec(interface.AsyncEnv) for _ in range(count)]
+
+
+class DevicePoolTest(absltest.TestCase):
+
+  def test_sessions_lease_distinct_devices(self):
+    envs = _envs(3)
+    pool = device_pool.DevicePool(envs)
+    self.addCleanup(pool.close)
+
+    sessions = [pool.open_session() for _ in range(3)]
+
+    self.assertCountEqual(
+        [pool.get(session).env for session in sessions], envs
+    )
+    # The first device is leased last.
+    self.assertIs(pool.get(sessions[-1]).env, envs[0])
+    with self.assertRaises(device_pool.NoDeviceAvailableError):
+      pool.open_session()
+
+  def test_close_session_frees_device(self):
+    pool = device_pool.DevicePool(_envs(1))
+    self.addCleanup(pool.close)
+    session = pool.open_session()
+
+    device = pool.close_session(session)
+
+    self.assertIsNone(device.session_id)
+    with self.assertRaises(device_pool.UnknownSessionError):
+      pool.get(session)
+    with self.assertRaises(device_pool.UnknownSessionError):
+      pool.close_session(session)
+    self.assertIsNot(pool.open_session(), session)
+
+  def test_requests_without_session_use_first_device(self):
+    envs = _envs(2)
+    pool = device_pool.DevicePool(envs)
+    self.addCleanup(pool.close)
+
+    self.assertIs(pool.get().env, envs[0])
+    pool.open_session()
+    self.assertIs(pool.get().env, envs[0])
+    pool.open_session()
+    with self.assertRaises(device_pool.NoDeviceAvailableError):
+      pool.get()
+
+  def test_utilization(self):
+    pool = device_pool.DevicePool(_envs(2), names=['5554', '5556'])
+    self.addCleanup(pool.close)
+    pool.open_session()
+
+    utilization = pool.utilization()
+
+    self.assertEqual(utilization['size'], 2)
+    self.assertEqual(utilization['leased'], 1)
+    self.assertEqual(utilization['available'], 1)
+    self.assertEqual(
+        [device['leased'] for device in utilization['devices']], [False, True]
+    )
+    self.assertEqual(utilization['devices'][0]['name'], '5554')
+
+  def test_close_closes_all_devices(self):
+    envs = _envs(2)
+    envs[0].close.side_effect = RuntimeError('device is gone')
+    pool = device_pool.DevicePool(envs)
+
+    pool.close()
+
+    for env in envs:
+      env.close.assert_called_once()
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,104 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Runs the blocking operations on a device off the event loop.
+
+ADB and gRPC calls to a device block for up to minutes. An async server that
+calls them directly stalls every other request in the meantime. A
+`DeviceWorker` instead runs the operations on a device one at a time on a
+dedicated thread, in the order they are submitted, and lets coroutines await
+them with a timeout.
+"""
+
+import asyncio
+from collections.abc import Callable
+from concurrent import futures
+import functools
+import threading
+from typing import Any, TypeVar
+
+T = TypeVar('T')
+
+
+class DeviceWorker:
+  """Runs the operations on one device sequentially on a dedicated thread.
+
+  A timed out or cancelled operation is dropped if it has not started yet.
+  Operations that have started cannot be interrupted: they run to completion
+  on the worker thread, and later operations wait for them.
+  """
+
+  def __init__(self, name: str = 'device'):
+    self._executor = futures.ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix=name
+    )
+    self._lock = threading.Lock()
+    self._pending = 0
+
+  @property
+  def pending(self) -> int:
+    """The number of operations that are queued or running."""
+    with self._lock:
+      return self._pending
+
+  def _done(self, unused_future: futures.Future[Any]) -> None:
+    with self._lock:
+      self._pending -= 1
+
+  def submit(
+      self, fn: Callable[..., T], *args: Any, **kwargs: Any
+  ) -> futures.Future[T]:
+    """Queues `fn(*args, **kwargs)` to run after the pending operations."""
+    with self._lock:
+      self._pending += 1
+    try:
+      future = self._executor.submit(fn, *args, **kwargs)
+    except RuntimeError:
+      self._done(None)
+      raise
+    future.add_done_callback(self._done)
+    return future
+
+  async def run(
+      self,
+      fn: Callable[..., T],
+      *args: Any,
+      timeout: float | None = None,
+      **kwargs: Any,
+  ) -> T:
+    """Runs `fn(*args, **kwargs)` on the worker thread and awaits its result.
+
+    Args:
+      fn: The blocking operation.
+      *args: Its positional arguments.
+      timeout: Seconds to wait for the operation, including the time spent
+        queued behind other operations. None waits indefinitely.
+      **kwargs: Its keyword arguments.
+
+    Returns:
+      The result of the operation.
+
+    Raises:
+      TimeoutError: If the operation did not complete within `timeout`.
+    """
+    future = asyncio.wrap_future(
+        self.submit(functools.partial(fn, *args, **kwargs))
+    )
+    # Cancelling the awaiting coroutine, e.g. on timeout, cancels the
+    # operation if it is still queued.
+    return await asyncio.wait_for(future, timeout)
+
+  def close(self, wait: bool = True) -> None:
+    """Stops the worker, dropping the operations that have not started."""
+    self._executor.shutdown(wait=wait, cancel_futures=True)
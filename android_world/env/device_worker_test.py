@@ -0,0 +1,80 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+
+from absl.testing import absltest
+from android_world.env import device_worker
+
+
+class DeviceWorkerTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.worker = device_worker.DeviceWorker()
+    self.addCleanup(self.worker.close)
+
+  def test_runs_operations_in_order_on_one_thread(self):
+    calls = []
+
+    def operation(index):
+      calls.append((index, threading.get_ident()))
+      return index
+
+    results = [self.worker.submit(operation, i) for i in range(5)]
+
+    self.assertEqual([result.result() for result in results], list(range(5)))
+    self.assertEqual([index for index, _ in calls], list(range(5)))
+    self.assertLen({thread for _, thread in calls}, 1)
+    self.assertNotEqual(calls[0][1], threading.get_ident())
+    self.assertEqual(self.worker.pending, 0)
+
+  def test_run_does_not_block_the_event_loop(self):
+    release = threading.Event()
+
+    async def main():
+      operation = asyncio.ensure_future(self.worker.run(release.wait, 10))
+      # The loop keeps serving other coroutines while the operation blocks.
+      await asyncio.sleep(0.01)
+      self.assertFalse(operation.done())
+      self.assertEqual(self.worker.pending, 1)
+      release.set()
+      return await operation
+
+    self.assertTrue(asyncio.run(main()))
+
+  def test_run_raises_errors(self):
+    def operation():
+      raise ValueError('device error')
+
+    with self.assertRaisesRegex(ValueError, 'device error'):
+      asyncio.run(self.worker.run(operation))
+
+  def test_timeout_drops_queued_operation(self):
+    release = threading.Event()
+    calls = []
+    self.worker.submit(release.wait, 10)
+
+    with self.assertRaises(TimeoutError):
+      asyncio.run(self.worker.run(calls.append, 'queued', timeout=0.01))
+    release.set()
+    self.worker.submit(calls.append, 'next').result()
+
+    self.assertEqual(calls, ['next'])
+    self.assertEqual(self.worker.pending, 0)
+
+
+if __name__ == '__main__':
+  absltest.main()
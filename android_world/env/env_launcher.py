@@ -14,6 +14,8 @@
 
 """Launches the environment used in the benchmark."""
 
+from collections.abc import Sequence
+from concurrent import futures
 import platform
 
 from absl import logging
@@ -120,3 +122,51 @@ def load_and_setup_env(
   env = _get_env(console_port, adb_path, grpc_port)
   setup_env(env, emulator_setup, freeze_datetime)
   return env
+
+
+def load_and_setup_envs(
+    console_ports: Sequence[int],
+    grpc_ports: Sequence[int],
+    emulator_setup: bool = False,
+    freeze_datetime: bool = True,
+    adb_path: str = android_world_controller.DEFAULT_ADB_PATH,
+) -> list[interface.AsyncEnv]:
+  """Connects to and sets up several running emulators concurrently.
+
+  Each emulator is identified by its console port and gRPC port; e.g. a second
+  emulator launched with `-port 5556 -grpc 8555` is addressed by console port
+  5556 and gRPC port 8555.
+
+  Args:
+    console_ports: The console ports of the existing devices.
+    grpc_ports: The gRPC ports of the existing devices, aligned with
+      `console_ports`.
+    emulator_setup: Perform first-time app setup on each environment if True.
+    freeze_datetime: Whether to freeze the datetime to a fixed time, October
+      2023, to ensure consistent benchmarking.
+    adb_path: The location of the adb binary.
+
+  Returns:
+    Interactable Android environments, in the order of `console_ports`.
+
+  Raises:
+    ValueError: If the port lists are empty or have different lengths.
+  """
+  if not console_ports or len(console_ports) != len(grpc_ports):
+    raise ValueError(
+        'Expected one gRPC port per console port, got console ports'
+        f' {list(console_ports)} and gRPC ports {list(grpc_ports)}.'
+    )
+  with futures.ThreadPoolExecutor(max_workers=len(console_ports)) as executor:
+    return list(
+        executor.map(
+            lambda ports: load_and_setup_env(
+                console_port=ports[0],
+                emulator_setup=emulator_setup,
+                freeze_datetime=freeze_datetime,
+                adb_path=adb_path,
+                grpc_port=ports[1],
+            ),
+            zip(console_ports, grpc_ports),
+        )
+    )
@@ -59,6 +59,29 @@ class EnvLauncherTest(absltest.TestCase):
     mock_controller.assert_called_with(mock_android_env)
     mock_async_android_env.assert_called_with(mock_controller.return_value)
 
+  @mock.patch.object(env_launcher, "load_and_setup_env", autospec=True)
+  def test_load_and_setup_envs(self, mock_load_and_setup_env):
+    mock_load_and_setup_env.side_effect = lambda **kwargs: kwargs["grpc_port"]
+
+    envs = env_launcher.load_and_setup_envs(
+        console_ports=[5554, 5556], grpc_ports=[8554, 8555]
+    )
+
+    self.assertEqual(envs, [8554, 8555])
+    mock_load_and_setup_env.assert_any_call(
+        console_port=5556,
+        emulator_setup=False,
+        freeze_datetime=True,
+        adb_path=android_world_controller.DEFAULT_ADB_PATH,
+        grpc_port=8555,
+    )
+
+  def test_load_and_setup_envs_mismatched_ports(self):
+    with self.assertRaises(ValueError):
+      env_launcher.load_and_setup_envs(
+          console_ports=[5554, 5556], grpc_ports=[8554]
+      )
+
 
 if __name__ == "__main__":
   absltest.main()
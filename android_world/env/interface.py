@@ -15,6 +15,7 @@
 """Environment interface for real-time interaction Android."""
 
 import abc
+from collections.abc import Sequence
 import dataclasses
 import time
 from typing import Any, Optional, Self
@@ -46,13 +47,14 @@ class State:
     pixels: RGB array of current screen.
     forest: Raw UI forest; see android_world_controller.py for more info.
     ui_elements: Processed children and stateful UI elements extracted from
-      forest.
+      forest. A `representation_utils.UIElementTable` when read from an
+      accessibility forest.
     auxiliaries: Additional information about the state.
   """
 
   pixels: np.ndarray
   forest: Any
-  ui_elements: list[representation_utils.UIElement]
+  ui_elements: Sequence[representation_utils.UIElement]
   auxiliaries: dict[str, Any] | None = None
 
   @classmethod
@@ -214,11 +216,23 @@ class AsyncAndroidEnv(AsyncEnv):
   """Async environment interface using AndroidEnv to communicate with device."""
 
   interaction_cache = ''
+  stabilization_quiet_period: float | None = None
 
   def __init__(
-      self, controller: android_world_controller.AndroidWorldController
+      self,
+      controller: android_world_controller.AndroidWorldController,
+      stabilization_quiet_period: float | None = None,
   ):
+    """Initializes the environment.
+
+    Args:
+      controller: The controller for the device.
+      stabilization_quiet_period: If set, `get_state(wait_to_stabilize=True)`
+        returns as soon as the UI tree has not changed for this many seconds,
+        instead of waiting for several identical UI element polls.
+    """
     self._controller = controller
+    self.stabilization_quiet_period = stabilization_quiet_period
     self._prior_state = None
     # Variable used to temporarily save interactions between agent and user.
     # Like when agent use answer action to answer user questions, we
@@ -289,8 +303,50 @@ class AsyncAndroidEnv(AsyncEnv):
 
     return current_state  # pylint: disable=undefined-variable
 
+  def _get_quiescent_state(
+      self,
+      quiet_period: float,
+      poll_interval: float = 0.1,
+      timeout: float = 6.0,
+  ) -> State:
+    """Waits for the UI tree to stop changing and returns the state.
+
+    Unlike `_get_stable_state`, only a digest of the UI tree is polled, without
+    grabbing a screenshot or parsing UI elements, and the state is fetched once
+    no change was seen for `quiet_period` seconds.
+
+    Args:
+        quiet_period: Time in seconds without UI changes to consider UI stable.
+        poll_interval: Time in seconds between UI tree digests.
+        timeout: Maximum time in seconds to wait for UI to become stable before
+          giving up.
+
+    Returns:
+        The current state of the UI.
+    """
+    start_time = time.time()
+    deadline = start_time + timeout
+    last_fingerprint = None
+    last_change_time = start_time
+    while time.time() < deadline:
+      fingerprint = self.controller.get_ui_fingerprint()
+      now = time.time()
+      if fingerprint != last_fingerprint:
+        last_fingerprint = fingerprint
+        last_change_time = now
+      elif now - last_change_time >= quiet_period:
+        break
+      sleep_time = min(poll_interval, deadline - time.time())
+      if sleep_time > 0:
+        time.sleep(sleep_time)
+    else:
+      logging.info('UI did not settle within %.1f seconds.', timeout)
+    return self._get_state()
+
   def get_state(self, wait_to_stabilize: bool = False) -> State:
     if wait_to_stabilize:
+      if self.stabilization_quiet_period is not None:
+        return self._get_quiescent_state(self.stabilization_quiet_period)
       return self._get_stable_state()
     return self._get_state()
 
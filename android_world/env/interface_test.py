@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
 from unittest import mock
 
 from absl.testing import absltest
@@ -86,6 +87,36 @@ class InterfaceTest(absltest.TestCase):
         states[5],
     )
 
+  def test_quiescent_state_waits_for_quiet_period(self):
+    controller = mock.MagicMock()
+    controller.get_ui_fingerprint.side_effect = itertools.chain(
+        [b"a", b"b"], itertools.repeat(b"c")
+    )
+    env = interface.AsyncAndroidEnv(
+        controller, stabilization_quiet_period=0.05
+    )
+    state = interface.State(
+        ui_elements=[], pixels=np.empty([1, 2, 3]), forest=None
+    )
+    env._get_state = mock.MagicMock(return_value=state)
+
+    self.assertIs(env.get_state(wait_to_stabilize=True), state)
+
+    self.assertGreater(controller.get_ui_fingerprint.call_count, 3)
+    env._get_state.assert_called_once()
+
+  def test_quiescent_state_times_out(self):
+    controller = mock.MagicMock()
+    controller.get_ui_fingerprint.side_effect = (
+        str(i).encode() for i in range(100)
+    )
+    env = interface.AsyncAndroidEnv(controller)
+    env._get_state = mock.MagicMock()
+
+    env._get_quiescent_state(quiet_period=1.0, poll_interval=0.01, timeout=0.1)
+
+    env._get_state.assert_called_once()
+
 
 if __name__ == "__main__":
   absltest.main()
@@ -14,10 +14,14 @@
 
 """Tools for processing and representing accessibility trees."""
 
+from collections.abc import Iterable, Iterator, Sequence
 import dataclasses
+import itertools
+import sys
 from typing import Any, Optional
 import xml.etree.ElementTree as ET
 from android_env.proto.a11y import android_accessibility_forest_pb2
+import numpy as np
 
 
 @dataclasses.dataclass
@@ -77,6 +81,252 @@ class UIElement:
   metadata: Optional[dict[str, Any]] = None
 
 
+_FLAG_FIELDS = (
+    'is_checked',
+    'is_checkable',
+    'is_clickable',
+    'is_editable',
+    'is_enabled',
+    'is_focused',
+    'is_focusable',
+    'is_long_clickable',
+    'is_scrollable',
+    'is_selected',
+    'is_visible',
+)
+_STRING_FIELDS = (
+    'text',
+    'content_description',
+    'class_name',
+    'hint_text',
+    'package_name',
+    'resource_name',
+    'tooltip',
+    'resource_id',
+)
+# Strings shared by many elements, which are kept once.
+_INTERNED_FIELDS = frozenset({'class_name', 'package_name', 'resource_name'})
+# Flag values by their code in the flags column; None is -1.
+_FLAG_VALUES = (False, True, None)
+_MISSING_BBOX = (np.nan,) * 4
+
+
+def _flag_code(value: Optional[bool]) -> int:
+  return -1 if value is None else int(bool(value))
+
+
+def _bbox_row(bbox: Optional[BoundingBox]) -> tuple[float, ...]:
+  if bbox is None:
+    return _MISSING_BBOX
+  return (bbox.x_min, bbox.x_max, bbox.y_min, bbox.y_max)
+
+
+class UIElementTable(Sequence[UIElement]):
+  """UI elements stored column-wise.
+
+  Bounding boxes and flags are kept in NumPy arrays and strings in lists, with
+  the class, package and resource names interned. Compared to a list of
+  `UIElement`s, a table is much cheaper to build, compare and pickle, and
+  much smaller.
+
+  The table is a read-only sequence of `UIElement`s: indexing it creates a
+  `UIElement` view of the row, so changes to a view are not written back.
+  Tables compare equal to sequences of equal `UIElement`s.
+  """
+
+  def __init__(
+      self,
+      bbox: np.ndarray,
+      bbox_pixels: np.ndarray,
+      integral_pixels: bool,
+      flags: np.ndarray,
+      strings: dict[str, list[Optional[str]]],
+      metadata: Optional[list[Optional[dict[str, Any]]]],
+  ):
+    """Initializes the table; use `from_elements` to create one.
+
+    Args:
+      bbox: The (n, 4) array of normalized (x_min, x_max, y_min, y_max) boxes,
+        with NaN rows for elements without one.
+      bbox_pixels: The (n, 4) array of boxes in pixels, likewise.
+      integral_pixels: Whether the pixel coordinates are ints.
+      flags: The (n, len(_FLAG_FIELDS)) array of flag codes.
+      strings: The columns of the `_STRING_FIELDS`.
+      metadata: The metadata of the elements, or None if none has any.
+    """
+    self._bbox = bbox
+    self._bbox_pixels = bbox_pixels
+    self._integral_pixels = integral_pixels
+    self._flags = flags
+    self._strings = strings
+    self._metadata = metadata
+
+  @classmethod
+  def _from_rows(
+      cls,
+      bbox: Sequence[tuple[float, ...]] | np.ndarray,
+      bbox_pixels: list[tuple[float, ...]],
+      flags: list[tuple[int, ...]],
+      strings: dict[str, list[Optional[str]]],
+      metadata: Optional[list[Optional[dict[str, Any]]]] = None,
+      integral_pixels: Optional[bool] = None,
+  ) -> 'UIElementTable':
+    """Creates a table from per-element rows and per-field string columns."""
+    columns = []
+    for rows, dtype, width in (
+        (bbox, np.float64, 4),
+        (bbox_pixels, np.float64, 4),
+        (flags, np.int8, len(_FLAG_FIELDS)),
+    ):
+      column = np.array(rows, dtype=dtype).reshape(-1, width)
+      column.flags.writeable = False
+      columns.append(column)
+    for name in _INTERNED_FIELDS:
+      strings[name] = [
+          None if value is None else sys.intern(value)
+          for value in strings[name]
+      ]
+    if metadata is not None and all(value is None for value in metadata):
+      metadata = None
+    if integral_pixels is None:
+      # Pixel coordinates are usually ints, which views must return as such.
+      integral_pixels = all(
+          isinstance(value, (int, np.integer))
+          for row in bbox_pixels
+          if row is not _MISSING_BBOX
+          for value in row
+      )
+    return cls(
+        bbox=columns[0],
+        bbox_pixels=columns[1],
+        integral_pixels=integral_pixels,
+        flags=columns[2],
+        strings=strings,
+        metadata=metadata,
+    )
+
+  @classmethod
+  def from_elements(cls, elements: Iterable[UIElement]) -> 'UIElementTable':
+    """Creates a table holding the given elements."""
+    elements = list(elements)
+    return cls._from_rows(
+        bbox=[_bbox_row(element.bbox) for element in elements],
+        bbox_pixels=[_bbox_row(element.bbox_pixels) for element in elements],
+        flags=[
+            tuple(_flag_code(getattr(element, name)) for name in _FLAG_FIELDS)
+            for element in elements
+        ],
+        strings={
+            name: [getattr(element, name) for element in elements]
+            for name in _STRING_FIELDS
+        },
+        metadata=[element.metadata for element in elements],
+    )
+
+  @property
+  def bbox_pixels_array(self) -> np.ndarray:
+    """The read-only (n, 4) array of (x_min, x_max, y_min, y_max) pixel boxes.
+
+    Rows of elements without a bounding box are NaN.
+    """
+    return self._bbox_pixels
+
+  def flag_array(self, name: str) -> np.ndarray:
+    """Returns a boolean array of the elements whose flag `name` is True."""
+    return self._flags[:, _FLAG_FIELDS.index(name)] == 1
+
+  def __len__(self) -> int:
+    return self._flags.shape[0]
+
+  def __iter__(self) -> Iterator[UIElement]:
+    # Converts the columns once, rather than row by row.
+    bboxes = [
+        None if row[0] != row[0] else BoundingBox(*row)  # NaN rows.
+        for row in self._bbox.tolist()
+    ]
+    missing_pixels = np.isnan(self._bbox_pixels[:, 0])
+    pixel_rows = self._bbox_pixels
+    if self._integral_pixels:
+      pixel_rows = np.nan_to_num(pixel_rows).astype(np.int64)
+    pixel_bboxes = [
+        None if missing else BoundingBox(*row)
+        for row, missing in zip(pixel_rows.tolist(), missing_pixels.tolist())
+    ]
+    flag_rows = [
+        [_FLAG_VALUES[code] for code in row] for row in self._flags.tolist()
+    ]
+    strings = self._strings
+    for row in zip(
+        strings['text'],
+        strings['content_description'],
+        strings['class_name'],
+        bboxes,
+        pixel_bboxes,
+        strings['hint_text'],
+        flag_rows,
+        strings['package_name'],
+        strings['resource_name'],
+        strings['tooltip'],
+        strings['resource_id'],
+        self._metadata or itertools.repeat(None),
+    ):
+      # Positional, in the order of the UIElement fields.
+      yield UIElement(*row[:6], *row[6], *row[7:])
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return UIElementTable(
+          bbox=self._bbox[index],
+          bbox_pixels=self._bbox_pixels[index],
+          integral_pixels=self._integral_pixels,
+          flags=self._flags[index],
+          strings={
+              name: column[index] for name, column in self._strings.items()
+          },
+          metadata=None if self._metadata is None else self._metadata[index],
+      )
+    index = range(len(self))[index]
+    return next(iter(self[index : index + 1]))
+
+  def __eq__(self, other: Any) -> bool:
+    if isinstance(other, UIElementTable):
+      return (
+          len(self) == len(other)
+          and np.array_equal(self._flags, other._flags)
+          and np.array_equal(self._bbox, other._bbox, equal_nan=True)
+          and np.array_equal(
+              self._bbox_pixels, other._bbox_pixels, equal_nan=True
+          )
+          and self._strings == other._strings
+          and self._metadata == other._metadata
+      )
+    if isinstance(other, Sequence) and not isinstance(other, str):
+      return len(self) == len(other) and all(
+          element == other_element
+          for element, other_element in zip(self, other)
+      )
+    return NotImplemented
+
+  __hash__ = None
+
+  def __repr__(self) -> str:
+    return repr(list(self))
+
+
+def ui_element_to_dict(element: UIElement) -> dict[str, Any]:
+  """Converts a UIElement to a dict of plain values, e.g. to send as JSON."""
+  return dataclasses.asdict(element)
+
+
+def ui_element_from_dict(data: dict[str, Any]) -> UIElement:
+  """Converts a dict from `ui_element_to_dict` back to a UIElement."""
+  data = dict(data)
+  for key in ('bbox', 'bbox_pixels'):
+    if data.get(key) is not None:
+      data[key] = BoundingBox(**data[key])
+  return UIElement(**data)
+
+
 def accessibility_node_to_ui_element(
     node: Any,
     screen_size: Optional[tuple[int, int]] = None,
@@ -137,11 +387,12 @@ def forest_to_ui_elements(
     forest: android_accessibility_forest_pb2.AndroidAccessibilityForest | Any,
     exclude_invisible_elements: bool = False,
     screen_size: Optional[tuple[int, int]] = None,
-) -> list[UIElement]:
+) -> UIElementTable:
   """Extracts nodes from accessibility forest and converts to UI elements.
 
   We extract all nodes that are either leaf nodes or have content descriptions
-  or is scrollable.
+  or is scrollable. The elements are read into table columns directly, which
+  is equivalent to `accessibility_node_to_ui_element` on every node.
 
   Args:
     forest: The forest to extract leaf nodes from.
@@ -152,15 +403,63 @@ def forest_to_ui_elements(
   Returns:
     The extracted UI elements.
   """
-  elements = []
+  bbox_pixels = []
+  flags = []
+  strings = {name: [] for name in _STRING_FIELDS}
+  texts = strings['text']
+  content_descriptions = strings['content_description']
+  class_names = strings['class_name']
+  hint_texts = strings['hint_text']
+  package_names = strings['package_name']
+  resource_names = strings['resource_name']
   for window in forest.windows:
     for node in window.tree.nodes:
       if not node.child_ids or node.content_description or node.is_scrollable:
         if exclude_invisible_elements and not node.is_visible_to_user:
           continue
-        else:
-          elements.append(accessibility_node_to_ui_element(node, screen_size))
-  return elements
+        bounds = node.bounds_in_screen
+        bbox_pixels.append(
+            (bounds.left, bounds.right, bounds.top, bounds.bottom)
+        )
+        flags.append((
+            node.is_checked,
+            node.is_checkable,
+            node.is_clickable,
+            node.is_editable,
+            node.is_enabled,
+            node.is_focused,
+            node.is_focusable,
+            node.is_long_clickable,
+            node.is_scrollable,
+            node.is_selected,
+            node.is_visible_to_user,
+        ))
+        texts.append(node.text or None)
+        content_descriptions.append(node.content_description or None)
+        class_names.append(node.class_name or None)
+        hint_texts.append(node.hint_text or None)
+        package_names.append(node.package_name or None)
+        resource_names.append(node.view_id_resource_name or None)
+  strings['tooltip'] = [None] * len(flags)
+  strings['resource_id'] = [None] * len(flags)
+
+  if screen_size is not None:
+    width, height = screen_size
+    bbox = np.array(bbox_pixels, dtype=np.float64).reshape(-1, 4) / (
+        width,
+        width,
+        height,
+        height,
+    )
+  else:
+    bbox = [_MISSING_BBOX] * len(flags)
+  return UIElementTable._from_rows(  # pylint: disable=protected-access
+      bbox=bbox,
+      bbox_pixels=bbox_pixels,
+      flags=flags,
+      strings=strings,
+      integral_pixels=True,
+  )
 
 
 def _parse_ui_hierarchy(xml_string: str) -> dict[str, Any]:
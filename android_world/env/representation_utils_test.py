@@ -13,10 +13,12 @@
 # limitations under the License.
 
 import dataclasses
+import pickle
 from unittest import mock
 
 from absl.testing import absltest
 from absl.testing import parameterized
+from android_env.proto.a11y import android_accessibility_forest_pb2
 from android_world.env import representation_utils
 
 
@@ -115,5 +117,146 @@ class TestAccessibilityNodeToUIElement(parameterized.TestCase):
     self.assertEqual(ui_element.bbox, expected_normalized_bbox)
 
 
+class UIElementDictTest(absltest.TestCase):
+
+  def test_round_trip(self):
+    element = representation_utils.UIElement(
+        text='OK',
+        bbox=representation_utils.BoundingBox(0.1, 0.2, 0.3, 0.4),
+        bbox_pixels=representation_utils.BoundingBox(10, 20, 30, 40),
+        is_clickable=True,
+    )
+
+    data = representation_utils.ui_element_to_dict(element)
+
+    self.assertEqual(
+        data['bbox_pixels'], dict(x_min=10, x_max=20, y_min=30, y_max=40)
+    )
+    self.assertEqual(representation_utils.ui_element_from_dict(data), element)
+    self.assertEqual(
+        representation_utils.ui_element_from_dict(
+            representation_utils.ui_element_to_dict(
+                representation_utils.UIElement()
+            )
+        ),
+        representation_utils.UIElement(),
+    )
+
+
+def _forest() -> android_accessibility_forest_pb2.AndroidAccessibilityForest:
+  forest = android_accessibility_forest_pb2.AndroidAccessibilityForest()
+  nodes = forest.windows.add().tree.nodes
+  for i in range(6):
+    node = nodes.add(unique_id=i, class_name='android.widget.TextView')
+    node.bounds_in_screen.left = 10 * i
+    node.bounds_in_screen.right = 10 * i + 25
+    node.bounds_in_screen.top = 20 * i
+    node.bounds_in_screen.bottom = 20 * i + 15
+    node.package_name = 'com.android.settings'
+    node.text = f'item {i}' if i % 2 else ''
+    node.is_clickable = bool(i % 2)
+    node.is_visible_to_user = i != 4
+  # A container without content description is not an element.
+  nodes[0].child_ids.append(1)
+  return forest
+
+
+def _expected_elements(forest, exclude_invisible_elements, screen_size):
+  return [
+      representation_utils.accessibility_node_to_ui_element(node, screen_size)
+      for node in forest.windows[0].tree.nodes
+      if not node.child_ids
+      and (node.is_visible_to_user or not exclude_invisible_elements)
+  ]
+
+
+class UIElementTableTest(parameterized.TestCase):
+
+  @parameterized.product(
+      exclude_invisible_elements=[False, True],
+      screen_size=[None, (1080, 2400)],
+  )
+  def test_forest_to_ui_elements(self, exclude_invisible_elements, screen_size):
+    forest = _forest()
+    expected = _expected_elements(
+        forest, exclude_invisible_elements, screen_size
+    )
+
+    elements = representation_utils.forest_to_ui_elements(
+        forest,
+        exclude_invisible_elements=exclude_invisible_elements,
+        screen_size=screen_size,
+    )
+
+    self.assertIsInstance(elements, representation_utils.UIElementTable)
+    self.assertEqual(list(elements), expected)
+    self.assertEqual(elements, expected)
+    self.assertEqual(expected, elements)
+    # Prompts stringify the elements, so ints must stay ints.
+    self.assertEqual(repr(elements), repr(expected))
+    self.assertEqual(
+        elements,
+        representation_utils.UIElementTable.from_elements(expected),
+    )
+
+  def test_from_elements_round_trip(self):
+    elements = [
+        representation_utils.UIElement(
+            text='a',
+            class_name='android.widget.Button',
+            bbox=representation_utils.BoundingBox(0.1, 0.2, 0.3, 0.4),
+            bbox_pixels=representation_utils.BoundingBox(1.5, 2, 3, 4),
+            is_checked=False,
+            is_clickable=True,
+            tooltip='tip',
+            resource_id='id',
+            metadata={'key': 'value'},
+        ),
+        representation_utils.UIElement(),
+    ]
+
+    table = representation_utils.UIElementTable.from_elements(elements)
+
+    self.assertLen(table, 2)
+    self.assertEqual(list(table), elements)
+    self.assertEqual(table[-1], elements[-1])
+    self.assertEqual(list(table[1:]), elements[1:])
+    with self.assertRaises(IndexError):
+      _ = table[2]
+
+  def test_equality(self):
+    table = representation_utils.forest_to_ui_elements(_forest())
+    forest = _forest()
+    forest.windows[0].tree.nodes[3].is_checked = True
+    changed = representation_utils.forest_to_ui_elements(forest)
+
+    self.assertEqual(
+        table, representation_utils.forest_to_ui_elements(_forest())
+    )
+    self.assertNotEqual(table, changed)
+    self.assertNotEqual(table, list(changed))
+    self.assertNotEqual(table, table[1:])
+    self.assertNotEqual(table, 'not elements')
+
+  def test_pickle(self):
+    table = representation_utils.forest_to_ui_elements(
+        _forest(), screen_size=(100, 200)
+    )
+
+    self.assertEqual(pickle.loads(pickle.dumps(table)), table)
+    self.assertLess(len(pickle.dumps(table)), len(pickle.dumps(list(table))))
+
+  def test_columns(self):
+    table = representation_utils.forest_to_ui_elements(_forest())
+
+    self.assertEqual(table.bbox_pixels_array[0].tolist(), [10, 35, 20, 35])
+    self.assertEqual(
+        table.flag_array('is_clickable').tolist(),
+        [element.is_clickable for element in table],
+    )
+    with self.assertRaises(ValueError):
+      table.bbox_pixels_array[0, 0] = 0
+
+
 if __name__ == '__main__':
   absltest.main()
@@ -81,18 +81,20 @@ def run_episode(
     result = agent.step(goal)
     print_fn('Completed step {:d}.'.format(step_n + 1))
     assert constants.STEP_NUMBER not in result.data
-    output.append(result.data | {constants.STEP_NUMBER: step_n})
+    # The agent may still fill in the step data, see `finish_episode`, so it
+    # is only copied once the episode ends.
+    output.append(result.data)
     if termination_fn(agent.env):
       print_fn('Environment ends episode.')
       return EpisodeResult(
           done=True,
-          step_data=_transpose_lod_to_dol(output),
+          step_data=_collect_step_data(agent, output),
       )
     elif result.done:
       print_fn('Agent indicates task is done.')
       return EpisodeResult(
           done=result.done,
-          step_data=_transpose_lod_to_dol(output),
+          step_data=_collect_step_data(agent, output),
       )
   print_fn(
       termcolor.colored(
@@ -101,10 +103,22 @@ def run_episode(
       )
   )
   return EpisodeResult(
-      done=result.done, step_data=_transpose_lod_to_dol(output)  # pylint: disable=undefined-variable
+      done=result.done, step_data=_collect_step_data(agent, output)  # pylint: disable=undefined-variable
   )
 
 
+def _collect_step_data(
+    agent: base_agent.EnvironmentInteractingAgent,
+    output: list[dict[str, Any]],
+) -> dict[str, list[Any]]:
+  """Waits for the agent's pending work and transposes its step data."""
+  agent.finish_episode()
+  return _transpose_lod_to_dol([
+      step_data | {constants.STEP_NUMBER: step_n}
+      for step_n, step_data in enumerate(output)
+  ])
+
+
 def _transpose_lod_to_dol(data: list[dict[str, Any]]) -> dict[str, list[Any]]:
   """Transposes a list of dictionaries to a dictionary of lists.
 
@@ -12,34 +12,22 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Registers the task classes."""
+"""Registers the task classes.
 
+Task modules and the information retrieval tasks are only loaded when their
+family's registry is first used, so importing this module is cheap.
+"""
+
+from collections.abc import Callable, Iterator, Mapping, MutableMapping
+import importlib
+import threading
 import types
 from typing import Any, Final
 
 from android_world.task_evals import task_eval
-from android_world.task_evals.composite import markor_sms
-from android_world.task_evals.composite import system as system_composite
-from android_world.task_evals.information_retrieval import information_retrieval
-from android_world.task_evals.information_retrieval import information_retrieval_registry
-from android_world.task_evals.miniwob import miniwob_registry
-from android_world.task_evals.single import audio_recorder
-from android_world.task_evals.single import browser
-from android_world.task_evals.single import camera
-from android_world.task_evals.single import clock
-from android_world.task_evals.single import contacts
-from android_world.task_evals.single import expense
-from android_world.task_evals.single import files
-from android_world.task_evals.single import markor
-from android_world.task_evals.single import osmand
-from android_world.task_evals.single import recipe
-from android_world.task_evals.single import retro_music
-from android_world.task_evals.single import simple_draw_pro
-from android_world.task_evals.single import simple_gallery_pro
-from android_world.task_evals.single import sms
-from android_world.task_evals.single import system
-from android_world.task_evals.single import vlc
-from android_world.task_evals.single.calendar import calendar
+
+# Package the Android task classes are imported from.
+_TASK_EVALS_PACKAGE = 'android_world.task_evals'
 
 
 def get_information_retrieval_task_path() -> None:
@@ -56,6 +44,101 @@ def get_families() -> list[str]:
   ]
 
 
+class LazyTaskRegistry(MutableMapping[str, type[task_eval.TaskEval]]):
+  """Maps task names to task classes, importing each class on first access.
+
+  Tasks are either given as classes or as the import path of the class, e.g.
+  `android_world.task_evals.single.clock.ClockTimerEntry`. Iterating over the
+  registry or checking if it contains a task does not import anything.
+  """
+
+  def __init__(
+      self,
+      tasks: Mapping[str, type[task_eval.TaskEval] | str] | None = None,
+  ):
+    self._tasks = dict(tasks or {})
+
+  def __getitem__(self, name: str) -> type[task_eval.TaskEval]:
+    task = self._tasks[name]
+    if isinstance(task, str):
+      module_name, class_name = task.rsplit('.', 1)
+      task = getattr(importlib.import_module(module_name), class_name)
+      self._tasks[name] = task
+    return task
+
+  def __setitem__(self, name: str, task: type[task_eval.TaskEval]) -> None:
+    self._tasks[name] = task
+
+  def __delitem__(self, name: str) -> None:
+    del self._tasks[name]
+
+  def __iter__(self) -> Iterator[str]:
+    return iter(self._tasks)
+
+  def __len__(self) -> int:
+    return len(self._tasks)
+
+  def __or__(
+      self, other: Mapping[str, type[task_eval.TaskEval]]
+  ) -> 'LazyTaskRegistry':
+    if isinstance(other, LazyTaskRegistry):
+      return LazyTaskRegistry({**self._tasks, **other._tasks})  # pylint: disable=protected-access
+    return LazyTaskRegistry({**self._tasks, **other})
+
+
+class _LazyClassAttribute:
+  """A class attribute that is computed from the class on first access."""
+
+  def __init__(self, load_fn: Callable[[type[Any]], Any]):
+    self._load_fn = load_fn
+    self._lock = threading.Lock()
+
+  def __set_name__(self, owner: type[Any], name: str) -> None:
+    self._name = name
+
+  def __get__(self, instance: Any, owner: type[Any]) -> Any:
+    with self._lock:
+      value = owner.__dict__.get(self._name, self)
+      if value is self:
+        value = self._load_fn(owner)
+        # Replaces this descriptor, so later accesses are plain lookups.
+        setattr(owner, self._name, value)
+    return value
+
+
+def _load_information_retrieval_registry(
+    unused_cls: type[Any],
+) -> dict[str, type[task_eval.TaskEval]]:
+  # pylint: disable=g-import-not-at-top
+  from android_world.task_evals.information_retrieval import information_retrieval
+  from android_world.task_evals.information_retrieval import information_retrieval_registry
+  # pylint: enable=g-import-not-at-top
+
+  return information_retrieval_registry.InformationRetrievalRegistry[
+      information_retrieval.InformationRetrieval
+  ](filename=get_information_retrieval_task_path()).registry
+
+
+def _load_miniwob_registry(
+    unused_cls: type[Any],
+) -> dict[str, type[task_eval.TaskEval]]:
+  from android_world.task_evals.miniwob import miniwob_registry  # pylint: disable=g-import-not-at-top
+
+  return miniwob_registry.TASK_REGISTRY
+
+
+def _load_names(cls: type['TaskRegistry']) -> types.SimpleNamespace:
+  return types.SimpleNamespace(**{
+      k: k
+      for registry in (
+          cls.ANDROID_TASK_REGISTRY,
+          cls.INFORMATION_RETRIEVAL_TASK_REGISTRY,
+          cls.MINIWOB_TASK_REGISTRY,
+      )
+      for k in registry
+  })
+
+
 class TaskRegistry:
   """Registry of tasks."""
 
@@ -68,16 +151,125 @@ class TaskRegistry:
   MINIWOB_FAMILY: Final[str] = 'miniwob'
   MINIWOB_FAMILY_SUBSET: Final[str] = 'miniwob_subset'
 
+  # Task classes of the Android family, relative to `_TASK_EVALS_PACKAGE`.
+  _TASKS = (
+      # keep-sorted start
+      'single.audio_recorder.AudioRecorderRecordAudio',
+      'single.audio_recorder.AudioRecorderRecordAudioWithFileName',
+      'single.browser.BrowserDraw',
+      'single.browser.BrowserMaze',
+      'single.browser.BrowserMultiply',
+      'single.calendar.calendar.SimpleCalendarAddOneEvent',
+      'single.calendar.calendar.SimpleCalendarAddOneEventInTwoWeeks',
+      'single.calendar.calendar.SimpleCalendarAddOneEventRelativeDay',
+      'single.calendar.calendar.SimpleCalendarAddOneEventTomorrow',
+      'single.calendar.calendar.SimpleCalendarAddRepeatingEvent',
+      'single.calendar.calendar.SimpleCalendarDeleteEvents',
+      'single.calendar.calendar.SimpleCalendarDeleteEventsOnRelativeDay',
+      'single.calendar.calendar.SimpleCalendarDeleteOneEvent',
+      'single.camera.CameraTakePhoto',
+      'single.camera.CameraTakeVideo',
+      'single.clock.ClockStopWatchPausedVerify',
+      'single.clock.ClockStopWatchRunning',
+      'single.clock.ClockTimerEntry',
+      'single.contacts.ContactsAddContact',
+      'single.contacts.ContactsNewContactDraft',
+      'single.expense.ExpenseAddMultiple',
+      'single.expense.ExpenseAddMultipleFromGallery',
+      'single.expense.ExpenseAddMultipleFromMarkor',
+      'single.expense.ExpenseAddSingle',
+      'single.expense.ExpenseDeleteDuplicates',
+      'single.expense.ExpenseDeleteDuplicates2',
+      'single.expense.ExpenseDeleteMultiple',
+      'single.expense.ExpenseDeleteMultiple2',
+      'single.expense.ExpenseDeleteSingle',
+      'single.files.FilesDeleteFile',
+      'single.files.FilesMoveFile',
+      'single.markor.MarkorAddNoteHeader',
+      'single.markor.MarkorChangeNoteContent',
+      'single.markor.MarkorCreateFolder',
+      'single.markor.MarkorCreateNote',
+      'single.markor.MarkorCreateNoteFromClipboard',
+      'single.markor.MarkorDeleteAllNotes',
+      'single.markor.MarkorDeleteNewestNote',
+      'single.markor.MarkorDeleteNote',
+      'single.markor.MarkorEditNote',
+      'single.markor.MarkorMergeNotes',
+      'single.markor.MarkorMoveNote',
+      'single.markor.MarkorTranscribeReceipt',
+      'single.markor.MarkorTranscribeVideo',
+      # Markor composite tasks.
+      'composite.markor_sms.MarkorCreateNoteAndSms',
+      # OsmAnd.
+      'single.osmand.OsmAndFavorite',
+      'single.osmand.OsmAndMarker',
+      'single.osmand.OsmAndTrack',
+      'single.recipe.RecipeAddMultipleRecipes',
+      'single.recipe.RecipeAddMultipleRecipesFromImage',
+      'single.recipe.RecipeAddMultipleRecipesFromMarkor',
+      'single.recipe.RecipeAddMultipleRecipesFromMarkor2',
+      'single.recipe.RecipeAddSingleRecipe',
+      'single.recipe.RecipeDeleteDuplicateRecipes',
+      'single.recipe.RecipeDeleteDuplicateRecipes2',
+      'single.recipe.RecipeDeleteDuplicateRecipes3',
+      'single.recipe.RecipeDeleteMultipleRecipes',
+      'single.recipe.RecipeDeleteMultipleRecipesWithConstraint',
+      'single.recipe.RecipeDeleteMultipleRecipesWithNoise',
+      'single.recipe.RecipeDeleteSingleRecipe',
+      'single.recipe.RecipeDeleteSingleWithRecipeWithNoise',
+      'single.retro_music.RetroCreatePlaylist',
+      'single.retro_music.RetroPlayingQueue',
+      'single.retro_music.RetroPlaylistDuration',
+      'single.retro_music.RetroSavePlaylist',
+      'single.simple_draw_pro.SimpleDrawProCreateDrawing',
+      'single.simple_gallery_pro.SaveCopyOfReceiptTaskEval',
+      'single.sms.SimpleSmsReply',
+      'single.sms.SimpleSmsReplyMostRecent',
+      'single.sms.SimpleSmsResend',
+      'single.sms.SimpleSmsSend',
+      'single.sms.SimpleSmsSendClipboardContent',
+      'single.sms.SimpleSmsSendReceivedAddress',
+      'single.system.OpenAppTaskEval',
+      'single.system.SystemBluetoothTurnOff',
+      'single.system.SystemBluetoothTurnOffVerify',
+      'single.system.SystemBluetoothTurnOn',
+      'single.system.SystemBluetoothTurnOnVerify',
+      'single.system.SystemBrightnessMax',
+      'single.system.SystemBrightnessMaxVerify',
+      'single.system.SystemBrightnessMin',
+      'single.system.SystemBrightnessMinVerify',
+      'single.system.SystemCopyToClipboard',
+      'single.system.SystemWifiTurnOff',
+      'single.system.SystemWifiTurnOffVerify',
+      'single.system.SystemWifiTurnOn',
+      'single.system.SystemWifiTurnOnVerify',
+      'composite.system.TurnOffWifiAndTurnOnBluetooth',
+      'composite.system.TurnOnWifiAndOpenApp',
+      # keep-sorted end
+      # VLC media player tasks.
+      'single.vlc.VlcCreatePlaylist',
+      'single.vlc.VlcCreateTwoPlaylists',
+      # Phone operations are flaky and the root cause is not known. Disabling
+      # until resolution.
+      # 'single.phone.MarkorCallApartment',
+      # 'single.phone.PhoneAnswerCall',
+      # 'single.phone.PhoneCallTextSender',
+      # 'single.phone.PhoneMakeCall',
+      # 'single.phone.PhoneRedialNumber',
+      # 'single.phone.PhoneReturnMissedCall',
+      # 'single.sms.SimpleSmsSendAfterCall',
+  )
+
   # Task registries; they contain a mapping from each task name to its class,
   # to construct instances of a task.
-  ANDROID_TASK_REGISTRY = {}
-  INFORMATION_RETRIEVAL_TASK_REGISTRY = (
-      information_retrieval_registry.InformationRetrievalRegistry[
-          information_retrieval.InformationRetrieval
-      ](filename=get_information_retrieval_task_path()).registry
+  ANDROID_TASK_REGISTRY = LazyTaskRegistry({
+      path.rsplit('.', 1)[1]: f'{_TASK_EVALS_PACKAGE}.{path}' for path in _TASKS
+  })
+  INFORMATION_RETRIEVAL_TASK_REGISTRY = _LazyClassAttribute(
+      _load_information_retrieval_registry
   )
 
-  MINIWOB_TASK_REGISTRY = miniwob_registry.TASK_REGISTRY
+  MINIWOB_TASK_REGISTRY = _LazyClassAttribute(_load_miniwob_registry)
 
   def get_registry(self, family: str) -> Any:
     """Gets the task registry for the given family.
@@ -92,129 +284,22 @@ class TaskRegistry:
       ValueError: If provided family doesn't exist.
     """
     if family == self.ANDROID_WORLD_FAMILY:
-      return {
-          **self.ANDROID_TASK_REGISTRY,
-          **self.INFORMATION_RETRIEVAL_TASK_REGISTRY,
-      }
+      return (
+          self.ANDROID_TASK_REGISTRY | self.INFORMATION_RETRIEVAL_TASK_REGISTRY
+      )
     elif family == self.ANDROID_FAMILY:
       return self.ANDROID_TASK_REGISTRY
     elif family == self.MINIWOB_FAMILY:
       return self.MINIWOB_TASK_REGISTRY
     elif family == self.MINIWOB_FAMILY_SUBSET:
+      from android_world.task_evals.miniwob import miniwob_registry  # pylint: disable=g-import-not-at-top
+
       return miniwob_registry.TASK_REGISTRY_SUBSET
     elif family == self.INFORMATION_RETRIEVAL_FAMILY:
       return self.INFORMATION_RETRIEVAL_TASK_REGISTRY
     else:
       raise ValueError(f'Unsupported family: {family}')
 
-  _TASKS = (
-      # keep-sorted start
-      audio_recorder.AudioRecorderRecordAudio,
-      audio_recorder.AudioRecorderRecordAudioWithFileName,
-      browser.BrowserDraw,
-      browser.BrowserMaze,
-      browser.BrowserMultiply,
-      calendar.SimpleCalendarAddOneEvent,
-      calendar.SimpleCalendarAddOneEventInTwoWeeks,
-      calendar.SimpleCalendarAddOneEventRelativeDay,
-      calendar.SimpleCalendarAddOneEventTomorrow,
-      calendar.SimpleCalendarAddRepeatingEvent,
-      calendar.SimpleCalendarDeleteEvents,
-      calendar.SimpleCalendarDeleteEventsOnRelativeDay,
-      calendar.SimpleCalendarDeleteOneEvent,
-      camera.CameraTakePhoto,
-      camera.CameraTakeVideo,
-      clock.ClockStopWatchPausedVerify,
-      clock.ClockStopWatchRunning,
-      clock.ClockTimerEntry,
-      contacts.ContactsAddContact,
-      contacts.ContactsNewContactDraft,
-      expense.ExpenseAddMultiple,
-      expense.ExpenseAddMultipleFromGallery,
-      expense.ExpenseAddMultipleFromMarkor,
-      expense.ExpenseAddSingle,
-      expense.ExpenseDeleteDuplicates,
-      expense.ExpenseDeleteDuplicates2,
-      expense.ExpenseDeleteMultiple,
-      expense.ExpenseDeleteMultiple2,
-      expense.ExpenseDeleteSingle,
-      files.FilesDeleteFile,
-      files.FilesMoveFile,
-      markor.MarkorAddNoteHeader,
-      markor.MarkorChangeNoteContent,
-      markor.MarkorCreateFolder,
-      markor.MarkorCreateNote,
-      markor.MarkorCreateNoteFromClipboard,
-      markor.MarkorDeleteAllNotes,
-      markor.MarkorDeleteNewestNote,
-      markor.MarkorDeleteNote,
-      markor.MarkorEditNote,
-      markor.MarkorMergeNotes,
-      markor.MarkorMoveNote,
-      markor.MarkorTranscribeReceipt,
-      markor.MarkorTranscribeVideo,
-      # Markor composite tasks.
-      markor_sms.MarkorCreateNoteAndSms,
-      # OsmAnd.
-      osmand.OsmAndFavorite,
-      osmand.OsmAndMarker,
-      osmand.OsmAndTrack,
-      recipe.RecipeAddMultipleRecipes,
-      recipe.RecipeAddMultipleRecipesFromImage,
-      recipe.RecipeAddMultipleRecipesFromMarkor,
-      recipe.RecipeAddMultipleRecipesFromMarkor2,
-      recipe.RecipeAddSingleRecipe,
-      recipe.RecipeDeleteDuplicateRecipes,
-      recipe.RecipeDeleteDuplicateRecipes2,
-      recipe.RecipeDeleteDuplicateRecipes3,
-      recipe.RecipeDeleteMultipleRecipes,
-      recipe.RecipeDeleteMultipleRecipesWithConstraint,
-      recipe.RecipeDeleteMultipleRecipesWithNoise,
-      recipe.RecipeDeleteSingleRecipe,
-      recipe.RecipeDeleteSingleWithRecipeWithNoise,
-      retro_music.RetroCreatePlaylist,
-      retro_music.RetroPlayingQueue,
-      retro_music.RetroPlaylistDuration,
-      retro_music.RetroSavePlaylist,
-      simple_draw_pro.SimpleDrawProCreateDrawing,
-      simple_gallery_pro.SaveCopyOfReceiptTaskEval,
-      sms.SimpleSmsReply,
-      sms.SimpleSmsReplyMostRecent,
-      sms.SimpleSmsResend,
-      sms.SimpleSmsSend,
-      sms.SimpleSmsSendClipboardContent,
-      sms.SimpleSmsSendReceivedAddress,
-      system.OpenAppTaskEval,
-      system.SystemBluetoothTurnOff,
-      system.SystemBluetoothTurnOffVerify,
-      system.SystemBluetoothTurnOn,
-      system.SystemBluetoothTurnOnVerify,
-      system.SystemBrightnessMax,
-      system.SystemBrightnessMaxVerify,
-      system.SystemBrightnessMin,
-      system.SystemBrightnessMinVerify,
-      system.SystemCopyToClipboard,
-      system.SystemWifiTurnOff,
-      system.SystemWifiTurnOffVerify,
-      system.SystemWifiTurnOn,
-      system.SystemWifiTurnOnVerify,
-      system_composite.TurnOffWifiAndTurnOnBluetooth,
-      system_composite.TurnOnWifiAndOpenApp,
-      # keep-sorted end
-      # VLC media player tasks.
-      vlc.VlcCreatePlaylist,
-      vlc.VlcCreateTwoPlaylists,
-      # Phone operations are flaky and the root cause is not known. Disabling
-      # until resolution.
-      # phone.MarkorCallApartment,
-      # phone.PhoneAnswerCall,
-      # phone.PhoneCallTextSender,
-      # phone.PhoneMakeCall,
-      # phone.PhoneRedialNumber,
-      # phone.PhoneReturnMissedCall,
-      # sms.SimpleSmsSendAfterCall,
-  )
-
   def register_task(
       self, task_registry: dict[Any, Any], task_class: type[task_eval.TaskEval]
   ) -> None:
@@ -226,17 +311,5 @@ class TaskRegistry:
     """
     task_registry[task_class.__name__] = task_class
 
-  def __init__(self):
-    for task in self._TASKS:
-      self.register_task(self.ANDROID_TASK_REGISTRY, task)
-
   # Add names with "." notation for autocomplete in Colab.
-  names = types.SimpleNamespace(**{
-      k: k
-      for k in {
-          **ANDROID_TASK_REGISTRY,
-          **INFORMATION_RETRIEVAL_TASK_REGISTRY,
-          **MINIWOB_TASK_REGISTRY,
-          **MINIWOB_TASK_REGISTRY,
-      }
-  })
+  names = _LazyClassAttribute(_load_names)
@@ -0,0 +1,100 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import subprocess
+import sys
+
+from absl.testing import absltest
+from android_world import registry
+from android_world.task_evals.single import clock
+
+_CLOCK_TIMER_ENTRY_PATH = 'android_world.task_evals.single.clock.ClockTimerEntry'
+
+
+class LazyTaskRegistryTest(absltest.TestCase):
+
+  def test_imports_task_on_access(self):
+    task_registry = registry.LazyTaskRegistry(
+        {'ClockTimerEntry': _CLOCK_TIMER_ENTRY_PATH}
+    )
+
+    self.assertIn('ClockTimerEntry', task_registry)
+    self.assertIs(task_registry['ClockTimerEntry'], clock.ClockTimerEntry)
+
+  def test_or(self):
+    task_registry = registry.LazyTaskRegistry(
+        {'A': _CLOCK_TIMER_ENTRY_PATH}
+    ) | {'B': clock.ClockStopWatchRunning}
+
+    self.assertEqual(list(task_registry), ['A', 'B'])
+    self.assertIs(task_registry['B'], clock.ClockStopWatchRunning)
+
+  def test_register_task(self):
+    task_registry = registry.LazyTaskRegistry()
+
+    registry.TaskRegistry().register_task(task_registry, clock.ClockTimerEntry)
+
+    self.assertEqual(
+        dict(task_registry), {'ClockTimerEntry': clock.ClockTimerEntry}
+    )
+
+
+class TaskRegistryTest(absltest.TestCase):
+
+  def test_android_tasks_resolve(self):
+    android_registry = registry.TaskRegistry().get_registry(
+        registry.TaskRegistry.ANDROID_FAMILY
+    )
+
+    self.assertLen(android_registry, len(registry.TaskRegistry._TASKS))
+    for name, task_class in android_registry.items():
+      self.assertEqual(task_class.__name__, name)
+
+  def test_android_world_family(self):
+    task_registry = registry.TaskRegistry()
+
+    android_world_registry = task_registry.get_registry(
+        task_registry.ANDROID_WORLD_FAMILY
+    )
+
+    self.assertEqual(
+        set(android_world_registry),
+        set(task_registry.ANDROID_TASK_REGISTRY)
+        | set(task_registry.INFORMATION_RETRIEVAL_TASK_REGISTRY),
+    )
+
+  def test_names(self):
+    self.assertEqual(
+        registry.TaskRegistry.names.ClockTimerEntry, 'ClockTimerEntry'
+    )
+
+  def test_import_does_not_load_tasks(self):
+    output = subprocess.run(
+        [
+            sys.executable,
+            '-c',
+            'import sys; from android_world import registry;'
+            ' print(sorted(m for m in sys.modules if ".single." in m'
+            ' or ".information_retrieval." in m or ".miniwob." in m))',
+        ],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+
+    self.assertEqual(output.strip(), '[]')
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -15,11 +15,15 @@
 """Utilities for evaluating automation agents."""
 
 import collections
+from collections.abc import Iterator, Sequence
 import datetime
+import functools
 import hashlib
 import logging
 import os
+import queue
 import random
+import threading
 import time
 import traceback
 from typing import Any, Callable, Type, TypeVar
@@ -43,13 +47,32 @@ _TASK_TEMPLATE_COLUMN = 'task_template'
 _TASK_PROMPT_COLUMN = 'task_prompt'
 TaskEvalType = TypeVar('TaskEvalType', bound=task_eval.TaskEval)
 
-
-class Suite(dict[str, list[task_eval.TaskEval]]):
+# Tasks reseed the global `random` module and draw from it both to generate
+# their params and while they initialize, so tasks created or initialized
+# concurrently, e.g. by parallel runners, would draw from each other's
+# sequences. Held for both.
+_RANDOM_LOCK = threading.Lock()
+
+# Episode fields needed to resume a run and to summarize results.
+_METADATA_FIELDS = (
+    constants.EpisodeConstants.GOAL,
+    constants.EpisodeConstants.TASK_TEMPLATE,
+    constants.EpisodeConstants.INSTANCE_ID,
+    constants.EpisodeConstants.IS_SUCCESSFUL,
+    constants.EpisodeConstants.EPISODE_LENGTH,
+    constants.EpisodeConstants.RUN_TIME,
+    constants.EpisodeConstants.EXCEPTION_INFO,
+    constants.EpisodeConstants.AUX_DATA,
+)
+
+
+class Suite(dict[str, Sequence[task_eval.TaskEval]]):
   """A suite of tasks.
 
-  Each key is the task name as defined in registry.py and its value is a list
-  of instantiated task objects. These instances differ from each other by their
-  parameter initializations; i.e. each task will have different task parameters.
+  Each key is the task name as defined in registry.py and its value is a
+  sequence of task objects, e.g. `TaskInstances`. These instances differ from
+  each other by their parameter initializations; i.e. each task will have
+  different task parameters.
   """
 
   def __init__(self, *args, **kwargs):
@@ -79,30 +102,112 @@ def _instantiate_task(
     task: Type[task_eval.TaskEval],
     params: dict[str, Any] | None = None,
     seed: int | None = None,
-    env: interface.AsyncEnv | None = None,
 ) -> task_eval.TaskEval:
   """Creates an instance of a task with params.
 
   If params is not provided, it will use random params, controlled by a seed.
+  The task's device time must already be set, see `create_suite`.
 
   Args:
     task: The task to instantiate.
     params: Params to use.
     seed: Seed for the random number generator.
-    env: The environment.
 
   Returns:
     An instance of a task.
   """
-  task.set_device_time(env)
   if params is None:
-    if seed is not None:
-      random.seed(seed)
-    params = task.generate_random_params()
+    with _RANDOM_LOCK:
+      if seed is not None:
+        random.seed(seed)
+      params = task.generate_random_params()
     params[constants.EpisodeConstants.SEED] = seed
   return task(params)
 
 
+class TaskInstances(Sequence[task_eval.TaskEval]):
+  """The instances of a task in a suite, which are created on demand.
+
+  Each instance is created from its own seed when it is first needed, so large
+  suites cost nothing until they are run. Instances that are accessed by index
+  are kept, so e.g. a task initialized via `suite[name][i]` can later be
+  evaluated via `suite[name][i]`. Iterating, and `get(i, keep=False)`, create
+  the other instances without keeping them, so runners can stream through any
+  number of instances. Instances with random params, i.e. without a seed,
+  cannot be recreated, so they are always kept.
+  """
+
+  def __init__(
+      self,
+      task: Type[task_eval.TaskEval],
+      n_instances: int,
+      seed_fn: Callable[[int], int | None],
+  ):
+    """Initializes the instances.
+
+    Args:
+      task: The task to instantiate.
+      n_instances: The number of instances.
+      seed_fn: Returns the seed to create the instance with the given index
+        with; None for random params.
+    """
+    self._task = task
+    self._n_instances = n_instances
+    self._seed_fn = seed_fn
+    self._instances: dict[int, task_eval.TaskEval] = {}
+    self._lock = threading.Lock()
+
+  def get(self, index: int, keep: bool = True) -> task_eval.TaskEval:
+    """Returns an instance, creating it if it is not kept yet.
+
+    Args:
+      index: The index of the instance.
+      keep: Whether to keep the instance if it is created.
+
+    Raises:
+      IndexError: If the index is out of range.
+    """
+    if index < 0:
+      index += len(self)
+    if not 0 <= index < len(self):
+      raise IndexError(f'Instance index {index} out of range.')
+    with self._lock:
+      instance = self._instances.get(index)
+    if instance is not None:
+      return instance
+    seed = self._seed_fn(index)
+    instance = _instantiate_task(self._task, seed=seed)
+    if keep or seed is None:
+      with self._lock:
+        # Another thread may have created and kept it meanwhile.
+        instance = self._instances.setdefault(index, instance)
+    return instance
+
+  def __len__(self) -> int:
+    return self._n_instances
+
+  def __getitem__(self, index):
+    if isinstance(index, slice):
+      return [self[i] for i in range(*index.indices(len(self)))]
+    return self.get(index)
+
+  def __iter__(self) -> Iterator[task_eval.TaskEval]:
+    for i in range(len(self)):
+      yield self.get(i, keep=False)
+
+  def __repr__(self) -> str:
+    return f'TaskInstances({self._task.__name__}, n={len(self)})'
+
+
+def _get_instance(
+    instances: Sequence[task_eval.TaskEval], i: int
+) -> task_eval.TaskEval:
+  """Returns an instance to run, without keeping it if it is created."""
+  if isinstance(instances, TaskInstances):
+    return instances.get(i, keep=False)
+  return instances[i]
+
+
 def create_suite(
     task_registry: dict[str, Type[task_eval.TaskEval]],
     n_task_combinations: int = 1,
@@ -130,6 +235,9 @@ def create_suite(
   }
   ```
 
+  The instances are `TaskInstances`, which only create a task instance when it
+  is accessed, and only tasks in `tasks` are looked up in the registry.
+
   Args:
     task_registry: Maps task names to their TaskEvals.
     n_task_combinations: Number of instances to create per task. Each instance
@@ -152,24 +260,27 @@ def create_suite(
         2**32
     )
 
-  suite = {}
-  for name, task_type in task_registry.items():
-    current = []
-    for i in range(n_task_combinations):
-      if use_identical_params:
-        instance_seed = (
-            _get_instance_seed(name, 0) if seed is not None else _FIXED_SEED
-        )
-      elif seed is not None:
-        instance_seed = _get_instance_seed(name, i)
-      else:
-        instance_seed = None
-      current.append(_instantiate_task(task_type, seed=instance_seed, env=env))
-    suite[name] = current
-  suite = _filter_tasks(suite, task_registry, tasks)
+  def _seed_fn(name: str) -> Callable[[int], int | None]:
+    if use_identical_params:
+      instance_seed = (
+          _get_instance_seed(name, 0) if seed is not None else _FIXED_SEED
+      )
+      return lambda i: instance_seed
+    elif seed is not None:
+      return functools.partial(_get_instance_seed, name)
+    else:
+      return lambda i: None
 
-  # Sort suite alphabetically by task name.
-  return Suite(sorted(suite.items()))
+  _validate_tasks(task_registry, tasks)
+  names = sorted(
+      name for name in task_registry if tasks is None or name in tasks
+  )
+  suite = Suite()
+  for name in names:
+    task = task_registry[name]
+    task.set_device_time(env)
+    suite[name] = TaskInstances(task, n_task_combinations, _seed_fn(name))
+  return suite
 
 
 def _suggest_keyword(
@@ -183,41 +294,34 @@ def _suggest_keyword(
     return ''
 
 
-def _filter_tasks(
-    suite: dict[str, list[task_eval.TaskEval]],
+def _validate_tasks(
     task_registry: dict[str, Type[task_eval.TaskEval]],
-    tasks: list[str] | None = None,
-) -> dict[str, list[task_eval.TaskEval]]:
-  """Filters a suite by specific tasks.
-
-  Args:
-    suite: The suite to retrieve tasks from.
-    task_registry: The task registry the suite is from.
-    tasks: The tasks to retrieve. If None, just return entire suite.
-
-  Returns:
-    A "mini-suite" of tasks from suite.
-
-  Raises:
-    ValueError: If invalid task name.
-  """
-  if tasks is None:
-    return suite
-  subset = {}
-
-  # Validate.
-  for name in tasks:
+    tasks: list[str] | None,
+) -> None:
+  """Raises a ValueError if any of the tasks is not in the registry."""
+  for name in tasks or []:
     if name not in task_registry:
       raise ValueError(
           f'Task {name} not found in the task registry.'
           + _suggest_keyword(name, list(task_registry.keys()))
       )
 
-  # Filter.
-  for name, instances in suite.items():
-    if name in tasks:
-      subset[name] = instances
-  return subset
+
+def initialize_task(
+    task: task_eval.TaskEval, env: interface.AsyncEnv
+) -> None:
+  """Initializes a task, one at a time, so its random data is deterministic.
+
+  Tasks reseed the global `random` module from their seed and draw from it
+  while they initialize, so concurrent initializations, or concurrent param
+  generation, would draw from each other's sequences.
+
+  Args:
+    task: The task to initialize.
+    env: The environment to initialize it on.
+  """
+  with _RANDOM_LOCK:
+    task.initialize_task(env)
 
 
 def _run_task(
@@ -242,7 +346,7 @@ def _run_task(
   """
   start = time.time()
   try:
-    task.initialize_task(env)
+    initialize_task(task, env)
     _log_and_print('Running task %s with goal "%s"', task.name, task.goal)
     interaction_results = run_episode(task)
     task_successful = task.is_successful(env)
@@ -345,18 +449,8 @@ def _run_task_suite(
   Returns:
     Metadata for each episode, including the scripted reward.
   """
-  metadata_fields = [
-      constants.EpisodeConstants.GOAL,
-      constants.EpisodeConstants.TASK_TEMPLATE,
-      constants.EpisodeConstants.INSTANCE_ID,
-      constants.EpisodeConstants.IS_SUCCESSFUL,
-      constants.EpisodeConstants.EPISODE_LENGTH,
-      constants.EpisodeConstants.RUN_TIME,
-      constants.EpisodeConstants.EXCEPTION_INFO,
-      constants.EpisodeConstants.AUX_DATA,
-  ]
   completed_tasks, failed_tasks = _get_task_info(
-      checkpointer.load(fields=metadata_fields)
+      checkpointer.load(fields=list(_METADATA_FIELDS))
   )
   if process_episodes_fn is None:
     process_episodes_fn = process_episodes
@@ -372,10 +466,8 @@ def _run_task_suite(
     msg = 'Running task: ' + name
     _log_and_print(msg + '\n' + '=' * len(msg))
 
-    for i, instance in enumerate(instances):
-      instance_name = (
-          instance.name + checkpointer_lib.INSTANCE_SEPARATOR + str(i)
-      )
+    for i in range(len(instances)):
+      instance_name = name + checkpointer_lib.INSTANCE_SEPARATOR + str(i)
       # Transferring from old checkpoint.
       if instance_name in completed_tasks:
         completed_episodes: list[dict[str, Any]] = completed_tasks[
@@ -391,6 +483,8 @@ def _run_task_suite(
         _log_and_print('Skipping already processed task %s', instance_name)
         continue
 
+      # Only created once it is known to be needed.
+      instance = _get_instance(instances, i)
       episode = _run_task(instance, run_episode, env, demo_mode=demo_mode)
       if (
           episode.get(constants.EpisodeConstants.EXCEPTION_INFO) is None
@@ -405,7 +499,7 @@ def _run_task_suite(
       if return_full_episode_data:
         full_episode_data.append(episode)
 
-      episodes_metadata.append({k: episode[k] for k in metadata_fields})
+      episodes_metadata.append({k: episode[k] for k in _METADATA_FIELDS})
       process_episodes_fn(episodes_metadata, print_summary=True)
 
       if episode[constants.EpisodeConstants.EXCEPTION_INFO] is not None:
@@ -420,26 +514,41 @@ def _run_task_suite(
   return full_episode_data if return_full_episode_data else episodes_metadata
 
 
-def run(
+def _run_task_suite_parallel(
     suite: Suite,
-    agent: base_agent.EnvironmentInteractingAgent,
+    run_episode_fns: Sequence[
+        Callable[[task_eval.TaskEval], episode_runner.EpisodeResult]
+    ],
+    envs: Sequence[interface.AsyncEnv],
     checkpointer: checkpointer_lib.Checkpointer = checkpointer_lib.NullCheckpointer(),
-    demo_mode: bool = False,
+    agent_name: str = '',
     return_full_episode_data: bool = False,
     process_episodes_fn=None,
     check_episode_fn: Callable[[dict[str, Any]], bool] | None = None,
 ) -> list[dict[str, Any]]:
-  """Create suite and runs eval suite.
+  """Runs e2e system on suite, spreading task instances over several devices.
+
+  Each device gets a worker thread which pulls the next pending task instance
+  from a shared queue, so faster devices simply run more instances. Results are
+  written to the same checkpoint and summarized exactly as in `_run_task_suite`,
+  and the returned episodes are ordered as if the suite were run serially.
+
+  The pending instances are created up front, so their params are generated
+  in suite order. Task initialization reseeds and draws from the global
+  `random` module, e.g. for distractor entries, so only one device initializes
+  a task at a time; episodes run concurrently. Each instance thus has the same
+  params and initial data as in a serial run.
+
+  If processing or saving an episode fails, the other workers stop after their
+  current instance and the error is raised once all workers have stopped.
 
   Args:
-    suite: The suite of tasks to run on.
-    agent: An agent that interacts on the environment.
-    checkpointer: Checkpointer that loads from existing run and resumes from
-      there. NOTE: It will resume from the last fully completed task template.
-      Relatedly, data for a task template will not be saved until all instances
-      are executed.
-    demo_mode: Whether to run in demo mode, which displays a scoreboard and the
-      task instruction as a notification.
+    suite: The suite to run it on.
+    run_episode_fns: One e2e system per device; `run_episode_fns[k]` must drive
+      the agent acting on `envs[k]`.
+    envs: The environments, one per device.
+    checkpointer: See docstring from `run`.
+    agent_name: The name of the agent.
     return_full_episode_data: Whether to return full episode data instead of
       just metadata.
     process_episodes_fn: The function to process episode data. Usually to
@@ -447,8 +556,132 @@ def run(
     check_episode_fn: The function to check episode data.
 
   Returns:
-    Step-by-step data from each episode.
+    Metadata for each episode, including the scripted reward.
+
+  Raises:
+    ValueError: If the number of episode runners and environments differ.
+    Exception: The first error raised by a worker outside of an episode.
   """
+  if len(run_episode_fns) != len(envs) or not envs:
+    raise ValueError(
+        'Expected one run_episode function per environment, got'
+        f' {len(run_episode_fns)} functions and {len(envs)} environments.'
+    )
+  completed_tasks, failed_tasks = _get_task_info(
+      checkpointer.load(fields=list(_METADATA_FIELDS))
+  )
+  if process_episodes_fn is None:
+    process_episodes_fn = process_episodes
+
+  if (completed_tasks or failed_tasks) and return_full_episode_data:
+    raise ValueError(
+        'Cannot return full episode data when resuming from a checkpoint.'
+    )
+
+  # One slot per instance, in suite order, so output order does not depend on
+  # which device finishes first.
+  slots: list[list[dict[str, Any]]] = []
+  full_episode_slots: list[dict[str, Any] | None] = []
+  pending = queue.Queue()
+  for name, instances in suite.items():
+    for i in range(len(instances)):
+      instance_name = name + checkpointer_lib.INSTANCE_SEPARATOR + str(i)
+      slot = list(completed_tasks.get(instance_name, [])) + list(
+          failed_tasks.get(instance_name, [])
+      )
+      already_processed = (
+          instance_name in completed_tasks and instance_name not in failed_tasks
+      )
+      if already_processed:
+        _log_and_print('Skipping already processed task %s', instance_name)
+      else:
+        # Created up front, on this thread, so that their params do not
+        # depend on how the workers are scheduled.
+        pending.put((len(slots), name, i, _get_instance(instances, i)))
+      slots.append(slot)
+      full_episode_slots.append(None)
+
+  _log_and_print(
+      'Running %d task instances on %d devices.', pending.qsize(), len(envs)
+  )
+  results_lock = threading.Lock()
+  errors: list[Exception] = []
+  failed = threading.Event()
+
+  def _run_instance(
+      run_episode: Callable[[task_eval.TaskEval], episode_runner.EpisodeResult],
+      env: interface.AsyncEnv,
+      index: int,
+      name: str,
+      i: int,
+      instance: task_eval.TaskEval,
+  ) -> None:
+    _log_and_print('Running task: %s (instance %d)', name, i)
+    episode = _run_task(instance, run_episode, env, demo_mode=False)
+    if (
+        episode.get(constants.EpisodeConstants.EXCEPTION_INFO) is None
+        and check_episode_fn is not None
+    ):
+      if not check_episode_fn(episode):
+        return
+    episode[constants.EpisodeConstants.AGENT_NAME] = agent_name
+    episode[constants.EpisodeConstants.INSTANCE_ID] = i
+    instance_name = name + checkpointer_lib.INSTANCE_SEPARATOR + str(i)
+    with results_lock:
+      checkpointer.save_episodes([episode], instance_name)
+      if return_full_episode_data:
+        full_episode_slots[index] = episode
+      slots[index].append({k: episode[k] for k in _METADATA_FIELDS})
+      process_episodes_fn(
+          [episode for slot in slots for episode in slot],
+          print_summary=True,
+      )
+
+  def _worker(
+      run_episode: Callable[[task_eval.TaskEval], episode_runner.EpisodeResult],
+      env: interface.AsyncEnv,
+  ) -> None:
+    while not failed.is_set():
+      try:
+        item = pending.get_nowait()
+      except queue.Empty:
+        return
+      try:
+        _run_instance(run_episode, env, *item)
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        # `_run_task` already handles errors in episodes; this is e.g. a
+        # failing checkpoint, which the main thread must raise.
+        logging.exception('Suite worker failed; stopping all workers.')
+        with results_lock:
+          errors.append(e)
+        failed.set()
+        return
+
+  workers = [
+      threading.Thread(
+          target=_worker,
+          args=(run_episode, env),
+          name=f'suite_worker_{k}',
+          daemon=True,
+      )
+      for k, (run_episode, env) in enumerate(zip(run_episode_fns, envs))
+  ]
+  for worker in workers:
+    worker.start()
+  for worker in workers:
+    worker.join()
+  if errors:
+    raise errors[0]
+
+  if return_full_episode_data:
+    return [episode for episode in full_episode_slots if episode is not None]
+  return [episode for slot in slots for episode in slot]
+
+
+def _make_run_episode(
+    agent: base_agent.EnvironmentInteractingAgent, demo_mode: bool = False
+) -> Callable[[task_eval.TaskEval], episode_runner.EpisodeResult]:
+  """Returns a function that runs `agent` on a task for one episode."""
 
   def run_episode(task: task_eval.TaskEval) -> episode_runner.EpisodeResult:
     if demo_mode:
@@ -465,6 +698,41 @@ def run(
         ),
     )
 
+  return run_episode
+
+
+def run(
+    suite: Suite,
+    agent: base_agent.EnvironmentInteractingAgent,
+    checkpointer: checkpointer_lib.Checkpointer = checkpointer_lib.NullCheckpointer(),
+    demo_mode: bool = False,
+    return_full_episode_data: bool = False,
+    process_episodes_fn=None,
+    check_episode_fn: Callable[[dict[str, Any]], bool] | None = None,
+) -> list[dict[str, Any]]:
+  """Create suite and runs eval suite.
+
+  Args:
+    suite: The suite of tasks to run on.
+    agent: An agent that interacts on the environment.
+    checkpointer: Checkpointer that loads from existing run and resumes from
+      there. NOTE: It will resume from the last fully completed task template.
+      Relatedly, data for a task template will not be saved until all instances
+      are executed.
+    demo_mode: Whether to run in demo mode, which displays a scoreboard and the
+      task instruction as a notification.
+    return_full_episode_data: Whether to return full episode data instead of
+      just metadata.
+    process_episodes_fn: The function to process episode data. Usually to
+      compute metrics. Deafaults to process_episodes from this file.
+    check_episode_fn: The function to check episode data.
+
+  Returns:
+    Step-by-step data from each episode.
+  """
+
+  run_episode = _make_run_episode(agent, demo_mode)
+
   if demo_mode:
     adb_utils.send_android_intent(
         'broadcast',
@@ -488,6 +756,56 @@ def run(
   return results
 
 
+def run_parallel(
+    suite: Suite,
+    agents: Sequence[base_agent.EnvironmentInteractingAgent],
+    checkpointer: checkpointer_lib.Checkpointer = checkpointer_lib.NullCheckpointer(),
+    return_full_episode_data: bool = False,
+    process_episodes_fn=None,
+    check_episode_fn: Callable[[dict[str, Any]], bool] | None = None,
+) -> list[dict[str, Any]]:
+  """Runs eval suite on a pool of devices, one agent per device.
+
+  Task instances are dispatched to whichever device is free. Each instance is
+  created from its seed in `create_suite` and initialized with the same random
+  data as in a serial run, so results are the same as running the suite
+  serially with `run`, only faster.
+
+  Args:
+    suite: The suite of tasks to run on.
+    agents: Agents that interact on the environments; each agent must have its
+      own environment, e.g. one per `env_launcher.load_and_setup_envs` output.
+    checkpointer: See docstring from `run`.
+    return_full_episode_data: Whether to return full episode data instead of
+      just metadata.
+    process_episodes_fn: The function to process episode data. Usually to
+      compute metrics. Deafaults to process_episodes from this file.
+    check_episode_fn: The function to check episode data.
+
+  Returns:
+    Step-by-step data from each episode.
+
+  Raises:
+    ValueError: If no agents are given or agents share an environment.
+  """
+  if not agents:
+    raise ValueError('At least one agent is required.')
+  envs = [agent.env for agent in agents]
+  if len({id(env) for env in envs}) != len(envs):
+    raise ValueError('Each agent must act on a separate environment.')
+
+  return _run_task_suite_parallel(
+      suite,
+      [_make_run_episode(agent) for agent in agents],
+      envs,
+      checkpointer=checkpointer,
+      agent_name=agents[0].name,
+      return_full_episode_data=return_full_episode_data,
+      process_episodes_fn=process_episodes_fn,
+      check_episode_fn=check_episode_fn,
+  )
+
+
 def _allocate_step_budget(task_complexity: float) -> int:
   """Allocates number of steps dynamically based on the complexity score.
 
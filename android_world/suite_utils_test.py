@@ -15,6 +15,7 @@
 """Tests for suite utils."""
 
 import copy
+import threading
 import time
 from typing import Any
 from unittest import mock
@@ -28,6 +29,7 @@ from android_world import suite_utils
 from android_world.agents import base_agent
 from android_world.env import adb_utils
 from android_world.env import interface
+from android_world.task_evals import task_eval
 from android_world.utils import test_utils
 import dm_env
 import numpy as np
@@ -133,96 +135,109 @@ class TestSuite(absltest.TestCase):
         'Task2 instance 1 params should not match with different seeds',
     )
 
+  def test_instances_are_created_on_access(self):
+    with mock.patch.object(
+        test_utils.FakeCurrentStateEval,
+        'generate_random_params',
+        wraps=test_utils.FakeCurrentStateEval.generate_random_params,
+    ) as mock_generate:
+      suite = suite_utils.create_suite(
+          self.testing_registry, n_task_combinations=1_000_000, seed=self.seed
+      )
+      mock_generate.assert_not_called()
+
+      instance = suite['Task1'][3]
+      self.assertIs(suite['Task1'][3], instance)
+      self.assertEqual(mock_generate.call_count, 1)
+
+  def test_iterating_streams_instances(self):
+    suite = suite_utils.create_suite(
+        self.testing_registry, n_task_combinations=3, seed=self.seed
+    )
+    indexed = suite['Task1'][1]
+
+    instances = list(suite['Task1'])
+
+    self.assertIs(instances[1], indexed)
+    self.assertEqual(instances[2].params, suite['Task1'][2].params)
+    self.assertIsNot(instances[2], suite['Task1'][2])
+
+  def test_filtered_tasks_are_not_resolved(self):
+    task_registry = mock.MagicMock()
+    task_registry.__iter__.return_value = iter(['Task1', 'Task2'])
+    task_registry.__contains__.side_effect = lambda name: name in (
+        'Task1',
+        'Task2',
+    )
+    task_registry.__getitem__.side_effect = self.testing_registry.__getitem__
+
+    suite = suite_utils.create_suite(task_registry, tasks=['Task2'])
+
+    self.assertEqual(list(suite), ['Task2'])
+    task_registry.__getitem__.assert_called_once_with('Task2')
+
   @mock.patch.object(suite_utils.random, 'seed')
   def test_no_seed_provides_randomness(self, mock_seed):
     suite_utils.create_suite(self.testing_registry, n_task_combinations=2)
     mock_seed.assert_not_called()
 
-  def test_return_all_when_tasks_none(self):
-    suite = suite_utils.Suite(
-        **{
-            'Task1': [
-                test_utils.FakeCurrentStateEval(
-                    test_utils.FakeCurrentStateEval.generate_random_params()
-                ),
-                test_utils.FakeCurrentStateEval(
-                    test_utils.FakeCurrentStateEval.generate_random_params()
-                ),
-            ],
-            'Task2': [
-                test_utils.FakeAdbEval(
-                    test_utils.FakeAdbEval.generate_random_params()
-                )
-            ],
-        },
+  def test_random_params_are_kept_when_iterating(self):
+    suite = suite_utils.create_suite(
+        self.testing_registry, n_task_combinations=2
     )
-    suite.suite_family = 'test'
-    tasks = None
 
-    result = suite_utils._filter_tasks(
-        suite,
-        self.task_registry.get_registry(registry.TaskRegistry.ANDROID_FAMILY),
-        tasks,
-    )
+    instances = list(suite['Task1'])
 
-    self.assertEqual(
-        result, suite, 'Should return the same suite when tasks is None'
+    self.assertIs(suite['Task1'][0], instances[0])
+    self.assertIs(suite['Task1'][1], instances[1])
+
+  def test_get_without_keeping(self):
+    suite = suite_utils.create_suite(
+        self.testing_registry, n_task_combinations=2, seed=self.seed
     )
 
-  def test_valid_tasks_subset(self):
-    expected = [
-        test_utils.FakeCurrentStateEval(
-            test_utils.FakeCurrentStateEval.generate_random_params()
-        )
-    ]
-    tasks = ['Task1']
+    instance = suite['Task1'].get(0, keep=False)
 
-    result = suite_utils._filter_tasks(
-        {
-            'Task1': expected,
-            'Task2': [
-                test_utils.FakeCurrentStateEval(
-                    test_utils.FakeCurrentStateEval.generate_random_params()
-                )
-            ],
-            'Task3': [
-                test_utils.FakeAdbEval(
-                    test_utils.FakeAdbEval.generate_random_params()
-                )
-            ],
-        },
-        self.testing_registry,
-        tasks,
-    )
+    self.assertIsNot(suite['Task1'][0], instance)
+    self.assertEqual(suite['Task1'][0].params, instance.params)
 
-    self.assertEqual(
-        result, {'Task1': expected}, 'Should return the subset of tasks'
-    )
+  def test_device_time_is_set_when_suite_is_created(self):
+    env = mock.create_autospec(interface.AsyncEnv)
+    with mock.patch.object(
+        test_utils.FakeCurrentStateEval, 'set_device_time'
+    ) as mock_set_device_time:
+      suite = suite_utils.create_suite(
+          self.testing_registry, tasks=['Task1'], env=env
+      )
+      mock_set_device_time.assert_called_once_with(env)
+
+      suite['Task1'].get(0, keep=False)
+
+    mock_set_device_time.assert_called_once()
+
+  def test_valid_tasks_subset(self):
+    suite = suite_utils.create_suite(self.testing_registry, tasks=['Task1'])
+
+    self.assertEqual(list(suite), ['Task1'])
 
   def test_invalid_task_raises_value_error(self):
-    suite = suite_utils.Suite(
-        **{
-            'Task1': [
-                test_utils.FakeCurrentStateEval(
-                    test_utils.FakeCurrentStateEval.generate_random_params()
-                )
-            ],
-            'Task2': [
-                test_utils.FakeAdbEval(
-                    test_utils.FakeAdbEval.generate_random_params()
-                )
-            ],
-        },
+    with self.assertRaises(ValueError):
+      suite_utils.create_suite(self.testing_registry, tasks=['Task1', 'Task3'])
+
+
+class InitializeTaskTest(absltest.TestCase):
+
+  def test_initialization_is_serialized_with_param_generation(self):
+    task = mock.create_autospec(task_eval.TaskEval, instance=True)
+    env = mock.create_autospec(interface.AsyncEnv)
+    task.initialize_task.side_effect = lambda _: self.assertTrue(
+        suite_utils._RANDOM_LOCK.locked()
     )
-    suite.suite_family = 'test'
-    tasks = ['Task1', 'Task3']
 
-    with self.assertRaises(ValueError):
-      suite_utils._filter_tasks(
-          suite,
-          self.task_registry.get_registry(registry.TaskRegistry.ANDROID_FAMILY),
-          tasks,
-      )
+    suite_utils.initialize_task(task, env)
+
+    task.initialize_task.assert_called_once_with(env)
+    self.assertFalse(suite_utils._RANDOM_LOCK.locked())
 
 
 class SuiteUtilsTest(parameterized.TestCase):
@@ -712,5 +727,200 @@ class RunTaskSuiteTest(absltest.TestCase):
     self.assertLen(result2, 1)
 
 
+class RunTaskSuiteParallelTest(absltest.TestCase):
+
+  def _make_suite(self) -> suite_utils.Suite:
+    suite = suite_utils.Suite(
+        **{
+            'FakeCurrentStateEval': [
+                test_utils.FakeCurrentStateEval(
+                    test_utils.FakeCurrentStateEval.generate_random_params()
+                ),
+                test_utils.FakeCurrentStateEval(
+                    test_utils.FakeCurrentStateEval.generate_random_params()
+                ),
+            ],
+            'FakeAdbEval': [
+                test_utils.FakeAdbEval(
+                    test_utils.FakeAdbEval.generate_random_params()
+                )
+            ],
+        },
+    )
+    suite.suite_family = 'android'
+    return suite
+
+  @mock.patch.object(time, 'sleep', autospec=True)
+  @mock.patch.object(checkpointer, 'Checkpointer')
+  def test_runs_all_instances_across_devices(
+      self, mock_checkpointer, unused_mock_sleep
+  ):
+    mock_checkpointer.load.return_value = []
+    envs = [mock.MagicMock(), mock.MagicMock()]
+    run_e2e_fns = [mock.MagicMock(), mock.MagicMock()]
+    for run_e2e in run_e2e_fns:
+      run_e2e.return_value = episode_runner.EpisodeResult(
+          True, {'step_number': [0]}
+      )
+
+    result = suite_utils._run_task_suite_parallel(
+        self._make_suite(), run_e2e_fns, envs, mock_checkpointer
+    )
+
+    self.assertLen(result, 3)
+    self.assertEqual(
+        [(r['task_template'], r['instance_id']) for r in result],
+        [
+            ('FakeCurrentStateEval', 0),
+            ('FakeCurrentStateEval', 1),
+            ('FakeAdbEval', 0),
+        ],
+    )
+    self.assertEqual(sum(fn.call_count for fn in run_e2e_fns), 3)
+    mock_checkpointer.save_episodes.assert_has_calls(
+        [
+            mock.call(mock.ANY, 'FakeCurrentStateEval_0'),
+            mock.call(mock.ANY, 'FakeCurrentStateEval_1'),
+            mock.call(mock.ANY, 'FakeAdbEval_0'),
+        ],
+        any_order=True,
+    )
+
+  @mock.patch.object(time, 'sleep', autospec=True)
+  @mock.patch.object(checkpointer, 'Checkpointer')
+  def test_resume_skips_completed_instances(
+      self, mock_checkpointer, unused_mock_sleep
+  ):
+    mock_checkpointer.load.return_value = [
+        {
+            'instance_id': 0,
+            'is_successful': 0.0,
+            'goal': 'Current state eval',
+            'task_template': 'FakeCurrentStateEval',
+            'episode_length': 1,
+            'run_time': 0,
+        },
+    ]
+    run_e2e = mock.MagicMock()
+    run_e2e.return_value = episode_runner.EpisodeResult(
+        True, {'step_number': [0]}
+    )
+
+    result = suite_utils._run_task_suite_parallel(
+        self._make_suite(), [run_e2e], [mock.MagicMock()], mock_checkpointer
+    )
+
+    self.assertEqual(run_e2e.call_count, 2)
+    self.assertEqual([r['is_successful'] for r in result], [0.0, 1, 1])
+
+  @mock.patch.object(time, 'sleep', autospec=True)
+  @mock.patch.object(checkpointer, 'Checkpointer')
+  def test_resume_does_not_create_completed_instances(
+      self, mock_checkpointer, unused_mock_sleep
+  ):
+    mock_checkpointer.load.return_value = [
+        {
+            'instance_id': 0,
+            'is_successful': 1.0,
+            'goal': 'Current state eval',
+            'task_template': 'FakeCurrentStateEval',
+            'episode_length': 1,
+            'run_time': 0,
+        },
+    ]
+    run_e2e = mock.MagicMock()
+    run_e2e.return_value = episode_runner.EpisodeResult(
+        True, {'step_number': [0]}
+    )
+    with mock.patch.object(
+        test_utils.FakeCurrentStateEval,
+        'generate_random_params',
+        wraps=test_utils.FakeCurrentStateEval.generate_random_params,
+    ) as mock_generate:
+      suite = suite_utils.create_suite(
+          {'FakeCurrentStateEval': test_utils.FakeCurrentStateEval},
+          n_task_combinations=2,
+          seed=42,
+      )
+
+      result = suite_utils._run_task_suite_parallel(
+          suite, [run_e2e], [mock.MagicMock()], mock_checkpointer
+      )
+
+    self.assertEqual(mock_generate.call_count, 1)
+    self.assertEqual([r['instance_id'] for r in result], [0, 1])
+
+  @mock.patch.object(time, 'sleep', autospec=True)
+  @mock.patch.object(checkpointer, 'Checkpointer')
+  def test_params_are_generated_before_workers_start(
+      self, mock_checkpointer, unused_mock_sleep
+  ):
+    mock_checkpointer.load.return_value = []
+    generate = test_utils.FakeCurrentStateEval.generate_random_params
+    threads = []
+
+    def _generate():
+      threads.append(threading.current_thread())
+      return generate()
+
+    run_e2e_fns = [mock.MagicMock(), mock.MagicMock()]
+    for run_e2e in run_e2e_fns:
+      run_e2e.return_value = episode_runner.EpisodeResult(
+          True, {'step_number': [0]}
+      )
+    with mock.patch.object(
+        test_utils.FakeCurrentStateEval,
+        'generate_random_params',
+        side_effect=_generate,
+    ):
+      suite = suite_utils.create_suite(
+          {'FakeCurrentStateEval': test_utils.FakeCurrentStateEval},
+          n_task_combinations=4,
+          seed=42,
+      )
+      suite_utils._run_task_suite_parallel(
+          suite,
+          run_e2e_fns,
+          [mock.MagicMock(), mock.MagicMock()],
+          mock_checkpointer,
+      )
+
+    self.assertEqual(threads, [threading.main_thread()] * 4)
+
+  @mock.patch.object(time, 'sleep', autospec=True)
+  @mock.patch.object(checkpointer, 'Checkpointer')
+  def test_worker_error_is_raised(self, mock_checkpointer, unused_mock_sleep):
+    mock_checkpointer.load.return_value = []
+    mock_checkpointer.save_episodes.side_effect = OSError('disk full')
+    run_e2e_fns = [mock.MagicMock(), mock.MagicMock()]
+    for run_e2e in run_e2e_fns:
+      run_e2e.return_value = episode_runner.EpisodeResult(
+          True, {'step_number': [0]}
+      )
+
+    with self.assertRaisesRegex(OSError, 'disk full'):
+      suite_utils._run_task_suite_parallel(
+          self._make_suite(),
+          run_e2e_fns,
+          [mock.MagicMock(), mock.MagicMock()],
+          mock_checkpointer,
+      )
+    # Workers stop after their current instance instead of draining the queue.
+    self.assertLess(sum(fn.call_count for fn in run_e2e_fns), 3)
+
+  def test_mismatched_envs_raises(self):
+    with self.assertRaises(ValueError):
+      suite_utils._run_task_suite_parallel(
+          self._make_suite(), [mock.MagicMock()], []
+      )
+
+  def test_run_parallel_requires_distinct_envs(self):
+    env = test_utils.FakeAsyncEnv()
+    agents = [mock.MagicMock(env=env), mock.MagicMock(env=env)]
+
+    with self.assertRaises(ValueError):
+      suite_utils.run_parallel(self._make_suite(), agents)
+
+
 if __name__ == '__main__':
   absltest.main()
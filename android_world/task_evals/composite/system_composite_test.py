@@ -26,7 +26,7 @@ class TurnOnWifiAndOpenAppTest(absltest.TestCase):
   def setUp(self):
     super().setUp()
     self.mock_restore_snapshot = self.enter_context(
-        mock.patch.object(app_snapshot, "restore_snapshot").start()
+        mock.patch.object(app_snapshot, "restore_snapshot")
     )
 
   def test_generate_random_params(self):
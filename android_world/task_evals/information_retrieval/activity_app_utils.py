@@ -17,6 +17,7 @@
 App available at github.com/OpenTracksApp/OpenTracks.
 """
 
+import collections
 import datetime
 import random
 from android_world.env import adb_utils
@@ -24,6 +25,7 @@ from android_world.env import device_constants
 from android_world.env import interface
 from android_world.task_evals.information_retrieval import calendar_utils
 from android_world.task_evals.information_retrieval import datetime_utils as datetime_utils_ir
+from android_world.task_evals.information_retrieval import exclusion_sampler
 from android_world.task_evals.information_retrieval import proto_utils
 from android_world.task_evals.information_retrieval.proto import state_pb2
 from android_world.task_evals.information_retrieval.proto import task_pb2
@@ -141,31 +143,75 @@ def list_rows(
   )
 
 
+def _activity_sampler(
+    exclusion_conditions: list[task_pb2.ExclusionCondition],
+) -> exclusion_sampler.ExclusionSampler:
+  """Creates a sampler for the fields of a random activity."""
+
+  def meets(conditions, **fields) -> bool:
+    activity = sqlite_schema_utils.SportsActivity(**{'name': '', **fields})
+    return not _check_activity_conditions(activity, conditions)
+
+  # Make sure that the start date is in the past
+  start_ranges = exclusion_sampler.split_datetime_window(
+      window_center=device_constants.DT - datetime.timedelta(days=7)
+  )
+  # Random distances are stored rounded, and rounding a rounded distance does
+  # not change it, so the rounded distances are sampled directly.
+  distances = collections.Counter(
+      _distance_rounding_error_conversion(distance) for distance in range(20001)
+  )
+  return exclusion_sampler.ExclusionSampler(
+      [
+          exclusion_sampler.Field(
+              'category',
+              list(_CATEGORY_TO_ACTIVITY_NAMES.keys()),
+              condition_fields={'category'},
+              meets_conditions=lambda v, c: meets(c, category=v),
+          ),
+          exclusion_sampler.Field(
+              'start',
+              start_ranges,
+              condition_fields={'start_date'},
+              meets_conditions=lambda v, c: meets(
+                  c, starttime=int(v.start.timestamp()) * 1000
+              ),
+              weights=[r.num_minutes for r in start_ranges],
+          ),
+          exclusion_sampler.Field(
+              'total_distance',
+              list(distances.keys()),
+              condition_fields={'total_distance'},
+              meets_conditions=lambda v, c: meets(c, totaldistance=float(v)),
+              weights=list(distances.values()),
+          ),
+      ],
+      exclusion_conditions,
+  )
+
+
 def _generate_random_activities(
     num_activities: int,
     exclusion_conditions: list[task_pb2.ExclusionCondition],
 ) -> list[sqlite_schema_utils.Task]:
   """Generates random tasks with the given exclusion conditions."""
+  sampler = _activity_sampler(exclusion_conditions)
   return sqlite_schema_utils.get_random_items(
       num_activities,
-      generate_item_fn=_generate_random_activity,
+      generate_item_fn=lambda: _generate_random_activity(sampler),
       filter_fn=lambda x: _check_activity_conditions(x, exclusion_conditions),
   )
 
 
-def _generate_random_activity():
+def _generate_random_activity(sampler: exclusion_sampler.ExclusionSampler):
   """Generates a single random sqlite_schema_utils.SportsActivity object."""
+  fields = sampler.sample()
   new_activity = state_pb2.SportsActivity()
-  new_activity.category = random.choice(
-      list(_CATEGORY_TO_ACTIVITY_NAMES.keys())
-  )
+  new_activity.category = fields['category']
   new_activity.name = random.choice(
       _CATEGORY_TO_ACTIVITY_NAMES[new_activity.category]
   )
-  # Make sure that the start date is in the past
-  random_start_datetime = datetime_utils.generate_random_datetime(
-      window_center=device_constants.DT - datetime.timedelta(days=7)
-  )
+  random_start_datetime = fields['start'].sample()
   new_activity.start_date = random_start_datetime.date().strftime(
       datetime_utils_ir.DATE_FORMAT
   )
@@ -173,7 +219,7 @@ def _generate_random_activity():
 
   random_duration = datetime.timedelta(minutes=random.randrange(1, 60 * 5))
   new_activity.duration = '{}'.format(int(random_duration.seconds / 60))
-  new_activity.total_distance = str(random.randint(0, 20000))
+  new_activity.total_distance = str(fields['total_distance'])
   new_activity.elevation_gain = str(random.randint(0, 500))
   new_activity.elevation_loss = str(random.randint(0, 500))
   return _create_activity_from_proto(new_activity)
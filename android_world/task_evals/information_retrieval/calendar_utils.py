@@ -20,13 +20,13 @@ import zoneinfo
 from android_world.env import device_constants
 from android_world.env import interface
 from android_world.task_evals.information_retrieval import datetime_utils as datetime_utils_ir
+from android_world.task_evals.information_retrieval import exclusion_sampler
 from android_world.task_evals.information_retrieval import proto_utils
 from android_world.task_evals.information_retrieval.proto import state_pb2
 from android_world.task_evals.information_retrieval.proto import task_pb2
 from android_world.task_evals.single.calendar import calendar_utils as utils
 from android_world.task_evals.single.calendar import events_generator
 from android_world.task_evals.utils import sqlite_schema_utils
-from android_world.utils import datetime_utils
 
 TIME_FORMAT = '%H:%M'
 DEFAULT_DURATION_S = 1800  # 30 minutes
@@ -150,43 +150,174 @@ def setup_task_state(
   events = []
   for event in relevant_state.events:
     events.append(create_event_from_proto(event))
-  events += [generate_random_event(exclusion_conditions) for _ in range(75)]
+  events += generate_random_events(75, exclusion_conditions)
   random.shuffle(events)
   utils.add_events(events, env)
 
 
+_EVENT_WINDOW_SIZE = datetime.timedelta(days=30)
+_EVENT_DURATIONS = [15, 30, 45, 60]
+
+
+def _event_start_breakpoints(
+    exclusion_conditions: list[task_pb2.ExclusionCondition],
+    duration: int,
+) -> list[datetime.datetime]:
+  """Returns the start datetimes at which an event's conditions can change.
+
+  `check_event_conditions` compares the dates and times of both the start and
+  the end of an event, so the outcome for events of the given duration can only
+  change where the start or the end crosses midnight or a compared time.
+
+  Args:
+    exclusion_conditions: The conditions the events are checked against.
+    duration: The duration of the events, in minutes.
+  """
+  times = {datetime.time()}
+  for condition in exclusion_conditions:
+    if condition.field == 'start_time':
+      condition_time = datetime.datetime.combine(
+          datetime.date.min, datetime_utils_ir.parse_time(condition.value)
+      )
+      times.add(condition_time.time())
+      times.add((condition_time + datetime.timedelta(minutes=1)).time())
+  window_start = device_constants.DT - _EVENT_WINDOW_SIZE / 2
+  breakpoints = []
+  for day in range(-1, _EVENT_WINDOW_SIZE.days + 2):
+    date = window_start.date() + datetime.timedelta(days=day)
+    for time in times:
+      start = datetime.datetime.combine(
+          date, time, tzinfo=window_start.tzinfo
+      )
+      breakpoints.append(start)
+      breakpoints.append(start - datetime.timedelta(minutes=duration))
+  return breakpoints
+
+
+def _event_start_meets_conditions(
+    value: tuple[exclusion_sampler.DatetimeRange, int],
+    exclusion_conditions: list[task_pb2.ExclusionCondition],
+) -> bool:
+  start_range, duration = value
+  event = state_pb2.Event(
+      start_date=start_range.start.date().strftime(
+          datetime_utils_ir.DATE_FORMAT
+      ),
+      start_time=start_range.start.time().strftime(TIME_FORMAT),
+      duration='{} m'.format(duration),
+  )
+  return not check_event_conditions(event, exclusion_conditions)
+
+
+def _event_title_meets_conditions(
+    title: str,
+    exclusion_conditions: list[task_pb2.ExclusionCondition],
+) -> bool:
+  return all(
+      proto_utils.compare(
+          title.lower(), condition.operation, condition.value.lower()
+      )
+      for condition in exclusion_conditions
+  )
+
+
+def _event_sampler(
+    exclusion_conditions: list[task_pb2.ExclusionCondition],
+) -> exclusion_sampler.ExclusionSampler:
+  """Creates a sampler for the start, duration and title of random events."""
+  starts = []
+  for duration in _EVENT_DURATIONS:
+    for start_range in exclusion_sampler.split_datetime_window(
+        window_size=_EVENT_WINDOW_SIZE,
+        breakpoints=_event_start_breakpoints(exclusion_conditions, duration),
+    ):
+      starts.append((start_range, duration))
+  titles = events_generator.event_title_probabilities()
+  return exclusion_sampler.ExclusionSampler(
+      [
+          exclusion_sampler.Field(
+              'start',
+              starts,
+              condition_fields={'start_date', 'start_time'},
+              meets_conditions=_event_start_meets_conditions,
+              weights=[start_range.num_minutes for start_range, _ in starts],
+          ),
+          exclusion_sampler.Field(
+              'title',
+              list(titles.keys()),
+              condition_fields={'title'},
+              meets_conditions=_event_title_meets_conditions,
+              weights=list(titles.values()),
+          ),
+      ],
+      exclusion_conditions,
+  )
+
+
+def _generate_random_event(
+    sampler: exclusion_sampler.ExclusionSampler,
+) -> sqlite_schema_utils.CalendarEvent:
+  fields = sampler.sample()
+  start_range, duration = fields['start']
+  start_ts = int(start_range.sample().timestamp())
+  return sqlite_schema_utils.CalendarEvent(
+      start_ts=start_ts,
+      end_ts=start_ts + duration * 60,
+      title=fields['title'],
+      description=events_generator.generate_event_description(),
+  )
+
+
+def _event_to_proto(
+    event: sqlite_schema_utils.CalendarEvent,
+) -> state_pb2.Event:
+  """Inverse of `create_event_from_proto`, for checking generated events."""
+  start = datetime.datetime.fromtimestamp(
+      event.start_ts, zoneinfo.ZoneInfo(device_constants.TIMEZONE)
+  )
+  return state_pb2.Event(
+      start_date=start.date().strftime(datetime_utils_ir.DATE_FORMAT),
+      start_time=start.time().strftime(TIME_FORMAT),
+      duration='{} m'.format((event.end_ts - event.start_ts) // 60),
+      title=event.title,
+      description=event.description,
+  )
+
+
+def generate_random_events(
+    num_events: int,
+    exclusion_conditions: list[task_pb2.ExclusionCondition],
+) -> list[sqlite_schema_utils.CalendarEvent]:
+  """Generates random events with the given exclusion conditions.
+
+  Args:
+    num_events: The number of events to generate.
+    exclusion_conditions: The events do not meet all of these conditions.
+
+  Returns:
+    The random events.
+
+  Raises:
+    ValueError: If every event would meet all of the exclusion conditions.
+  """
+  sampler = _event_sampler(exclusion_conditions)
+  # The sampler only yields eligible events; `check_event_conditions` still
+  # filters them as a safety net.
+  return sqlite_schema_utils.get_random_items(
+      num_events,
+      generate_item_fn=lambda: _generate_random_event(sampler),
+      replacement=True,
+      filter_fn=lambda event: check_event_conditions(
+          _event_to_proto(event), exclusion_conditions
+      ),
+  )
+
+
 def generate_random_event(
     exclusion_conditions: list[task_pb2.ExclusionCondition],
-    max_retries: int = 100,
 ) -> sqlite_schema_utils.CalendarEvent:
   """Generates a random event with the given exclusion conditions."""
-  attempt = 0
-  while attempt < max_retries:
-    event = state_pb2.Event()
-    random_datetime = datetime_utils.generate_random_datetime(
-        window_size=datetime.timedelta(days=30)
-    )
-    event.start_date = random_datetime.date().strftime(
-        datetime_utils_ir.DATE_FORMAT
-    )
-    event.start_time = random_datetime.time().strftime(TIME_FORMAT)
-    random_duration = random.choice([15, 30, 45, 60])
-    event.duration = '{} m'.format(random_duration)
-    event.title = events_generator.generate_event_title()
-    event.description = events_generator.generate_event_description()
-    if check_event_conditions(event, exclusion_conditions):
-      start_ts = int(random_datetime.timestamp())
-      end_ts = start_ts + random_duration * 60
-      return sqlite_schema_utils.CalendarEvent(
-          start_ts=start_ts,
-          end_ts=end_ts,
-          title=event.title,
-          description=event.description,
-      )
-    attempt += 1
-  raise ValueError(
-      'Failed to create a random event that meets the exclusion conditions'
-  )
+  return generate_random_events(1, exclusion_conditions)[0]
 
 
 def check_event_conditions(
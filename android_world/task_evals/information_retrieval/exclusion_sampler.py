@@ -0,0 +1,246 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Samples random rows that do not meet a list of exclusion conditions.
+
+A row is excluded if it meets *all* of its task's exclusion conditions. Instead
+of drawing rows until one is not excluded, the sampler splits every field's
+domain into the values that meet all conditions on that field and the values
+that do not, and samples directly from the rows outside of the excluded box.
+The resulting rows have the same distribution as rejection sampling, but a
+sample always takes a single draw per field, and a condition that excludes
+every row is reported upfront.
+"""
+
+from collections.abc import Callable, Collection, Iterable, Sequence
+import dataclasses
+import datetime
+import math
+import random
+from typing import Any
+
+from android_world.env import device_constants
+from android_world.task_evals.information_retrieval.proto import task_pb2
+
+
+@dataclasses.dataclass(frozen=True)
+class Field:
+  """A field of a random row, drawn independently of the other fields.
+
+  Attributes:
+    name: Key of the field's value in the sampled rows.
+    values: The values the field is drawn from.
+    condition_fields: The `ExclusionCondition.field`s that are decided by the
+      value of this field.
+    meets_conditions: Returns whether a value meets all of the given exclusion
+      conditions, which are all on `condition_fields`.
+    weights: Relative probabilities of `values`. Values are drawn uniformly if
+      None.
+  """
+
+  name: str
+  values: Sequence[Any]
+  condition_fields: Collection[str] = ()
+  meets_conditions: (
+      Callable[[Any, list[task_pb2.ExclusionCondition]], bool] | None
+  ) = None
+  weights: Sequence[float] | None = None
+
+
+@dataclasses.dataclass(frozen=True)
+class _Domain:
+  """A field's values, split by whether they meet the field's conditions."""
+
+  excluded: list[Any]
+  excluded_weights: list[float]
+  allowed: list[Any]
+  allowed_weights: list[float]
+
+  @property
+  def excluded_probability(self) -> float:
+    excluded = sum(self.excluded_weights)
+    return excluded / (excluded + sum(self.allowed_weights))
+
+  def sample_excluded(self) -> Any:
+    return random.choices(self.excluded, self.excluded_weights)[0]
+
+  def sample_allowed(self) -> Any:
+    return random.choices(self.allowed, self.allowed_weights)[0]
+
+  def sample(self) -> Any:
+    return random.choices(
+        self.excluded + self.allowed,
+        self.excluded_weights + self.allowed_weights,
+    )[0]
+
+
+def _compile_domain(
+    field: Field, conditions: list[task_pb2.ExclusionCondition]
+) -> _Domain:
+  """Splits the values of a field by whether they meet all `conditions`."""
+  weights = field.weights or [1.0] * len(field.values)
+  if len(weights) != len(field.values):
+    raise ValueError(
+        f'Field {field.name} has {len(field.values)} values but'
+        f' {len(weights)} weights.'
+    )
+  domain = _Domain([], [], [], [])
+  for value, weight in zip(field.values, weights):
+    if weight <= 0:
+      continue
+    if not conditions or field.meets_conditions(value, conditions):
+      domain.excluded.append(value)
+      domain.excluded_weights.append(weight)
+    else:
+      domain.allowed.append(value)
+      domain.allowed_weights.append(weight)
+  if not domain.excluded and not domain.allowed:
+    raise ValueError(f'Field {field.name} has no values to sample from.')
+  return domain
+
+
+class ExclusionSampler:
+  """Samples rows that do not meet all of the given exclusion conditions.
+
+  Conditions on fields that are not decided by any of the sampler's fields are
+  considered met and no row is excluded without conditions, the same as in the
+  `check_*_conditions` functions.
+  """
+
+  def __init__(
+      self,
+      fields: Sequence[Field],
+      exclusion_conditions: Iterable[task_pb2.ExclusionCondition],
+  ):
+    """Initializes the sampler.
+
+    Args:
+      fields: The independently drawn fields of a row.
+      exclusion_conditions: The conditions a row is excluded by if it meets all
+        of them.
+
+    Raises:
+      ValueError: If two fields decide the same condition field or if every
+        row meets all of the exclusion conditions.
+    """
+    owners = {}
+    for field in fields:
+      for condition_field in field.condition_fields:
+        if condition_field in owners:
+          raise ValueError(
+              f'Condition field {condition_field} is decided by both'
+              f' {owners[condition_field]} and {field.name}.'
+          )
+        owners[condition_field] = field.name
+    exclusion_conditions = list(exclusion_conditions)
+    conditions = {field.name: [] for field in fields}
+    for condition in exclusion_conditions:
+      if condition.field in owners:
+        conditions[owners[condition.field]].append(condition)
+
+    self._fields = list(fields)
+    self._has_conditions = bool(exclusion_conditions)
+    self._domains = [
+        _compile_domain(field, conditions[field.name]) for field in fields
+    ]
+    # Probability that the fields after the i-th all meet their conditions.
+    self._remaining_excluded_probabilities = []
+    remaining = 1.0
+    for domain in reversed(self._domains):
+      self._remaining_excluded_probabilities.append(remaining)
+      remaining *= domain.excluded_probability
+    self._remaining_excluded_probabilities.reverse()
+    if self._has_conditions and remaining >= 1.0:
+      raise ValueError('Every row meets all of the exclusion conditions.')
+
+  def sample(self) -> dict[str, Any]:
+    """Samples a row that does not meet all of the exclusion conditions.
+
+    Returns:
+      A map from each field's name to its value.
+    """
+    row = {}
+    excluded = self._has_conditions
+    for field, domain, remaining in zip(
+        self._fields, self._domains, self._remaining_excluded_probabilities
+    ):
+      if not excluded:
+        row[field.name] = domain.sample()
+        continue
+      # The row so far meets all conditions, so a value that meets this
+      # field's conditions is only kept if a later field can still leave the
+      # excluded box.
+      p = domain.excluded_probability
+      excluded = random.random() < p * (1 - remaining) / (1 - p * remaining)
+      row[field.name] = (
+          domain.sample_excluded() if excluded else domain.sample_allowed()
+      )
+    return row
+
+
+@dataclasses.dataclass(frozen=True)
+class DatetimeRange:
+  """A range of whole minutes [start, start + num_minutes)."""
+
+  start: datetime.datetime
+  num_minutes: int
+
+  def sample(self) -> datetime.datetime:
+    return self.start + datetime.timedelta(
+        minutes=random.randrange(self.num_minutes)
+    )
+
+
+def split_datetime_window(
+    window_size: datetime.timedelta = datetime.timedelta(days=14),
+    window_center: datetime.datetime = device_constants.DT,
+    breakpoints: Iterable[datetime.datetime] = (),
+) -> list[DatetimeRange]:
+  """Splits the window of `datetime_utils.generate_random_datetime`.
+
+  The window is split at every midnight and at every breakpoint, so that
+  conditions on dates, or comparisons against the breakpoints, have the same
+  outcome for every minute of a range. Picking a range weighted by its
+  `num_minutes` and then calling `sample` has the same distribution as
+  `generate_random_datetime` with the same arguments.
+
+  Args:
+    window_size: The window size of the random datetimes.
+    window_center: The center of the window of the random datetimes.
+    breakpoints: Datetimes a range must start at if they are in the window.
+
+  Returns:
+    The consecutive ranges that cover the window.
+  """
+  start = window_center - (window_size / 2)
+  num_minutes = window_size.days * 24 * 60
+  end = start + datetime.timedelta(minutes=num_minutes)
+  midnights = []
+  day = start.date()
+  while day <= end.date():
+    midnights.append(
+        datetime.datetime.combine(day, datetime.time(), tzinfo=start.tzinfo)
+    )
+    day += datetime.timedelta(days=1)
+
+  offsets = {0, num_minutes}
+  for point in [*midnights, *breakpoints]:
+    offset = math.ceil((point - start) / datetime.timedelta(minutes=1))
+    if 0 < offset < num_minutes:
+      offsets.add(offset)
+  offsets = sorted(offsets)
+  return [
+      DatetimeRange(start + datetime.timedelta(minutes=a), b - a)
+      for a, b in zip(offsets, offsets[1:])
+  ]
@@ -0,0 +1,151 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import collections
+import datetime
+import random
+
+from absl.testing import absltest
+from android_world.task_evals.information_retrieval import exclusion_sampler
+from android_world.task_evals.information_retrieval import proto_utils
+from android_world.task_evals.information_retrieval.proto import task_pb2
+
+_Operation = task_pb2.ExclusionCondition.Operation
+_UTC = datetime.timezone.utc
+
+
+def _meets_conditions(value, conditions):
+  return all(
+      proto_utils.compare(value, condition.operation, int(condition.value))
+      for condition in conditions
+  )
+
+
+def _field(name, values, weights=None):
+  return exclusion_sampler.Field(
+      name,
+      values,
+      condition_fields={name},
+      meets_conditions=_meets_conditions,
+      weights=weights,
+  )
+
+
+def _condition(field, operation, value):
+  return task_pb2.ExclusionCondition(
+      field=field, operation=operation, value=str(value)
+  )
+
+
+class ExclusionSamplerTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    random.seed(0)
+
+  def test_samples_are_uniform_over_rows_that_are_not_excluded(self):
+    sampler = exclusion_sampler.ExclusionSampler(
+        [_field('a', [0, 1]), _field('b', [0, 1, 2])],
+        [
+            _condition('a', _Operation.EQUAL_TO, 0),
+            _condition('b', _Operation.LESS_THAN, 2),
+        ],
+    )
+
+    counts = collections.Counter(
+        tuple(sampler.sample().values()) for _ in range(8000)
+    )
+
+    self.assertCountEqual(counts, [(0, 2), (1, 0), (1, 1), (1, 2)])
+    for count in counts.values():
+      self.assertAlmostEqual(count / 8000, 0.25, delta=0.03)
+
+  def test_weights(self):
+    sampler = exclusion_sampler.ExclusionSampler(
+        [_field('a', [0, 1, 2], weights=[1, 1, 2]), _field('b', [0, 1])],
+        [_condition('a', _Operation.EQUAL_TO, 0)],
+    )
+
+    counts = collections.Counter(sampler.sample()['a'] for _ in range(8000))
+
+    self.assertEqual(counts[0], 0)
+    self.assertAlmostEqual(counts[2] / 8000, 2 / 3, delta=0.03)
+
+  def test_conditions_on_unknown_fields_are_met(self):
+    sampler = exclusion_sampler.ExclusionSampler(
+        [_field('a', [0, 1])],
+        [
+            _condition('a', _Operation.EQUAL_TO, 0),
+            _condition('unknown', _Operation.EQUAL_TO, 0),
+        ],
+    )
+
+    self.assertEqual({sampler.sample()['a'] for _ in range(100)}, {1})
+
+  def test_no_conditions(self):
+    sampler = exclusion_sampler.ExclusionSampler([_field('a', [0, 1])], [])
+
+    self.assertEqual({sampler.sample()['a'] for _ in range(100)}, {0, 1})
+
+  def test_every_row_excluded_raises(self):
+    with self.assertRaisesRegex(ValueError, 'Every row'):
+      exclusion_sampler.ExclusionSampler(
+          [_field('a', [0, 1]), _field('b', [0, 1])],
+          [_condition('a', _Operation.LESS_THAN, 5)],
+      )
+
+  def test_condition_field_decided_twice_raises(self):
+    with self.assertRaisesRegex(ValueError, 'decided by both'):
+      exclusion_sampler.ExclusionSampler(
+          [_field('a', [0, 1]), _field('a', [0, 1])], []
+      )
+
+
+class SplitDatetimeWindowTest(absltest.TestCase):
+
+  def test_splits_at_midnights_and_breakpoints(self):
+    center = datetime.datetime(2023, 10, 15, 12, 30, tzinfo=_UTC)
+
+    ranges = exclusion_sampler.split_datetime_window(
+        window_size=datetime.timedelta(days=2),
+        window_center=center,
+        breakpoints=[
+            datetime.datetime(2023, 10, 15, 9, 0, tzinfo=_UTC),
+            # Outside of the window.
+            datetime.datetime(2023, 10, 20, tzinfo=_UTC),
+        ],
+    )
+
+    self.assertEqual(
+        [(r.start.strftime('%d %H:%M'), r.num_minutes) for r in ranges],
+        [
+            ('14 12:30', 11 * 60 + 30),
+            ('15 00:00', 9 * 60),
+            ('15 09:00', 15 * 60),
+            ('16 00:00', 12 * 60 + 30),
+        ],
+    )
+
+  def test_samples_are_in_range(self):
+    datetime_range = exclusion_sampler.DatetimeRange(
+        datetime.datetime(2023, 10, 15, 9, 0, tzinfo=_UTC), 3
+    )
+
+    samples = {datetime_range.sample().minute for _ in range(100)}
+
+    self.assertEqual(samples, {0, 1, 2})
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -17,14 +17,22 @@
 Information retrieval tasks are defined in a textproto file. For each task in
 the proto,
 we dynamically create a new task with the name of the task in the class name.
+
+Parsing the textproto is slow, so the parsed tasks are cached in binary form in
+the local temporary directory, keyed by the hash of the textproto and of the
+task proto schema.
 """
 
+import hashlib
 import os
 import random
+import tempfile
 from typing import Any, Generic, Type, TypeVar
+from absl import logging
 from android_world.task_evals.information_retrieval import information_retrieval
 from android_world.task_evals.information_retrieval.proto import task_pb2
 from android_world.utils import file_utils
+from google.protobuf import message
 from google.protobuf import text_format
 
 TaskType = TypeVar('TaskType', bound=information_retrieval.InformationRetrieval)
@@ -39,6 +47,48 @@ _COMPLEXITY_OVERRIDES = {
 }
 
 
+def _cache_path(textproto_content: bytes) -> str:
+  """Returns the path of the binary cache of the given tasks textproto."""
+  digest = hashlib.sha256(textproto_content)
+  digest.update(task_pb2.DESCRIPTOR.serialized_pb)
+  return file_utils.convert_to_posix_path(
+      file_utils.get_local_tmp_directory(),
+      'android_world',
+      'registry_cache',
+      f'ir_tasks_{digest.hexdigest()}.binpb',
+  )
+
+
+def _parse_tasks(textproto_content: bytes) -> task_pb2.Tasks:
+  """Parses the tasks textproto, reading and writing its binary cache."""
+  cache_path = _cache_path(textproto_content)
+  try:
+    with open(cache_path, 'rb') as f:
+      return task_pb2.Tasks.FromString(f.read())
+  except (OSError, message.DecodeError):
+    pass
+
+  proto = task_pb2.Tasks()
+  text_format.Merge(textproto_content.decode('utf-8'), proto)
+  try:
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    # Writes to a unique file first so readers never see a partial cache.
+    with tempfile.NamedTemporaryFile(
+        dir=os.path.dirname(cache_path), suffix='.tmp', delete=False
+    ) as f:
+      f.write(proto.SerializeToString())
+    try:
+      # Readable by other users of the shared directory, like open() makes it.
+      os.chmod(f.name, 0o644)
+      os.replace(f.name, cache_path)
+    except OSError:
+      os.remove(f.name)
+      raise
+  except OSError as e:
+    logging.warning('Failed to write the task cache %s: %s', cache_path, e)
+  return proto
+
+
 class InformationRetrievalRegistry(Generic[TaskType]):
   """Information retrieval registry; it dynamically creates tasks."""
 
@@ -49,15 +99,13 @@ class InformationRetrievalRegistry(Generic[TaskType]):
     return self._task_registry
 
   def _read_tasks(self) -> task_pb2.Tasks:
-    proto = task_pb2.Tasks()
     script_dir = os.path.dirname(os.path.abspath(__file__))
     local_path = file_utils.convert_to_posix_path(
         script_dir, 'proto', 'tasks.textproto'
     )
-    with open(local_path, 'r') as f:
+    with open(local_path, 'rb') as f:
       textproto_content = f.read()
-    text_format.Merge(textproto_content, proto)
-    return proto
+    return _parse_tasks(textproto_content)
 
   def __init__(
       self,
@@ -12,8 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from concurrent import futures
+import os
+import shutil
+import tempfile
+from unittest import mock
+
 from absl.testing import absltest
 from android_world.task_evals.information_retrieval import information_retrieval_registry
+from android_world.utils import file_utils
 
 
 class InformationRetrievalRegistryTest(absltest.TestCase):
@@ -41,5 +48,73 @@ class InformationRetrievalRegistryTest(absltest.TestCase):
       )
 
 
+class TaskCacheTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    tmp_dir = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, tmp_dir)
+    self.enter_context(
+        mock.patch.object(
+            file_utils, "get_local_tmp_directory", return_value=tmp_dir
+        )
+    )
+    self.textproto = b'tasks { name: "Task1" prompt: "What?" }'
+    self.cache_path = information_retrieval_registry._cache_path(
+        self.textproto
+    )
+
+  def test_writes_and_reads_cache(self):
+    tasks = information_retrieval_registry._parse_tasks(self.textproto)
+
+    self.assertTrue(os.path.exists(self.cache_path))
+    with mock.patch.object(
+        information_retrieval_registry.text_format, "Merge"
+    ) as mock_merge:
+      cached_tasks = information_retrieval_registry._parse_tasks(
+          self.textproto
+      )
+    mock_merge.assert_not_called()
+    self.assertEqual(cached_tasks, tasks)
+    self.assertEqual(cached_tasks.tasks[0].name, "Task1")
+
+  def test_changed_textproto_is_reparsed(self):
+    information_retrieval_registry._parse_tasks(self.textproto)
+
+    tasks = information_retrieval_registry._parse_tasks(
+        b'tasks { name: "Task2" }'
+    )
+
+    self.assertEqual([task.name for task in tasks.tasks], ["Task2"])
+
+  def test_corrupt_cache_is_replaced(self):
+    os.makedirs(os.path.dirname(self.cache_path))
+    with open(self.cache_path, "wb") as f:
+      f.write(b"\xff\xff")
+
+    tasks = information_retrieval_registry._parse_tasks(self.textproto)
+
+    self.assertEqual(tasks.tasks[0].name, "Task1")
+    with open(self.cache_path, "rb") as f:
+      self.assertEqual(f.read(), tasks.SerializeToString())
+
+  def test_concurrent_writes_leave_complete_cache(self):
+    with futures.ThreadPoolExecutor(max_workers=8) as executor:
+      results = list(
+          executor.map(
+              lambda _: information_retrieval_registry._parse_tasks(
+                  self.textproto
+              ),
+              range(16),
+          )
+      )
+
+    self.assertTrue(all(tasks == results[0] for tasks in results))
+    self.assertEqual(
+        os.listdir(os.path.dirname(self.cache_path)),
+        [os.path.basename(self.cache_path)],
+    )
+
+
 if __name__ == "__main__":
   absltest.main()
@@ -62,57 +62,90 @@ class TestTimestampToLocalDatetime(parameterized.TestCase):
     )
     self.assertEqual(converted_event, expected_event)
 
-  @mock.patch.object(random, 'choice')
-  @mock.patch.object(random, 'randrange')
-  def test_generate_random_event(self, mock_randrange, mock_choice):
-    expected_event = sqlite_schema_utils.CalendarEvent(
-        start_ts=1697556840,  # October 17, 2023 15:34
-        end_ts=1697558640,  # October 17, 2023, 16:04
-        title='Call with Nick',
-        description="We will organize Jess' birthday party.",
-    )
+  def test_generate_random_event(self):
+    random.seed(0)
+    exclusion_conditions = [
+        task_pb2.ExclusionCondition(
+            field='title',
+            value='Alice',
+            operation=task_pb2.ExclusionCondition.Operation.CONTAINS,
+        ),
+    ]
+
+    events = calendar_utils.generate_random_events(200, exclusion_conditions)
+
+    for event in events:
+      self.assertNotIn('Alice', event.title)
+      self.assertIn(event.end_ts - event.start_ts, [900, 1800, 2700, 3600])
+      # Within 15 days of October 15 2023 15:34.
+      self.assertBetween(event.start_ts, 1696088040, 1698679980)
+
+  def test_generate_random_events_in_narrow_window(self):
+    random.seed(0)
+    # Only events starting on the last 1.6 days of the 30 day window are kept.
+    exclusion_conditions = [
+        task_pb2.ExclusionCondition(
+            field='start_date',
+            value='October 29 2023',
+            operation=task_pb2.ExclusionCondition.Operation.LESS_THAN,
+        ),
+    ]
+
+    events = calendar_utils.generate_random_events(500, exclusion_conditions)
 
-    # 1st event mock calls:
-    # Mock date will be 2 days after current date (= October 17, 15:34)
-    date_call1 = 24 * 60 * 17
-    duration_call1 = 30
-    title_call1 = 'Meeting with'
-    title_name_call1 = 'Dan'
-    description_verb_call1 = 'discuss'
-    description_object_call1 = 'annual budget'
+    for event in events:
+      self.assertGreaterEqual(event.start_ts, 1698537600)  # October 29 2023.
 
-    # 2nd event mock calls:
-    date_call2 = 24 * 60 * 17
-    duration_call2 = 30
-    title_call2 = 'Call with'
-    title_name_call2 = 'Nick'
-    description_verb_call2 = 'organize'
-    description_object_call2 = "Jess' birthday party"
-    mock_randrange.side_effect = [date_call1, date_call2]
-    mock_choice.side_effect = [
-        duration_call1,
-        title_call1,
-        title_name_call1,
-        description_verb_call1,
-        description_object_call1,
-        False,
-        duration_call2,
-        title_call2,
-        title_name_call2,
-        description_verb_call2,
-        description_object_call2,
-        False,
+  def test_generate_random_events_all_excluded_raises(self):
+    exclusion_conditions = [
+        task_pb2.ExclusionCondition(
+            field='start_date',
+            value='October 1 2024',
+            operation=task_pb2.ExclusionCondition.Operation.LESS_THAN,
+        ),
     ]
 
+    with self.assertRaises(ValueError):
+      calendar_utils.generate_random_events(1, exclusion_conditions)
+
+  def test_generate_random_events_filters_excluded_events(self):
     exclusion_conditions = [
         task_pb2.ExclusionCondition(
             field='title',
-            value=title_name_call1,
+            value='Alice',
             operation=task_pb2.ExclusionCondition.Operation.CONTAINS,
         ),
     ]
-    event = calendar_utils.generate_random_event(exclusion_conditions)
-    self.assertEqual(event, expected_event)
+    excluded = sqlite_schema_utils.CalendarEvent(
+        start_ts=1697380200, end_ts=1697382000, title='Call Alice'
+    )
+    eligible = sqlite_schema_utils.CalendarEvent(
+        start_ts=1697380200, end_ts=1697382000, title='Call Bob'
+    )
+
+    with mock.patch.object(
+        calendar_utils,
+        '_generate_random_event',
+        side_effect=[excluded, eligible],
+    ):
+      events = calendar_utils.generate_random_events(1, exclusion_conditions)
+
+    self.assertEqual(events, [eligible])
+
+  def test_event_to_proto_round_trip(self):
+    event = sqlite_schema_utils.CalendarEvent(
+        start_ts=1697380200,
+        end_ts=1697382000,
+        title='Meeting',
+        description='Description',
+    )
+
+    self.assertEqual(
+        calendar_utils.create_event_from_proto(
+            calendar_utils._event_to_proto(event)
+        ),
+        event,
+    )
 
   @parameterized.named_parameters(
       dict(
@@ -14,17 +14,16 @@
 
 """Utils for Joplin app."""
 
-import os
 import random
 
 from android_world.env import adb_utils
 from android_world.env import interface
+from android_world.task_evals.information_retrieval import exclusion_sampler
 from android_world.task_evals.information_retrieval import proto_utils
 from android_world.task_evals.information_retrieval.proto import state_pb2
 from android_world.task_evals.information_retrieval.proto import task_pb2
 from android_world.task_evals.utils import sqlite_schema_utils
 from android_world.task_evals.utils import sqlite_utils
-from android_world.utils import file_utils
 
 _NOTES_TABLE = "notes"
 _NOTES_NORMALIZED_TABLE = "notes_normalized"
@@ -68,14 +67,11 @@ def setup_task_state(
 
 def clear_dbs(env: interface.AsyncEnv) -> None:
   """Clears Joplin databases."""
-  sqlite_utils.delete_all_rows_from_table(
-      _FOLDER_TABLE, _DB_PATH, env, _APP_NAME
-  )
-  sqlite_utils.delete_all_rows_from_table(
-      _NOTES_TABLE, _DB_PATH, env, _APP_NAME
-  )
-  sqlite_utils.delete_all_rows_from_table(
-      _NOTES_NORMALIZED_TABLE, _DB_PATH, env, _APP_NAME
+  sqlite_utils.delete_all_rows_from_tables(
+      [_FOLDER_TABLE, _NOTES_TABLE, _NOTES_NORMALIZED_TABLE],
+      _DB_PATH,
+      env,
+      _APP_NAME,
   )
   adb_utils.close_app(_APP_NAME, env.controller)  # Register changes.
 
@@ -84,15 +80,8 @@ def _get_folder_to_id(
     env: interface.AsyncEnv,
 ) -> dict[str, str]:
   """Gets a mapping from folder title to ID as represented in Folder table."""
-  with env.controller.pull_file(_DB_PATH) as local_db_directory:
-    local_db_path = file_utils.convert_to_posix_path(
-        local_db_directory, os.path.split(_DB_PATH)[1]
-    )
-    folder_info = sqlite_utils.execute_query(
-        f"select * from {_FOLDER_TABLE};",
-        local_db_path,
-        sqlite_schema_utils.JoplinFolder,
-    )
+  with sqlite_utils.open_remote_db(_DB_PATH, env) as db:
+    folder_info = db.get_rows(_FOLDER_TABLE, sqlite_schema_utils.JoplinFolder)
 
   result = {}
   for row in folder_info:
@@ -227,6 +216,62 @@ def _create_note_from_proto(
   )
 
 
+def _note_sampler(
+    relevant_folders: list[str],
+    exclusion_conditions: list[task_pb2.ExclusionCondition],
+) -> exclusion_sampler.ExclusionSampler:
+  """Creates a sampler for the folder, content and to-do state of notes."""
+  for folder in relevant_folders:
+    if folder not in _FOLDERS:
+      raise ValueError("Unexpected folder name: {}".format(folder))
+
+  def meets(conditions, **fields) -> bool:
+    note = sqlite_schema_utils.JoplinNote(**fields)
+    # Notes are checked with their folder's name as the folder ID.
+    folder_mapping = {folder: folder for folder in _FOLDERS}
+    return not _check_note_conditions(note, conditions, folder_mapping)
+
+  notes = []
+  weights = []
+  for folder, folder_notes in _FOLDERS.items():
+    # Add to relevant folders 30% of the time.
+    if relevant_folders:
+      folder_probability = 0.7 / len(_FOLDERS) + 0.3 * relevant_folders.count(
+          folder
+      ) / len(relevant_folders)
+    else:
+      folder_probability = 1 / len(_FOLDERS)
+    for note in folder_notes:
+      notes.append((folder, note))
+      weights.append(folder_probability / len(folder_notes))
+  return exclusion_sampler.ExclusionSampler(
+      [
+          exclusion_sampler.Field(
+              "note",
+              notes,
+              condition_fields={"folder", "title"},
+              meets_conditions=lambda v, c: meets(
+                  c, parent_id=v[0], title=v[1]["title"]
+              ),
+              weights=weights,
+          ),
+          exclusion_sampler.Field(
+              "is_todo",
+              [True, False],
+              condition_fields={"is_todo"},
+              meets_conditions=lambda v, c: meets(c, is_todo=int(v)),
+          ),
+          exclusion_sampler.Field(
+              "todo_completed",
+              [True, False],
+              condition_fields={"todo_completed"},
+              meets_conditions=lambda v, c: meets(c, todo_completed=int(v)),
+          ),
+      ],
+      exclusion_conditions,
+  )
+
+
 def _generate_random_notes(
     num_notes: int,
     exclusion_conditions: list[task_pb2.ExclusionCondition],
@@ -235,10 +280,11 @@ def _generate_random_notes(
     env: interface.AsyncEnv,
 ) -> list[sqlite_schema_utils.JoplinNote]:
   """Generates random notes with the given exclusion conditions."""
+  sampler = _note_sampler(relevant_folders, exclusion_conditions)
   return sqlite_schema_utils.get_random_items(
       num_notes,
       generate_item_fn=lambda: _generate_random_note(
-          relevant_folders, folder_mapping, env
+          sampler, folder_mapping, env
       ),
       filter_fn=lambda x: _check_note_conditions(
           x, exclusion_conditions, folder_mapping
@@ -247,26 +293,17 @@ def _generate_random_notes(
 
 
 def _generate_random_note(
-    relevant_folders: list[str],
+    sampler: exclusion_sampler.ExclusionSampler,
     folder_mapping: dict[str, str],
     env: interface.AsyncEnv,
 ):
   """Generates a single random sqlite_schema_utils.JoplinNote object."""
+  fields = sampler.sample()
+  folder, random_note = fields["note"]
   new_note = state_pb2.Note()
-  # add to relevant folders 30% of the time:
-  add_to_relevant_folder = random.random() < 0.3
-  if add_to_relevant_folder:
-    folder = random.choice(relevant_folders)
-    if folder not in _FOLDERS:
-      raise ValueError("Unexpected folder name: {}".format(folder))
-  else:
-    folder = random.choice(list(_FOLDERS.keys()))
   new_note.folder = folder
-  new_note.is_todo = str(random.choice([True, False]))
-  if new_note.is_todo:
-    new_note.todo_completed = random.choice(["True", "False"])
-  random_note = random.choice(_FOLDERS[folder])
-
+  new_note.is_todo = str(fields["is_todo"])
+  new_note.todo_completed = str(fields["todo_completed"])
   new_note.title = random_note["title"]
   new_note.body = random_note["body"]
   note = _create_note_from_proto(new_note, folder_mapping, env)
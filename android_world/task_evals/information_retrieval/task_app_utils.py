@@ -25,6 +25,7 @@ from android_world.env import device_constants
 from android_world.env import interface
 from android_world.task_evals.information_retrieval import calendar_utils
 from android_world.task_evals.information_retrieval import datetime_utils as datetime_utils_ir
+from android_world.task_evals.information_retrieval import exclusion_sampler
 from android_world.task_evals.information_retrieval import proto_utils
 from android_world.task_evals.information_retrieval.proto import state_pb2
 from android_world.task_evals.information_retrieval.proto import task_pb2
@@ -127,14 +128,72 @@ def list_rows(
   )
 
 
-def _generate_random_task():
+def _to_ms(dt: datetime.datetime) -> int:
+  return int(dt.timestamp()) * 1000
+
+
+def _task_sampler(
+    exclusion_conditions: list[task_pb2.ExclusionCondition],
+) -> exclusion_sampler.ExclusionSampler:
+  """Creates a sampler for the fields of a random task."""
+
+  def meets(conditions, **fields) -> bool:
+    task = sqlite_schema_utils.Task(**{'title': '', **fields})
+    return not check_task_conditions(task, conditions)
+
+  due_ranges = exclusion_sampler.split_datetime_window()
+  completed_ranges = exclusion_sampler.split_datetime_window(
+      window_center=device_constants.DT - datetime.timedelta(days=14)
+  )
+  completed_minutes = sum(r.num_minutes for r in completed_ranges)
+  return exclusion_sampler.ExclusionSampler(
+      [
+          exclusion_sampler.Field(
+              'title',
+              list(_TASKS.keys()),
+              condition_fields={'title'},
+              meets_conditions=lambda v, c: meets(c, title=v),
+          ),
+          exclusion_sampler.Field(
+              'importance',
+              [0, 1, 2, 3],
+              condition_fields={'importance'},
+              meets_conditions=lambda v, c: meets(c, importance=v),
+          ),
+          exclusion_sampler.Field(
+              'due',
+              due_ranges,
+              condition_fields={'due_date'},
+              meets_conditions=lambda v, c: meets(c, dueDate=_to_ms(v.start)),
+              weights=[r.num_minutes for r in due_ranges],
+          ),
+          # Half of the tasks are not completed.
+          exclusion_sampler.Field(
+              'completed',
+              [None, *completed_ranges],
+              condition_fields={'completed_date'},
+              meets_conditions=lambda v, c: meets(
+                  c, completed=_to_ms(v.start) if v else 0
+              ),
+              weights=[
+                  completed_minutes,
+                  *[r.num_minutes for r in completed_ranges],
+              ],
+          ),
+      ],
+      exclusion_conditions,
+  )
+
+
+def _generate_random_task(sampler: exclusion_sampler.ExclusionSampler):
   """Generates a single random sqlite_schema_utils.Task object."""
+  fields = sampler.sample()
   new_task = state_pb2.TasksAppTask()
-  new_task.title = random.choice(list(_TASKS.keys()))
+  new_task.title = fields['title']
   if random.choice([True, False]):
     new_task.notes = _TASKS[new_task.title]
-  new_task.importance = str(random.choice([0, 1, 2, 3]))
-  random_due_datetime = datetime_utils.generate_random_datetime()
+  new_task.importance = str(fields['importance'])
+  random_due_datetime = fields['due'].sample()
   new_task.due_date = random_due_datetime.date().strftime(
       datetime_utils_ir.DATE_FORMAT
   )
@@ -148,12 +207,9 @@ def _generate_random_task():
       '%B %d %Y'
   )
   new_task.hide_until_time = random_hide_until_datetime.time().strftime('%H:%M')
-  is_completed = random.choice([True, False])
-  if is_completed:
+  if fields['completed'] is not None:
     # Make sure completed date is before current time
-    random_completed_datetime = datetime_utils.generate_random_datetime(
-        window_center=device_constants.DT - datetime.timedelta(days=14)
-    )
+    random_completed_datetime = fields['completed'].sample()
     new_task.completed_date = random_completed_datetime.date().strftime(
         datetime_utils_ir.DATE_FORMAT
     )
@@ -166,9 +222,10 @@ def generate_random_tasks(
     exclusion_conditions: list[task_pb2.ExclusionCondition],
 ) -> list[sqlite_schema_utils.Task]:
   """Generates random tasks with the given exclusion conditions."""
+  sampler = _task_sampler(exclusion_conditions)
   return sqlite_schema_utils.get_random_items(
       num_tasks,
-      generate_item_fn=_generate_random_task,
+      generate_item_fn=lambda: _generate_random_task(sampler),
       filter_fn=lambda x: check_task_conditions(x, exclusion_conditions),
   )
 
@@ -151,6 +151,29 @@ class TaskAppUtilsTest(parameterized.TestCase):
         expected_value,
     )
 
+  def test_generate_random_tasks(self):
+    exclusion_conditions = [
+        task_pb2.ExclusionCondition(
+            field='due_date',
+            value='October 21 2023',
+            operation=task_pb2.ExclusionCondition.Operation.LESS_THAN,
+        ),
+        task_pb2.ExclusionCondition(
+            field='completed_date',
+            value='0',
+            operation=task_pb2.ExclusionCondition.Operation.EQUAL_TO,
+        ),
+    ]
+
+    tasks = task_app_utils.generate_random_tasks(100, exclusion_conditions)
+
+    self.assertLen(tasks, 100)
+    for task in tasks:
+      self.assertTrue(
+          task_app_utils.check_task_conditions(task, exclusion_conditions)
+      )
+      self.assertTrue(task.completed or task.dueDate >= 1697846400000)
+
 
 if __name__ == '__main__':
   absltest.main()
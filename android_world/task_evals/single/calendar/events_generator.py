@@ -97,6 +97,19 @@ def generate_event_title() -> str:
   return title
 
 
+def event_title_probabilities() -> dict[str, float]:
+  """Returns each title `generate_event_title` can generate and its chance."""
+  probabilities = {}
+  for prefix in TITLES_PREFIXES:
+    suffixes = NAMES if 'with' in prefix else SUBJECTS
+    for suffix in suffixes:
+      title = f'{prefix} {suffix}'
+      probabilities[title] = probabilities.get(title, 0.0) + 1 / (
+          len(TITLES_PREFIXES) * len(suffixes)
+      )
+  return probabilities
+
+
 def generate_event_description() -> str:
   """Generates a realistic event description."""
   description = (
@@ -15,7 +15,6 @@
 """Tasks for Retro Music app."""
 
 import dataclasses
-import os
 import random
 from typing import Any
 from android_world.env import adb_utils
@@ -63,16 +62,11 @@ def _get_playlist_data(
     env: interface.AsyncEnv,
 ) -> list[sqlite_schema_utils.PlaylistInfo]:
   """Executes join query to fetch playlist file info."""
-  with env.controller.pull_file(
-      _PLAYLIST_DB_PATH, timeout_sec=3
-  ) as local_db_directory:
-    local_db_path = file_utils.convert_to_posix_path(
-        local_db_directory, os.path.split(_PLAYLIST_DB_PATH)[1]
-    )
-    return sqlite_utils.execute_query(
-        _get_playlist_info_query(),
-        local_db_path,
-        sqlite_schema_utils.PlaylistInfo,
+  with sqlite_utils.open_remote_db(
+      _PLAYLIST_DB_PATH, env, timeout_sec=3
+  ) as db:
+    return db.query(
+        _get_playlist_info_query(), sqlite_schema_utils.PlaylistInfo
     )
 
 
@@ -83,27 +77,17 @@ def _get_playing_queue(env: interface.AsyncEnv) -> list[str]:
   class Queue(sqlite_schema_utils.SQLiteRow):
     title: str
 
-  with env.controller.pull_file(
-      _PLAYBACK_DB_PATH, timeout_sec=3
-  ) as local_db_directory:
-    local_db_path = file_utils.convert_to_posix_path(
-        local_db_directory, os.path.split(_PLAYBACK_DB_PATH)[1]
-    )
-    result = sqlite_utils.execute_query(
-        'SELECT title from playing_queue;',
-        local_db_path,
-        Queue,
-    )
-    return [r.title for r in result]
+  with sqlite_utils.open_remote_db(
+      _PLAYBACK_DB_PATH, env, timeout_sec=3
+  ) as db:
+    result = db.query('SELECT title from playing_queue;', Queue)
+  return [r.title for r in result]
 
 
 def _clear_playlist_dbs(env: interface.AsyncEnv) -> None:
   """Clears all DBs related to playlists."""
-  sqlite_utils.delete_all_rows_from_table(
-      'PlaylistEntity', _PLAYLIST_DB_PATH, env, _APP_NAME
-  )
-  sqlite_utils.delete_all_rows_from_table(
-      'SongEntity', _PLAYLIST_DB_PATH, env, _APP_NAME
+  sqlite_utils.delete_all_rows_from_tables(
+      ['PlaylistEntity', 'SongEntity'], _PLAYLIST_DB_PATH, env, _APP_NAME
   )
 
 
@@ -14,7 +14,6 @@
 
 """Tasks for VLC player."""
 
-import os
 import random
 from typing import Any
 from android_world.env import interface
@@ -49,10 +48,8 @@ def _get_playlist_info_query() -> str:
 
 def _clear_playlist_dbs(env: interface.AsyncEnv) -> None:
   """Clears all DBs related to playlists."""
-  sqlite_utils.delete_all_rows_from_table('Playlist', _DB_PATH, env, _APP_NAME)
-  sqlite_utils.delete_all_rows_from_table('Media', _DB_PATH, env, _APP_NAME)
-  sqlite_utils.delete_all_rows_from_table(
-      'PlaylistMediaRelation', _DB_PATH, env, _APP_NAME
+  sqlite_utils.delete_all_rows_from_tables(
+      ['Playlist', 'Media', 'PlaylistMediaRelation'], _DB_PATH, env, _APP_NAME
   )
 
 
@@ -60,14 +57,9 @@ def _get_playlist_file_info(
     env: interface.AsyncEnv,
 ) -> list[sqlite_schema_utils.PlaylistInfo]:
   """Executes join query to fetch playlist file info."""
-  with env.controller.pull_file(_DB_PATH, timeout_sec=3) as local_db_directory:
-    local_db_path = file_utils.convert_to_posix_path(
-        local_db_directory, os.path.split(_DB_PATH)[1]
-    )
-    return sqlite_utils.execute_query(
-        _get_playlist_info_query(),
-        local_db_path,
-        sqlite_schema_utils.PlaylistInfo,
+  with sqlite_utils.open_remote_db(_DB_PATH, env, timeout_sec=3) as db:
+    return db.query(
+        _get_playlist_info_query(), sqlite_schema_utils.PlaylistInfo
     )
 
 
@@ -19,6 +19,7 @@ import datetime
 import textwrap
 from typing import Any, Callable, ClassVar, Optional, TypeVar
 import uuid
+from absl import logging
 from android_world.env import device_constants
 from android_world.utils import datetime_utils
 
@@ -468,26 +469,61 @@ def insert_into_db(
   return insert_command, values
 
 
-def _is_candidate_equal_to_any_result(
-    candidate: Any, result: list[Any]
-) -> bool:
-  """Private function to check if a candidate is equal to any of the objects in result."""
-  for existing in result:
-    if all(
-        getattr(candidate, field.name) == getattr(existing, field.name)
-        for field in dataclasses.fields(candidate)
-    ):
-      return True
-  return False
+def _row_key(row: Any) -> tuple[Any, ...]:
+  """Returns a hashable key that is equal for rows with equal fields."""
+  key = tuple(getattr(row, field.name) for field in dataclasses.fields(row))
+  try:
+    hash(key)
+  except TypeError:
+    # Unhashable field values (e.g. lists) are compared by their repr.
+    key = tuple(_hashable(value) for value in key)
+  return key
 
 
-def get_random_items(
+def _hashable(value: Any) -> Any:
+  try:
+    hash(value)
+    return value
+  except TypeError:
+    return repr(value)
+
+
+@dataclasses.dataclass
+class GenerationStats:
+  """Statistics of a `generate_random_items` run.
+
+  Attributes:
+    n_requested: The number of items requested.
+    n_draws: The number of candidates generated.
+    n_filtered: Candidates rejected by the filter function.
+    n_duplicates: Candidates rejected for being equal to an accepted item.
+  """
+
+  n_requested: int
+  n_draws: int = 0
+  n_filtered: int = 0
+  n_duplicates: int = 0
+
+  @property
+  def n_accepted(self) -> int:
+    return self.n_draws - self.n_filtered - self.n_duplicates
+
+  @property
+  def acceptance_rate(self) -> float:
+    return self.n_accepted / self.n_draws if self.n_draws else 0.0
+
+
+def generate_random_items(
     n: int,
     generate_item_fn: Callable[[], RowType],
     replacement: bool = False,
     filter_fn: Optional[Callable[[RowType], bool]] = None,
-) -> list[RowType]:
-  """Generates a list of random items, optionally filtering and avoiding duplicates.
+    max_draws: Optional[int] = None,
+) -> tuple[list[RowType], GenerationStats]:
+  """Generates random items and returns them with acceptance statistics.
+
+  Duplicates are detected through a set of row keys, so generation takes time
+  linear in the number of draws.
 
   Args:
       n: The number of items to generate.
@@ -496,26 +532,73 @@ def get_random_items(
         list.
       filter_fn: Optional function to filter items. If None, all items are
         accepted.
+      max_draws: The maximum number of candidates to generate before giving up.
+        Defaults to the larger of 10,000 and 10 * n.
 
   Returns:
-      A list of randomly generated items.
+      A list of randomly generated items and the generation statistics.
+
+  Raises:
+      ValueError: If `n` items could not be generated within `max_draws`.
   """
-  if not filter_fn:
-    filter_fn = lambda _: True
+  if max_draws is None:
+    max_draws = max(10_000, 10 * n)
+  stats = GenerationStats(n_requested=n)
   result = []
-  i = 0
+  seen = set()
   while len(result) < n:
     candidate = generate_item_fn()
-    i += 1
-    if i > 10_000:
+    stats.n_draws += 1
+    if stats.n_draws > max_draws:
       raise ValueError(
           'Something went wrong: generation exhaused. There are total of'
           f" {len(result)} items created; couldn't generate {n} items."
+          f' Stats: {stats}.'
       )
-    if not filter_fn(candidate):
+    if filter_fn is not None and not filter_fn(candidate):
+      stats.n_filtered += 1
       continue
     if replacement:
       result.append(candidate)
-    elif not _is_candidate_equal_to_any_result(candidate, result):
-      result.append(candidate)
+      continue
+    key = _row_key(candidate)
+    if key in seen:
+      stats.n_duplicates += 1
+      continue
+    seen.add(key)
+    result.append(candidate)
+  return result, stats
+
+
+def get_random_items(
+    n: int,
+    generate_item_fn: Callable[[], RowType],
+    replacement: bool = False,
+    filter_fn: Optional[Callable[[RowType], bool]] = None,
+) -> list[RowType]:
+  """Generates a list of random items, optionally filtering and avoiding duplicates.
+
+  Args:
+      n: The number of items to generate.
+      generate_item_fn: Function to generate a single random item.
+      replacement: Whether to allow replacement (duplicates) in the returned
+        list.
+      filter_fn: Optional function to filter items. If None, all items are
+        accepted.
+
+  Returns:
+      A list of randomly generated items.
+  """
+  result, stats = generate_random_items(
+      n, generate_item_fn, replacement, filter_fn
+  )
+  logging.info(
+      'Generated %d items in %d draws (acceptance rate %.2f; %d filtered, %d'
+      ' duplicates).',
+      n,
+      stats.n_draws,
+      stats.acceptance_rate,
+      stats.n_filtered,
+      stats.n_duplicates,
+  )
   return result
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import dataclasses
 from unittest import mock
 
 from absl.testing import absltest
@@ -75,5 +76,59 @@ class SchemaUtilsTest(absltest.TestCase):
     generate_item_fn.assert_called()
 
 
+  def test_generate_random_items_reports_stats(self):
+    titles = ['Item 1', 'Item 1', 'Reject', 'Item 2']
+    generate_item_fn = mock.Mock(
+        side_effect=[self.generate_mock_item(title) for title in titles]
+    )
+
+    items, stats = sqlite_schema_utils.generate_random_items(
+        n=2,
+        generate_item_fn=generate_item_fn,
+        filter_fn=lambda item: item.title != 'Reject',
+    )
+
+    self.assertEqual([item.title for item in items], ['Item 1', 'Item 2'])
+    self.assertEqual(stats.n_draws, 4)
+    self.assertEqual(stats.n_filtered, 1)
+    self.assertEqual(stats.n_duplicates, 1)
+    self.assertEqual(stats.acceptance_rate, 0.5)
+
+  def test_generate_large_batch(self):
+    counter = iter(range(1_000_000))
+    items, stats = sqlite_schema_utils.generate_random_items(
+        n=20_000,
+        generate_item_fn=lambda: self.generate_mock_item(
+            f'Item {next(counter) % 25_000}'
+        ),
+    )
+
+    self.assertLen({item.title for item in items}, 20_000)
+    self.assertEqual(stats.n_duplicates, 0)
+
+  def test_generate_random_items_exhausted(self):
+    with self.assertRaisesRegex(ValueError, 'generation exhaused'):
+      sqlite_schema_utils.generate_random_items(
+          n=2,
+          generate_item_fn=lambda: self.generate_mock_item('Item 1'),
+          max_draws=100,
+      )
+
+  def test_unhashable_fields_are_deduplicated(self):
+
+    @dataclasses.dataclass(frozen=True)
+    class Tagged(sqlite_schema_utils.SQLiteRow):
+      tags: list[str]
+
+    generate_item_fn = mock.Mock(
+        side_effect=[Tagged(['a']), Tagged(['a']), Tagged(['b'])]
+    )
+
+    items = sqlite_schema_utils.get_random_items(
+        n=2, generate_item_fn=generate_item_fn
+    )
+
+    self.assertEqual(items, [Tagged(['a']), Tagged(['b'])])
+
 if __name__ == '__main__':
   absltest.main()
@@ -12,20 +12,40 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Utility functions for interacting with SQLite database on an Android device."""
+"""Utility functions for interacting with SQLite database on an Android device.
 
+Databases are read and written through a local mirror of the database
+directory, one per device. A mirrored copy is reused for as long as the
+on-device files are unchanged, so repeated reads of the same database cost a
+single checksum request instead of a full pull. Use `open_remote_db` to batch
+several reads and writes into one pull/push cycle.
+"""
+
+from collections.abc import Iterator, Sequence
+import contextlib
+import hashlib
 import os
+import re
+import shutil
 import sqlite3
+import tempfile
+import threading
 import time
-from typing import Optional, Type
+from typing import Any, Optional, Type
+import weakref
+
+from android_env.proto import adb_pb2
 from android_world.env import adb_utils
+from android_world.env import android_world_controller
 from android_world.env import interface
 from android_world.task_evals.utils import sqlite_schema_utils
-from android_world.utils import file_utils
 
 
 def execute_query(
-    query: str, db_path: str, row_type: Type[sqlite_schema_utils.RowType]
+    query: str,
+    db_path: str,
+    row_type: Type[sqlite_schema_utils.RowType],
+    params: Sequence[Any] = (),
 ) -> list[sqlite_schema_utils.RowType]:
   """Retrieves all rows from the given SQLite database path.
 
@@ -33,6 +53,7 @@ def execute_query(
     query: The query to issue.
     db_path: The path to the SQLite database file.
     row_type: The object type that will be created for each retrieved row.
+    params: Values bound to the query's `?` placeholders.
 
   Returns:
       A list of tuples, each representing an row from the database.
@@ -40,7 +61,7 @@ def execute_query(
   conn = sqlite3.connect(db_path)
   conn.row_factory = sqlite3.Row
   cursor = conn.cursor()
-  raw_rows = cursor.execute(query).fetchall()
+  raw_rows = cursor.execute(query, params).fetchall()
   conn.close()
 
   rows = []
@@ -50,6 +71,287 @@ def execute_query(
   return rows
 
 
+def _remote_checksums(
+    remote_directory: str,
+    env: android_world_controller.AndroidWorldController,
+    timeout_sec: Optional[float],
+) -> dict[str, str] | None:
+  """Returns the md5 of each file in a device directory, or None if unknown."""
+  response = adb_utils.issue_generic_request(
+      ['shell', 'md5sum', f'{remote_directory}/*'], env, timeout_sec
+  )
+  if response.status != adb_pb2.AdbResponse.Status.OK:
+    return None
+  checksums = {}
+  for line in response.generic.output.decode('utf-8', errors='replace').split(
+      '\n'
+  ):
+    match = re.fullmatch(r'([0-9a-f]{32})\s+(.+)', line.strip())
+    if match:
+      checksums[os.path.basename(match.group(2))] = match.group(1)
+  return checksums or None
+
+
+def _local_checksums(local_directory: str) -> dict[str, str]:
+  checksums = {}
+  for file_name in os.listdir(local_directory):
+    path = os.path.join(local_directory, file_name)
+    if os.path.isfile(path):
+      with open(path, 'rb') as f:
+        checksums[file_name] = hashlib.md5(f.read()).hexdigest()
+  return checksums
+
+
+class DatabaseMirror:
+  """Local copies of database directories on a single device.
+
+  Copies are keyed by remote directory, since SQLite keeps the journal and WAL
+  files next to the database. A copy is reused as long as the md5 checksums of
+  the on-device files match the ones recorded at the last pull or push.
+  Checksums are used rather than size and mtime because SQLite rewrites pages
+  in place, which often leaves the file size unchanged, and on-device mtimes
+  have a one second resolution.
+  """
+
+  def __init__(self):
+    self._root = tempfile.TemporaryDirectory(prefix='db_mirror_')
+    self._checksums: dict[str, dict[str, str]] = {}
+    self._local_directories: dict[str, str] = {}
+
+  def _local_directory(self, remote_directory: str) -> str:
+    if remote_directory not in self._local_directories:
+      self._local_directories[remote_directory] = tempfile.mkdtemp(
+          dir=self._root.name
+      )
+    return self._local_directories[remote_directory]
+
+  def sync(
+      self,
+      remote_db_file_path: str,
+      env: interface.AsyncEnv,
+      timeout_sec: Optional[float] = None,
+  ) -> str:
+    """Makes the local copy of a database current, pulling only if needed.
+
+    Args:
+      remote_db_file_path: The database path on the device.
+      env: The environment.
+      timeout_sec: Optional timeout in seconds for the adb operations.
+
+    Returns:
+      The path to the local copy of the database.
+
+    Raises:
+      FileNotFoundError: If the database directory does not exist on device.
+    """
+    remote_directory = os.path.dirname(remote_db_file_path)
+    local_directory = self._local_directory(remote_directory)
+    local_db_path = os.path.join(
+        local_directory, os.path.basename(remote_db_file_path)
+    )
+    cached = self._checksums.get(remote_directory)
+    if cached is not None and cached == _remote_checksums(
+        remote_directory, env.controller, timeout_sec
+    ):
+      return local_db_path
+
+    self._checksums.pop(remote_directory, None)
+    with env.controller.pull_file(
+        remote_db_file_path, timeout_sec
+    ) as pulled_directory:
+      shutil.rmtree(local_directory)
+      shutil.copytree(pulled_directory, local_directory)
+    # Recorded before the copy is opened, as SQLite may checkpoint a pulled WAL
+    # file into the database and delete it.
+    self._checksums[remote_directory] = _local_checksums(local_directory)
+    return local_db_path
+
+  def push(
+      self,
+      remote_db_file_path: str,
+      env: interface.AsyncEnv,
+      timeout_sec: Optional[float] = None,
+  ) -> None:
+    """Pushes the local copy of a database back to the device."""
+    remote_directory = os.path.dirname(remote_db_file_path)
+    local_directory = self._local_directory(remote_directory)
+    db_file_name = os.path.basename(remote_db_file_path)
+    self._checksums.pop(remote_directory, None)
+    env.controller.push_file(
+        os.path.join(local_directory, db_file_name),
+        remote_db_file_path,
+        timeout_sec,
+    )
+    # `push_file` replaces the remote directory with just the database file.
+    for file_name in os.listdir(local_directory):
+      path = os.path.join(local_directory, file_name)
+      if file_name != db_file_name and os.path.isfile(path):
+        os.remove(path)
+    self._checksums[remote_directory] = _local_checksums(local_directory)
+
+  def invalidate(self, remote_db_file_path: str) -> None:
+    """Forces the next `sync` of a database to pull it."""
+    self._checksums.pop(os.path.dirname(remote_db_file_path), None)
+
+
+_mirrors_lock = threading.Lock()
+_mirrors: weakref.WeakKeyDictionary[Any, DatabaseMirror] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_mirror(env: interface.AsyncEnv) -> DatabaseMirror:
+  with _mirrors_lock:
+    if env.controller not in _mirrors:
+      _mirrors[env.controller] = DatabaseMirror()
+    return _mirrors[env.controller]
+
+
+class RemoteDatabase:
+  """A database opened with `open_remote_db`.
+
+  Reads and writes go to the local copy; writes are pushed to the device when
+  the enclosing `open_remote_db` block exits.
+  """
+
+  def __init__(self, local_db_path: str):
+    self.local_db_path = local_db_path
+    self.modified = False
+
+  def query(
+      self,
+      query: str,
+      row_type: Type[sqlite_schema_utils.RowType],
+      params: Sequence[Any] = (),
+  ) -> list[sqlite_schema_utils.RowType]:
+    """Runs a query and returns the resulting rows as `row_type`."""
+    return execute_query(query, self.local_db_path, row_type, params)
+
+  def get_rows(
+      self,
+      table_name: str,
+      row_type: Type[sqlite_schema_utils.RowType],
+      where: str | None = None,
+      params: Sequence[Any] = (),
+  ) -> list[sqlite_schema_utils.RowType]:
+    """Returns the rows of a table, optionally filtered by a WHERE clause."""
+    query = f'SELECT * FROM {table_name}'
+    if where:
+      query += f' WHERE {where}'
+    return self.query(query, row_type, params)
+
+  def _fetch_one(self, query: str, params: Sequence[Any] = ()) -> Any:
+    conn = sqlite3.connect(self.local_db_path)
+    try:
+      row = conn.execute(query, params).fetchone()
+    finally:
+      conn.close()
+    return None if row is None else row[0]
+
+  def count(
+      self,
+      table_name: str,
+      where: str | None = None,
+      params: Sequence[Any] = (),
+  ) -> int:
+    """Returns the number of rows in a table matching an optional WHERE."""
+    query = f'SELECT COUNT(*) FROM {table_name}'
+    if where:
+      query += f' WHERE {where}'
+    return self._fetch_one(query, params)
+
+  def table_exists(self, table_name: str) -> bool:
+    """Checks for a table in `sqlite_master` without reading its rows."""
+    if not os.path.exists(self.local_db_path):
+      return False
+    return (
+        self._fetch_one(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?",
+            (table_name,),
+        )
+        is not None
+    )
+
+  def execute(self, command: str, params: Sequence[Any] = ()) -> None:
+    """Runs a statement that modifies the database."""
+    self.execute_many([(command, params)])
+
+  def execute_many(
+      self, commands: Sequence[tuple[str, Sequence[Any]]]
+  ) -> None:
+    """Runs several modifying statements in a single transaction."""
+    conn = sqlite3.connect(self.local_db_path)
+    try:
+      cursor = conn.cursor()
+      for command, params in commands:
+        cursor.execute(command, params)
+      conn.commit()
+    finally:
+      conn.close()
+    self.modified = True
+
+  def insert_rows(
+      self,
+      rows: Sequence[sqlite_schema_utils.RowType],
+      table_name: str,
+      exclude_key: str | None = None,
+  ) -> None:
+    """Inserts rows, skipping the (typically auto-incrementing) exclude_key."""
+    self.execute_many([
+        sqlite_schema_utils.insert_into_db(row, table_name, exclude_key)
+        for row in rows
+    ])
+
+  def delete_all_rows(self, table_name: str) -> None:
+    self.execute(f'DELETE FROM {table_name}')
+
+
+@contextlib.contextmanager
+def open_remote_db(
+    remote_db_file_path: str,
+    env: interface.AsyncEnv,
+    app_name: str | None = None,
+    timeout_sec: Optional[float] = None,
+) -> Iterator[RemoteDatabase]:
+  """Opens a database on device for a batch of reads and writes.
+
+  The database is pulled at most once on entry and, if it was modified, pushed
+  once on exit, after which the owning app is closed to register the changes.
+
+  Example:
+  ~~~~~~~
+
+  with open_remote_db(db_path, env, app_name='vlc') as db:
+    if db.table_exists('Media'):
+      db.delete_all_rows('Media')
+
+  Args:
+    remote_db_file_path: The database path on the device.
+    env: The environment.
+    app_name: The name of the app that owns the database. Closed after a push.
+    timeout_sec: Optional timeout in seconds for the database copy operations.
+
+  Yields:
+    The opened database.
+
+  Raises:
+    FileNotFoundError: If the database directory does not exist on device.
+  """
+  mirror = _get_mirror(env)
+  db = RemoteDatabase(mirror.sync(remote_db_file_path, env, timeout_sec))
+  try:
+    yield db
+  except BaseException:
+    if db.modified:
+      # The local copy has changes that never reached the device.
+      mirror.invalidate(remote_db_file_path)
+    raise
+  if db.modified:
+    mirror.push(remote_db_file_path, env, timeout_sec)
+    if app_name is not None:
+      adb_utils.close_app(app_name, env.controller)
+
+
 def get_rows_from_remote_device(
     table_name: str,
     remote_db_file_path: str,
@@ -60,8 +362,8 @@ def get_rows_from_remote_device(
 ) -> list[sqlite_schema_utils.RowType]:
   """Retrieves rows from a table in a SQLite database located on a remote Android device.
 
-  This function first copies the database from the remote device to a
-  temporary local directory.
+  The database is read from the local mirror, which is refreshed from the
+  device if it changed.
 
   Args:
     table_name: The name of the table from which to retrieve rows.
@@ -81,19 +383,10 @@ def get_rows_from_remote_device(
   Raises:
     ValueError: If cannot query table.
   """
-  with env.controller.pull_file(
-      remote_db_file_path, timeout_sec
-  ) as local_db_directory:
-    local_db_path = file_utils.convert_to_posix_path(
-        local_db_directory, os.path.split(remote_db_file_path)[1]
-    )
+  with open_remote_db(remote_db_file_path, env, timeout_sec=timeout_sec) as db:
     for _ in range(n_retries):
       try:
-        return execute_query(
-            f"SELECT * FROM {table_name};",
-            local_db_path,
-            row_type,
-        )
+        return db.get_rows(table_name, row_type)
       except sqlite3.OperationalError:
         time.sleep(1.0)
   raise ValueError(
@@ -119,55 +412,65 @@ def table_exists(
     True if the table exists in the database.
   """
   try:
-    get_rows_from_remote_device(
-        table_name,
-        remote_db_file_path,
-        sqlite_schema_utils.GenericRow,
-        env,
-    )
-    return True
-  except (FileNotFoundError, ValueError):
+    with open_remote_db(remote_db_file_path, env) as db:
+      return db.table_exists(table_name)
+  except (FileNotFoundError, sqlite3.DatabaseError):
     return False
 
 
-def delete_all_rows_from_table(
-    table_name: str,
+def delete_all_rows_from_tables(
+    table_names: Sequence[str],
     remote_db_file_path: str,
     env: interface.AsyncEnv,
     app_name: str,
     timeout_sec: Optional[float] = None,
 ) -> None:
-  """Deletes all rows from a specified table in a SQLite database on a remote Android device.
+  """Deletes all rows from several tables with a single pull and push.
 
   Args:
-    table_name: Deletes all rows from the table.
+    table_names: The tables to clear.
     remote_db_file_path: The path to the sqlite database on the device.
     env: The environment.
     app_name: The name of the app that owns the database.
     timeout_sec: Timeout in seconds.
   """
-  if not table_exists(table_name, remote_db_file_path, env):
+  try:
+    with open_remote_db(remote_db_file_path, env) as db:
+      tables_exist = all(db.table_exists(name) for name in table_names)
+  except (FileNotFoundError, sqlite3.DatabaseError):
+    tables_exist = False
+  if not tables_exist:
     # If the database was never created, opening the app may create it.
     adb_utils.launch_app(app_name, env.controller)
     time.sleep(7.0)
 
-  with env.controller.pull_file(
-      remote_db_file_path, timeout_sec
-  ) as local_db_directory:
-    local_db_path = file_utils.convert_to_posix_path(
-        local_db_directory, os.path.split(remote_db_file_path)[1]
+  with open_remote_db(
+      remote_db_file_path, env, app_name=app_name, timeout_sec=timeout_sec
+  ) as db:
+    db.execute_many(
+        [(f"DELETE FROM {table_name}", ()) for table_name in table_names]
     )
 
-    conn = sqlite3.connect(local_db_path)
-    cursor = conn.cursor()
-    delete_command = f"DELETE FROM {table_name}"
-    cursor.execute(delete_command)
-    conn.commit()
-    conn.close()
-    env.controller.push_file(local_db_path, remote_db_file_path, timeout_sec)
-    adb_utils.close_app(
-        app_name, env.controller
-    )  # Close app to register the changes.
+
+def delete_all_rows_from_table(
+    table_name: str,
+    remote_db_file_path: str,
+    env: interface.AsyncEnv,
+    app_name: str,
+    timeout_sec: Optional[float] = None,
+) -> None:
+  """Deletes all rows from a specified table in a SQLite database on a remote Android device.
+
+  Args:
+    table_name: Deletes all rows from the table.
+    remote_db_file_path: The path to the sqlite database on the device.
+    env: The environment.
+    app_name: The name of the app that owns the database.
+    timeout_sec: Timeout in seconds.
+  """
+  delete_all_rows_from_tables(
+      [table_name], remote_db_file_path, env, app_name, timeout_sec
+  )
 
 
 def insert_rows_to_remote_db(
@@ -191,22 +494,7 @@ def insert_rows_to_remote_db(
     env: The environment.
     timeout_sec: Optional timeout in seconds for the database copy operation.
   """
-  with env.controller.pull_file(
-      remote_db_file_path, timeout_sec
-  ) as local_db_directory:
-    local_db_path = file_utils.convert_to_posix_path(
-        local_db_directory, os.path.split(remote_db_file_path)[1]
-    )
-
-    conn = sqlite3.connect(local_db_path)
-    cursor = conn.cursor()
-    for row in rows:
-      insert_command, values = sqlite_schema_utils.insert_into_db(
-          row, table_name, exclude_key
-      )
-      cursor.execute(insert_command, values)
-    conn.commit()
-    conn.close()
-
-    env.controller.push_file(local_db_path, remote_db_file_path, timeout_sec)
-    adb_utils.close_app(app_name, env.controller)
+  with open_remote_db(
+      remote_db_file_path, env, app_name=app_name, timeout_sec=timeout_sec
+  ) as db:
+    db.insert_rows(rows, table_name, exclude_key)
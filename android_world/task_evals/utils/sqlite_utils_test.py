@@ -14,10 +14,12 @@
 
 import os
 import sqlite3
+import subprocess
 from unittest import mock
 
 from absl.testing import absltest
 from android_env import env_interface
+from android_env.proto import adb_pb2
 from android_env.wrappers import a11y_grpc_wrapper
 from android_world.env import adb_utils
 from android_world.env import android_world_controller
@@ -29,7 +31,7 @@ from android_world.utils import file_test_utils
 from android_world.utils import file_utils
 
 
-class SqliteUtilsTest(absltest.TestCase):
+class SqliteUtilsTestBase(absltest.TestCase):
 
   def setUp(self):
     super().setUp()
@@ -74,6 +76,9 @@ class SqliteUtilsTest(absltest.TestCase):
         )
     )
 
+
+class SqliteUtilsTest(SqliteUtilsTestBase):
+
   def test_get_rows_from_remote_device_success(self):
     expected_rows = sqlite_test_utils.get_db_rows()
 
@@ -140,5 +145,110 @@ class SqliteUtilsTest(absltest.TestCase):
     self.assertEqual(retrieved, original_rows + [new_row])
 
 
+
+def _run_locally(args, unused_env, unused_timeout_sec=None):
+  """Runs an `adb shell` request with the host shell instead of a device."""
+  completed = subprocess.run(
+      ['sh', '-c', ' '.join(args[1:])], capture_output=True, check=False
+  )
+  return adb_pb2.AdbResponse(
+      status=adb_pb2.AdbResponse.Status.OK,
+      generic=adb_pb2.AdbResponse.GenericResponse(output=completed.stdout),
+  )
+
+
+class DatabaseMirrorTest(SqliteUtilsTestBase):
+
+  def setUp(self):
+    super().setUp()
+    self.enter_context(
+        mock.patch.object(
+            adb_utils, 'issue_generic_request', side_effect=_run_locally
+        )
+    )
+    self.mock_close_app = self.enter_context(
+        mock.patch.object(adb_utils, 'close_app', autospec=True)
+    )
+
+  def test_unchanged_database_is_not_pulled_again(self):
+    for _ in range(3):
+      rows = sqlite_utils.get_rows_from_remote_device(
+          self.table_name,
+          self.remote_db_path,
+          self.row_type,
+          self.async_env_mock,
+      )
+
+    self.assertEqual(rows, sqlite_test_utils.get_db_rows())
+    self.mock_copy_db.assert_called_once()
+
+  def test_changed_database_is_pulled_again(self):
+    sqlite_utils.get_rows_from_remote_device(
+        self.table_name, self.remote_db_path, self.row_type, self.async_env_mock
+    )
+    conn = sqlite3.connect(self.remote_db_path)
+    conn.execute('DELETE FROM events')
+    conn.commit()
+    conn.close()
+
+    rows = sqlite_utils.get_rows_from_remote_device(
+        self.table_name, self.remote_db_path, self.row_type, self.async_env_mock
+    )
+
+    self.assertEmpty(rows)
+    self.assertEqual(self.mock_copy_db.call_count, 2)
+
+  def test_batched_writes_are_pushed_once(self):
+    rows = sqlite_test_utils.get_db_rows()
+
+    with sqlite_utils.open_remote_db(
+        self.remote_db_path, self.async_env_mock, app_name='TestApp'
+    ) as db:
+      db.delete_all_rows(self.table_name)
+      db.insert_rows(rows[:2], self.table_name, 'id')
+      self.assertEqual(db.count(self.table_name), 2)
+
+    self.mock_copy_data_to_device.assert_called_once()
+    self.mock_close_app.assert_called_once_with('TestApp', self.controller)
+    # The pushed database is mirrored, so reading it back needs no pull.
+    self.assertLen(
+        sqlite_utils.get_rows_from_remote_device(
+            self.table_name,
+            self.remote_db_path,
+            self.row_type,
+            self.async_env_mock,
+        ),
+        2,
+    )
+    self.mock_copy_db.assert_called_once()
+
+  def test_read_only_session_does_not_push(self):
+    with sqlite_utils.open_remote_db(
+        self.remote_db_path, self.async_env_mock, app_name='TestApp'
+    ) as db:
+      first_row = sqlite_test_utils.get_db_rows()[0]
+      self.assertEqual(
+          db.get_rows(
+              self.table_name, self.row_type, 'id = ?', (first_row.id,)
+          ),
+          [first_row],
+      )
+
+    self.mock_copy_data_to_device.assert_not_called()
+    self.mock_close_app.assert_not_called()
+
+  def test_table_exists(self):
+    self.assertTrue(
+        sqlite_utils.table_exists(
+            self.table_name, self.remote_db_path, self.async_env_mock
+        )
+    )
+    self.assertFalse(
+        sqlite_utils.table_exists(
+            'missing', self.remote_db_path, self.async_env_mock
+        )
+    )
+
+
 if __name__ == '__main__':
   absltest.main()
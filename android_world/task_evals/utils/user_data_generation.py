@@ -455,34 +455,64 @@ def _draw_text(text: str, font_size: int = 24) -> Image.Image:
   return img
 
 
+_CLEAR_INTERNAL_STORAGE_COMMAND = (
+    "find",
+    device_constants.EMULATOR_DATA,
+    "-mindepth",
+    "1",
+    "-type",
+    "f",  # Regular file.
+    "-delete",
+)
+
+_CLEAR_EXTERNAL_DOWNLOADS_COMMAND = (
+    "content",
+    "delete",
+    "--uri",
+    "content://media/external/downloads",
+)
+
+
 def clear_internal_storage(env: interface.AsyncEnv) -> None:
   """Deletes all files from internal storage, leaving directory structure intact."""
-  adb_command = [
-      "shell",
-      "find",
-      device_constants.EMULATOR_DATA,
-      "-mindepth",
-      "1",
-      "-type",
-      "f",  # Regular file.
-      "-delete",
-  ]
-  adb_utils.issue_generic_request(adb_command, env.controller)
+  adb_utils.issue_generic_request(
+      ["shell", *_CLEAR_INTERNAL_STORAGE_COMMAND], env.controller
+  )
 
 
 def _clear_external_downloads(env: interface.AsyncEnv) -> None:
   """Clears all external downloads directories on device."""
   adb_utils.issue_generic_request(
-      "shell content delete --uri content://media/external/downloads",
+      ["shell", *_CLEAR_EXTERNAL_DOWNLOADS_COMMAND],
       env.controller,
       timeout_sec=20,  # This can sometimes take longer than 5s.
   )
 
 
 def clear_device_storage(env: interface.AsyncEnv) -> None:
-  """Clears commonly used storage locations on device."""
-  clear_internal_storage(env)
-  _clear_external_downloads(env)
+  """Clears commonly used storage locations on device.
+
+  Equivalent to `clear_internal_storage` followed by
+  `_clear_external_downloads`, issued as a single adb round-trip.
+
+  Args:
+    env: The environment.
+  """
+  results = adb_utils.issue_batched_shell_commands(
+      [
+          list(_CLEAR_INTERNAL_STORAGE_COMMAND),
+          list(_CLEAR_EXTERNAL_DOWNLOADS_COMMAND),
+      ],
+      env.controller,
+      timeout_sec=30,  # Clearing downloads can sometimes take longer than 5s.
+  )
+  for result in results:
+    if not result.ok:
+      logging.warning(
+          "Failed to clear device storage: %r (%s)",
+          result.command,
+          result.output.strip(),
+      )
 
 
 # Family names taken verbatim from
@@ -12,7 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-"""Utils for handling snapshots for apps."""
+"""Utils for handling snapshots for apps.
+
+A snapshot of an app's data is stored on device as a single tar archive next
+to a fingerprint of the app's files as they were when they last matched the
+archive. Restoring is a single on-device command which is a no-op if the app's
+live data still matches the fingerprint.
+Snapshots saved as plain directory copies by older versions are still restored.
+"""
 
 from absl import logging
 from android_env import env_interface
@@ -20,20 +27,61 @@ from android_world.env import adb_utils
 from android_world.env import device_constants
 from android_world.utils import file_utils
 
+# Archiving and extracting large app data (e.g. maps) can take a while.
+_SNAPSHOT_TIMEOUT_SEC = 60.0
+
+# Exit code of the restore script when there is no archived snapshot.
+_NO_ARCHIVE_EXIT_CODE = 3
+
+_UNCHANGED = "snapshot unchanged"
+
+
+def _package_name(app_name: str) -> str:
+  return adb_utils.extract_package_name(adb_utils.get_adb_activity(app_name))
+
 
 def _app_data_path(app_name: str) -> str:
-  package_name = adb_utils.extract_package_name(
-      adb_utils.get_adb_activity(app_name)
+  return file_utils.convert_to_posix_path(
+      "/data/data/", _package_name(app_name)
   )
-  return file_utils.convert_to_posix_path("/data/data/", package_name)
 
 
 def _snapshot_path(app_name: str) -> str:
-  package_name = adb_utils.extract_package_name(
-      adb_utils.get_adb_activity(app_name)
-  )
+  """Location of snapshots stored as a directory copy of the app data."""
   return file_utils.convert_to_posix_path(
-      device_constants.SNAPSHOT_DATA, package_name
+      device_constants.SNAPSHOT_DATA, _package_name(app_name)
+  )
+
+
+def _archive_path(app_name: str) -> str:
+  return _snapshot_path(app_name) + ".tar"
+
+
+def _fingerprint_path(app_name: str) -> str:
+  return _snapshot_path(app_name) + ".fingerprint"
+
+
+def _fingerprint_command(directory: str) -> str:
+  """Shell command printing a fingerprint of all files in a directory.
+
+  The fingerprint is a digest of each file's path, size, inode and modification
+  and status change times, to the nanosecond, collected with a single
+  `find`/`stat` call, so it does not read file contents. The device clock is
+  reset to the same time for every task, so whole-second modification times
+  alone miss in-place, same-size writes, e.g. to a database page. Any write
+  updates the status change time, which cannot be set back. Extracting the
+  archive creates new inodes and status change times, so the fingerprint is
+  recomputed after each restore.
+
+  Args:
+    directory: Directory on device.
+
+  Returns:
+    The shell command.
+  """
+  return (
+      f"(cd {directory} && find . -type f -exec stat -c '%n %s %i %y %z' {{}}"
+      " + | sort | md5sum)"
   )
 
 
@@ -47,8 +95,17 @@ def clear_snapshot(
     app_name: Package name for the application snapshot to remove.
     env: Android environment.
   """
-  snapshot_path = _snapshot_path(app_name)
-  file_utils.clear_directory(snapshot_path, env)
+  adb_utils.issue_generic_request(
+      [
+          "shell",
+          "rm",
+          "-f",
+          _archive_path(app_name),
+          _fingerprint_path(app_name),
+      ],
+      env,
+  )
+  file_utils.clear_directory(_snapshot_path(app_name), env)
 
 
 def save_snapshot(app_name: str, env: env_interface.AndroidEnvInterface):
@@ -64,21 +121,86 @@ def save_snapshot(app_name: str, env: env_interface.AndroidEnvInterface):
   Raises:
     RuntimeError: on failed or incomplete snapshot.
   """
+  app_data_path = _app_data_path(app_name)
+  archive_path = _archive_path(app_name)
+  fingerprint_path = _fingerprint_path(app_name)
+  # Written to temporary files first so that a failure never leaves an archive
+  # next to the fingerprint of a different one.
+  script = " && ".join([
+      f"mkdir -p {device_constants.SNAPSHOT_DATA}",
+      f"tar -cf {archive_path}.tmp -C {app_data_path} .",
+      f"{_fingerprint_command(app_data_path)} > {fingerprint_path}.tmp",
+      f"mv {archive_path}.tmp {archive_path}",
+      f"mv {fingerprint_path}.tmp {fingerprint_path}",
+      f"rm -rf {_snapshot_path(app_name)}",
+  ])
+  (result,) = adb_utils.issue_batched_shell_commands(
+      [script], env, timeout_sec=_SNAPSHOT_TIMEOUT_SEC
+  )
+  if not result.ok:
+    raise RuntimeError(
+        f"Failed to save {app_name} snapshot: {result.output.strip()}"
+    )
+
+
+def _check_result(result: adb_utils.ShellResult, message: str) -> None:
+  if not result.ok:
+    raise RuntimeError(f"{message} {result.output.strip()}".strip())
+
+
+def _restore_directory_snapshot(
+    app_name: str, env: env_interface.AndroidEnvInterface
+) -> None:
+  """Restores a snapshot stored as a directory copy of the app data."""
   snapshot_path = _snapshot_path(app_name)
-  try:
-    file_utils.clear_directory(snapshot_path, env)
-  except RuntimeError:
-    logging.warn(
-        "Continuing to save %s snapshot after failing to clear prior snapshot.",
+  app_data_path = _app_data_path(app_name)
+
+  _, snapshot_exists = adb_utils.issue_batched_shell_commands(
+      [
+          ["am", "force-stop", _package_name(app_name)],
+          ["test", "-d", snapshot_path],
+      ],
+      env,
+  )
+  if not snapshot_exists.ok:
+    raise RuntimeError(f"Snapshot not found in {snapshot_path}.")
+
+  # File permissions, ownership, and security context may be lost during save
+  # and/or loading of the snapshot. As a workaround, restore the security
+  # context and open up full file permissions.
+  clear, mkdir, copy, restorecon, chmod = (
+      adb_utils.issue_batched_shell_commands(
+          [
+              ["rm", "-rf", f"{app_data_path}/*"],
+              ["mkdir", "-p", app_data_path],
+              ["cp", "-a", f"{snapshot_path}/.", f"{app_data_path}/"],
+              ["restorecon", "-RD", app_data_path],
+              ["chmod", "777", "-R", app_data_path],
+          ],
+          env,
+      )
+  )
+  if not clear.ok:
+    logging.warning(
+        "Continuing to restore %s snapshot after failing to clear application"
+        " data.",
         app_name,
     )
-
-  file_utils.copy_dir(_app_data_path(app_name), snapshot_path, env)
+  _check_result(mkdir, f"Failed to create directory {app_data_path}.")
+  _check_result(
+      copy, f"Failure copying {snapshot_path} directory to {app_data_path}."
+  )
+  _check_result(restorecon, "Failed to restore app data security context.")
+  _check_result(chmod, "Failed to set app data permissions.")
 
 
 def restore_snapshot(app_name: str, env: env_interface.AndroidEnvInterface):
   """Loads a snapshot of application data.
 
+  The app is always closed. Its data is only replaced if it no longer matches
+  the fingerprint stored with the snapshot, which is cheap to check since it
+  only looks at file metadata.
+
   Args:
     app_name: App package that will have its data overwritten with the stored
       snapshot.
@@ -88,36 +210,36 @@ def restore_snapshot(app_name: str, env: env_interface.AndroidEnvInterface):
     RuntimeError: when there is no available snapshot or a failure occurs while
       loading the snapshot.
   """
-  adb_utils.close_app(app_name, env)
-
-  snapshot_path = _snapshot_path(app_name)
-  if not file_utils.check_directory_exists(snapshot_path, env):
-    raise RuntimeError(f"Snapshot not found in {snapshot_path}.")
-
   app_data_path = _app_data_path(app_name)
-  try:
-    file_utils.clear_directory(app_data_path, env)
-  except RuntimeError:
-    logging.warn(
-        "Continuing to restore %s snapshot after failing to clear application"
-        " data.",
-        app_name,
-    )
-
-  file_utils.copy_dir(snapshot_path, app_data_path, env)
-
+  archive_path = _archive_path(app_name)
+  fingerprint_path = _fingerprint_path(app_name)
+  live_fingerprint = _fingerprint_command(app_data_path)
   # File permissions, ownership, and security context may be lost during save
   # and/or loading of the snapshot. As a workaround, restore the security
   # context and open up full file permissions.
-  adb_utils.check_ok(
-      adb_utils.issue_generic_request(
-          ["shell", "restorecon", "-RD", app_data_path], env
+  script = "; ".join([
+      f"am force-stop {_package_name(app_name)}",
+      f"[ -f {archive_path} ] || exit {_NO_ARCHIVE_EXIT_CODE}",
+      (
+          f"if [ -f {fingerprint_path} ] && [ \"$( {live_fingerprint} )\" ="
+          f" \"$(cat {fingerprint_path})\" ]; then echo {_UNCHANGED}; exit 0;"
+          " fi"
       ),
-      "Failed to restore app data security context.",
-  )
-  adb_utils.check_ok(
-      adb_utils.issue_generic_request(
-          ["shell", "chmod", "777", "-R", app_data_path], env
+      f"rm -rf {app_data_path}/*",
+      (
+          f"mkdir -p {app_data_path}"
+          f" && tar -xf {archive_path} -C {app_data_path}"
+          f" && restorecon -RD {app_data_path}"
+          f" && chmod 777 -R {app_data_path}"
+          f" && {live_fingerprint} > {fingerprint_path}"
       ),
-      "Failed to set app data permissions.",
+  ])
+  (result,) = adb_utils.issue_batched_shell_commands(
+      [script], env, timeout_sec=_SNAPSHOT_TIMEOUT_SEC
   )
+  if result.exit_code == _NO_ARCHIVE_EXIT_CODE:
+    _restore_directory_snapshot(app_name, env)
+    return
+  _check_result(result, f"Failed to restore {app_name} snapshot.")
+  if _UNCHANGED in result.output:
+    logging.info("%s data matches its snapshot, skipping restore.", app_name)
@@ -0,0 +1,219 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import subprocess
+import tempfile
+from unittest import mock
+
+from absl.testing import absltest
+from android_env import env_interface
+from android_env.proto import adb_pb2
+from android_world.env import adb_utils
+from android_world.env import device_constants
+from android_world.utils import app_snapshot
+
+
+def _results(commands, exit_codes):
+  return [
+      adb_utils.ShellResult(' '.join(command), code, '')
+      for command, code in zip(commands, exit_codes)
+  ]
+
+
+class RestoreDirectorySnapshotTest(absltest.TestCase):
+
+  def setUp(self):
+    super().setUp()
+    self.env = mock.create_autospec(env_interface.AndroidEnvInterface)
+    self.mock_batch = self.enter_context(
+        mock.patch.object(adb_utils, 'issue_batched_shell_commands')
+    )
+
+  def _set_exit_codes(self, *exit_codes_per_batch):
+    # The first batch is always the archive restore, which reports that there
+    # is no archive.
+    batches = iter([[3]] + list(exit_codes_per_batch))
+    self.mock_batch.side_effect = lambda commands, env, **_: _results(
+        commands, next(batches)
+    )
+
+  def test_restore_uses_three_round_trips(self):
+    self._set_exit_codes([0, 0], [0, 0, 0, 0, 0])
+
+    app_snapshot.restore_snapshot('clock', self.env)
+
+    self.assertEqual(self.mock_batch.call_count, 3)
+    commands = self.mock_batch.call_args_list[2].args[0]
+    self.assertIn(
+        [
+            'cp',
+            '-a',
+            '/data/data/android_world/snapshots/com.google.android.deskclock/.',
+            '/data/data/com.google.android.deskclock/',
+        ],
+        commands,
+    )
+
+  def test_missing_snapshot_raises(self):
+    self._set_exit_codes([0, 1])
+
+    with self.assertRaisesRegex(RuntimeError, 'Snapshot not found'):
+      app_snapshot.restore_snapshot('clock', self.env)
+    self.assertEqual(self.mock_batch.call_count, 2)
+
+  def test_failed_clear_is_not_fatal(self):
+    self._set_exit_codes([0, 0], [1, 0, 0, 0, 0])
+
+    app_snapshot.restore_snapshot('clock', self.env)
+
+  def test_failed_copy_raises(self):
+    self._set_exit_codes([0, 0], [0, 0, 1, 0, 0])
+
+    with self.assertRaisesRegex(RuntimeError, 'Failure copying'):
+      app_snapshot.restore_snapshot('clock', self.env)
+
+
+class ArchiveSnapshotTest(absltest.TestCase):
+  """Runs the snapshot scripts with the host shell on a fake device tree."""
+
+  def setUp(self):
+    super().setUp()
+    root = tempfile.mkdtemp()
+    self.addCleanup(shutil.rmtree, root)
+    self.app_data = os.path.join(root, 'data', 'com.example')
+    os.makedirs(os.path.join(self.app_data, 'databases'))
+    self._write('databases/app.db', 'rows')
+    self._write('shared_prefs.xml', 'prefs')
+
+    # Device-only tools are no-ops on the host.
+    bin_dir = os.path.join(root, 'bin')
+    os.makedirs(bin_dir)
+    for tool in ('am', 'restorecon'):
+      path = os.path.join(bin_dir, tool)
+      with open(path, 'w') as f:
+        f.write('#!/bin/sh\n')
+      os.chmod(path, 0o755)
+    self.shell_env = dict(os.environ, PATH=f'{bin_dir}:{os.environ["PATH"]}')
+
+    self.enter_context(
+        mock.patch.object(
+            device_constants,
+            'SNAPSHOT_DATA',
+            os.path.join(root, 'snapshots'),
+        )
+    )
+    self.enter_context(
+        mock.patch.object(
+            app_snapshot, '_app_data_path', return_value=self.app_data
+        )
+    )
+    self.enter_context(
+        mock.patch.object(
+            app_snapshot, '_package_name', return_value='com.example'
+        )
+    )
+    self.mock_issue_generic_request = self.enter_context(
+        mock.patch.object(
+            adb_utils, 'issue_generic_request', side_effect=self._run_locally
+        )
+    )
+    self.env = mock.create_autospec(env_interface.AndroidEnvInterface)
+
+  def _run_locally(self, args, unused_env, unused_timeout_sec=None):
+    completed = subprocess.run(
+        ['sh', '-c', ' '.join(args[1:])],
+        capture_output=True,
+        check=False,
+        env=self.shell_env,
+    )
+    return adb_pb2.AdbResponse(
+        status=adb_pb2.AdbResponse.Status.OK,
+        generic=adb_pb2.AdbResponse.GenericResponse(output=completed.stdout),
+    )
+
+  def _write(self, relative_path, content):
+    with open(os.path.join(self.app_data, relative_path), 'w') as f:
+      f.write(content)
+
+  def _read(self, relative_path):
+    with open(os.path.join(self.app_data, relative_path)) as f:
+      return f.read()
+
+  def test_restore_reverts_changes(self):
+    app_snapshot.save_snapshot('example', self.env)
+    self._write('databases/app.db', 'modified rows')
+    self._write('cache.tmp', 'new file')
+
+    app_snapshot.restore_snapshot('example', self.env)
+
+    self.assertEqual(self._read('databases/app.db'), 'rows')
+    self.assertFalse(os.path.exists(os.path.join(self.app_data, 'cache.tmp')))
+
+  def test_same_size_change_with_new_mtime_is_restored(self):
+    app_snapshot.save_snapshot('example', self.env)
+    path = os.path.join(self.app_data, 'databases/app.db')
+    mtime = os.stat(path).st_mtime
+    self._write('databases/app.db', 'ROWS')
+    os.utime(path, (mtime + 10, mtime + 10))
+
+    app_snapshot.restore_snapshot('example', self.env)
+
+    self.assertEqual(self._read('databases/app.db'), 'rows')
+
+  def test_same_size_change_with_same_mtime_is_restored(self):
+    app_snapshot.save_snapshot('example', self.env)
+    path = os.path.join(self.app_data, 'databases/app.db')
+    stat = os.stat(path)
+    self._write('databases/app.db', 'ROWS')
+    # As when the device clock was reset to the time of the snapshot.
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    app_snapshot.restore_snapshot('example', self.env)
+
+    self.assertEqual(self._read('databases/app.db'), 'rows')
+
+  def test_restore_skipped_when_unchanged(self):
+    app_snapshot.save_snapshot('example', self.env)
+
+    with self.assertLogs(level='INFO') as logs:
+      app_snapshot.restore_snapshot('example', self.env)
+
+    self.assertIn('skipping restore', '\n'.join(logs.output))
+    self.assertEqual(self._read('databases/app.db'), 'rows')
+
+  def test_restore_round_trip_keeps_fingerprint(self):
+    app_snapshot.save_snapshot('example', self.env)
+    self._write('databases/app.db', 'modified rows')
+    app_snapshot.restore_snapshot('example', self.env)
+
+    with self.assertLogs(level='INFO') as logs:
+      app_snapshot.restore_snapshot('example', self.env)
+
+    self.assertIn('skipping restore', '\n'.join(logs.output))
+
+  def test_clear_snapshot(self):
+    app_snapshot.save_snapshot('example', self.env)
+    self.enter_context(
+        mock.patch.object(app_snapshot.file_utils, 'clear_directory')
+    )
+
+    app_snapshot.clear_snapshot('example', self.env)
+
+    self.assertEmpty(os.listdir(device_constants.SNAPSHOT_DATA))
+
+
+if __name__ == '__main__':
+  absltest.main()
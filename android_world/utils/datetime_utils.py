@@ -19,6 +19,7 @@ import enum
 import random
 import zoneinfo
 
+from absl import logging
 from android_env import env_interface
 from android_env.proto import adb_pb2
 from android_world.env import adb_utils
@@ -99,6 +100,26 @@ class Toggle(enum.Enum):
   OFF = '0'
 
 
+# The (namespace, key, value) of the setting for the 24-hour time format.
+_24_HOUR_FORMAT_SETTING = (
+    adb_pb2.AdbRequest.SettingsRequest.Namespace.SYSTEM,
+    'time_12_24',
+    '24',
+)
+
+_SET_TIMEZONE_TO_UTC_COMMAND = ('service', 'call', 'alarm', '3', 's16', 'UTC')
+
+
+def _auto_settings(
+    toggle: Toggle,
+) -> list[tuple[adb_pb2.AdbRequest.SettingsRequest.Namespace, str, str]]:
+  """Returns the (namespace, key, value) of the automatic datetime settings."""
+  return [
+      (adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL, key, toggle.value)
+      for key in ('auto_time', 'auto_time_zone')
+  ]
+
+
 def toggle_auto_settings(
     env: env_interface.AndroidEnvInterface, toggle: Toggle
 ) -> None:
@@ -110,18 +131,8 @@ def toggle_auto_settings(
     env: AndroidEnv instance.
     toggle: Whether to enable or disable the settings.
   """
-  adb_utils.put_settings(
-      adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL,
-      'auto_time',
-      toggle.value,
-      env,
-  )
-  adb_utils.put_settings(
-      adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL,
-      'auto_time_zone',
-      toggle.value,
-      env,
-  )
+  for setting in _auto_settings(toggle):
+    adb_utils.put_settings(*setting, env)
 
 
 def setup_datetime(env: env_interface.AndroidEnvInterface) -> None:
@@ -136,9 +147,24 @@ def setup_datetime(env: env_interface.AndroidEnvInterface) -> None:
     env: AndroidEnv instance.
   """
   adb_utils.set_root_if_needed(env)
-  toggle_auto_settings(env, Toggle.OFF)
-  _enable_24_hour_format(env)
-  _set_timezone_to_utc(env)
+  # Equivalent to `toggle_auto_settings(env, Toggle.OFF)`,
+  # `_enable_24_hour_format(env)` and `_set_timezone_to_utc(env)`, issued as a
+  # single adb round-trip.
+  results = adb_utils.issue_batched_shell_commands(
+      [
+          adb_utils.put_settings_command(*setting)
+          for setting in _auto_settings(Toggle.OFF) + [_24_HOUR_FORMAT_SETTING]
+      ]
+      + [list(_SET_TIMEZONE_TO_UTC_COMMAND)],
+      env,
+  )
+  for result in results:
+    if not result.ok:
+      logging.warning(
+          'Datetime setup command failed: %r (%s)',
+          result.command,
+          result.output.strip(),
+      )
 
 
 def set_datetime(
@@ -185,12 +211,7 @@ def advance_system_time(
 
 def _enable_24_hour_format(env: env_interface.AndroidEnvInterface) -> None:
   """Sets to 24-hour time format to be consistent and region-independent."""
-  adb_utils.put_settings(
-      adb_pb2.AdbRequest.SettingsRequest.Namespace.SYSTEM,
-      'time_12_24',
-      '24',
-      env,
-  )
+  adb_utils.put_settings(*_24_HOUR_FORMAT_SETTING, env)
 
 
 def _set_timezone_to_utc(env: env_interface.AndroidEnvInterface) -> None:
@@ -199,8 +220,9 @@ def _set_timezone_to_utc(env: env_interface.AndroidEnvInterface) -> None:
   Args:
       env: An instance of AndroidEnv interface.
   """
-  adb_command = ['shell', 'service', 'call', 'alarm', '3', 's16', 'UTC']
-  adb_utils.issue_generic_request(adb_command, env)
+  adb_utils.issue_generic_request(
+      ['shell', *_SET_TIMEZONE_TO_UTC_COMMAND], env
+  )
 
 
 def _set_datetime(
@@ -27,14 +27,32 @@ from android_world.utils import datetime_utils
 @mock.patch.object(adb_utils, 'issue_generic_request')
 class AdbDatetimeManagerTest(absltest.TestCase):
 
-  @mock.patch.object(adb_utils, 'put_settings')
+  @mock.patch.object(adb_utils, 'issue_batched_shell_commands')
   def test_setup_datetime_environment(
-      self, mock_put_settings, unused_mock_issue_generic_request
+      self, mock_issue_batched_shell_commands, unused_mock_issue_generic_request
   ):
     env_mock = mock.create_autospec(env_interface.AndroidEnvInterface)
 
     datetime_utils.setup_datetime(env_mock)
 
+    mock_issue_batched_shell_commands.assert_called_once_with(
+        [
+            ['settings', 'put', 'global', 'auto_time', '0'],
+            ['settings', 'put', 'global', 'auto_time_zone', '0'],
+            ['settings', 'put', 'system', 'time_12_24', '24'],
+            ['service', 'call', 'alarm', '3', 's16', 'UTC'],
+        ],
+        env_mock,
+    )
+
+  @mock.patch.object(adb_utils, 'put_settings')
+  def test_toggle_auto_settings(
+      self, mock_put_settings, unused_mock_issue_generic_request
+  ):
+    env_mock = mock.create_autospec(env_interface.AndroidEnvInterface)
+
+    datetime_utils.toggle_auto_settings(env_mock, datetime_utils.Toggle.OFF)
+
     expected_calls = [
         mock.call(
             adb_pb2.AdbRequest.SettingsRequest.Namespace.GLOBAL,
@@ -48,12 +66,6 @@ class AdbDatetimeManagerTest(absltest.TestCase):
             '0',
             env_mock,
         ),
-        mock.call(
-            adb_pb2.AdbRequest.SettingsRequest.Namespace.SYSTEM,
-            'time_12_24',
-            '24',
-            env_mock,
-        ),
     ]
     mock_put_settings.assert_has_calls(expected_calls, any_order=False)
 
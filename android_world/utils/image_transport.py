@@ -0,0 +1,136 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Binary encoding of screenshots sent between the server and its clients.
+
+Sending a frame as a JSON list of ints costs seconds and hundreds of MB per
+call. Frames are instead sent as raw bytes, with their shape and dtype in
+headers, or as PNG or JPEG images.
+"""
+
+from collections.abc import Mapping
+import enum
+
+import cv2
+import numpy as np
+
+SHAPE_HEADER = 'X-Image-Shape'
+DTYPE_HEADER = 'X-Image-Dtype'
+
+_RAW_MEDIA_TYPE = 'application/octet-stream'
+_PNG_MEDIA_TYPE = 'image/png'
+_JPEG_MEDIA_TYPE = 'image/jpeg'
+
+# Favors encoding speed over size; PNG is lossless at any level.
+_PNG_COMPRESSION = 1
+
+
+class Encoding(str, enum.Enum):
+  """How a frame is encoded."""
+
+  # The array bytes, with the shape and dtype in headers. Cheapest to encode
+  # and decode, largest on the wire.
+  RAW = 'raw'
+  # A lossless PNG image.
+  PNG = 'png'
+  # A JPEG image, at a given quality.
+  JPEG = 'jpeg'
+
+
+def _resize(pixels: np.ndarray, max_long_edge: int | None) -> np.ndarray:
+  height, width = pixels.shape[:2]
+  if not max_long_edge or max(height, width) <= max_long_edge:
+    return pixels
+  scale = max_long_edge / max(height, width)
+  return cv2.resize(
+      pixels,
+      (max(1, round(width * scale)), max(1, round(height * scale))),
+      interpolation=cv2.INTER_AREA,
+  )
+
+
+def encode(
+    pixels: np.ndarray,
+    encoding: Encoding,
+    jpeg_quality: int = 75,
+    max_long_edge: int | None = None,
+) -> tuple[bytes, str, dict[str, str]]:
+  """Encodes an RGB frame.
+
+  Args:
+    pixels: The RGB frame.
+    encoding: How to encode the frame.
+    jpeg_quality: For `JPEG`, the JPEG quality, from 0 to 100.
+    max_long_edge: If set, the frame is downscaled so its longer edge has at
+      most this many pixels.
+
+  Returns:
+    The encoded frame, its media type and the headers to send with it.
+  """
+  pixels = _resize(pixels, max_long_edge)
+  if encoding == Encoding.RAW:
+    pixels = np.ascontiguousarray(pixels)
+    headers = {
+        SHAPE_HEADER: ','.join(str(dim) for dim in pixels.shape),
+        DTYPE_HEADER: pixels.dtype.str,
+    }
+    return pixels.tobytes(), _RAW_MEDIA_TYPE, headers
+
+  bgr = cv2.cvtColor(pixels.astype(np.uint8, copy=False), cv2.COLOR_RGB2BGR)
+  if encoding == Encoding.PNG:
+    ok, buffer = cv2.imencode(
+        '.png', bgr, [cv2.IMWRITE_PNG_COMPRESSION, _PNG_COMPRESSION]
+    )
+    media_type = _PNG_MEDIA_TYPE
+  else:
+    ok, buffer = cv2.imencode(
+        '.jpg', bgr, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality]
+    )
+    media_type = _JPEG_MEDIA_TYPE
+  if not ok:
+    raise ValueError(f'Failed to encode frame of shape {pixels.shape}.')
+  return buffer.tobytes(), media_type, {}
+
+
+def decode(
+    content: bytes | memoryview, headers: Mapping[str, str]
+) -> np.ndarray:
+  """Decodes a frame encoded by `encode`.
+
+  Args:
+    content: The encoded frame.
+    headers: The headers it was sent with. Lookups must be case-insensitive,
+      as they are for HTTP response headers.
+
+  Returns:
+    The RGB frame.
+
+  Raises:
+    ValueError: If the frame cannot be decoded.
+  """
+  media_type = headers.get('Content-Type', '').split(';')[0].strip()
+  if media_type == _RAW_MEDIA_TYPE:
+    try:
+      shape = tuple(int(dim) for dim in headers[SHAPE_HEADER].split(','))
+      dtype = np.dtype(headers.get(DTYPE_HEADER, '|u1'))
+    except (KeyError, ValueError, TypeError) as e:
+      raise ValueError(f'Invalid raw frame headers: {e}') from e
+    # Copied so the frame is writable, like decoded images.
+    return np.frombuffer(content, dtype=dtype).reshape(shape).copy()
+  if media_type not in (_PNG_MEDIA_TYPE, _JPEG_MEDIA_TYPE):
+    raise ValueError(f'Unsupported frame media type: {media_type!r}')
+  bgr = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+  if bgr is None:
+    raise ValueError('Failed to decode frame.')
+  return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
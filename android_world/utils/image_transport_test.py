@@ -0,0 +1,69 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from absl.testing import absltest
+from absl.testing import parameterized
+from android_world.utils import image_transport
+import numpy as np
+
+
+def _frame() -> np.ndarray:
+  frame = np.zeros((240, 108, 3), dtype=np.uint8)
+  frame[:120, :, 0] = 255
+  frame[120:, :, 2] = 255
+  return frame
+
+
+def _round_trip(frame: np.ndarray, encoding, **kwargs) -> np.ndarray:
+  content, media_type, headers = image_transport.encode(
+      frame, encoding, **kwargs
+  )
+  return image_transport.decode(
+      content, {'Content-Type': media_type, **headers}
+  )
+
+
+class ImageTransportTest(parameterized.TestCase):
+
+  @parameterized.parameters(
+      image_transport.Encoding.RAW, image_transport.Encoding.PNG
+  )
+  def test_lossless(self, encoding):
+    frame = _frame()
+
+    decoded = _round_trip(frame, encoding)
+
+    np.testing.assert_array_equal(decoded, frame)
+    decoded[0, 0] = 0  # Decoded frames are writable.
+
+  def test_jpeg(self):
+    decoded = _round_trip(_frame(), image_transport.Encoding.JPEG)
+
+    self.assertEqual(decoded.shape, (240, 108, 3))
+    self.assertGreater(decoded[10, 10, 0], 200)
+    self.assertLess(decoded[10, 10, 2], 50)
+
+  @parameterized.parameters(list(image_transport.Encoding))
+  def test_max_long_edge(self, encoding):
+    decoded = _round_trip(_frame(), encoding, max_long_edge=120)
+
+    self.assertEqual(decoded.shape, (120, 54, 3))
+
+  def test_decode_rejects_unknown_media_type(self):
+    with self.assertRaises(ValueError):
+      image_transport.decode(b'', {'Content-Type': 'application/json'})
+
+
+if __name__ == '__main__':
+  absltest.main()
@@ -0,0 +1,45 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""JPEG-compressed frames, as kept in step data instead of arrays."""
+
+import dataclasses
+
+import cv2
+import numpy as np
+
+
+@dataclasses.dataclass(frozen=True)
+class JpegFrame:
+  """A JPEG-compressed RGB frame.
+
+  Attributes:
+    data: The JPEG bytes.
+    shape: The shape of the decoded frame.
+  """
+
+  data: bytes
+  shape: tuple[int, ...]
+
+  def decode(self) -> np.ndarray:
+    """Returns the frame as an RGB array."""
+    bgr = cv2.imdecode(np.frombuffer(self.data, np.uint8), cv2.IMREAD_COLOR)
+    return cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+
+
+def to_array(frame: np.ndarray | JpegFrame | None) -> np.ndarray | None:
+  """Returns a frame kept in step data as an array."""
+  if isinstance(frame, JpegFrame):
+    return frame.decode()
+  return frame
@@ -0,0 +1,44 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from absl.testing import absltest
+from android_world.utils import jpeg_frame
+import cv2
+import numpy as np
+
+
+class JpegFrameTest(absltest.TestCase):
+
+  def test_to_array_decodes_jpeg_frames(self):
+    frame = np.zeros((20, 10, 3), dtype=np.uint8)
+    frame[..., 0] = 255  # Red.
+    _, data = cv2.imencode('.jpg', cv2.cvtColor(frame, cv2.COLOR_RGB2BGR))
+
+    decoded = jpeg_frame.to_array(
+        jpeg_frame.JpegFrame(data.tobytes(), (20, 10, 3))
+    )
+
+    self.assertEqual(decoded.shape, (20, 10, 3))
+    self.assertGreater(decoded[5, 5, 0], 200)
+    self.assertLess(decoded[5, 5, 1], 50)
+
+  def test_to_array_keeps_arrays(self):
+    frame = np.zeros((20, 10, 3), dtype=np.uint8)
+
+    self.assertIs(jpeg_frame.to_array(frame), frame)
+    self.assertIsNone(jpeg_frame.to_array(None))
+
+
+if __name__ == '__main__':
+  absltest.main()
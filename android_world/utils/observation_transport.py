@@ -0,0 +1,118 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Packs a screenshot and its UI elements into a single binary message.
+
+A message is a 4-byte big-endian length, followed by a JSON header of that
+length and by the screenshot encoded with `image_transport`. The header holds
+the UI elements, how the screenshot is encoded and any extra fields, such as
+the result of the action that led to the observation. The same message is
+sent as an HTTP response body or as a WebSocket binary message.
+"""
+
+import dataclasses
+import json
+import struct
+from typing import Any
+
+from android_world.env import representation_utils
+from android_world.utils import image_transport
+import numpy as np
+
+MEDIA_TYPE = 'application/x-android-world-observation'
+
+_LENGTH = struct.Struct('>I')
+
+
+@dataclasses.dataclass(frozen=True)
+class Observation:
+  """A decoded observation.
+
+  Attributes:
+    pixels: The RGB screenshot.
+    ui_elements: The UI elements on screen.
+    info: The extra fields the observation was encoded with.
+  """
+
+  pixels: np.ndarray
+  ui_elements: list[representation_utils.UIElement]
+  info: dict[str, Any]
+
+
+def encode(
+    pixels: np.ndarray,
+    ui_elements: list[representation_utils.UIElement],
+    encoding: image_transport.Encoding = image_transport.Encoding.RAW,
+    jpeg_quality: int = 75,
+    max_long_edge: int | None = None,
+    **info: Any,
+) -> bytes:
+  """Encodes an observation.
+
+  Args:
+    pixels: The RGB screenshot.
+    ui_elements: The UI elements on screen.
+    encoding: How to encode the screenshot.
+    jpeg_quality: For `JPEG`, the JPEG quality, from 0 to 100.
+    max_long_edge: If set, the screenshot is downscaled so its longer edge has
+      at most this many pixels. UI element coordinates are not rescaled.
+    **info: Extra JSON-serializable fields.
+
+  Returns:
+    The encoded observation.
+  """
+  content, media_type, image_headers = image_transport.encode(
+      pixels, encoding, jpeg_quality=jpeg_quality, max_long_edge=max_long_edge
+  )
+  header = json.dumps(
+      {
+          'info': info,
+          'image_media_type': media_type,
+          'image_headers': image_headers,
+          'ui_elements': [
+              representation_utils.ui_element_to_dict(element)
+              for element in ui_elements
+          ],
+      },
+      # UI element metadata may hold values JSON does not support.
+      default=str,
+  ).encode('utf-8')
+  return b''.join((_LENGTH.pack(len(header)), header, content))
+
+
+def decode(data: bytes) -> Observation:
+  """Decodes an observation encoded by `encode`.
+
+  Raises:
+    ValueError: If the observation cannot be decoded.
+  """
+  if len(data) < _LENGTH.size:
+    raise ValueError('Truncated observation.')
+  (header_length,) = _LENGTH.unpack_from(data)
+  header_end = _LENGTH.size + header_length
+  if len(data) < header_end:
+    raise ValueError('Truncated observation.')
+  header = json.loads(data[_LENGTH.size : header_end])
+  pixels = image_transport.decode(
+      memoryview(data)[header_end:],
+      {'Content-Type': header['image_media_type'], **header['image_headers']},
+  )
+  return Observation(
+      pixels=pixels,
+      ui_elements=[
+          representation_utils.ui_element_from_dict(element)
+          for element in header['ui_elements']
+      ],
+      info=header['info'],
+  )
@@ -0,0 +1,65 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from absl.testing import absltest
+from android_world.env import representation_utils
+from android_world.utils import image_transport
+from android_world.utils import observation_transport
+import numpy as np
+
+
+class ObservationTransportTest(absltest.TestCase):
+
+  def test_round_trip(self):
+    pixels = np.arange(24 * 12 * 3, dtype=np.uint8).reshape(24, 12, 3)
+    ui_elements = [
+        representation_utils.UIElement(
+            text='OK',
+            bbox_pixels=representation_utils.BoundingBox(1, 5, 2, 8),
+            is_clickable=True,
+        ),
+        representation_utils.UIElement(metadata={'array': np.zeros(1)}),
+    ]
+
+    observation = observation_transport.decode(
+        observation_transport.encode(pixels, ui_elements, status='success')
+    )
+
+    np.testing.assert_array_equal(observation.pixels, pixels)
+    self.assertEqual(observation.ui_elements[0], ui_elements[0])
+    self.assertIsInstance(observation.ui_elements[1].metadata['array'], str)
+    self.assertEqual(observation.info, {'status': 'success'})
+
+  def test_image_encoding(self):
+    pixels = np.zeros((240, 120, 3), dtype=np.uint8)
+
+    observation = observation_transport.decode(
+        observation_transport.encode(
+            pixels, [], image_transport.Encoding.JPEG, max_long_edge=60
+        )
+    )
+
+    self.assertEqual(observation.pixels.shape, (60, 30, 3))
+    self.assertEmpty(observation.ui_elements)
+
+  def test_truncated(self):
+    data = observation_transport.encode(np.zeros((2, 2, 3), np.uint8), [])
+
+    for length in (2, 10):
+      with self.assertRaises(ValueError):
+        observation_transport.decode(data[:length])
+
+
+if __name__ == '__main__':
+  absltest.main()
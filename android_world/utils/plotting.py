@@ -18,6 +18,7 @@ import copy
 from typing import Any
 from android_world.env import interface
 from android_world.env import representation_utils
+from android_world.utils import jpeg_frame
 from matplotlib import patches
 import matplotlib.pyplot as plt
 import numpy as np
@@ -159,13 +160,13 @@ def plot_ui_elements(
 
 
 def _plot_episode(
-    screens: list[np.ndarray],
+    screens: list[np.ndarray | jpeg_frame.JpegFrame],
     title: str,
 ) -> None:
   """Plots an episode in a grid format.
 
   Args:
-    screens: List of screen images.
+    screens: List of screen images, as kept in step data by a `FrameStore`.
     title: The title.
   """
   num_screens = len(screens)
@@ -182,7 +183,8 @@ def _plot_episode(
     row = i // num_columns
     col = i % num_columns
     ax = axs[row, col]
-    ax.imshow(screen, aspect='auto')  # Use 'auto' to avoid distortion
+    # Use 'auto' to avoid distortion.
+    ax.imshow(jpeg_frame.to_array(screen), aspect='auto')
     ax.axis('off')  # Turn off axes
 
   for j in range(i + 1, num_rows * num_columns):
@@ -30,8 +30,10 @@ from android_world import checkpointer as checkpointer_lib
 from android_world import registry
 from android_world import suite_utils
 from android_world.agents import base_agent
+from android_world.agents import frame_store as frame_store_lib
 from android_world.agents import human_agent
 from android_world.agents import infer
+from android_world.agents import llm_cache
 from android_world.agents import m3a
 from android_world.agents import random_agent
 from android_world.agents import seeact
@@ -81,6 +83,19 @@ _DEVICE_CONSOLE_PORT = flags.DEFINE_integer(
     ' first connected device is port 5554, the second is 5556, and'
     ' so on.',
 )
+_DEVICE_CONSOLE_PORTS = flags.DEFINE_list(
+    'console_ports',
+    None,
+    'Console ports of several running Android devices to run the suite on in'
+    ' parallel, e.g. 5554,5556. Overrides --console_port. Must be paired with'
+    ' --grpc_ports.',
+)
+_DEVICE_GRPC_PORTS = flags.DEFINE_list(
+    'grpc_ports',
+    None,
+    'gRPC ports of the devices given by --console_ports, in the same order,'
+    ' e.g. 8554,8555.',
+)
 
 _SUITE_FAMILY = flags.DEFINE_enum(
     'suite_family',
@@ -120,6 +135,13 @@ _CHECKPOINT_DIR = flags.DEFINE_string(
     ' the latest checkpoint. If the directory is empty or does not exist, a new'
     ' directory will be created.',
 )
+_EXTERNALIZE_ARRAYS = flags.DEFINE_boolean(
+    'externalize_arrays',
+    False,
+    'Whether to store screenshots and other large arrays from episode data as'
+    ' uncompressed, deduplicated .npy files next to the checkpoint instead of'
+    ' pickling them, so they can be memory-mapped when viewing results.',
+)
 _OUTPUT_PATH = flags.DEFINE_string(
     'output_path',
     os.path.expanduser('~/android_world/runs'),
@@ -130,6 +152,82 @@ _OUTPUT_PATH = flags.DEFINE_string(
 # Agent specific.
 _AGENT_NAME = flags.DEFINE_string('agent_name', 'm3a_gpt4v', help='Agent name.')
 
+_OVERLAP_SUMMARY = flags.DEFINE_boolean(
+    'overlap_summary',
+    False,
+    'For M3A and T3A, whether to request the summary of a step in the'
+    ' background and only wait for it once the next step has captured the new'
+    ' screen, overlapping the summary LLM call with the device.',
+)
+
+_LLM_MAX_CONCURRENT_REQUESTS = flags.DEFINE_integer(
+    'llm_max_concurrent_requests',
+    None,
+    'If set, the maximum number of LLM API requests in flight at once across'
+    ' all agents.',
+)
+_LLM_REQUESTS_PER_MINUTE = flags.DEFINE_float(
+    'llm_requests_per_minute',
+    None,
+    'If set, the maximum rate of LLM API requests across all agents.',
+)
+
+_LLM_CACHE_MODE = flags.DEFINE_enum(
+    'llm_cache_mode',
+    'off',
+    ['off', 'record', 'replay'],
+    'For M3A and T3A, whether to cache LLM responses on disk. "record" answers'
+    ' repeated requests from the cache and stores new responses; "replay"'
+    ' only answers from the cache and fails on requests that are not in it.',
+)
+_LLM_CACHE_DIR = flags.DEFINE_string(
+    'llm_cache_dir',
+    None,
+    'Directory of the LLM response cache. Defaults to a directory under the'
+    ' local temporary directory.',
+)
+
+_LLM_IMAGE_MAX_LONG_EDGE = flags.DEFINE_integer(
+    'llm_image_max_long_edge',
+    None,
+    'If set, screenshots in M3A prompts are downscaled so that their longer'
+    ' edge has at most this many pixels. Gemini models then receive them as'
+    ' JPEGs instead of lossless WebP.',
+)
+
+_FRAME_ENCODING = flags.DEFINE_enum(
+    'frame_encoding',
+    'array',
+    ['array', 'downsampled', 'jpeg'],
+    'How M3A and T3A keep screenshots in episode data: as full resolution'
+    ' arrays, as arrays downscaled to --frame_max_long_edge, or as JPEGs.'
+    ' Identical screenshots are kept once either way.',
+)
+_FRAME_MAX_LONG_EDGE = flags.DEFINE_integer(
+    'frame_max_long_edge',
+    None,
+    'Number of pixels the longer edge of screenshots kept in episode data is'
+    ' downscaled to, for the "downsampled" and "jpeg" frame encodings.',
+)
+
+_STABILIZATION_QUIET_PERIOD = flags.DEFINE_float(
+    'stabilization_quiet_period',
+    None,
+    'If set, when waiting for the screen to stabilize, return as soon as the UI'
+    ' tree has not changed for this many seconds instead of polling for'
+    ' several identical observations.',
+)
+
+_TEXT_INPUT_METHOD = flags.DEFINE_enum(
+    'text_input_method',
+    'words',
+    ['words', 'clipboard', 'auto'],
+    'How text is entered for input_text actions. "words" types one word per'
+    ' adb request; "clipboard" pastes the text through the Clipper app, falling'
+    ' back to "words" on failure; "auto" pastes only long or non-ASCII text.'
+    ' Pasting overwrites the device clipboard, which clipboard tasks inspect.',
+)
+
 _FIXED_TASK_SEED = flags.DEFINE_boolean(
     'fixed_task_seed',
     False,
@@ -150,6 +248,19 @@ _MINIWOB_ADDITIONAL_GUIDELINES = [
 ]
 
 
+def _maybe_cache(
+    llm: infer.LlmWrapper | infer.MultimodalLlmWrapper,
+) -> infer.LlmWrapper | infer.MultimodalLlmWrapper:
+  """Wraps the LLM in a response cache if --llm_cache_mode is set."""
+  if _LLM_CACHE_MODE.value == 'off':
+    return llm
+  return llm_cache.CachingLlmWrapper(
+      llm,
+      cache_dir=_LLM_CACHE_DIR.value,
+      mode=llm_cache.Mode(_LLM_CACHE_MODE.value),
+  )
+
+
 def _get_agent(
     env: interface.AsyncEnv,
     family: str | None = None,
@@ -157,6 +268,15 @@ def _get_agent(
   """Gets agent."""
   print('Initializing agent...')
   agent = None
+  frame_store = frame_store_lib.FrameStore(
+      encoding=frame_store_lib.Encoding(_FRAME_ENCODING.value),
+      max_long_edge=_FRAME_MAX_LONG_EDGE.value,
+  )
+  image_encoding = None
+  if _LLM_IMAGE_MAX_LONG_EDGE.value:
+    image_encoding = infer.ImageEncoding(
+        max_long_edge=_LLM_IMAGE_MAX_LONG_EDGE.value
+    )
   if _AGENT_NAME.value == 'human_agent':
     agent = human_agent.HumanAgent(env)
   elif _AGENT_NAME.value == 'random_agent':
@@ -164,17 +284,44 @@ def _get_agent(
   # Gemini.
   elif _AGENT_NAME.value == 'm3a_gemini_gcp':
     agent = m3a.M3A(
-        env, infer.GeminiGcpWrapper(model_name='gemini-1.5-pro-latest')
+        env,
+        _maybe_cache(
+            infer.GeminiGcpWrapper(
+                model_name='gemini-1.5-pro-latest',
+                image_encoding=image_encoding,
+            )
+        ),
+        overlap_summary=_OVERLAP_SUMMARY.value,
+        frame_store=frame_store,
     )
   elif _AGENT_NAME.value == 't3a_gemini_gcp':
     agent = t3a.T3A(
-        env, infer.GeminiGcpWrapper(model_name='gemini-1.5-pro-latest')
+        env,
+        _maybe_cache(
+            infer.GeminiGcpWrapper(model_name='gemini-1.5-pro-latest')
+        ),
+        overlap_summary=_OVERLAP_SUMMARY.value,
+        frame_store=frame_store,
     )
   # GPT.
   elif _AGENT_NAME.value == 't3a_gpt4':
-    agent = t3a.T3A(env, infer.Gpt4Wrapper('gpt-4-turbo-2024-04-09'))
+    agent = t3a.T3A(
+        env,
+        _maybe_cache(infer.Gpt4Wrapper('gpt-4-turbo-2024-04-09')),
+        overlap_summary=_OVERLAP_SUMMARY.value,
+        frame_store=frame_store,
+    )
   elif _AGENT_NAME.value == 'm3a_gpt4v':
-    agent = m3a.M3A(env, infer.Gpt4Wrapper('gpt-4-turbo-2024-04-09'))
+    agent = m3a.M3A(
+        env,
+        _maybe_cache(
+            infer.Gpt4Wrapper(
+                'gpt-4-turbo-2024-04-09', image_encoding=image_encoding
+            )
+        ),
+        overlap_summary=_OVERLAP_SUMMARY.value,
+        frame_store=frame_store,
+    )
   # SeeAct.
   elif _AGENT_NAME.value == 'seeact':
     agent = seeact.SeeAct(env)
@@ -196,11 +343,21 @@ def _get_agent(
 
 def _main() -> None:
   """Runs eval suite and gets rewards back."""
-  env = env_launcher.load_and_setup_env(
-      console_port=_DEVICE_CONSOLE_PORT.value,
-      emulator_setup=_EMULATOR_SETUP.value,
-      adb_path=_ADB_PATH.value,
-  )
+  if _DEVICE_CONSOLE_PORTS.value:
+    envs = env_launcher.load_and_setup_envs(
+        console_ports=[int(port) for port in _DEVICE_CONSOLE_PORTS.value],
+        grpc_ports=[int(port) for port in _DEVICE_GRPC_PORTS.value or []],
+        emulator_setup=_EMULATOR_SETUP.value,
+        adb_path=_ADB_PATH.value,
+    )
+  else:
+    envs = [
+        env_launcher.load_and_setup_env(
+            console_port=_DEVICE_CONSOLE_PORT.value,
+            emulator_setup=_EMULATOR_SETUP.value,
+            adb_path=_ADB_PATH.value,
+        )
+    ]
 
   n_task_combinations = _N_TASK_COMBINATIONS.value
   task_registry = registry.TaskRegistry()
@@ -213,13 +370,22 @@ def _main() -> None:
   )
   suite.suite_family = _SUITE_FAMILY.value
 
-  agent = _get_agent(env, _SUITE_FAMILY.value)
+  for env in envs:
+    env.stabilization_quiet_period = _STABILIZATION_QUIET_PERIOD.value
+    env.controller.text_input_method = _TEXT_INPUT_METHOD.value
+  infer.set_request_limits(
+      max_concurrent_requests=_LLM_MAX_CONCURRENT_REQUESTS.value,
+      requests_per_minute=_LLM_REQUESTS_PER_MINUTE.value,
+  )
+  agents = [_get_agent(env, _SUITE_FAMILY.value) for env in envs]
 
-  if _SUITE_FAMILY.value.startswith('miniwob'):
-    # MiniWoB pages change quickly, don't need to wait for screen to stabilize.
-    agent.transition_pause = _MINIWOB_TRANSITION_PAUSE
-  else:
-    agent.transition_pause = None
+  for agent in agents:
+    if _SUITE_FAMILY.value.startswith('miniwob'):
+      # MiniWoB pages change quickly, don't need to wait for screen to
+      # stabilize.
+      agent.transition_pause = _MINIWOB_TRANSITION_PAUSE
+    else:
+      agent.transition_pause = None
 
   if _CHECKPOINT_DIR.value:
     checkpoint_dir = _CHECKPOINT_DIR.value
@@ -230,17 +396,24 @@ def _main() -> None:
       f'Starting eval with agent {_AGENT_NAME.value} and writing to'
       f' {checkpoint_dir}'
   )
-  suite_utils.run(
-      suite,
-      agent,
-      checkpointer=checkpointer_lib.IncrementalCheckpointer(checkpoint_dir),
-      demo_mode=False,
+  checkpointer = checkpointer_lib.IncrementalCheckpointer(
+      checkpoint_dir, externalize_arrays=_EXTERNALIZE_ARRAYS.value
   )
+  if len(agents) > 1:
+    suite_utils.run_parallel(suite, agents, checkpointer=checkpointer)
+  else:
+    suite_utils.run(
+        suite,
+        agents[0],
+        checkpointer=checkpointer,
+        demo_mode=False,
+    )
   print(
       f'Finished running agent {_AGENT_NAME.value} on {_SUITE_FAMILY.value}'
       f' family. Wrote to {checkpoint_dir}.'
   )
-  env.close()
+  for env in envs:
+    env.close()
 
 
 def main(argv: Sequence[str]) -> None:
@@ -26,18 +26,30 @@ repository directory
 After running the server, you can use the client to interact with the
 environment. You'll need to implement your agent logic to interact with the
 environment.
+
+If the server manages several emulators, the tasks are run in parallel, one
+session per emulator.
 """
 
+from concurrent import futures
 import json
 import logging
 import time
 from typing import Any
 
 from android_world.env import json_action
+from android_world.utils import image_transport
+from android_world.utils import observation_transport
 import numpy as np
 import pydantic
 import requests
 
+try:
+  # websocket-client, only needed for `AndroidEnvClient.open_step_stream`.
+  import websocket
+except ImportError:
+  websocket = None
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
@@ -49,35 +61,150 @@ class Response(pydantic.BaseModel):
   message: str
 
 
+def _step_params(
+    encoding: image_transport.Encoding,
+    jpeg_quality: int,
+    max_long_edge: int | None,
+    wait_to_stabilize: bool,
+) -> dict[str, Any]:
+  params = {
+      "encoding": image_transport.Encoding(encoding).value,
+      "jpeg_quality": jpeg_quality,
+      "wait_to_stabilize": wait_to_stabilize,
+  }
+  if max_long_edge is not None:
+    params["max_long_edge"] = max_long_edge
+  return params
+
+
+class StepStream:
+  """A persistent WebSocket connection that executes steps on a device."""
+
+  def __init__(self, connection: Any):
+    self._connection = connection
+
+  def step(
+      self,
+      action: json_action.JSONAction | None = None,
+      wait_to_stabilize: bool = False,
+      encoding: image_transport.Encoding = image_transport.Encoding.RAW,
+      jpeg_quality: int = 75,
+      max_long_edge: int | None = None,
+  ) -> observation_transport.Observation:
+    """Executes an action, if any, and returns the next observation."""
+    request = _step_params(
+        encoding, jpeg_quality, max_long_edge, wait_to_stabilize
+    )
+    if action is not None:
+      request["action"] = json.loads(action.json_str())
+    self._connection.send(json.dumps(request))
+    message = self._connection.recv()
+    if isinstance(message, str):
+      raise RuntimeError(f"Step failed: {json.loads(message)['message']}")
+    return observation_transport.decode(message)
+
+  def close(self) -> None:
+    self._connection.close()
+
+  def __enter__(self) -> "StepStream":
+    return self
+
+  def __exit__(self, *unused_exc_info: Any) -> None:
+    self.close()
+
+
 class AndroidEnvClient:
   """Client for interacting with the Android environment server."""
 
-  def __init__(self):
-    logger.info(
-        "Setting up Android environment using Docker - Initial setup may take"
-        " 5-10 minutes. Please wait..."
+  def __init__(
+      self,
+      base_url: str = "http://localhost:5000",
+      session_id: str | None = None,
+  ):
+    """Initializes the client.
+
+    Args:
+      base_url: The URL of the server.
+      session_id: The session whose device the client controls. If None, the
+        client controls the server's first device.
+    """
+    if session_id is None:
+      logger.info(
+          "Setting up Android environment using Docker - Initial setup may"
+          " take 5-10 minutes. Please wait..."
+      )
+    self.base_url = base_url
+    self.session_id = session_id
+
+  def _params(self, params: dict[str, Any] | None = None) -> dict[str, Any]:
+    """Returns the query parameters of a request to the session's device."""
+    params = dict(params or {})
+    if self.session_id is not None:
+      params["session_id"] = self.session_id
+    return params
+
+  def open_session(self) -> "AndroidEnvClient":
+    """Leases a device of the server and returns a client controlling it."""
+    response = requests.post(f"{self.base_url}/session/open")
+    response.raise_for_status()
+    return AndroidEnvClient(self.base_url, response.json()["session_id"])
+
+  def close_session(self) -> Response:
+    """Ends the client's session and returns its device to the server."""
+    response = requests.post(
+        f"{self.base_url}/session/close",
+        params={"session_id": self.session_id},
     )
-    self.base_url = "http://localhost:5000"
+    response.raise_for_status()
+    return Response(**response.json())
+
+  def get_pool_utilization(self) -> dict[str, Any]:
+    """Gets the number of devices of the server and how many are leased."""
+    response = requests.get(f"{self.base_url}/pool")
+    response.raise_for_status()
+    return response.json()
 
   def reset(self, go_home: bool) -> Response:
     """Resets the environment."""
     response = requests.post(
-        f"{self.base_url}/reset", params={"go_home": go_home}
+        f"{self.base_url}/reset", params=self._params({"go_home": go_home})
     )
     response.raise_for_status()
     return Response(**response.json())
 
   def get_screenshot(
-      self, wait_to_stabilize: bool = False
+      self,
+      wait_to_stabilize: bool = False,
+      encoding: image_transport.Encoding | None = image_transport.Encoding.RAW,
+      jpeg_quality: int = 75,
+      max_long_edge: int | None = None,
   ) -> np.ndarray[Any, Any]:
-    """Gets the current screenshot of the environment."""
+    """Gets the current screenshot of the environment.
+
+    Args:
+      wait_to_stabilize: Whether to wait for the screen to stabilize.
+      encoding: How the server sends the screenshot. `None` requests the legacy
+        JSON list of pixels.
+      jpeg_quality: For `JPEG`, the JPEG quality, from 0 to 100.
+      max_long_edge: If set, the server downscales the screenshot so its longer
+        edge has at most this many pixels. Ignored for the JSON list.
+
+    Returns:
+      The RGB screenshot.
+    """
+    params: dict[str, Any] = {"wait_to_stabilize": wait_to_stabilize}
+    if encoding is not None:
+      params["encoding"] = image_transport.Encoding(encoding).value
+      params["jpeg_quality"] = jpeg_quality
+      if max_long_edge is not None:
+        params["max_long_edge"] = max_long_edge
     response = requests.get(
-        f"{self.base_url}/screenshot",
-        params={"wait_to_stabilize": wait_to_stabilize},
+        f"{self.base_url}/screenshot", params=self._params(params)
     )
     response.raise_for_status()
-    image = response.json()
-    return np.array(image["pixels"])
+    if encoding is None:
+      return np.array(response.json()["pixels"])
+    return image_transport.decode(response.content, response.headers)
 
   def execute_action(
       self,
@@ -86,15 +213,69 @@ class AndroidEnvClient:
     """Executes an action in the environment."""
     print(f"Executing action: {action.json_str()}")
     response = requests.post(
-        f"{self.base_url}/execute_action", json=json.loads(action.json_str())
+        f"{self.base_url}/execute_action",
+        params=self._params(),
+        json=json.loads(action.json_str()),
     )
     response.raise_for_status()
     return Response(**response.json())
 
+  def step(
+      self,
+      action: json_action.JSONAction,
+      wait_to_stabilize: bool = False,
+      encoding: image_transport.Encoding = image_transport.Encoding.RAW,
+      jpeg_quality: int = 75,
+      max_long_edge: int | None = None,
+  ) -> observation_transport.Observation:
+    """Executes an action and returns the next observation in one request.
+
+    Args:
+      action: The action to execute.
+      wait_to_stabilize: Whether to wait for the screen to stabilize before
+        observing it.
+      encoding: How the server sends the screenshot.
+      jpeg_quality: For `JPEG`, the JPEG quality, from 0 to 100.
+      max_long_edge: If set, the server downscales the screenshot so its longer
+        edge has at most this many pixels.
+
+    Returns:
+      The screenshot and UI elements after the action, and the action result
+      in `info`.
+    """
+    response = requests.post(
+        f"{self.base_url}/step",
+        params=self._params(
+            _step_params(
+                encoding, jpeg_quality, max_long_edge, wait_to_stabilize
+            )
+        ),
+        json=json.loads(action.json_str()),
+    )
+    response.raise_for_status()
+    return observation_transport.decode(response.content)
+
+  def open_step_stream(self) -> StepStream:
+    """Opens a WebSocket connection to stream steps to the client's device.
+
+    Returns:
+      The stream, which saves the HTTP request overhead of `step`.
+
+    Raises:
+      ImportError: If the websocket-client package is not installed.
+    """
+    if websocket is None:
+      raise ImportError("Step streams require the websocket-client package.")
+    url = "ws" + self.base_url.removeprefix("http") + "/step/ws"
+    if self.session_id is not None:
+      url += f"?session_id={self.session_id}"
+    return StepStream(websocket.create_connection(url))
+
   def get_suite_task_list(self, max_index: int) -> list[str]:
     """Gets the list of tasks in the suite."""
     response = requests.get(
-        f"{self.base_url}/suite/task_list", params={"max_index": max_index}
+        f"{self.base_url}/suite/task_list",
+        params=self._params({"max_index": max_index}),
     )
     response.raise_for_status()
     return response.json()["task_list"]
@@ -102,7 +283,8 @@ class AndroidEnvClient:
   def get_suite_task_length(self, task_type: str) -> int:
     """Gets the length of the suite of tasks."""
     response = requests.get(
-        f"{self.base_url}/suite/task_length", params={"task_type": task_type}
+        f"{self.base_url}/suite/task_length",
+        params=self._params({"task_type": task_type}),
     )
     response.raise_for_status()
     return response.json()["length"]
@@ -113,14 +295,14 @@ class AndroidEnvClient:
       seed: int = 42,  # Default from initial server setup.
       task_family: str = "android_world",  # Default from initial server setup.
   ) -> Response:
-    """Reinitializes the suite of tasks."""
+    """Reinitializes the suite of tasks of the client's session."""
     response = requests.get(
         f"{self.base_url}/suite/reinitialize",
-        params={
+        params=self._params({
             "n_task_combinations": n_task_combinations,
             "seed": seed,
             "task_family": task_family,
-        },
+        }),
     )
     response.raise_for_status()
     return Response(**response.json())
@@ -128,41 +310,51 @@ class AndroidEnvClient:
   def initialize_task(self, task_type: str, task_idx: int) -> Response:
     """Initializes the task in the environment."""
     params: Params = {"task_type": task_type, "task_idx": task_idx}
-    response = requests.post(f"{self.base_url}/task/initialize", params=params)
+    response = requests.post(
+        f"{self.base_url}/task/initialize", params=self._params(params)
+    )
     response.raise_for_status()
     return Response(**response.json())
 
   def tear_down_task(self, task_type: str, task_idx: int) -> Response:
     """Tears down the task in the environment."""
     params: Params = {"task_type": task_type, "task_idx": task_idx}
-    response = requests.post(f"{self.base_url}/task/tear_down", params=params)
+    response = requests.post(
+        f"{self.base_url}/task/tear_down", params=self._params(params)
+    )
     response.raise_for_status()
     return Response(**response.json())
 
   def get_task_score(self, task_type: str, task_idx: int) -> float:
     """Gets the score of the current task."""
     params: Params = {"task_type": task_type, "task_idx": task_idx}
-    response = requests.get(f"{self.base_url}/task/score", params=params)
+    response = requests.get(
+        f"{self.base_url}/task/score", params=self._params(params)
+    )
     response.raise_for_status()
     return response.json()["score"]
 
   def get_task_goal(self, task_type: str, task_idx: int) -> str:
     """Gets the goal of the current task."""
     params: Params = {"task_type": task_type, "task_idx": task_idx}
-    response = requests.get(f"{self.base_url}/task/goal", params=params)
+    response = requests.get(
+        f"{self.base_url}/task/goal", params=self._params(params)
+    )
     response.raise_for_status()
     return response.json()["goal"]
 
   def get_task_template(self, task_type: str, task_idx: int) -> str:
     """Gets the template of the current task."""
     params: Params = {"task_type": task_type, "task_idx": task_idx}
-    response = requests.get(f"{self.base_url}/task/template", params=params)
+    response = requests.get(
+        f"{self.base_url}/task/template", params=self._params(params)
+    )
     response.raise_for_status()
     return response.json()["template"]
 
   def close(self) -> None:
     """Closes the environment."""
-    response = requests.post(f"{self.base_url}/close")
+    response = requests.post(f"{self.base_url}/close", params=self._params())
     response.raise_for_status()
 
   def health(self) -> bool:
@@ -176,6 +368,42 @@ class AndroidEnvClient:
     return True
 
 
+def run_tasks(client: AndroidEnvClient, tasks: list[tuple[str, int]]) -> None:
+  """Runs tasks, given by their type and index, on the client's device."""
+  for task_name, cur_idx in tasks:
+    task_template = client.get_task_template(
+        task_type=task_name, task_idx=cur_idx
+    )
+    print(f"task_template: {task_template}")
+
+    task_goal = client.get_task_goal(task_type=task_name, task_idx=cur_idx)
+    print(f"task_goal: {task_goal}")
+
+    try:
+      res = client.initialize_task(task_type=task_name, task_idx=cur_idx)
+      print(f"initialize_task response: {res}")
+
+      # Complete the task using your agent...
+
+      task_score = client.get_task_score(task_type=task_name, task_idx=cur_idx)
+      print(f"task_score: {task_score}")
+
+      res = client.tear_down_task(task_type=task_name, task_idx=cur_idx)
+      print(f"tear_down_task response: {res}")
+
+    except Exception as e:  # pylint: disable=broad-exception-caught
+      # Error tasks:
+      # RetroPlayingQueue -> sqlite3.OperationalError: no such table:
+      # playing_queue.
+      # SimpleSmsReplyMostRecent -> IndexError: list index out of range
+      print(f"Error initializing task {task_name} {cur_idx}: {e}")
+      print("Continuing to next task...")
+      continue
+
+    res = client.reset(go_home=True)
+    print(f"reset response: {res}")
+
+
 if __name__ == "__main__":
   client = AndroidEnvClient()
 
@@ -197,49 +425,47 @@ if __name__ == "__main__":
   )
   print(f"execute_action response: {res}")
 
+  observation = client.step(
+      json_action.JSONAction(action_type="navigate_home")
+  )
+  print(
+      f"step response: {observation.info}, screen dimensions:"
+      f" {observation.pixels.shape}, {len(observation.ui_elements)} UI elements"
+  )
+
   task_list = client.get_suite_task_list(max_index=-1)
   print(task_list)
 
   res = client.reinitialize_suite()
   print(f"reinitialize_suite response: {res}")
 
+  all_tasks = []
   for task_name in task_list:
     num_tasks = client.get_suite_task_length(task_type=task_name)
     print(f"num_tasks: {num_tasks}")
-
-    for cur_idx in range(num_tasks):
-      task_template = client.get_task_template(
-          task_type=task_name, task_idx=cur_idx
+    all_tasks.extend((task_name, cur_idx) for cur_idx in range(num_tasks))
+
+  # One session per free device of the server, each running a share of the
+  # tasks.
+  pool = client.get_pool_utilization()
+  if not pool["available"]:
+    raise RuntimeError(
+        f"All {pool['size']} devices of the server are leased to other"
+        " sessions; retry once one is free."
+    )
+  num_sessions = max(1, min(pool["available"], len(all_tasks)))
+  session_clients = [client.open_session() for _ in range(num_sessions)]
+  try:
+    with futures.ThreadPoolExecutor(max_workers=num_sessions) as executor:
+      list(
+          executor.map(
+              run_tasks,
+              session_clients,
+              [all_tasks[i::num_sessions] for i in range(num_sessions)],
+          )
       )
-      print(f"task_template: {task_template}")
-
-      task_goal = client.get_task_goal(task_type=task_name, task_idx=cur_idx)
-      print(f"task_goal: {task_goal}")
-
-      try:
-        res = client.initialize_task(task_type=task_name, task_idx=cur_idx)
-        print(f"initialize_task response: {res}")
-
-        # Complete the task using your agent...
-
-        task_score = client.get_task_score(
-            task_type=task_name, task_idx=cur_idx
-        )
-        print(f"task_score: {task_score}")
-
-        res = client.tear_down_task(task_type=task_name, task_idx=cur_idx)
-        print(f"tear_down_task response: {res}")
-
-      except Exception as e:  # pylint: disable=broad-exception-caught
-        # Error tasks:
-        # RetroPlayingQueue -> sqlite3.OperationalError: no such table:
-        # playing_queue.
-        # SimpleSmsReplyMostRecent -> IndexError: list index out of range
-        print(f"Error initializing task {task_name} {cur_idx}: {e}")
-        print("Continuing to next task...")
-        continue
-
-      res = client.reset(go_home=True)
-      print(f"reset response: {res}")
+  finally:
+    for session_client in session_clients:
+      session_client.close_session()
 
   client.close()
@@ -0,0 +1,129 @@
+# Copyright 2025 The android_world Authors.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Compares text input throughput of the `adb_utils.type_text` methods.
+
+Before running, launch an emulator, open an app with a multi-line text field
+(e.g. a new note in Markor) and focus the field. The field is cleared before
+every trial.
+
+python scripts/text_input_benchmark.py --adb_path=... --num_words=200
+"""
+
+from collections.abc import Sequence
+import random
+import time
+
+from absl import app
+from absl import flags
+from android_world.env import adb_utils
+from android_world.env import android_world_controller
+from android_world.env import env_launcher
+
+_ADB_PATH = flags.DEFINE_string(
+    'adb_path',
+    android_world_controller.DEFAULT_ADB_PATH,
+    'Path to adb.',
+)
+_CONSOLE_PORT = flags.DEFINE_integer(
+    'console_port', 5554, 'The console port of the running Android device.'
+)
+_NUM_WORDS = flags.DEFINE_integer(
+    'num_words', 200, 'Number of words in the typed text.'
+)
+_WORDS_PER_LINE = flags.DEFINE_integer(
+    'words_per_line', 12, 'Number of words per line of the typed text.'
+)
+_NUM_TRIALS = flags.DEFINE_integer(
+    'num_trials', 3, 'Number of trials per input method.'
+)
+_METHODS = flags.DEFINE_list(
+    'methods', ['words', 'clipboard'], 'Input methods to compare.'
+)
+
+_VOCABULARY = (
+    'the quick brown fox jumps over lazy dog meeting notes agenda budget'
+    ' review follow up with team on Monday deadline project draft'
+).split()
+
+
+def _make_text(num_words: int, words_per_line: int) -> str:
+  rng = random.Random(0)
+  lines = []
+  for start in range(0, num_words, words_per_line):
+    n = min(words_per_line, num_words - start)
+    lines.append(' '.join(rng.choice(_VOCABULARY) for _ in range(n)))
+  return '\n'.join(lines)
+
+
+def _clear_focused_field(env: android_world_controller.AndroidWorldController):
+  # Select all (CTRL+A) and delete, as done for `clear_text` input actions.
+  adb_utils.issue_generic_request(
+      [
+          'shell',
+          'input',
+          'keycombination',
+          '113',
+          '29',
+          '&&',
+          'input',
+          'keyevent',
+          '67',
+      ],
+      env,
+  )
+  time.sleep(1.0)
+
+
+def main(argv: Sequence[str]) -> None:
+  if len(argv) > 1:
+    raise app.UsageError('Too many command-line arguments.')
+
+  env = env_launcher.load_and_setup_env(
+      console_port=_CONSOLE_PORT.value,
+      freeze_datetime=False,
+      adb_path=_ADB_PATH.value,
+  )
+  controller = env.controller
+  num_requests = 0
+  execute_adb_call = controller.execute_adb_call
+
+  def counting_execute_adb_call(*args, **kwargs):
+    nonlocal num_requests
+    num_requests += 1
+    return execute_adb_call(*args, **kwargs)
+
+  controller.execute_adb_call = counting_execute_adb_call
+
+  text = _make_text(_NUM_WORDS.value, _WORDS_PER_LINE.value)
+  print(f'Typing {len(text)} characters ({_NUM_WORDS.value} words).')
+  print(f'{"method":<10} {"seconds":>8} {"chars/s":>8} {"requests":>8}')
+  try:
+    for method in _METHODS.value:
+      for _ in range(_NUM_TRIALS.value):
+        _clear_focused_field(controller)
+        num_requests = 0
+        start = time.perf_counter()
+        adb_utils.type_text(text, controller, method=method)
+        elapsed = time.perf_counter() - start
+        print(
+            f'{method:<10} {elapsed:>8.2f} {len(text) / elapsed:>8.1f}'
+            f' {num_requests:>8d}'
+        )
+  finally:
+    env.close()
+
+
+if __name__ == '__main__':
+  app.run(main)
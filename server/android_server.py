@@ -16,21 +16,54 @@
 
 This server exposes endpoints to control an Android emulator, execute tasks,
 and manage task execution on AndroidWorld tasks.
+
+The server can manage a pool of emulators, given by the comma-separated
+`ANDROID_WORLD_CONSOLE_PORTS` and `ANDROID_WORLD_GRPC_PORTS` environment
+variables (by default the single emulator on 5554/8554). Each agent opens a
+session with `/session/open`, which leases it a device, and passes the returned
+`session_id` to the device, suite and task endpoints. Requests without a
+`session_id` go to the first emulator.
+
+Each session has its own task suite, so sessions running the same task do not
+share its instance.
 """
 
+import asyncio
+from collections.abc import Callable
 import contextlib
+import os
+import threading
 import typing
 from typing import Any
 
 from android_world import registry as aw_registry_module
 from android_world import suite_utils
+from android_world.env import device_pool
+from android_world.env import device_worker
 from android_world.env import env_launcher
 from android_world.env import interface
 from android_world.env import json_action
+from android_world.utils import image_transport
+from android_world.utils import observation_transport
 import fastapi
 import pydantic
 import uvicorn
 
+T = typing.TypeVar("T")
+
+# Seconds a request waits for a device operation, including the time it spends
+# queued behind other operations on the device, unless it sets `timeout`.
+_DEFAULT_DEVICE_TIMEOUT_SECONDS = 600.0
+
+# Params of the suite a session gets until it reinitializes it.
+_DEFAULT_TASK_FAMILY = "android_world"
+_DEFAULT_N_TASK_COMBINATIONS = 2
+_DEFAULT_SEED = 42
+
+
+def _ports_from_environment(name: str, default: str) -> list[int]:
+  return [int(port) for port in os.environ.get(name, default).split(",")]
+
 
 class StateResponse(pydantic.BaseModel):
   """Pydantic model for state responses, including pixels and UI elements."""
@@ -41,41 +74,97 @@ class StateResponse(pydantic.BaseModel):
 
 @contextlib.asynccontextmanager
 async def lifespan(fast_api_app: fastapi.FastAPI):
-  """Manages the lifecycle of the Android environment and task suite."""
-  fast_api_app.state.app_android_env = env_launcher.load_and_setup_env(
-      console_port=5554,
+  """Manages the lifecycle of the Android environments and task suite."""
+  console_ports = _ports_from_environment(
+      "ANDROID_WORLD_CONSOLE_PORTS", "5554"
+  )
+  envs = env_launcher.load_and_setup_envs(
+      console_ports=console_ports,
+      grpc_ports=_ports_from_environment("ANDROID_WORLD_GRPC_PORTS", "8554"),
       emulator_setup=True,
       freeze_datetime=True,
       adb_path="/opt/android/platform-tools/adb",
   )
-  task_registry = aw_registry_module.TaskRegistry()
-  aw_registry = task_registry.get_registry(task_registry.ANDROID_WORLD_FAMILY)
-  initial_suite = suite_utils.create_suite(
-      task_registry=aw_registry,
-      n_task_combinations=2,
-      seed=42,  # Optional: for reproducibility
+  fast_api_app.state.device_pool = device_pool.DevicePool(
+      envs, names=[str(port) for port in console_ports]
   )
-  fast_api_app.state.suite = initial_suite
-  fast_api_app.state.task_registry = task_registry
+  fast_api_app.state.task_registry = aw_registry_module.TaskRegistry()
+  # Suites by session ID, created when a session first needs one.
+  fast_api_app.state.suites = {}
+  fast_api_app.state.suites_lock = threading.Lock()
   yield
   # Shutdown
-  if fast_api_app.state.app_android_env is not None:
-    fast_api_app.state.app_android_env.close()
+  await asyncio.to_thread(fast_api_app.state.device_pool.close)
 
 
 app = fastapi.FastAPI(lifespan=lifespan)
 suite_router = fastapi.APIRouter(prefix="/suite", tags=["suite"])
 task_router = fastapi.APIRouter(prefix="/task", tags=["task"])
+session_router = fastapi.APIRouter(prefix="/session", tags=["session"])
 
 
-def get_app_android_env(request: fastapi.Request) -> interface.AsyncEnv:
-  """Dependency to get the application's Android environment instance."""
-  return request.app.state.app_android_env
+def get_device_pool(request: fastapi.Request) -> device_pool.DevicePool:
+  """Dependency to get the application's pool of devices."""
+  return request.app.state.device_pool
 
 
-def get_app_suite(request: fastapi.Request) -> suite_utils.Suite:
-  """Dependency to get the application's task suite instance."""
-  return request.app.state.suite
+DevicePool = typing.Annotated[
+    device_pool.DevicePool, fastapi.Depends(get_device_pool)
+]
+
+
+def get_device(
+    pool: DevicePool, session_id: str | None = None
+) -> device_pool.Device:
+  """Dependency to get the device of the request's session."""
+  try:
+    return pool.get(session_id)
+  except device_pool.UnknownSessionError as exc:
+    raise fastapi.HTTPException(
+        status_code=404, detail=f"Unknown session: {session_id}"
+    ) from exc
+  except device_pool.NoDeviceAvailableError as exc:
+    raise fastapi.HTTPException(status_code=409, detail=str(exc)) from exc
+
+
+Device = typing.Annotated[device_pool.Device, fastapi.Depends(get_device)]
+
+
+def get_app_android_env(device: Device) -> interface.AsyncEnv:
+  """Dependency to get the Android environment of the request's session."""
+  return device.env
+
+
+def _create_suite(
+    task_registry: aw_registry_module.TaskRegistry,
+    task_family: str = _DEFAULT_TASK_FAMILY,
+    n_task_combinations: int = _DEFAULT_N_TASK_COMBINATIONS,
+    seed: int = _DEFAULT_SEED,
+) -> suite_utils.Suite:
+  """Creates a suite; raises a ValueError if the task family is invalid."""
+  return suite_utils.create_suite(
+      task_registry=task_registry.get_registry(task_family),
+      n_task_combinations=n_task_combinations,
+      seed=seed,
+  )
+
+
+def get_app_suite(
+    request: fastapi.Request, device: Device, session_id: str | None = None
+) -> suite_utils.Suite:
+  """Dependency to get the task suite of the request's session."""
+  del device  # Only resolved to reject unknown sessions.
+  state = request.app.state
+  with state.suites_lock:
+    suite = state.suites.get(session_id)
+    if suite is None:
+      suite = state.suites[session_id] = _create_suite(state.task_registry)
+  return suite
+
+
+def get_device_worker(device: Device) -> device_worker.DeviceWorker:
+  """Dependency to get the worker that runs the operations on the device."""
+  return device.worker
 
 
 AndroidEnv = typing.Annotated[
@@ -84,12 +173,37 @@ AndroidEnv = typing.Annotated[
 AndroidSuite = typing.Annotated[
     suite_utils.Suite, fastapi.Depends(get_app_suite)
 ]
+DeviceWorker = typing.Annotated[
+    device_worker.DeviceWorker, fastapi.Depends(get_device_worker)
+]
+DeviceTimeout = typing.Annotated[float, fastapi.Query(gt=0)]
+
+
+async def run_on_device(
+    worker: device_worker.DeviceWorker,
+    timeout: float,
+    fn: Callable[..., T],
+    *args: typing.Any,
+) -> T:
+  """Runs a blocking device operation without blocking the event loop."""
+  try:
+    return await worker.run(fn, *args, timeout=timeout)
+  except TimeoutError as exc:
+    raise fastapi.HTTPException(
+        status_code=504,
+        detail=f"Device operation timed out after {timeout} seconds.",
+    ) from exc
 
 
 @app.post("/reset")
-async def reset(go_home: bool, app_android_env: AndroidEnv):
+async def reset(
+    go_home: bool,
+    app_android_env: AndroidEnv,
+    worker: DeviceWorker,
+    timeout: DeviceTimeout = _DEFAULT_DEVICE_TIMEOUT_SECONDS,
+):
   """Resets the Android environment, optionally returning to the home screen."""
-  app_android_env.reset(go_home=go_home)
+  await run_on_device(worker, timeout, app_android_env.reset, go_home)
   return {
       "status": "success",
       "message": f"Environment reset with go_home={go_home}.",
@@ -97,22 +211,155 @@ async def reset(go_home: bool, app_android_env: AndroidEnv):
 
 
 @app.get("/screenshot")
-async def get_screenshot(wait_to_stabilize: bool, app_android_env: AndroidEnv):
-  """Captures and returns the current screenshot of the Android environment."""
-  state = app_android_env.get_state(wait_to_stabilize=wait_to_stabilize)
-  return {"pixels": state.pixels.tolist()}
+async def get_screenshot(
+    wait_to_stabilize: bool,
+    app_android_env: AndroidEnv,
+    worker: DeviceWorker,
+    timeout: DeviceTimeout = _DEFAULT_DEVICE_TIMEOUT_SECONDS,
+    encoding: image_transport.Encoding | None = None,
+    jpeg_quality: typing.Annotated[int, fastapi.Query(ge=0, le=100)] = 75,
+    max_long_edge: typing.Annotated[int | None, fastapi.Query(gt=0)] = None,
+):
+  """Captures and returns the current screenshot of the Android environment.
+
+  Without `encoding`, the pixels are returned as a JSON list. With `encoding`,
+  the screenshot is returned in the response body as raw bytes (with its shape
+  and dtype in headers) or as a PNG or JPEG image, which is orders of magnitude
+  cheaper to produce and parse.
+  """
+  state = await run_on_device(
+      worker, timeout, app_android_env.get_state, wait_to_stabilize
+  )
+  if encoding is None:
+    return {"pixels": await asyncio.to_thread(state.pixels.tolist)}
+  content, media_type, headers = await asyncio.to_thread(
+      image_transport.encode,
+      state.pixels,
+      encoding,
+      jpeg_quality=jpeg_quality,
+      max_long_edge=max_long_edge,
+  )
+  return fastapi.Response(
+      content=content, media_type=media_type, headers=headers
+  )
 
 
 @app.post("/execute_action")
 async def execute_action(
-    action_dict: dict[str, typing.Any], app_android_env: AndroidEnv
+    action_dict: dict[str, typing.Any],
+    app_android_env: AndroidEnv,
+    worker: DeviceWorker,
+    timeout: DeviceTimeout = _DEFAULT_DEVICE_TIMEOUT_SECONDS,
 ):
   """Executes a given JSON-formatted action in the Android environment."""
   action = json_action.JSONAction(**action_dict)
-  app_android_env.execute_action(action)
+  await run_on_device(worker, timeout, app_android_env.execute_action, action)
   return {"status": "success", "message": f"Action {action} executed."}
 
 
+def _step(
+    env: interface.AsyncEnv,
+    action: json_action.JSONAction | None,
+    wait_to_stabilize: bool,
+) -> interface.State:
+  """Executes an action, if any, and returns the next state."""
+  if action is not None:
+    env.execute_action(action)
+  return env.get_state(wait_to_stabilize=wait_to_stabilize)
+
+
+@app.post("/step")
+async def step(
+    action_dict: dict[str, typing.Any],
+    app_android_env: AndroidEnv,
+    worker: DeviceWorker,
+    wait_to_stabilize: bool = False,
+    timeout: DeviceTimeout = _DEFAULT_DEVICE_TIMEOUT_SECONDS,
+    encoding: image_transport.Encoding = image_transport.Encoding.RAW,
+    jpeg_quality: typing.Annotated[int, fastapi.Query(ge=0, le=100)] = 75,
+    max_long_edge: typing.Annotated[int | None, fastapi.Query(gt=0)] = None,
+):
+  """Executes an action and returns the next observation in one response.
+
+  The response body is an `observation_transport` message holding the
+  screenshot, the UI elements and the action result.
+  """
+  action = json_action.JSONAction(**action_dict)
+  state = await run_on_device(
+      worker, timeout, _step, app_android_env, action, wait_to_stabilize
+  )
+  content = await asyncio.to_thread(
+      observation_transport.encode,
+      state.pixels,
+      state.ui_elements,
+      encoding,
+      jpeg_quality,
+      max_long_edge,
+      status="success",
+      message=f"Action {action} executed.",
+  )
+  return fastapi.Response(
+      content=content, media_type=observation_transport.MEDIA_TYPE
+  )
+
+
+@app.websocket("/step/ws")
+async def step_stream(
+    websocket: fastapi.WebSocket, session_id: str | None = None
+):
+  """Streams steps over a persistent connection.
+
+  Each JSON message may hold an `action` (a `JSONAction` dict; if omitted, the
+  current state is observed) and the `wait_to_stabilize`, `timeout`,
+  `encoding`, `jpeg_quality` and `max_long_edge` options of `/step`. It is
+  answered with an `observation_transport` binary message, or with a JSON
+  message with an error status if the step failed.
+  """
+  try:
+    device = websocket.app.state.device_pool.get(session_id)
+  except (
+      device_pool.UnknownSessionError,
+      device_pool.NoDeviceAvailableError,
+  ) as exc:
+    await websocket.close(code=1008, reason=str(exc))
+    return
+  await websocket.accept()
+  try:
+    while True:
+      request = await websocket.receive_json()
+      try:
+        action = request.get("action")
+        if action is not None:
+          action = json_action.JSONAction(**action)
+        state = await device.worker.run(
+            _step,
+            device.env,
+            action,
+            bool(request.get("wait_to_stabilize", False)),
+            timeout=request.get("timeout", _DEFAULT_DEVICE_TIMEOUT_SECONDS),
+        )
+        content = await asyncio.to_thread(
+            observation_transport.encode,
+            state.pixels,
+            state.ui_elements,
+            image_transport.Encoding(request.get("encoding", "raw")),
+            request.get("jpeg_quality", 75),
+            request.get("max_long_edge"),
+            status="success",
+            message=(
+                "State observed."
+                if action is None
+                else f"Action {action} executed."
+            ),
+        )
+      except Exception as e:  # pylint: disable=broad-exception-caught
+        await websocket.send_json({"status": "error", "message": repr(e)})
+        continue
+      await websocket.send_bytes(content)
+  except fastapi.WebSocketDisconnect:
+    pass
+
+
 @suite_router.get("/task_list")
 async def suite_task_list(max_index: int, app_suite: AndroidSuite):
   """Returns a list of task keys from the current suite, up to max_index."""
@@ -130,24 +377,25 @@ async def suite_task_length(task_type: str, app_suite: AndroidSuite):
 @suite_router.get("/reinitialize")
 def reinitialize_suite(
     request: fastapi.Request,
-    n_task_combinations: int = 2,  # Default from initial lifespan setup
-    seed: int = 42,  # Default from initial lifespan setup
-    task_family: str = "android_world",
+    device: Device,
+    session_id: str | None = None,
+    n_task_combinations: int = _DEFAULT_N_TASK_COMBINATIONS,
+    seed: int = _DEFAULT_SEED,
+    task_family: str = _DEFAULT_TASK_FAMILY,
 ):
-  """Re-initializes the task suite with new parameters."""
-  task_registry = request.app.state.task_registry
+  """Re-initializes the task suite of the session with new parameters."""
+  del device  # Only resolved to reject unknown sessions.
+  state = request.app.state
   try:
-    current_aw_registry = task_registry.get_registry(task_family)
+    new_suite = _create_suite(
+        state.task_registry, task_family, n_task_combinations, seed
+    )
   except ValueError as exc:
     raise fastapi.HTTPException(
         status_code=400, detail=f"Invalid task family: {task_family}"
     ) from exc
-  new_suite = suite_utils.create_suite(
-      task_registry=current_aw_registry,
-      n_task_combinations=n_task_combinations,
-      seed=seed,
-  )
-  request.app.state.suite = new_suite
+  with state.suites_lock:
+    state.suites[session_id] = new_suite
   return {
       "status": "success",
       "message": (
@@ -157,15 +405,32 @@ def reinitialize_suite(
   }
 
 
+async def _get_task(
+    app_suite: suite_utils.Suite, task_type: str, task_idx: int
+) -> Any:
+  """Looks up a task instance off the event loop, as it may be created."""
+  return await asyncio.to_thread(lambda: app_suite[task_type][task_idx])
+
+
 @task_router.post("/initialize")
 async def initialize_task(
     task_type: str,
     task_idx: int,
     app_android_env: AndroidEnv,
     app_suite: AndroidSuite,
+    worker: DeviceWorker,
+    timeout: DeviceTimeout = _DEFAULT_DEVICE_TIMEOUT_SECONDS,
 ):
   """Initializes a specific task in the Android environment."""
-  app_suite[task_type][task_idx].initialize_task(app_android_env)
+
+  def initialize():
+    # The instance may only be created now, which generates its params; this
+    # is kept off the event loop.
+    suite_utils.initialize_task(
+        app_suite[task_type][task_idx], app_android_env
+    )
+
+  await run_on_device(worker, timeout, initialize)
   return {
       "status": "success",
       "message": f"Task {task_type} {task_idx} initialized.",
@@ -178,9 +443,15 @@ async def tear_down_task(
     task_idx: int,
     app_android_env: AndroidEnv,
     app_suite: AndroidSuite,
+    worker: DeviceWorker,
+    timeout: DeviceTimeout = _DEFAULT_DEVICE_TIMEOUT_SECONDS,
 ):
   """Tears down a specific task in the Android environment."""
-  app_suite[task_type][task_idx].tear_down(app_android_env)
+  await run_on_device(
+      worker,
+      timeout,
+      lambda: app_suite[task_type][task_idx].tear_down(app_android_env),
+  )
   return {
       "status": "success",
       "message": f"Task {task_type} {task_idx} torn down.",
@@ -193,17 +464,26 @@ async def get_task_score(
     task_idx: int,
     app_android_env: AndroidEnv,
     app_suite: AndroidSuite,
+    worker: DeviceWorker,
+    timeout: DeviceTimeout = _DEFAULT_DEVICE_TIMEOUT_SECONDS,
 ):
   """Gets the success status (score) of a specific task."""
   return {
-      "score": app_suite[task_type][task_idx].is_successful(app_android_env)
+      "score": await run_on_device(
+          worker,
+          timeout,
+          lambda: app_suite[task_type][task_idx].is_successful(
+              app_android_env
+          ),
+      )
   }
 
 
 @task_router.get("/goal")
 async def get_task_goal(task_type: str, task_idx: int, app_suite: AndroidSuite):
   """Gets the goal description of a specific task."""
-  return {"goal": app_suite[task_type][task_idx].goal}
+  task = await _get_task(app_suite, task_type, task_idx)
+  return {"goal": task.goal}
 
 
 @task_router.get("/template")
@@ -211,28 +491,71 @@ async def get_task_template(
     task_type: str, task_idx: int, app_suite: AndroidSuite
 ):
   """Gets the template or configuration details of a specific task."""
-  return {"template": app_suite[task_type][task_idx].template}
+  task = await _get_task(app_suite, task_type, task_idx)
+  return {"template": task.template}
 
 
 @app.post("/close")
-async def close(app_android_env: AndroidEnv):
+async def close(
+    app_android_env: AndroidEnv,
+    worker: DeviceWorker,
+    timeout: DeviceTimeout = _DEFAULT_DEVICE_TIMEOUT_SECONDS,
+):
   """Closes the Android environment."""
-  app_android_env.close()
+  await run_on_device(worker, timeout, app_android_env.close)
   return {"status": "success"}
 
 
 @app.get("/health")
-async def health(app_android_env: AndroidEnv):
+async def health(request: fastapi.Request):
   """Checks the health of the Android environment server."""
-  if isinstance(app_android_env, interface.AsyncEnv):
+  if isinstance(
+      getattr(request.app.state, "device_pool", None), device_pool.DevicePool
+  ):
     return {"status": "success"}
   raise fastapi.HTTPException(
       status_code=500, detail="Environment not initialized"
   )
 
 
+@app.get("/pool")
+async def pool_utilization(pool: DevicePool):
+  """Returns the number of leased devices and the load of each device."""
+  return pool.utilization()
+
+
+@session_router.post("/open")
+async def open_session(pool: DevicePool):
+  """Leases a free device to a new session."""
+  try:
+    session_id = pool.open_session()
+  except device_pool.NoDeviceAvailableError as exc:
+    raise fastapi.HTTPException(status_code=503, detail=str(exc)) from exc
+  return {"session_id": session_id, "device": pool.get(session_id).name}
+
+
+@session_router.post("/close")
+async def close_session(
+    session_id: str, pool: DevicePool, request: fastapi.Request
+):
+  """Ends a session, dropping its suite, and returns its device to the pool."""
+  try:
+    device = pool.close_session(session_id)
+  except device_pool.UnknownSessionError as exc:
+    raise fastapi.HTTPException(
+        status_code=404, detail=f"Unknown session: {session_id}"
+    ) from exc
+  with request.app.state.suites_lock:
+    request.app.state.suites.pop(session_id, None)
+  return {
+      "status": "success",
+      "message": f"Session {session_id} closed, device {device.name} freed.",
+  }
+
+
 app.include_router(suite_router)
 app.include_router(task_router)
+app.include_router(session_router)
 
 if __name__ == "__main__":
   uvicorn.run(app, host="0.0.0.0", port=5000)